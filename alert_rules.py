@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Windowed Alert Rule Engine for IBE-100
+Declarative stream alerts with sliding windows, hold-off and hysteresis
+
+A rule such as "continuity_errors sum over 10 s > 5" or "bitrate < 1 Mbps
+for 3 s" is evaluated incrementally: every channel keeps one sliding-window
+aggregate per distinct (field, aggregate, window), shared by all rules that
+use it, and updated in O(1) amortized per sample. Alerts move through
+pending/firing/clearing states, so a single noisy reading does not flap
+them, and notifications are batched and deduplicated before delivery.
+"""
+
+import json
+import operator
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Any, Callable, Tuple
+
+
+COMPARISONS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le}
+# A firing '>' rule clears at or below clear_threshold, a '<' rule at or above it
+CLEAR_COMPARISONS = {'>': operator.le, '>=': operator.lt, '<': operator.ge, '<=': operator.gt}
+AGGREGATES = ('last', 'sum', 'mean', 'min', 'max', 'count')
+
+STATE_OK = 'ok'
+STATE_PENDING = 'pending'
+STATE_FIRING = 'firing'
+STATE_CLEARING = 'clearing'
+
+
+@dataclass
+class AlertRule:
+    """A threshold on a windowed aggregate of one stats field"""
+    name: str
+    field: str
+    op: str
+    threshold: float
+    aggregate: str = 'last'
+    window: float = 0.0
+    # The condition must hold this long before the alert fires
+    for_duration: float = 0.0
+    # Hysteresis: a firing alert clears past this value, default threshold
+    clear_threshold: Optional[float] = None
+    # The clear condition must hold this long before the alert clears
+    clear_after: float = 0.0
+    severity: str = 'warning'
+    message: str = ''
+    # Only this channel, None for every channel
+    channel: Optional[str] = None
+
+    def __post_init__(self):
+        if self.op not in COMPARISONS:
+            raise ValueError(f"Unknown comparison: {self.op}")
+        if self.aggregate not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate: {self.aggregate}")
+        if self.clear_threshold is None:
+            self.clear_threshold = self.threshold
+        if not self.message:
+            window = f" {self.aggregate} over {self.window:g}s" if self.window else ""
+            self.message = f"{self.field}{window} {self.op} {self.threshold:g}"
+
+    @property
+    def window_key(self) -> Tuple[str, str, float]:
+        if not self.window:
+            return (self.field, 'last', 0.0)
+        return (self.field, self.aggregate, float(self.window))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'AlertRule':
+        return cls(**data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class SlidingWindow:
+    """Time-based sliding aggregate with O(1) amortized updates"""
+
+    def __init__(self, aggregate: str, seconds: float):
+        self.aggregate = aggregate
+        self.seconds = seconds
+        self.samples: deque = deque()
+        self.total = 0.0
+        self.value: Optional[float] = None
+
+    def push(self, timestamp: float, value: float) -> float:
+        if not self.seconds or self.aggregate == 'last':
+            self.value = value
+            return value
+        samples = self.samples
+        if self.aggregate in ('min', 'max'):
+            # Monotonic deque: the front is the current extreme
+            worse = operator.ge if self.aggregate == 'min' else operator.le
+            while samples and worse(samples[-1][1], value):
+                samples.pop()
+            samples.append((timestamp, value))
+        else:
+            samples.append((timestamp, value))
+            self.total += value
+        horizon = timestamp - self.seconds
+        while samples and samples[0][0] <= horizon:
+            expired = samples.popleft()
+            if self.aggregate not in ('min', 'max'):
+                self.total -= expired[1]
+
+        if self.aggregate in ('min', 'max'):
+            self.value = samples[0][1]
+        elif self.aggregate == 'sum':
+            self.value = self.total
+        elif self.aggregate == 'mean':
+            self.value = self.total / len(samples)
+        else:
+            self.value = float(len(samples))
+        return self.value
+
+
+@dataclass
+class AlertState:
+    """State of one rule on one channel"""
+    rule: AlertRule
+    channel: str
+    state: str = STATE_OK
+    since: float = 0.0
+    value: Optional[float] = None
+    fired_at: Optional[float] = None
+
+
+class _ChannelRules:
+    """Windows and alert states of one channel"""
+
+    def __init__(self):
+        self.windows: Dict[Tuple[str, str, float], SlidingWindow] = {}
+        # field -> [(window key, state)]
+        self.by_field: Dict[str, List[Tuple[Tuple[str, str, float], AlertState]]] = {}
+
+
+class AlertRuleEngine:
+    """Evaluates rules for many channels and delivers batched notifications"""
+
+    def __init__(self, batch_interval: float = 0.0):
+        self.rules: Dict[str, AlertRule] = {}
+        self.channels: Dict[str, _ChannelRules] = {}
+        self.batch_interval = batch_interval
+        self.callbacks: List[Callable[[List[Dict[str, Any]]], None]] = []
+        self._pending: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._last_delivery = 0.0
+        self._lock = threading.RLock()
+
+    def add_rule(self, rule: AlertRule):
+        """Add or replace a rule"""
+        with self._lock:
+            self.remove_rule(rule.name)
+            self.rules[rule.name] = rule
+            for channel, channel_rules in self.channels.items():
+                self._attach(channel, channel_rules, rule)
+
+    def remove_rule(self, name: str):
+        with self._lock:
+            if self.rules.pop(name, None) is None:
+                return
+            for channel_rules in self.channels.values():
+                for field, entries in channel_rules.by_field.items():
+                    entries[:] = [entry for entry in entries if entry[1].rule.name != name]
+                used = {key for entries in channel_rules.by_field.values() for key, _ in entries}
+                for key in [key for key in channel_rules.windows if key not in used]:
+                    del channel_rules.windows[key]
+
+    def load_rules(self, path: str):
+        """Add rules from a JSON list of rule objects"""
+        with open(path, 'r') as f:
+            for data in json.load(f):
+                self.add_rule(AlertRule.from_dict(data))
+
+    def add_callback(self, callback: Callable[[List[Dict[str, Any]]], None]):
+        """Receive notifications, a list per delivered batch"""
+        self.callbacks.append(callback)
+
+    def _attach(self, channel: str, channel_rules: _ChannelRules, rule: AlertRule):
+        if rule.channel is not None and rule.channel != channel:
+            return
+        key = rule.window_key
+        if key not in channel_rules.windows:
+            channel_rules.windows[key] = SlidingWindow(key[1], key[2])
+        channel_rules.by_field.setdefault(rule.field, []).append((key, AlertState(rule, channel)))
+
+    def _channel(self, channel: str) -> _ChannelRules:
+        channel_rules = self.channels.get(channel)
+        if channel_rules is None:
+            channel_rules = _ChannelRules()
+            for rule in self.rules.values():
+                self._attach(channel, channel_rules, rule)
+            self.channels[channel] = channel_rules
+        return channel_rules
+
+    def evaluate(self, stats, channel: str = '', timestamp: Optional[float] = None):
+        """Feed one sample (StreamStats or dict) of a channel and update its alerts"""
+        with self._lock:
+            if timestamp is None:
+                timestamp = stats.timestamp.timestamp() if hasattr(stats, 'timestamp') else time.time()
+            channel_rules = self._channel(channel)
+            get = stats.get if isinstance(stats, dict) else lambda name: getattr(stats, name, None)
+
+            values = {}
+            for key, window in channel_rules.windows.items():
+                sample = get(key[0])
+                if sample is not None:
+                    values[key] = window.push(timestamp, float(sample))
+
+            for entries in channel_rules.by_field.values():
+                for key, state in entries:
+                    value = values.get(key)
+                    if value is not None:
+                        self._step(state, value, timestamp, stats)
+            self._deliver(timestamp)
+
+    def _step(self, state: AlertState, value: float, now: float, stats):
+        rule = state.rule
+        state.value = value
+        if state.state in (STATE_OK, STATE_PENDING):
+            if not COMPARISONS[rule.op](value, rule.threshold):
+                state.state = STATE_OK
+                return
+            if state.state == STATE_OK:
+                state.state = STATE_PENDING
+                state.since = now
+            if now - state.since >= rule.for_duration:
+                state.state = STATE_FIRING
+                state.fired_at = now
+                self._notify(state, 'firing', now, stats)
+        else:
+            if not CLEAR_COMPARISONS[rule.op](value, rule.clear_threshold):
+                state.state = STATE_FIRING
+                return
+            if state.state == STATE_FIRING:
+                state.state = STATE_CLEARING
+                state.since = now
+            if now - state.since >= rule.clear_after:
+                state.state = STATE_OK
+                self._notify(state, 'cleared', now, stats)
+
+    def _notify(self, state: AlertState, kind: str, now: float, stats):
+        key = (state.rule.name, state.channel)
+        previous = self._pending.pop(key, None)
+        if previous is not None and previous['kind'] != kind:
+            # Fired and cleared again within one batch: nothing changed
+            return
+        self._pending[key] = {
+            'name': state.rule.name,
+            'channel': state.channel,
+            'kind': kind,
+            'message': state.rule.message if kind == 'firing' else f"{state.rule.name} cleared",
+            'severity': state.rule.severity if kind == 'firing' else 'info',
+            'value': state.value,
+            'timestamp': now,
+            'stats': stats,
+        }
+
+    def _deliver(self, now: float, force: bool = False):
+        if not self._pending or (not force and now - self._last_delivery < self.batch_interval):
+            return
+        batch = list(self._pending.values())
+        self._pending.clear()
+        self._last_delivery = now
+        for callback in self.callbacks:
+            try:
+                callback(batch)
+            except Exception as e:
+                print(f"[ERROR] Alert callback error: {e}")
+
+    def flush(self):
+        """Deliver held notifications now"""
+        with self._lock:
+            self._deliver(time.time(), force=True)
+
+    def active_alerts(self) -> List[AlertState]:
+        """Alerts currently firing or about to clear"""
+        with self._lock:
+            return [state for channel_rules in self.channels.values()
+                    for entries in channel_rules.by_field.values()
+                    for _, state in entries if state.state in (STATE_FIRING, STATE_CLEARING)]
+
+
+# Example usage
+if __name__ == "__main__":
+    engine = AlertRuleEngine()
+    engine.add_rule(AlertRule("CC errors", "continuity_errors", ">", 5, aggregate="sum", window=10,
+                              severity="critical"))
+    engine.add_rule(AlertRule("Low bitrate", "bitrate", "<", 1000000, for_duration=3,
+                              clear_threshold=2000000, clear_after=5))
+    engine.add_callback(lambda batch: [print(f"{n['kind'].upper()}: [{n['channel']}] {n['message']}")
+                                       for n in batch])
+    for second in range(30):
+        sample = {'continuity_errors': 2 if 5 <= second < 10 else 0,
+                  'bitrate': 500000 if 12 <= second < 20 else 15000000}
+        engine.evaluate(sample, channel="demo", timestamp=float(second))
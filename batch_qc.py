@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Batch Transport Stream QC
+Multi-core quality check of large .ts recordings
+
+Each file is split on packet boundaries into shards which are analyzed in a
+process pool: continuity counters, PCR, PID census and SCTE-35 sections.
+Partial results are merged in stream order, CC and PCR continuity being
+checked again across shard edges.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Any, Tuple
+
+from ts_engine import (
+    MappedTSFile, SectionAssembler, parse_splice_info_section,
+    TS_PACKET_SIZE, DEFAULT_CHUNK_PACKETS, NUMPY_AVAILABLE
+)
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+
+SCTE35_TABLE_ID = 0xFC
+# How far a shard may read past its end to complete a section it started
+MAX_SECTION_OVERRUN_PACKETS = 100000
+
+
+def _find_section_pids(block, table_id: int) -> List[int]:
+    """PIDs where a section with the given table_id starts in this block"""
+    pusi = (block[:, 1] & 0x40) != 0
+    afc = (block[:, 3] >> 4) & 0x03
+    start = np.where((afc & 0x02) != 0, 5 + block[:, 4].astype(np.int32), 4)
+    rows = np.flatnonzero(pusi & ((afc & 0x01) != 0) & (start < TS_PACKET_SIZE - 1))
+    if not len(rows):
+        return []
+    start = start[rows]
+    pointer = block[rows, start].astype(np.int32)
+    table_pos = start + 1 + pointer
+    inside = table_pos < TS_PACKET_SIZE
+    rows, table_pos = rows[inside], table_pos[inside]
+    match = block[rows, table_pos] == table_id
+    pids = ((block[rows[match], 1].astype(np.int32) & 0x1F) << 8) | block[rows[match], 2]
+    return [int(pid) for pid in np.unique(pids)]
+
+
+def _extract_sections(ts_file: MappedTSFile, start: int, count: int,
+                      pids: List[int], chunk_packets: int) -> List[Dict[str, Any]]:
+    """Extract SCTE-35 sections starting in a packet range"""
+    assemblers: Dict[int, SectionAssembler] = {}
+    events = []
+    end = start + count
+    limit = min(ts_file.packet_count, end + MAX_SECTION_OVERRUN_PACKETS)
+    position = start
+
+    while position < limit:
+        block = ts_file.packets(position, chunk_packets)
+        if position < end:
+            for pid in pids + _find_section_pids(block, SCTE35_TABLE_ID):
+                assemblers.setdefault(pid, SectionAssembler(pid))
+        elif not any(assembler.pending for assembler in assemblers.values()):
+            break
+        if not assemblers:
+            position += len(block)
+            continue
+
+        block_pids = ((block[:, 1].astype(np.int32) & 0x1F) << 8) | block[:, 2]
+        for row in np.flatnonzero(np.isin(block_pids, list(assemblers))):
+            packet_number = position + int(row)
+            assembler = assemblers[int(block_pids[row])]
+            if packet_number < end:
+                sections = assembler.feed(block[row])
+            elif assembler.pending:
+                # Only complete the section in progress, the next shard owns the others
+                started = bytes(assembler.buffer)
+                sections = [section for section in assembler.feed(block[row])[:1]
+                            if section.startswith(started)]
+                if sections or not assembler.pending:
+                    assembler.buffer.clear()
+                    assembler.synchronized = False
+            else:
+                continue
+            for section in sections:
+                if section[0] != SCTE35_TABLE_ID:
+                    continue
+                try:
+                    event = parse_splice_info_section(section)
+                except (ValueError, IndexError) as e:
+                    event = {'error': str(e)}
+                event['pid'] = assembler.pid
+                event['packet'] = packet_number
+                events.append(event)
+        position += len(block)
+
+    return events
+
+
+def qc_shard(path: str, start: int, count: int, scte35_pids: List[int],
+             chunk_packets: int = DEFAULT_CHUNK_PACKETS) -> Tuple[Any, List[Dict[str, Any]]]:
+    """Analyze one shard of a file, runs in a worker process"""
+    with MappedTSFile(path) as ts_file:
+        engine = ts_file.analyze_range(start, count, chunk_packets)
+        events = _extract_sections(ts_file, start, count, scte35_pids, chunk_packets)
+    return engine, events
+
+
+def qc_file(path: str, executor: ProcessPoolExecutor, shards: int,
+            scte35_pids: Optional[List[int]] = None,
+            chunk_packets: int = DEFAULT_CHUNK_PACKETS) -> Dict[str, Any]:
+    """Run the QC of one file on a process pool and merge the shard results"""
+    started = time.monotonic()
+    with MappedTSFile(path) as ts_file:
+        ranges = ts_file.split_ranges(shards)
+        offset = ts_file.offset
+
+    futures = [executor.submit(qc_shard, path, start, count, scte35_pids or [], chunk_packets)
+               for start, count in ranges]
+
+    engine, events = futures[0].result()
+    for future in futures[1:]:
+        shard_engine, shard_events = future.result()
+        engine.merge(shard_engine)
+        events.extend(shard_events)
+
+    stats = engine.get_stats()
+    packets_per_second = stats['packets_per_second']
+    for event in events:
+        event['offset_seconds'] = round(event['packet'] / packets_per_second, 3) if packets_per_second else None
+
+    total = stats['total_packets'] or 1
+    census = {
+        f"0x{pid:04X}": {
+            'packets': pid_stats['packets'],
+            'percent': round(100.0 * pid_stats['packets'] / total, 3),
+            'bitrate': pid_stats['bitrate'],
+            'cc_errors': pid_stats['cc_errors'],
+            'pcr_count': pid_stats['pcr_count'],
+            'pcr_discontinuities': pid_stats['pcr_discontinuities'],
+            'pcr_max_interval_ms': round(pid_stats['pcr_max_interval_ms'], 3),
+        }
+        for pid, pid_stats in sorted(stats['pids'].items())
+    }
+
+    return {
+        'file': path,
+        'size': os.path.getsize(path),
+        'first_packet_offset': offset,
+        'shards': len(ranges),
+        'elapsed_seconds': round(time.monotonic() - started, 3),
+        'total_packets': stats['total_packets'],
+        'bitrate': stats['bitrate'],
+        'sync_errors': stats['sync_errors'],
+        'continuity_errors': stats['continuity_errors'],
+        'pcr_accuracy': stats['pcr_accuracy'],
+        'pcr_jitter_ns': round(stats['pcr_jitter_ns'], 1),
+        'pids': census,
+        'scte35': events,
+        'scte35_crc_errors': sum(1 for event in events if 'error' not in event and not event['crc_valid']),
+        'scte35_parse_errors': sum(1 for event in events if 'error' in event),
+    }
+
+
+def has_errors(report: Dict[str, Any]) -> bool:
+    """Whether a file report failed the QC or the file could not be checked"""
+    return bool(report.get('error') or report['continuity_errors'] or report['sync_errors']
+                or report['scte35_crc_errors'] or report['scte35_parse_errors'])
+
+
+def qc_files(paths: List[str], executor: ProcessPoolExecutor, shards: int,
+             scte35_pids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    """QC every file, a file that cannot be read gets an error report and the batch goes on"""
+    reports = []
+    for path in paths:
+        try:
+            report = qc_file(path, executor, shards, scte35_pids)
+        except (OSError, ValueError) as e:
+            reports.append({'file': path, 'error': f"{type(e).__name__}: {e}"})
+            print(f"❌ {path}: {reports[-1]['error']}", file=sys.stderr)
+            continue
+        reports.append(report)
+        status = "⚠️ " if has_errors(report) else "✅"
+        print(f"{status} {path}: {report['total_packets']:,} packets, "
+              f"{report['bitrate'] / 1000000:.2f} Mbps, {report['continuity_errors']} CC errors, "
+              f"{len(report['scte35'])} SCTE-35 sections ({report['elapsed_seconds']} s)",
+              file=sys.stderr)
+    return reports
+
+
+def argue():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Multi-core QC of transport stream recordings")
+    parser.add_argument("files", nargs="+", help="Transport stream files to check")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument("-s", "--shards", type=int, default=0,
+                        help="Shards per file (default: one per worker)")
+    parser.add_argument("-p", "--scte35-pid", type=lambda v: int(v, 0), action="append", default=[],
+                        help="SCTE-35 PID, detected automatically when omitted")
+    parser.add_argument("-o", "--output", help="Write the JSON report to this file")
+    parser.add_argument("--fail-on-errors", action="store_true",
+                        help="Exit with status 1 on CC, sync or SCTE-35 errors, or unreadable files")
+    return parser.parse_args()
+
+
+def main():
+    """Run the batch QC"""
+    args = argue()
+    if not NUMPY_AVAILABLE:
+        print("❌ NumPy is required for batch QC")
+        return 2
+
+    shards = args.shards or args.workers
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        reports = qc_files(args.files, executor, shards, args.scte35_pid)
+
+    output = json.dumps(reports, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    failed = any(has_errors(report) for report in reports)
+    return 1 if failed and args.fail_on_errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Ad Break Schedule Expansion for IBE-100
+Vectorized expansion of recurring break plans into an in-memory cue table
+
+A plan such as "every 12 minutes, a 90 s pod, for 24 h on 30 channels" is
+expanded in one NumPy pass into a structured array with one row per cue
+(warning time_signal, cue-out, cue-in), sorted by firing time. Event ids
+come from an allocator that never hands out an id twice, and a whole
+table is saved as a single compressed bundle instead of two files per
+marker. Sections are only encoded when a cue is about to be sent.
+"""
+
+import json
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional, Sequence, Tuple, Any
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from scte35_encoder import default_cue_cache, PTS_CLOCK_HZ, PTS_MASK
+
+
+KIND_TIME_SIGNAL = 0
+KIND_CUE_OUT = 1
+KIND_CUE_IN = 2
+# Marker type names as used by the templates
+KIND_NAMES = ("TIME_SIGNAL", "CUE-OUT", "CUE-IN")
+
+MAX_EVENT_ID = 0xFFFFFFFF
+
+if NUMPY_AVAILABLE:
+    CUE_DTYPE = np.dtype([
+        ('at', 'f8'),            # firing time, seconds (epoch, or relative to the plan start)
+        ('channel', 'u2'),       # index into CueTable.channels
+        ('kind', 'u1'),          # KIND_*
+        ('break_index', 'u4'),   # break number within the channel
+        ('event_id', 'u4'),
+        ('pts_offset', 'i8'),    # 90 kHz ticks from the plan start
+        ('duration', 'f4'),      # pod length in seconds, cue-out only
+    ])
+
+
+@dataclass
+class BreakPlan:
+    """A recurring ad break on a set of channels"""
+    interval: float
+    duration: float
+    start: float = 0.0
+    end: float = 86400.0
+    # Lead time of the warning time_signal, 0 for none
+    warning: float = 5.0
+    channels: List[str] = field(default_factory=lambda: ["default"])
+    # Channel n breaks n * stagger seconds after channel 0
+    stagger: float = 0.0
+    name: str = "schedule"
+
+    def __post_init__(self):
+        if self.interval <= 0:
+            raise ValueError("Break interval must be positive")
+        if self.duration <= 0 or self.duration >= self.interval:
+            raise ValueError("Break duration must be positive and shorter than the interval")
+        if not self.channels:
+            raise ValueError("A plan needs at least one channel")
+
+    @property
+    def cues_per_break(self) -> int:
+        return 3 if self.warning > 0 else 2
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'BreakPlan':
+        return cls(**data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class EventIdAllocator:
+    """Hands out blocks of splice_event_id values that never overlap"""
+
+    def __init__(self, first_id: int = 10000):
+        self.next_id = first_id
+        # Sorted, merged [start, end) ranges already in use
+        self.used: List[Tuple[int, int]] = []
+
+    def reserve(self, start: int, end: int):
+        """Mark [start, end) as used"""
+        ranges = self.used + [(start, end)]
+        ranges.sort()
+        merged = [ranges[0]]
+        for lo, hi in ranges[1:]:
+            if lo <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+            else:
+                merged.append((lo, hi))
+        self.used = merged
+
+    def reserve_ids(self, ids):
+        """Mark existing ids used, e.g. those of an already published schedule"""
+        ids = np.unique(np.asarray(ids, dtype=np.int64))
+        if not len(ids):
+            return
+        # Split the sorted ids into runs of consecutive values
+        breaks = np.flatnonzero(np.diff(ids) != 1) + 1
+        for run in np.split(ids, breaks):
+            self.reserve(int(run[0]), int(run[-1]) + 1)
+
+    def allocate(self, count: int) -> int:
+        """First id of a free block of count consecutive ids"""
+        if count > MAX_EVENT_ID:
+            raise ValueError("Too many event ids requested")
+        candidate = self.next_id
+        for _ in range(2):
+            for lo, hi in self.used:
+                if hi <= candidate:
+                    continue
+                if lo >= candidate + count:
+                    break
+                candidate = hi
+            if candidate + count <= MAX_EVENT_ID + 1:
+                self.reserve(candidate, candidate + count)
+                self.next_id = candidate + count
+                return candidate
+            # Wrap once to the bottom of the id space
+            candidate = 1
+        raise ValueError("No free block of event ids")
+
+
+class CueTable:
+    """Cues of one or more plans, one structured array row per cue"""
+
+    def __init__(self, cues, channels: Sequence[str], plans: Optional[List[Dict[str, Any]]] = None):
+        self.cues = cues
+        self.channels = list(channels)
+        self.plans = plans or []
+
+    def __len__(self) -> int:
+        return len(self.cues)
+
+    def channel_cues(self, channel: str):
+        """Cues of one channel in time order"""
+        return self.cues[self.cues['channel'] == self.channels.index(channel)]
+
+    def due_between(self, start: float, end: float):
+        """Cues with start <= at < end, the table is sorted by time"""
+        times = self.cues['at']
+        return self.cues[np.searchsorted(times, start, 'left'):np.searchsorted(times, end, 'left')]
+
+    def section(self, cue, pts_base: int = 0) -> bytes:
+        """Encode one cue; pts_base is the PTS of the plan start"""
+        kind = int(cue['kind'])
+        pts_time = (pts_base + int(cue['pts_offset'])) & PTS_MASK
+        event_id = int(cue['event_id'])
+        if kind == KIND_TIME_SIGNAL:
+            return default_cue_cache.time_signal(pts_time)
+        if kind == KIND_CUE_OUT:
+            return default_cue_cache.splice_insert(event_id, pts_time, True,
+                                                   duration=int(round(float(cue['duration']) * PTS_CLOCK_HZ)),
+                                                   auto_return=True)
+        return default_cue_cache.splice_insert(event_id, pts_time, False)
+
+    def to_markers(self) -> List[Dict[str, Any]]:
+        """Template-style marker dicts, for small tables"""
+        markers = []
+        for cue in self.cues:
+            marker = {
+                "type": KIND_NAMES[cue['kind']],
+                "event_id": int(cue['event_id']),
+                "channel": self.channels[cue['channel']],
+                "pts_offset": int(cue['pts_offset']),
+            }
+            if cue['kind'] == KIND_CUE_OUT:
+                marker["duration"] = float(cue['duration'])
+            markers.append(marker)
+        return markers
+
+    def save(self, path: str) -> str:
+        """Write the table as one compressed bundle"""
+        meta = json.dumps({"channels": self.channels, "plans": self.plans, "created": time.time()})
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, cues=self.cues, meta=np.frombuffer(meta.encode('utf-8'), dtype=np.uint8))
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> 'CueTable':
+        with np.load(path, allow_pickle=False) as bundle:
+            meta = json.loads(bundle['meta'].tobytes().decode('utf-8'))
+            return cls(bundle['cues'], meta["channels"], meta["plans"])
+
+    @classmethod
+    def merge(cls, tables: Sequence['CueTable']) -> 'CueTable':
+        """One time-ordered table from several, channel indexes are remapped"""
+        channels: List[str] = []
+        parts = []
+        for table in tables:
+            for channel in table.channels:
+                if channel not in channels:
+                    channels.append(channel)
+            mapping = np.array([channels.index(c) for c in table.channels], dtype=np.uint16)
+            part = table.cues.copy()
+            part['channel'] = mapping[part['channel']]
+            parts.append(part)
+        cues = np.concatenate(parts) if parts else np.zeros(0, dtype=CUE_DTYPE)
+        cues = cues[np.argsort(cues['at'], kind='stable')]
+        return cls(cues, channels, [plan for table in tables for plan in table.plans])
+
+
+def expand_plan(plan: BreakPlan, allocator: Optional[EventIdAllocator] = None,
+                day_start: float = 0.0) -> CueTable:
+    """Expand a plan into a time-ordered cue table in one vectorized pass"""
+    if not NUMPY_AVAILABLE:
+        raise ImportError("NumPy is required for schedule expansion")
+    allocator = allocator or EventIdAllocator()
+
+    break_starts = np.arange(plan.start, plan.end, plan.interval, dtype=np.float64)
+    channel_offsets = np.arange(len(plan.channels), dtype=np.float64) * plan.stagger
+    if plan.warning > 0:
+        kind_offsets = np.array([-plan.warning, 0.0, plan.duration])
+        kinds = np.array([KIND_TIME_SIGNAL, KIND_CUE_OUT, KIND_CUE_IN], dtype=np.uint8)
+    else:
+        kind_offsets = np.array([0.0, plan.duration])
+        kinds = np.array([KIND_CUE_OUT, KIND_CUE_IN], dtype=np.uint8)
+    shape = (len(channel_offsets), len(break_starts), len(kinds))
+    count = shape[0] * shape[1] * shape[2]
+
+    # (channel, break, kind) grid of relative times
+    times = channel_offsets[:, None, None] + break_starts[None, :, None] + kind_offsets[None, None, :]
+
+    cues = np.empty(count, dtype=CUE_DTYPE)
+    cues['at'] = times.ravel() + day_start
+    cues['channel'] = np.repeat(np.arange(shape[0], dtype=np.uint16), shape[1] * shape[2])
+    cues['kind'] = np.tile(kinds, shape[0] * shape[1])
+    cues['break_index'] = np.tile(np.repeat(np.arange(shape[1], dtype=np.uint32), shape[2]), shape[0])
+    cues['event_id'] = allocator.allocate(count) + np.arange(count, dtype=np.int64) if count else 0
+    cues['pts_offset'] = np.rint(times.ravel() * PTS_CLOCK_HZ).astype(np.int64)
+    cues['duration'] = np.where(cues['kind'] == KIND_CUE_OUT, plan.duration, 0.0)
+
+    order = np.argsort(cues['at'], kind='stable')
+    return CueTable(cues[order], plan.channels, [plan.to_dict()])
+
+
+def expand_plans(plans: Sequence[BreakPlan], allocator: Optional[EventIdAllocator] = None,
+                 day_start: float = 0.0) -> CueTable:
+    """Expand several plans with one allocator into one table"""
+    allocator = allocator or EventIdAllocator()
+    return CueTable.merge([expand_plan(plan, allocator, day_start) for plan in plans])
+
+
+# Example usage
+if __name__ == "__main__":
+    import os
+    import tempfile
+
+    plan = BreakPlan(interval=12 * 60, duration=90, channels=[f"ch{n:02d}" for n in range(30)], stagger=10)
+    start = time.perf_counter()
+    table = expand_plan(plan, day_start=time.time())
+    elapsed = time.perf_counter() - start
+    print(f"Expanded {len(table)} cues in {elapsed * 1000:.2f} ms")
+
+    path = os.path.join(tempfile.gettempdir(), "ibe100_schedule.npz")
+    start = time.perf_counter()
+    table.save(path)
+    print(f"Saved bundle: {os.path.getsize(path) / 1024:.1f} KiB in {(time.perf_counter() - start) * 1000:.2f} ms")
+    first = table.cues[1]
+    print(f"First cue-out: {table.channels[first['channel']]} event {first['event_id']}, "
+          f"{len(table.section(first))} byte section")
@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+Ad Break Scheduler for IBE-100
+Fires scheduled cues into the running injection path on time
+
+Pending cues of every channel sit in one binary heap ordered by firing
+time. A single thread sleeps on a condition variable until the earliest
+cue is due, so nothing polls: adding an earlier cue wakes it, and a
+cancel only marks the entry dead (it is dropped when it reaches the top),
+which keeps both at O(log n). Cues due together on a channel go out in
+one batch, and the difference between the due and the actual send time
+is kept as firing jitter.
+
+With a PTS source a cue is sent pre-roll seconds ahead of its break and
+carries the splice PTS of the break; without one, or while the source
+has no PTS for the channel, it is sent as an immediate splice at the
+break time.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+from scte35_encoder import default_cue_cache, encode_time_signal, PTS_CLOCK_HZ
+from break_schedule import KIND_NAMES, KIND_CUE_OUT
+
+CUE_OUT = "CUE-OUT"
+CUE_IN = "CUE-IN"
+CRASH_OUT = "CRASH-OUT"
+TIME_SIGNAL = "TIME_SIGNAL"
+
+STATE_PENDING = 'pending'
+STATE_FIRED = 'fired'
+STATE_MISSED = 'missed'
+STATE_FAILED = 'failed'
+STATE_CANCELLED = 'cancelled'
+
+JITTER_SAMPLES_KEPT = 1000
+# Rebuild the heap once dead entries outnumber live ones by this much
+COMPACT_MIN_DEAD = 1024
+
+
+@dataclass
+class ScheduledCue:
+    """One cue waiting in, or fired from, the scheduler"""
+    cue_id: int
+    channel: str
+    at: float                      # break time, epoch seconds
+    kind: str = CUE_OUT
+    event_id: int = 0
+    duration: float = 0.0          # pod length in seconds, cue-out only
+    fire_at: float = 0.0           # at minus the pre-roll
+    state: str = STATE_PENDING
+    fired_at: Optional[float] = None
+    jitter_ms: Optional[float] = None
+    pts_time: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class SchedulerStats:
+    """Scheduler counters"""
+    scheduled: int = 0
+    fired: int = 0
+    missed: int = 0
+    failed: int = 0
+    cancelled: int = 0
+    wakeups: int = 0
+
+
+def encode_cue(cue: ScheduledCue, pts_time: Optional[int] = None) -> bytes:
+    """Section of a cue, an immediate splice when no pts_time is known"""
+    immediate = pts_time is None
+    if cue.kind == CUE_OUT:
+        duration = int(round(cue.duration * PTS_CLOCK_HZ)) if cue.duration > 0 else None
+        return default_cue_cache.splice_insert(cue.event_id, pts_time, True, immediate,
+                                               duration, auto_return=duration is not None)
+    if cue.kind == CUE_IN:
+        return default_cue_cache.splice_insert(cue.event_id, pts_time, False, immediate)
+    if cue.kind == CRASH_OUT:
+        return default_cue_cache.splice_insert(cue.event_id, None, True, True)
+    if cue.kind == TIME_SIGNAL:
+        return default_cue_cache.time_signal(pts_time) if pts_time is not None else encode_time_signal(None)
+    raise ValueError(f"Unknown cue type: {cue.kind}")
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class BreakScheduler:
+    """Heap of pending cues across all channels, fired from one thread
+
+    sender(channel, sections) puts the sections into the channel's
+    injection path and returns False if they could not be sent.
+    pts_source(channel, at), if given, returns the stream PTS the channel
+    will have at epoch time at, or None if it is not known.
+    """
+
+    def __init__(self, sender: Callable[[str, List[bytes]], bool], preroll: float = 0.0,
+                 pts_source: Optional[Callable[[str, float], Optional[int]]] = None,
+                 max_lateness: float = 2.0, clock: Callable[[], float] = time.time):
+        self.sender = sender
+        self.preroll = preroll
+        self.pts_source = pts_source
+        self.max_lateness = max_lateness
+        self.clock = clock
+        self.stats = SchedulerStats()
+        self.jitter: deque = deque(maxlen=JITTER_SAMPLES_KEPT)
+        # (fire_at, cue_id) entries, cancelled ones stay until they reach the top
+        self._heap: List[Tuple[float, int]] = []
+        self._pending: Dict[int, ScheduledCue] = {}
+        self._by_event: Dict[Tuple[str, int], int] = {}
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._listeners: List[Callable[[ScheduledCue], None]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    # -- scheduling ------------------------------------------------------
+
+    def _fire_time(self, at: float) -> float:
+        # Pre-roll only helps when the cue can carry the PTS of the break
+        return at - self.preroll if self.pts_source else at
+
+    def _push(self, cue: ScheduledCue):
+        cue.fire_at = self._fire_time(cue.at)
+        self._pending[cue.cue_id] = cue
+        self._by_event[(cue.channel, cue.event_id)] = cue.cue_id
+        heapq.heappush(self._heap, (cue.fire_at, cue.cue_id))
+        # Only a new earliest cue changes how long the thread sleeps
+        if self._heap[0][1] == cue.cue_id:
+            self._cond.notify()
+
+    def schedule(self, channel: str, at: float, kind: str = CUE_OUT, event_id: int = 0,
+                 duration: float = 0.0) -> ScheduledCue:
+        """Schedule one cue at epoch time at"""
+        if kind not in (CUE_OUT, CUE_IN, CRASH_OUT, TIME_SIGNAL):
+            raise ValueError(f"Unknown cue type: {kind}")
+        cue = ScheduledCue(next(self._ids), channel, float(at), kind, int(event_id), float(duration))
+        with self._cond:
+            self._push(cue)
+            self.stats.scheduled += 1
+        return cue
+
+    def schedule_break(self, channel: str, at: float, duration: float, event_id: int,
+                       warning: float = 0.0) -> List[ScheduledCue]:
+        """Cue-out at at, cue-in duration seconds later, optional time_signal warning before
+
+        Event ids follow the templates: warning, cue-out and cue-in take
+        consecutive ids starting at event_id.
+        """
+        cues = []
+        if warning > 0:
+            cues.append(self.schedule(channel, at - warning, TIME_SIGNAL, event_id))
+            event_id += 1
+        cues.append(self.schedule(channel, at, CUE_OUT, event_id, duration))
+        cues.append(self.schedule(channel, at + duration, CUE_IN, event_id + 1))
+        return cues
+
+    def schedule_template(self, channel: str, template: Dict[str, Any],
+                          base_time: float) -> List[ScheduledCue]:
+        """Schedule the markers of a SCTE35Templates template
+
+        pts_offset of each marker is taken relative to base_time, e.g.
+        midnight for a scheduled template or the program start for a
+        multi-break one. Markers without an offset fire at base_time.
+        """
+        cues = []
+        for marker in template.get("markers", []):
+            at = base_time + marker.get("pts_offset", 0) / PTS_CLOCK_HZ
+            cues.append(self.schedule(channel, at, marker["type"], marker.get("event_id", 0),
+                                      marker.get("duration", 0)))
+        return cues
+
+    def schedule_table(self, table, channels: Optional[List[str]] = None) -> int:
+        """Schedule every cue of a break_schedule.CueTable whose at is epoch time
+
+        The heap is rebuilt once in O(n) rather than pushing cue by cue.
+        Cues of channels not in channels (if given) are skipped.
+        """
+        wanted = set(channels) if channels is not None else None
+        now = self.clock()
+        added = 0
+        with self._cond:
+            for row in table.cues:
+                channel = table.channels[row['channel']]
+                at = float(row['at'])
+                if (wanted is not None and channel not in wanted) or at < now - self.max_lateness:
+                    continue
+                kind = int(row['kind'])
+                cue = ScheduledCue(next(self._ids), channel, at, KIND_NAMES[kind], int(row['event_id']),
+                                   float(row['duration']) if kind == KIND_CUE_OUT else 0.0,
+                                   fire_at=self._fire_time(at))
+                self._pending[cue.cue_id] = cue
+                self._by_event[(channel, cue.event_id)] = cue.cue_id
+                self._heap.append((cue.fire_at, cue.cue_id))
+                added += 1
+            heapq.heapify(self._heap)
+            self.stats.scheduled += added
+            self._cond.notify()
+        return added
+
+    def cancel(self, cue_id: int) -> bool:
+        """Cancel a pending cue, False if it already fired or is unknown"""
+        with self._cond:
+            cue = self._pending.pop(cue_id, None)
+            if cue is None:
+                return False
+            cue.state = STATE_CANCELLED
+            if self._by_event.get((cue.channel, cue.event_id)) == cue_id:
+                del self._by_event[(cue.channel, cue.event_id)]
+            self.stats.cancelled += 1
+            dead = len(self._heap) - len(self._pending)
+            if dead > COMPACT_MIN_DEAD and dead > len(self._pending):
+                self._heap = [entry for entry in self._heap if entry[1] in self._pending]
+                heapq.heapify(self._heap)
+        self._notify(cue)
+        return True
+
+    def cancel_event(self, channel: str, event_id: int) -> bool:
+        """Cancel the pending cue of one splice event"""
+        with self._cond:
+            cue_id = self._by_event.get((channel, event_id))
+        return cue_id is not None and self.cancel(cue_id)
+
+    def cancel_channel(self, channel: str) -> int:
+        """Cancel every pending cue of a channel"""
+        with self._cond:
+            cue_ids = [cue.cue_id for cue in self._pending.values() if cue.channel == channel]
+        return sum(self.cancel(cue_id) for cue_id in cue_ids)
+
+    def reschedule(self, cue_id: int, at: Optional[float] = None, duration: Optional[float] = None) -> ScheduledCue:
+        """Move or resize a pending cue, it keeps its event id"""
+        with self._cond:
+            cue = self._pending.pop(cue_id, None)
+            if cue is None:
+                raise KeyError(f"No pending cue {cue_id}")
+            # The old heap entry goes dead, the cue comes back under a new id
+            replacement = ScheduledCue(next(self._ids), cue.channel, cue.at if at is None else float(at),
+                                       cue.kind, cue.event_id, cue.duration if duration is None else float(duration))
+            cue.state = STATE_CANCELLED
+            self._push(replacement)
+        return replacement
+
+    def get(self, cue_id: int) -> Optional[ScheduledCue]:
+        with self._cond:
+            return self._pending.get(cue_id)
+
+    def pending(self, limit: int = 100, channel: Optional[str] = None) -> List[ScheduledCue]:
+        """Next pending cues in firing order"""
+        with self._cond:
+            return heapq.nsmallest(limit, (cue for cue in self._pending.values()
+                                           if channel is None or cue.channel == channel),
+                                   key=lambda cue: (cue.fire_at, cue.cue_id))
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    # -- firing ----------------------------------------------------------
+
+    def add_listener(self, callback: Callable[[ScheduledCue], None]):
+        """Called on the scheduler thread after each cue fires, misses, fails or is cancelled"""
+        self._listeners.append(callback)
+
+    def _notify(self, cue: ScheduledCue):
+        for callback in self._listeners:
+            try:
+                callback(cue)
+            except Exception as e:
+                logging.error(f"Scheduler listener failed: {e}")
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="break-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _next_due(self) -> List[ScheduledCue]:
+        """Block until cues are due and pop them, empty when stopping"""
+        with self._cond:
+            while self._running:
+                while self._heap and self._heap[0][1] not in self._pending:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                delay = self._heap[0][0] - self.clock()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    self.stats.wakeups += 1
+                    continue
+                return self._pop_due()
+            return []
+
+    def _pop_due(self) -> List[ScheduledCue]:
+        now = self.clock()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, cue_id = heapq.heappop(self._heap)
+            cue = self._pending.pop(cue_id, None)
+            if cue is not None:
+                if self._by_event.get((cue.channel, cue.event_id)) == cue_id:
+                    del self._by_event[(cue.channel, cue.event_id)]
+                due.append(cue)
+        return due
+
+    def pop_due(self) -> List[ScheduledCue]:
+        """Take the cues that are due now without waiting, for driving fire() by hand"""
+        with self._cond:
+            return self._pop_due()
+
+    def _run(self):
+        while self._running:
+            due = self._next_due()
+            if due:
+                self.fire(due)
+
+    def fire(self, cues: List[ScheduledCue]):
+        """Send cues that are due, grouped into one batch per channel"""
+        batches: Dict[str, List[ScheduledCue]] = {}
+        now = self.clock()
+        for cue in cues:
+            if now - cue.fire_at > self.max_lateness:
+                cue.state = STATE_MISSED
+                self.stats.missed += 1
+                logging.warning(f"[{cue.channel}] {cue.kind} {cue.event_id} missed by {now - cue.fire_at:.3f}s")
+                self._notify(cue)
+                continue
+            if self.pts_source:
+                cue.pts_time = self.pts_source(cue.channel, cue.at)
+                if cue.pts_time is None and cue.at > now:
+                    # No stream PTS yet, send it as an immediate splice at the break time instead
+                    with self._cond:
+                        cue.fire_at = cue.at
+                        self._pending[cue.cue_id] = cue
+                        self._by_event[(cue.channel, cue.event_id)] = cue.cue_id
+                        heapq.heappush(self._heap, (cue.fire_at, cue.cue_id))
+                    continue
+            batches.setdefault(cue.channel, []).append(cue)
+
+        for channel, batch in batches.items():
+            sections = [encode_cue(cue, cue.pts_time) for cue in batch]
+            try:
+                sent = self.sender(channel, sections)
+            except (OSError, KeyError, ValueError) as e:
+                logging.error(f"[{channel}] Cannot send scheduled cues: {e}")
+                sent = False
+            fired_at = self.clock()
+            for cue in batch:
+                cue.fired_at = fired_at
+                cue.jitter_ms = (fired_at - cue.fire_at) * 1000
+                if sent:
+                    cue.state = STATE_FIRED
+                    self.stats.fired += 1
+                    self.jitter.append(cue.jitter_ms)
+                else:
+                    cue.state = STATE_FAILED
+                    self.stats.failed += 1
+                self._notify(cue)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters, next due cue and firing jitter in milliseconds"""
+        with self._cond:
+            pending = len(self._pending)
+            jitter = sorted(self.jitter)
+        next_cue = self.pending(1)
+        return {
+            **vars(self.stats),
+            'pending': pending,
+            'preroll': self.preroll,
+            'next_fire_at': next_cue[0].fire_at if next_cue else None,
+            'jitter_ms': {
+                'samples': len(jitter),
+                'mean': round(sum(jitter) / len(jitter), 3) if jitter else 0.0,
+                'p50': round(percentile(jitter, 0.50), 3),
+                'p99': round(percentile(jitter, 0.99), 3),
+                'max': round(jitter[-1], 3) if jitter else 0.0,
+            },
+        }
+
+
+# Example usage
+if __name__ == "__main__":
+    def print_sender(channel: str, sections: List[bytes]) -> bool:
+        print(f"  {channel}: {len(sections)} section(s) at {time.time():.3f}")
+        return True
+
+    scheduler = BreakScheduler(print_sender)
+    scheduler.start()
+    now = time.time()
+    for n in range(3):
+        scheduler.schedule_break(f"ch{n:02d}", now + 0.2 + n * 0.1, duration=0.3, event_id=10000 + n * 3, warning=0.1)
+    time.sleep(1.2)
+    scheduler.stop()
+    print(scheduler.get_stats())
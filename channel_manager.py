@@ -0,0 +1,570 @@
+#!/usr/bin/env python3
+"""
+Headless Channel Manager for IBE-100
+Runs and supervises many encoder pipelines from one daemon
+
+Each channel is a JSON config such as distributor_config.json or
+config_*.json. Commands are built with TSDuckCommandBuilder.build_full_command
+and all tsp processes share the asyncio ProcessSupervisor, so a box with 20+
+distributor feeds needs one small Python process instead of one Qt GUI per
+feed. Per-channel status and control are exposed as JSON over HTTP, stream
+metrics from a monitor tap per channel are served to Prometheus, and one
+BreakScheduler fires the scheduled ad breaks of every channel.
+"""
+
+import os
+import sys
+import json
+import glob
+import time
+import signal
+import argparse
+import logging
+import shlex
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Callable
+from urllib.parse import urlparse, parse_qs
+
+from tsduck_backend import TSDuckCommandBuilder, split_params
+from process_supervisor import (
+    ProcessSupervisor, PipelineSpec, get_supervisor,
+    EVENT_STARTED, EVENT_STDERR, EVENT_ERROR, EVENT_RESTARTING, EVENT_STOPPED, EVENT_FAILED
+)
+from splice_injector import (
+    SpliceDispatcher, DEFAULT_INJECT_PORT, DEFAULT_INJECT_COUNT, DEFAULT_INJECT_INTERVAL, DEFAULT_START_DELAY
+)
+from splice_packetizer import InjectionStage
+from stream_monitor import TSDuckMonitor, DEFAULT_TAP_PORT
+from splice_events import SpliceEventRing, follow_tap
+from stream_clock import register_clock, unregister_clock, get_clock, DEFAULT_CLOCK
+from metrics_exporter import MetricsRegistry, serve_metrics, DEFAULT_METRICS_PORT
+from break_scheduler import BreakScheduler
+
+
+DEFAULT_CONTROL_PORT = 8090
+DEFAULT_PTS_PID = 256
+DEFAULT_SCTE35_PID = 500
+LOG_LINES_KEPT = 50
+
+
+@dataclass
+class ChannelConfig:
+    """One encoder pipeline loaded from a JSON config file"""
+    channel_id: str
+    name: str
+    path: str
+    input: Dict[str, str]
+    output: Dict[str, str]
+    plugins: Dict[str, Dict[str, Any]]
+    tsp_options: Dict[str, Any] = field(default_factory=dict)
+    inject_port: Optional[int] = None
+    # PID whose PTS the injected cues follow (spliceinject --pts-pid)
+    pts_pid: Optional[int] = None
+    # SCTE-35 PID decoded from the monitor tap
+    scte35_pid: int = DEFAULT_SCTE35_PID
+    # InjectionStage settings, the stage runs between input and output
+    injection: Optional[Dict[str, Any]] = None
+    autostart: bool = True
+
+
+@dataclass
+class Channel:
+    """Runtime state of a channel"""
+    config: ChannelConfig
+    command: List[str] = field(default_factory=list)
+    state: str = 'stopped'
+    error: Optional[str] = None
+    started_at: float = 0.0
+    dispatcher: Optional[SpliceDispatcher] = None
+    monitor: Optional[TSDuckMonitor] = None
+    # Splice events seen on the output, decoded from the monitor tap
+    splice_events: SpliceEventRing = field(default_factory=SpliceEventRing)
+    unsubscribe: List[Callable[[], None]] = field(default_factory=list)
+    log: deque = field(default_factory=lambda: deque(maxlen=LOG_LINES_KEPT))
+
+
+def load_channel_config(path: str, inject_port: Optional[int] = None) -> ChannelConfig:
+    """Load a channel config, deriving the plugin chain from service/scte35 settings if needed"""
+    with open(path, 'r') as f:
+        data = json.load(f)
+
+    output = dict(data.get('output', {}))
+    # GUI configs name the output address 'destination', the builder expects 'source'
+    if not output.get('source') and output.get('destination'):
+        output['source'] = output['destination']
+
+    plugins = data.get('plugins')
+    pts_pid = None
+    injection = None
+    service = {**data.get('scte35', {}), **data.get('service', {})}
+    scte35 = data.get('scte35', {})
+    scte35_pid = service.get('scte35_pid', scte35.get('data_pid', DEFAULT_SCTE35_PID))
+    if not plugins:
+        vpid = service.get('vpid', 256)
+        pts_pid = vpid
+        plugins = {}
+        if service.get('service_name'):
+            plugins['sdt'] = {'enabled': True, 'params': shlex.join([
+                '--service', str(service.get('service_id', 1)), '--name', service['service_name'],
+                '--provider', service.get('provider_name', '')])}
+        plugins['pmt'] = {'enabled': scte35.get('pmt_enabled', True), 'params': (
+            scte35.get('pmt_params') or
+            f"--service {service.get('service_id', 1)} --add-pid {scte35_pid}/0x86")}
+        if scte35.get('spliceinject_enabled', True) and inject_port:
+            # Cues are fed at runtime through the channel's UDP control port to
+            # the null slot injection stage, as in the GUI
+            injection = {
+                'pid': scte35_pid, 'null_pid': service.get('null_pid', 0x1FFF), 'pts_pid': vpid,
+                'inject_count': scte35.get('inject_count', DEFAULT_INJECT_COUNT),
+                'inject_interval': scte35.get('inject_interval', DEFAULT_INJECT_INTERVAL),
+                'start_delay': scte35.get('start_delay', DEFAULT_START_DELAY),
+            }
+        else:
+            inject_port = None
+    else:
+        inject_port = None
+        # The clock follows the PTS PID spliceinject was configured with
+        params = split_params(plugins.get('spliceinject', {}).get('params', ''))
+        pts_pid = scte35.get('pts_pid', DEFAULT_PTS_PID)
+        if '--pts-pid' in params[:-1]:
+            pts_pid = int(params[params.index('--pts-pid') + 1], 0)
+        if '--pid' in params[:-1]:
+            scte35_pid = int(params[params.index('--pid') + 1], 0)
+
+    return ChannelConfig(
+        channel_id=Path(path).stem,
+        name=data.get('name', Path(path).stem),
+        path=str(path),
+        input=data.get('input', {}),
+        output=output,
+        plugins=plugins,
+        tsp_options=data.get('tsp_options', {}),
+        inject_port=inject_port,
+        pts_pid=pts_pid,
+        scte35_pid=int(scte35_pid),
+        injection=injection,
+        autostart=data.get('autostart', True),
+    )
+
+
+class ChannelManager:
+    """Starts, stops and reports on many channels sharing one supervisor"""
+
+    def __init__(self, supervisor: Optional[ProcessSupervisor] = None,
+                 base_inject_port: int = DEFAULT_INJECT_PORT, tsp_binary: str = 'tsp',
+                 registry: Optional[MetricsRegistry] = None, base_tap_port: int = DEFAULT_TAP_PORT,
+                 preroll: float = 0.0):
+        self.supervisor = supervisor or get_supervisor()
+        self.base_inject_port = base_inject_port
+        self.tsp_binary = tsp_binary
+        self.channels: Dict[str, Channel] = {}
+        self._lock = threading.Lock()
+        # Every channel gets a monitor tap, it drives the channel's stream clock
+        # and the stream metrics; a base port of 0 gives each tap a free port
+        self.registry = registry
+        self.base_tap_port = base_tap_port
+        if registry:
+            registry.bind_supervisor(self.supervisor)
+        # Scheduled breaks of all channels, started with the first schedule
+        self.scheduler = BreakScheduler(self._send_scheduled, preroll=preroll, pts_source=self.stream_pts)
+
+    def load(self, patterns: List[str]) -> List[str]:
+        """Load channel configs from files or glob patterns, returns the channel ids"""
+        loaded = []
+        for pattern in patterns:
+            for path in sorted(glob.glob(pattern)) or [pattern]:
+                try:
+                    config = load_channel_config(path, self.base_inject_port + len(self.channels))
+                except (OSError, ValueError) as e:
+                    logging.error(f"Cannot load channel config {path}: {e}")
+                    continue
+                if config.channel_id in self.channels:
+                    logging.error(f"Duplicate channel id {config.channel_id} in {path}, skipped")
+                    continue
+                self.channels[config.channel_id] = Channel(config=config)
+                loaded.append(config.channel_id)
+        return loaded
+
+    def _channel(self, channel_id: str) -> Channel:
+        channel = self.channels.get(channel_id)
+        if channel is None:
+            raise KeyError(f"Unknown channel: {channel_id}")
+        return channel
+
+    def start(self, channel_id: str):
+        """Build the tsp command and start the channel"""
+        channel = self._channel(channel_id)
+        with self._lock:
+            if self.supervisor.is_running(channel_id):
+                return
+            config = channel.config
+            try:
+                command = TSDuckCommandBuilder.build_full_command(
+                    config.input, config.output, config.plugins, config.tsp_options)
+            except (OSError, ValueError) as e:
+                channel.state = 'error'
+                channel.error = str(e)
+                logging.error(f"[{channel_id}] Invalid configuration: {e}")
+                return
+            command[0] = self.tsp_binary
+            if '-O' in command:
+                self._start_monitor(channel_id, channel)
+                output_index = command.index('-O')
+                command[output_index:output_index] = channel.monitor.tap_args(self.tsp_binary)
+                if config.injection:
+                    # The tap runs downstream of the stage and sees the cues
+                    stage = InjectionStage(inject_port=config.inject_port, **config.injection)
+                    command = stage.stage_command(command, split=output_index)
+            channel.command = command
+            channel.error = None
+            channel.state = 'starting'
+            if config.inject_port and channel.dispatcher is None:
+                channel.dispatcher = SpliceDispatcher(port=config.inject_port)
+            self.supervisor.start_pipeline(PipelineSpec(channel_id, command, restart=True,
+                                                        stdout_mode='discard'),
+                                           self._handle_event)
+
+    def _start_monitor(self, channel_id: str, channel: Channel):
+        if channel.monitor is not None:
+            return
+        port = self.base_tap_port + list(self.channels).index(channel_id) if self.base_tap_port else 0
+        channel.monitor = TSDuckMonitor(tap_port=port, pts_pid=channel.config.pts_pid)
+        channel.unsubscribe.append(follow_tap(channel.monitor.tap, channel.config.scte35_pid,
+                                              channel.splice_events, channel_id))
+        if self.registry:
+            self.registry.bind_monitor(channel_id, channel.monitor)
+            channel.unsubscribe.append(self.registry.bind_splice_events(channel_id, channel.splice_events))
+        channel.monitor.start_monitoring()
+        # Generators calling stream_pts() follow the first channel unless they name one
+        register_clock(channel.monitor.clock, channel_id)
+        if get_clock(DEFAULT_CLOCK) is None:
+            register_clock(channel.monitor.clock, DEFAULT_CLOCK)
+
+    def stop(self, channel_id: str, wait: bool = False):
+        self._channel(channel_id)
+        self.supervisor.stop_pipeline(channel_id, wait=wait)
+
+    def restart(self, channel_id: str):
+        self.stop(channel_id, wait=True)
+        self.start(channel_id)
+
+    def start_all(self, autostart_only: bool = True):
+        for channel_id, channel in self.channels.items():
+            if channel.config.autostart or not autostart_only:
+                self.start(channel_id)
+
+    def stop_all(self):
+        self.scheduler.stop()
+        for channel_id in self.channels:
+            self.stop(channel_id)
+        for channel_id in self.channels:
+            self.stop(channel_id, wait=True)
+        for channel in self.channels.values():
+            if channel.dispatcher:
+                channel.dispatcher.close()
+            for unsubscribe in channel.unsubscribe:
+                unsubscribe()
+            channel.unsubscribe = []
+            if channel.monitor:
+                channel.monitor.stop_monitoring()
+                unregister_clock(channel.config.channel_id, channel.monitor.clock)
+                unregister_clock(DEFAULT_CLOCK, channel.monitor.clock)
+                channel.monitor = None
+
+    def cue_out(self, channel_id: str, event_id: int, duration_seconds: int = 0) -> bool:
+        """Fire an immediate ad break on a running channel"""
+        channel = self._channel(channel_id)
+        if channel.dispatcher is None:
+            raise ValueError(f"Channel {channel_id} has no cue injection port")
+        sent = channel.dispatcher.cue_out(event_id, duration_seconds)
+        self._count_cues(channel_id, channel)
+        return sent
+
+    def cue_in(self, channel_id: str, event_id: int) -> bool:
+        channel = self._channel(channel_id)
+        if channel.dispatcher is None:
+            raise ValueError(f"Channel {channel_id} has no cue injection port")
+        sent = channel.dispatcher.cue_in(event_id)
+        self._count_cues(channel_id, channel)
+        return sent
+
+    def stream_pts(self, channel_id: str, at: float) -> Optional[int]:
+        """PTS of a channel's output at epoch time at, None until its monitor tap has locked"""
+        channel = self.channels.get(channel_id)
+        if channel is None or channel.monitor is None or channel.monitor.clock is None:
+            return None
+        return channel.monitor.clock.pts_at(at)
+
+    def _send_scheduled(self, channel_id: str, sections: List[bytes]) -> bool:
+        """Scheduler sender, called on the scheduler thread"""
+        channel = self._channel(channel_id)
+        if channel.dispatcher is None:
+            raise ValueError(f"Channel {channel_id} is not running with a cue injection port")
+        sent = channel.dispatcher.send_sections(sections)
+        self._count_cues(channel_id, channel)
+        return sent
+
+    def schedule_break(self, channel_id: str, at: float, duration: float, event_id: int,
+                       warning: float = 0.0) -> List[Dict[str, Any]]:
+        """Schedule an ad break on a channel at epoch time at"""
+        channel = self._channel(channel_id)
+        if not channel.config.inject_port:
+            raise ValueError(f"Channel {channel_id} has no cue injection port")
+        if duration <= 0:
+            raise ValueError("Break duration must be positive")
+        cues = self.scheduler.schedule_break(channel_id, at, duration, event_id, warning)
+        self.scheduler.start()
+        return [cue.to_dict() for cue in cues]
+
+    def load_schedule(self, path: str) -> int:
+        """Schedule the cues of a saved break_schedule bundle for the loaded channels"""
+        from break_schedule import CueTable
+        added = self.scheduler.schedule_table(CueTable.load(path), channels=list(self.channels))
+        self.scheduler.start()
+        return added
+
+    def cancel_scheduled(self, cue_id: int) -> bool:
+        if not self.scheduler.cancel(cue_id):
+            raise KeyError(f"No pending cue {cue_id}")
+        return True
+
+    def schedule_status(self, channel_id: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+        """Scheduler counters and jitter plus the next pending cues"""
+        if channel_id is not None:
+            self._channel(channel_id)
+        return {
+            'stats': self.scheduler.get_stats(),
+            'pending': [cue.to_dict() for cue in self.scheduler.pending(limit, channel_id)],
+        }
+
+    def _count_cues(self, channel_id: str, channel: Channel):
+        if self.registry:
+            self.registry.set('ibe100_scte35_cues_sent_total', channel.dispatcher.stats.cues_sent,
+                              channel=channel_id)
+
+    def _handle_event(self, channel_id: str, kind: str, payload: Any):
+        """Supervisor events, called on the supervisor thread"""
+        channel = self.channels.get(channel_id)
+        if channel is None:
+            return
+        if kind == EVENT_STARTED:
+            channel.state = 'running'
+            channel.started_at = time.time()
+            logging.info(f"[{channel_id}] Started, pid {payload}")
+        elif kind == EVENT_STDERR:
+            channel.log.append(payload)
+        elif kind == EVENT_ERROR:
+            channel.log.append(payload)
+            channel.error = payload
+        elif kind == EVENT_RESTARTING:
+            channel.state = 'restarting'
+            logging.warning(f"[{channel_id}] Exited, restarting in {payload:.1f}s")
+        elif kind in (EVENT_STOPPED, EVENT_FAILED):
+            channel.state = 'stopped' if kind == EVENT_STOPPED else 'failed'
+            logging.info(f"[{channel_id}] {channel.state.capitalize()} with exit code {payload}")
+
+    def channel_status(self, channel_id: str) -> Dict[str, Any]:
+        channel = self._channel(channel_id)
+        pipeline = self.supervisor.get_status().get(channel_id, {})
+        return {
+            'id': channel_id,
+            'name': channel.config.name,
+            'config': channel.config.path,
+            'state': channel.state,
+            'error': channel.error,
+            'pid': pipeline.get('pid'),
+            'restarts': pipeline.get('restarts', 0),
+            'last_exit_code': pipeline.get('last_exit_code'),
+            'uptime': round(time.time() - channel.started_at, 1) if channel.state == 'running' else 0.0,
+            'input': f"{channel.config.input.get('type', '')} {channel.config.input.get('source', '')}",
+            'output': f"{channel.config.output.get('type', '')} {channel.config.output.get('source', '')}",
+            'inject_port': channel.config.inject_port,
+            'cues_sent': channel.dispatcher.stats.cues_sent if channel.dispatcher else 0,
+            'splice_events': channel.splice_events.total,
+            'stream_clock': channel.monitor.clock.get_stats() if channel.monitor and channel.monitor.clock else None,
+            'command': channel.command,
+        }
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [self.channel_status(channel_id) for channel_id in self.channels]
+
+    def channel_log(self, channel_id: str) -> List[str]:
+        return list(self._channel(channel_id).log)
+
+
+class ControlHandler(BaseHTTPRequestHandler):
+    """JSON control API
+
+    GET  /channels                      status of all channels
+    GET  /channels/<id>                 status of one channel
+    GET  /channels/<id>/log             last tsp messages
+    POST /channels/<id>/start|stop|restart
+    POST /channels/<id>/cue-out?event_id=N&duration=S
+    POST /channels/<id>/cue-in?event_id=N
+    GET  /schedule                      scheduler stats, jitter and next cues
+    GET  /channels/<id>/schedule        next cues of one channel
+    POST /channels/<id>/schedule?at=T|in=S&duration=S&event_id=N[&warning=S]
+    POST /schedule/<cue_id>/cancel
+    """
+
+    manager: ChannelManager = None
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} {format % args}")
+
+    def _reply(self, status: int, body: Any):
+        data = json.dumps(body, indent=2).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _route(self):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        return parts, {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+    def do_GET(self):
+        parts, query = self._route()
+        try:
+            if parts == ['channels']:
+                self._reply(200, self.manager.status())
+            elif parts == ['schedule']:
+                self._reply(200, self.manager.schedule_status(limit=int(query.get('limit', 100))))
+            elif len(parts) == 3 and parts[0] == 'channels' and parts[2] == 'schedule':
+                self._reply(200, self.manager.schedule_status(parts[1], int(query.get('limit', 100))))
+            elif len(parts) == 2 and parts[0] == 'channels':
+                self._reply(200, self.manager.channel_status(parts[1]))
+            elif len(parts) == 3 and parts[0] == 'channels' and parts[2] == 'log':
+                self._reply(200, self.manager.channel_log(parts[1]))
+            else:
+                self._reply(404, {'error': 'Not found'})
+        except KeyError as e:
+            self._reply(404, {'error': str(e)})
+        except ValueError as e:
+            self._reply(400, {'error': str(e)})
+
+    def do_POST(self):
+        parts, query = self._route()
+        if len(parts) == 3 and parts[0] == 'schedule' and parts[2] == 'cancel':
+            try:
+                self.manager.cancel_scheduled(int(parts[1]))
+                self._reply(200, {'cancelled': int(parts[1])})
+            except KeyError as e:
+                self._reply(404, {'error': str(e)})
+            except ValueError as e:
+                self._reply(400, {'error': str(e)})
+            return
+        if len(parts) != 3 or parts[0] != 'channels':
+            self._reply(404, {'error': 'Not found'})
+            return
+        channel_id, action = parts[1], parts[2]
+        try:
+            if action == 'start':
+                self.manager.start(channel_id)
+            elif action == 'stop':
+                self.manager.stop(channel_id)
+            elif action == 'restart':
+                self.manager.restart(channel_id)
+            elif action == 'cue-out':
+                self.manager.cue_out(channel_id, int(query['event_id']), int(query.get('duration', 0)))
+            elif action == 'cue-in':
+                self.manager.cue_in(channel_id, int(query['event_id']))
+            elif action == 'schedule':
+                at = float(query['at']) if 'at' in query else time.time() + float(query.get('in', 0))
+                self._reply(200, self.manager.schedule_break(
+                    channel_id, at, float(query['duration']), int(query['event_id']),
+                    float(query.get('warning', 0))))
+                return
+            else:
+                self._reply(404, {'error': f"Unknown action: {action}"})
+                return
+            self._reply(200, self.manager.channel_status(channel_id))
+        except KeyError as e:
+            self._reply(404, {'error': str(e)})
+        except ValueError as e:
+            self._reply(400, {'error': str(e)})
+
+
+def serve_control(manager: ChannelManager, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Start the control API in a background thread"""
+    handler = type('BoundControlHandler', (ControlHandler,), {'manager': manager})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="control-api", daemon=True).start()
+    return server
+
+
+def argue():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Run many IBE-100 channels from one headless daemon")
+    parser.add_argument("configs", nargs="+", help="Channel config files or glob patterns")
+    parser.add_argument("--control-port", type=int, default=DEFAULT_CONTROL_PORT,
+                        help="HTTP control API port, 0 disables it")
+    parser.add_argument("--control-host", default="127.0.0.1", help="HTTP control API address")
+    parser.add_argument("--inject-base-port", type=int, default=DEFAULT_INJECT_PORT,
+                        help="First UDP cue injection port, one per channel")
+    parser.add_argument("--metrics-port", type=int, default=DEFAULT_METRICS_PORT,
+                        help="Prometheus /metrics port, 0 disables it")
+    parser.add_argument("--metrics-host", default="0.0.0.0", help="Prometheus /metrics address")
+    parser.add_argument("--tap-base-port", type=int, default=DEFAULT_TAP_PORT,
+                        help="First local UDP monitor tap port, one per channel")
+    parser.add_argument("--preroll", type=float, default=0.0,
+                        help="Seconds scheduled cues are sent ahead of their break, once the channel's stream clock "
+                             "has locked from its monitor tap")
+    parser.add_argument("--schedule", action="append", default=[],
+                        help="Saved break schedule bundle (.npz) to fire, may be repeated")
+    parser.add_argument("--tsp", default="tsp", help="TSDuck tsp binary")
+    parser.add_argument("--no-autostart", action="store_true", help="Load channels without starting them")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    return parser.parse_args()
+
+
+def main():
+    """Run the channel manager until SIGINT or SIGTERM"""
+    args = argue()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s")
+
+    registry = MetricsRegistry() if args.metrics_port else None
+    manager = ChannelManager(base_inject_port=args.inject_base_port, tsp_binary=args.tsp, registry=registry,
+                             base_tap_port=args.tap_base_port, preroll=args.preroll)
+    loaded = manager.load(args.configs)
+    if not loaded:
+        logging.error("No channel configs loaded")
+        return 1
+    logging.info(f"Loaded {len(loaded)} channels: {', '.join(loaded)}")
+
+    server = serve_control(manager, args.control_port, args.control_host) if args.control_port else None
+    if server:
+        logging.info(f"Control API on http://{args.control_host}:{args.control_port}/channels")
+    metrics_server = serve_metrics(registry, args.metrics_port, args.metrics_host) if registry else None
+    if metrics_server:
+        logging.info(f"Prometheus metrics on http://{args.metrics_host}:{args.metrics_port}/metrics")
+    if not args.no_autostart:
+        manager.start_all()
+    for path in args.schedule:
+        try:
+            logging.info(f"Scheduled {manager.load_schedule(path)} cues from {path}")
+        except (OSError, ValueError, ImportError) as e:
+            logging.error(f"Cannot load schedule {path}: {e}")
+
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    stop.wait()
+
+    logging.info("Stopping all channels")
+    for http_server in (server, metrics_server):
+        if http_server:
+            http_server.shutdown()
+    manager.stop_all()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Console Line Buffer for IBE-100
+Bounded line history with coalesced display batches and a search index
+
+Lines from tsp are appended as they arrive and handed to the console in
+one batch per timer tick. A burst larger than the visible block limit is
+cut to its newest lines, and the skipped count is reported. History is
+kept in blocks of lines; a full block stores its lowercased text once, so
+a search skips every block not containing the term with a single
+substring test and only scans the lines of the blocks that do.
+"""
+
+import threading
+from collections import deque
+from typing import List, Optional, Tuple
+
+DEFAULT_HISTORY_LINES = 100000
+BLOCK_LINES = 1024
+
+# (sequence number, is error, text)
+ConsoleLine = Tuple[int, bool, str]
+
+
+class _Block:
+    """Consecutive lines, with their lowercased text once the block is full"""
+
+    __slots__ = ('entries', 'text')
+
+    def __init__(self):
+        self.entries: List[ConsoleLine] = []
+        self.text: Optional[str] = None
+
+    def seal(self):
+        self.text = '\n'.join(entry[2] for entry in self.entries).lower()
+
+    def search(self, term: str) -> List[ConsoleLine]:
+        if self.text is not None and term not in self.text:
+            return []
+        return [entry for entry in self.entries if term in entry[2].lower()]
+
+
+class ConsoleBuffer:
+    """Ring buffer of console lines with pending display batches"""
+
+    def __init__(self, capacity: int = DEFAULT_HISTORY_LINES):
+        self.capacity = capacity
+        self.blocks: deque = deque([_Block()])
+        self.count = 0
+        self.pending: List[ConsoleLine] = []
+        self.next_seq = 0
+        # Sequence number of the first line since the last clear
+        self.base_seq = 0
+        # Lines never shown because a batch exceeded the display limit
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def append(self, text: str, error: bool = False):
+        """Add one or more lines"""
+        with self._lock:
+            for line in text.splitlines() or ['']:
+                entry = (self.next_seq, error, line)
+                self.next_seq += 1
+                block = self.blocks[-1]
+                block.entries.append(entry)
+                self.pending.append(entry)
+                self.count += 1
+                if len(block.entries) >= BLOCK_LINES:
+                    block.seal()
+                    self.blocks.append(_Block())
+                    # Evict whole blocks, history holds between capacity and capacity + one block
+                    while self.count - len(self.blocks[0].entries) >= self.capacity:
+                        self.count -= len(self.blocks.popleft().entries)
+
+    def take_pending(self, limit: int) -> List[ConsoleLine]:
+        """Lines added since the last call, at most the newest limit"""
+        with self._lock:
+            batch, self.pending = self.pending, []
+        if len(batch) > limit:
+            self.skipped += len(batch) - limit
+            batch = batch[-limit:]
+        return batch
+
+    @property
+    def first_seq(self) -> int:
+        return self.next_seq - self.count
+
+    @property
+    def dropped(self) -> int:
+        """Lines skipped from display or evicted from the history"""
+        return self.skipped + self.first_seq - self.base_seq
+
+    def latest(self, count: int) -> List[ConsoleLine]:
+        """The newest count lines, oldest first"""
+        with self._lock:
+            lines: List[ConsoleLine] = []
+            for block in reversed(self.blocks):
+                lines[:0] = block.entries
+                if len(lines) >= count:
+                    break
+        return lines[-count:] if count > 0 else []
+
+    def search(self, term: str, limit: int = None) -> List[ConsoleLine]:
+        """Lines containing term (case-insensitive), oldest first"""
+        term = term.lower()
+        with self._lock:
+            matches = []
+            for block in self.blocks:
+                matches.extend(block.search(term))
+        return matches[-limit:] if limit else matches
+
+    def clear(self):
+        with self._lock:
+            self.blocks = deque([_Block()])
+            self.count = 0
+            self.pending = []
+            self.skipped = 0
+            self.base_seq = self.next_seq
+
+    def __len__(self) -> int:
+        return self.count
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    buffer = ConsoleBuffer()
+    start = time.perf_counter()
+    for i in range(200000):
+        buffer.append(f"* splicemonitor: packet {i}, pid 0x01F4, splice_insert event {i % 100}",
+                      error=i % 1000 == 0)
+        if i % 500 == 0:
+            buffer.take_pending(5000)
+    elapsed = time.perf_counter() - start
+    print(f"{200000 / elapsed:,.0f} lines/s, {len(buffer)} kept, {buffer.dropped} dropped")
+    for term in ("packet 199999", "event 42"):
+        start = time.perf_counter()
+        matches = len(buffer.search(term))
+        print(f"'{term}': {matches} matches in {(time.perf_counter() - start) * 1000:.1f} ms")
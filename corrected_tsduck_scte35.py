@@ -10,6 +10,8 @@ import os
 import json
 from datetime import datetime
 
+from stream_clock import stream_pts
+
 class CorrectedTSDuckSCTE35:
     """Corrected TSDuck SCTE-35 implementation based on GitHub issues"""
     
@@ -52,7 +54,7 @@ class CorrectedTSDuckSCTE35:
         """Create corrected SCTE-35 XML format based on GitHub issues"""
         
         # Calculate PTS time (90kHz clock) - ensure valid range
-        pts_time = int(time.time() * 90000) % 8589934592
+        pts_time = stream_pts()
         duration_pts = duration_seconds * 90000
         
         # Create corrected TSDuck XML format based on issue analysis
@@ -6,6 +6,8 @@ Create simple SCTE-35 XML files for TSDuck spliceinject plugin
 import os
 import time
 
+from stream_clock import stream_pts
+
 def create_simple_scte35_files():
     """Create simple SCTE-35 XML files that work with TSDuck"""
     
@@ -26,7 +28,7 @@ def create_simple_scte35_files():
         <duration_flag>1</duration_flag>
         <splice_immediate_flag>0</splice_immediate_flag>
         <splice_time>
-            <pts_time>{int(time.time() * 90000)}</pts_time>
+            <pts_time>{stream_pts()}</pts_time>
         </splice_time>
         <break_duration>
             <auto_return>0</auto_return>
@@ -13,110 +13,105 @@ import threading
 import time
 import re
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Callable, Tuple
+
+from startup import StartupTimer
+startup_timer = StartupTimer()
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
     QGridLayout, QTabWidget, QGroupBox, QLabel, QLineEdit, QPushButton,
-    QComboBox, QSpinBox, QCheckBox, QTextEdit, QProgressBar,
-    QFileDialog, QMessageBox, QSplitter, QFrame, QScrollArea, QTableWidget
+    QComboBox, QSpinBox, QCheckBox, QTextEdit, QPlainTextEdit, QProgressBar,
+    QFileDialog, QMessageBox, QSplitter, QFrame, QScrollArea, QTableWidget, QTableWidgetItem
 )
 from PyQt6.QtCore import (
-    Qt, QThread, pyqtSignal, QTimer, QSettings, QSize
+    Qt, QObject, QThread, pyqtSignal, QTimer, QSettings, QSize
 )
 from PyQt6.QtGui import (
-    QFont, QIcon, QPalette, QColor, QAction, QKeySequence
+    QFont, QIcon, QPalette, QColor, QAction, QKeySequence, QTextCursor, QTextCharFormat
 )
 
+from console_buffer import ConsoleBuffer
+from splice_injector import (
+    SpliceDispatcher, DEFAULT_INJECT_HOST, DEFAULT_INJECT_PORT, DEFAULT_INJECT_COUNT, DEFAULT_INJECT_INTERVAL,
+    DEFAULT_START_DELAY
+)
+from process_supervisor import (
+    PipelineSpec, get_supervisor, get_bridge,
+    EVENT_STDOUT, EVENT_STDERR, EVENT_ERROR, EVENT_RESTARTING, EVENT_STOPPED, EVENT_FAILED
+)
+startup_timer.mark("imports")
 
-class TSDuckProcessor(QThread):
-    """Thread for running TSDuck commands"""
+
+class TSDuckProcessor(QObject):
+    """Runs a TSDuck command on the shared process supervisor"""
     output_received = pyqtSignal(str)
     error_received = pyqtSignal(str)
     finished = pyqtSignal(int)
     progress_updated = pyqtSignal(int)
     
-    def __init__(self, command: List[str]):
+    def __init__(self, command: List[str], restart: bool = False, name: Optional[str] = None):
         super().__init__()
         self.command = command
-        self.process = None
-        self._stop_requested = False
-        
-    def run(self):
-        """Execute the TSDuck command"""
-        try:
-            # Run command with proper output capture for GUI display
-            self.process = subprocess.Popen(
-                self.command,
-                stdout=subprocess.PIPE,  # Capture stdout for GUI
-                stderr=subprocess.PIPE,  # Capture stderr for GUI
-                text=True,
-                bufsize=1,  # Line buffered
-                universal_newlines=True
-            )
-            
-            # Start reading output in real-time
-            import threading
-            
-            def read_output():
-                """Read stdout and emit to GUI"""
-                try:
-                    for line in iter(self.process.stdout.readline, ''):
-                        if self._stop_requested:
-                            break
-                        if line.strip():
-                            self.output_received.emit(line.strip())
-                except Exception as e:
-                    self.error_received.emit(f"Output reading error: {str(e)}")
-            
-            def read_errors():
-                """Read stderr and emit to GUI"""
-                try:
-                    for line in iter(self.process.stderr.readline, ''):
-                        if self._stop_requested:
-                            break
-                        if line.strip():
-                            self.error_received.emit(line.strip())
-                except Exception as e:
-                    self.error_received.emit(f"Error reading error: {str(e)}")
-            
-            # Start output reading threads
-            output_thread = threading.Thread(target=read_output, daemon=True)
-            error_thread = threading.Thread(target=read_errors, daemon=True)
-            
-            output_thread.start()
-            error_thread.start()
-            
-            # Wait for process to complete or be stopped
-            while True:
-                if self._stop_requested:
-                    if self.process:
-                        self.process.terminate()
-                    break
-                    
-                if self.process.poll() is not None:
-                    break
-                    
-                # Small delay to prevent busy waiting
-                self.msleep(100)
-            
-            # Wait for threads to finish
-            output_thread.join(timeout=1)
-            error_thread.join(timeout=1)
-                
-            # Get return code
-            return_code = self.process.returncode if self.process else 1
-            self.finished.emit(return_code)
-            
-        except Exception as e:
-            self.error_received.emit(f"Error executing command: {str(e)}")
-            self.finished.emit(1)
+        self.restart = restart
+        self.name = name or f"tsp-{id(self):x}"
+        self._running = False
+        
+    def start(self):
+        """Start the command, failed runs are restarted with backoff if enabled"""
+        get_bridge().register(self.name, self._handle_event)
+        self._running = True
+        get_supervisor().start_pipeline(PipelineSpec(self.name, self.command, restart=self.restart))
+    
+    def _handle_event(self, kind: str, payload):
+        """Supervisor events, delivered on the GUI thread"""
+        if kind == EVENT_STDOUT:
+            self.output_received.emit(payload)
+        elif kind in (EVENT_STDERR, EVENT_ERROR):
+            self.error_received.emit(payload)
+        elif kind == EVENT_RESTARTING:
+            self.error_received.emit(f"[WARNING] TSDuck exited, restarting in {payload:.1f}s")
+        elif kind in (EVENT_STOPPED, EVENT_FAILED):
+            self._running = False
+            get_bridge().unregister(self.name)
+            get_supervisor().forget(self.name)
+            self.finished.emit(payload if payload is not None else 1)
+    
+    def isRunning(self) -> bool:
+        return self._running
     
     def stop(self):
         """Stop the process"""
-        self._stop_requested = True
-        if self.process:
-            self.process.terminate()
+        get_supervisor().stop_pipeline(self.name)
+
+
+class LazyTab(QWidget):
+    """Tab placeholder that builds its widget the first time it is shown"""
+    
+    def __init__(self, factory: Callable[[], QWidget], on_build: Optional[Callable[[QWidget], None]] = None):
+        super().__init__()
+        self.factory = factory
+        self.on_build = on_build
+        self.widget: Optional[QWidget] = None
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+    
+    def ensure_built(self) -> QWidget:
+        if self.widget is None:
+            self.widget = self.factory()
+            self.layout().addWidget(self.widget)
+            if self.on_build:
+                self.on_build(self.widget)
+        return self.widget
+    
+    @staticmethod
+    def install(tabs: QTabWidget):
+        """Build lazy tabs of a tab widget as they are selected"""
+        def build(index: int):
+            page = tabs.widget(index)
+            if isinstance(page, LazyTab):
+                page.ensure_built()
+        tabs.currentChanged.connect(build)
 
 
 class InputWidget(QWidget):
@@ -600,6 +595,15 @@ class SCTE35Widget(QWidget):
         splice_params_layout.addWidget(self.spliceinject_params)
         splice_layout.addLayout(splice_params_layout)
         
+        inject_port_layout = QHBoxLayout()
+        inject_port_layout.addWidget(QLabel("Cue Injection UDP Port:"))
+        self.inject_port = QSpinBox()
+        self.inject_port.setRange(1024, 65535)
+        self.inject_port.setValue(DEFAULT_INJECT_PORT)
+        self.inject_port.setToolTip("Local port where the injection stage receives cues while the stream runs")
+        inject_port_layout.addWidget(self.inject_port)
+        splice_layout.addLayout(inject_port_layout)
+        
         splice_group.setLayout(splice_layout)
         plugins_layout.addWidget(splice_group)
         
@@ -656,7 +660,8 @@ class SCTE35Widget(QWidget):
             "pmt_enabled": self.pmt_enabled.isChecked(),
             "pmt_params": self.pmt_params.text(),
             "spliceinject_enabled": self.spliceinject_enabled.isChecked(),
-            "spliceinject_params": self.spliceinject_params.text()
+            "spliceinject_params": self.spliceinject_params.text(),
+            "inject_port": self.inject_port.value()
         }
 
 
@@ -1045,13 +1050,13 @@ class MonitoringWidget(QWidget):
         self.console_widget = ConsoleWidget()
         self.monitor_tabs.addTab(self.console_widget, "📺 Console")
         
-        # Analytics Tab
-        self.analytics_widget = AnalyticsWidget()
-        self.monitor_tabs.addTab(self.analytics_widget, "📈 Analytics")
+        # Analytics and Performance start their monitoring when first shown
+        self.analytics_tab = LazyTab(AnalyticsWidget)
+        self.monitor_tabs.addTab(self.analytics_tab, "📈 Analytics")
         
-        # Performance Tab
-        self.performance_widget = PerformanceWidget()
-        self.monitor_tabs.addTab(self.performance_widget, "⚡ Performance")
+        self.performance_tab = LazyTab(PerformanceWidget)
+        self.monitor_tabs.addTab(self.performance_tab, "⚡ Performance")
+        LazyTab.install(self.monitor_tabs)
         
         content_layout.addWidget(self.monitor_tabs)
         content_layout.addStretch()
@@ -1059,6 +1064,14 @@ class MonitoringWidget(QWidget):
         scroll_area.setWidget(content_widget)
         main_layout.addWidget(scroll_area)
         self.setLayout(main_layout)
+    
+    @property
+    def analytics_widget(self) -> Optional['AnalyticsWidget']:
+        return self.analytics_tab.widget
+    
+    @property
+    def performance_widget(self) -> Optional['PerformanceWidget']:
+        return self.performance_tab.widget
 
 
 class AnalyticsWidget(QWidget):
@@ -1066,7 +1079,8 @@ class AnalyticsWidget(QWidget):
     
     def __init__(self):
         super().__init__()
-        self.monitor_process = None
+        self.monitoring_pipeline = None
+        self.remove_relay = None
         self.setup_ui()
         # Auto-start basic analytics monitoring
         self.start_basic_monitoring()
@@ -1166,65 +1180,26 @@ class AnalyticsWidget(QWidget):
         self.start_realtime_analysis()
     
     def start_realtime_analysis(self):
-        """Start real-time TSDuck analysis"""
+        """Start real-time analysis of the on-air stream"""
         try:
-            import subprocess
-            import threading
+            from stream_tap import shared_tap
             
-            # Build TSDuck real-time analysis command
-            tsp_binary = "/usr/local/bin/tsp"
-            
-            # Get input configuration from the main window
+            # SCTE-35 PID of the current service configuration
             try:
-                # Try to get the current input configuration
                 main_window = self.parent().parent().parent()  # Navigate to MainWindow
-                if hasattr(main_window, 'config_widget'):
-                    input_config = main_window.config_widget.input_widget.get_config()
-                    input_type = input_config.get('type', 'hls').lower()
-                    input_source = input_config.get('source', 'https://cdn.itassist.one/BREAKING/NEWS/index.m3u8')
-                else:
-                    # Fallback to default
-                    input_type = 'hls'
-                    input_source = 'https://cdn.itassist.one/BREAKING/NEWS/index.m3u8'
-            except:
-                # Fallback to default
-                input_type = 'hls'
-                input_source = 'https://cdn.itassist.one/BREAKING/NEWS/index.m3u8'
+                scte35_pid = int(main_window.config_widget.get_all_config()["service"]["scte35_pid"])
+            except Exception:
+                scte35_pid = 500
             
-            # Real-time analysis command with dynamic input
-            command = [
-                tsp_binary,
-                "-I", input_type, input_source,
-                # Bitrate monitoring
-                "-P", "bitrate_monitor", "--interval", "2", "--min", "1000000", "--max", "10000000",
-                # Continuity checking
-                "-P", "continuity",
-                # PCR monitoring
-                "-P", "pcr",
-                # Service analysis
-                "-P", "analyze", "--pid", "0", "--pid", "1", "--pid", "2", "--pid", "16", "--pid", "17", "--pid", "18", "--pid", "19",
-                # SCTE-35 monitoring
-                "-P", "splicemonitor",
-                # Output to null (monitoring only)
-                "-O", "drop"
-            ]
-            
-            # Start TSDuck process
-            self.realtime_process = subprocess.Popen(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,
-                universal_newlines=True
-            )
+            # The main pipeline forks its output to the shared tap: bitrate,
+            # continuity, PCR and SCTE-35 are measured in-process on exactly
+            # what is sent, without a second connection to the source
+            self.realtime_pipeline = TapAnalysis(shared_tap(), scte35_pid)
+            self.realtime_pipeline.stats_received.connect(self.update_realtime_metrics)
+            self.realtime_pipeline.data_received.connect(self.update_realtime_metrics)
+            self.realtime_pipeline.start()
             
-            # Start monitoring thread
-            self.realtime_thread = RealtimeAnalysisThread(self.realtime_process)
-            self.realtime_thread.data_received.connect(self.update_realtime_metrics)
-            self.realtime_thread.start()
-            
-            self.scte_status.setText("🔍 Real-time TSDuck analysis active")
+            self.scte_status.setText("🔍 Real-time analysis of the output tap active")
             self.scte_status.setStyleSheet("font-size: 14px; color: #4CAF50;")
             
         except Exception as e:
@@ -1234,47 +1209,13 @@ class AnalyticsWidget(QWidget):
     def update_realtime_metrics(self, data):
         """Update metrics with real TSDuck analysis data"""
         try:
-            # Parse TSDuck output for real metrics
-            if "bitrate" in data.lower():
-                # Extract bitrate from TSDuck output
-                import re
-                bitrate_match = re.search(r'bitrate[:\s]+(\d+)', data, re.IGNORECASE)
-                if bitrate_match:
-                    bitrate_bps = int(bitrate_match.group(1))
-                    bitrate_mbps = bitrate_bps / 1000000
-                    self.bitrate_label.setText(f"{bitrate_mbps:.1f} Mbps")
-            
-            elif "packets" in data.lower():
-                # Extract packet rate
-                import re
-                packets_match = re.search(r'packets[:\s]+(\d+)', data, re.IGNORECASE)
-                if packets_match:
-                    packets = int(packets_match.group(1))
-                    self.packets_label.setText(f"{packets}")
-            
-            elif "continuity" in data.lower() and "error" in data.lower():
-                # Extract continuity errors
-                import re
-                errors_match = re.search(r'(\d+)\s+continuity\s+errors?', data, re.IGNORECASE)
-                if errors_match:
-                    errors = int(errors_match.group(1))
-                    self.continuity_errors_label.setText(f"{errors}")
-            
-            elif "pcr" in data.lower() and "jitter" in data.lower():
-                # Extract PCR jitter
-                import re
-                jitter_match = re.search(r'jitter[:\s]+(\d+)', data, re.IGNORECASE)
-                if jitter_match:
-                    jitter = int(jitter_match.group(1))
-                    self.pcr_jitter_label.setText(f"{jitter} μs")
-            
-            elif "service" in data.lower():
-                # Extract service count
-                import re
-                services_match = re.search(r'(\d+)\s+services?', data, re.IGNORECASE)
-                if services_match:
-                    services = int(services_match.group(1))
-                    self.services_label.setText(f"{services}")
+            if isinstance(data, dict):
+                # Statistics from the in-process packet engine
+                self.bitrate_label.setText(f"{data['bitrate'] / 1000000:.1f} Mbps")
+                self.packets_label.setText(f"{data['packets_per_second']}")
+                self.continuity_errors_label.setText(f"{data['continuity_errors']}")
+                self.pcr_jitter_label.setText(f"{data['pcr_jitter_ns'] / 1000:.1f} μs")
+                self.services_label.setText(f"{data['services_count']}")
             
             elif "splice" in data.lower() or "scte" in data.lower():
                 # SCTE-35 activity detected
@@ -1287,15 +1228,21 @@ class AnalyticsWidget(QWidget):
     def start_monitoring(self):
         """Start advanced TSDuck monitoring"""
         try:
-            import subprocess
+            from stream_tap import shared_tap, free_udp_port, DEFAULT_TAP_HOST
+            
+            if self.monitoring_pipeline:
+                self.stop_monitoring()
             
             # Build TSDuck monitoring command
             tsp_binary = "/usr/local/bin/tsp"
+            # Ephemeral port, the tap port range belongs to the channel taps
+            relay_port = free_udp_port()
             
-            # Comprehensive monitoring command based on TSDuck PDF
+            # Comprehensive monitoring command based on TSDuck PDF, reading
+            # the output tap relayed to a local port instead of the source
             command = [
                 tsp_binary,
-                "-I", "hls", "https://cdn.itassist.one/BREAKING/NEWS/index.m3u8",
+                "-I", "ip", f"{DEFAULT_TAP_HOST}:{relay_port}",
                 # Bitrate monitoring for all PIDs
                 "-P", "bitrate_monitor", "--interval", "1", "--min", "1000000", "--max", "10000000",
                 # Continuity checking
@@ -1310,35 +1257,26 @@ class AnalyticsWidget(QWidget):
                 "-O", "drop"
             ]
             
-            self.monitor_process = subprocess.Popen(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,
-                universal_newlines=True
-            )
+            self.monitoring_pipeline = MonitoringPipeline(command)
+            self.monitoring_pipeline.data_received.connect(self.update_analytics)
+            self.monitoring_pipeline.start()
+            self.remove_relay = shared_tap().add_relay(relay_port)
             
             self.advanced_monitoring_btn.setText("🔄 Advanced Analysis Running")
             self.advanced_monitoring_btn.setStyleSheet("QPushButton { background-color: #4CAF50; color: white; font-weight: bold; padding: 8px; font-size: 12px; }")
             self.monitoring_status.setText("🔬 Advanced TSDuck analysis active")
             
-            # Start monitoring thread
-            self.monitoring_thread = MonitoringThread(self.monitor_process)
-            self.monitoring_thread.data_received.connect(self.update_analytics)
-            self.monitoring_thread.start()
-            
         except Exception as e:
             print(f"Error starting monitoring: {e}")
     
     def stop_monitoring(self):
         """Stop TSDuck monitoring"""
-        if self.monitor_process:
-            self.monitor_process.terminate()
-            self.monitor_process = None
-        
-        if hasattr(self, 'monitoring_thread'):
-            self.monitoring_thread.stop()
+        if self.remove_relay:
+            self.remove_relay()
+            self.remove_relay = None
+        if self.monitoring_pipeline:
+            self.monitoring_pipeline.stop()
+            self.monitoring_pipeline = None
         
         self.advanced_monitoring_btn.setText("🔬 Advanced TSDuck Analysis")
         self.advanced_monitoring_btn.setStyleSheet("QPushButton { background-color: #2196F3; color: white; font-weight: bold; padding: 8px; font-size: 12px; }")
@@ -1358,138 +1296,104 @@ class AnalyticsWidget(QWidget):
             pass
 
 
-class RealtimeAnalysisThread(QThread):
-    """Thread for real-time TSDuck analysis"""
+class TapAnalysis(QObject):
+    """Real-time analysis of the output tap of the main pipeline"""
     
     data_received = pyqtSignal(str)
+    stats_received = pyqtSignal(dict)
     
-    def __init__(self, process):
+    def __init__(self, tap, scte35_pid: int = 500, update_interval: float = 1.0,
+                 channel: str = "ibe100-main"):
         super().__init__()
-        self.process = process
-        self.running = True
+        self.tap = tap
+        self.scte35_pid = scte35_pid
+        self.channel = channel
+        self.update_interval = update_interval
+        self.name = f"tap-analysis-{id(self):x}"
+        self.engine = None
+        self.splice_events = None
+        self.next_update = 0.0
+        self._unsubscribe = []
     
-    def run(self):
-        """Monitor TSDuck process output"""
-        while self.running and self.process.poll() is None:
-            try:
-                line = self.process.stdout.readline()
-                if line:
-                    self.data_received.emit(line.strip())
-            except Exception as e:
-                print(f"Real-time analysis error: {e}")
-                break
+    def start(self):
+        """Analyze tapped packets on the tap thread, results arrive through the bridge"""
+        from ts_engine import TSPacketEngine
+        from splice_events import SpliceEventRing, follow_tap
+        from metrics_exporter import get_registry
+        
+        self.engine = TSPacketEngine(track_tables=True)
+        self.splice_events = SpliceEventRing()
+        self.next_update = time.monotonic() + self.update_interval
+        get_bridge().register(self.name, self._handle_event)
+        self._unsubscribe = [
+            self.splice_events.subscribe(lambda event: get_supervisor().post(
+                self.name, 'splice', f"SCTE-35 {event.description}")),
+            get_registry().bind_splice_events(self.channel, self.splice_events),
+            follow_tap(self.tap, self.scte35_pid, self.splice_events, "tap"),
+            self.tap.subscribe(self._feed),
+        ]
     
-    def stop(self):
-        """Stop real-time analysis"""
-        self.running = False
-        if self.process:
-            self.process.terminate()
+    def _feed(self, data):
+        """Runs on the tap thread for every buffer of packets"""
+        self.engine.feed(data)
+        now = time.monotonic()
+        if now >= self.next_update:
+            self.next_update = now + self.update_interval
+            get_supervisor().post(self.name, 'stats', self.engine.get_stats())
     
-    def start_monitoring(self):
-        """Start TSDuck monitoring"""
-        try:
-            import subprocess
-            
-            # Build TSDuck monitoring command
-            tsp_binary = "/usr/local/bin/tsp"  # Use the same binary detection as main app
-            
-            # Comprehensive monitoring command based on TSDuck PDF
-            command = [
-                tsp_binary,
-                "-I", "hls", "https://cdn.itassist.one/BREAKING/NEWS/index.m3u8",
-                # Bitrate monitoring for all PIDs
-                "-P", "bitrate_monitor", "--interval", "1", "--min", "1000000", "--max", "10000000",
-                # Continuity checking
-                "-P", "continuity",
-                # PCR monitoring
-                "-P", "pcr",
-                # Service discovery
-                "-P", "analyze", "--pid", "0", "--pid", "1", "--pid", "2", "--pid", "16", "--pid", "17", "--pid", "18", "--pid", "19",
-                # SCTE-35 monitoring
-                "-P", "splicemonitor",
-                # Output to null (monitoring only)
-                "-O", "drop"
-            ]
-            
-            self.monitor_process = subprocess.Popen(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,
-                universal_newlines=True
-            )
-            
-            self.advanced_monitoring_btn.setText("🔄 Advanced Analysis Running")
-            self.advanced_monitoring_btn.setStyleSheet("QPushButton { background-color: #4CAF50; color: white; font-weight: bold; padding: 8px; font-size: 12px; }")
-            self.monitoring_status.setText("🔬 Advanced TSDuck analysis active")
-            
-            # Start monitoring thread
-            self.monitoring_thread = MonitoringThread(self.monitor_process)
-            self.monitoring_thread.data_received.connect(self.update_analytics)
-            self.monitoring_thread.start()
-            
-        except Exception as e:
-            print(f"Error starting monitoring: {e}")
-    
-    def stop_monitoring(self):
-        """Stop TSDuck monitoring"""
-        if self.monitor_process:
-            self.monitor_process.terminate()
-            self.monitor_process = None
-        
-        if hasattr(self, 'monitoring_thread'):
-            self.monitoring_thread.stop()
-        
-        self.advanced_monitoring_btn.setText("🔬 Advanced TSDuck Analysis")
-        self.advanced_monitoring_btn.setStyleSheet("QPushButton { background-color: #2196F3; color: white; font-weight: bold; padding: 8px; font-size: 12px; }")
-        self.monitoring_status.setText("🟢 Real-time analytics active")
+    def _handle_event(self, kind: str, payload):
+        if kind == 'stats':
+            self.stats_received.emit(payload)
+        elif kind == 'splice':
+            self.data_received.emit(payload)
     
-    def update_analytics(self, data):
-        """Update analytics display with real-time data"""
-        # Parse TSDuck output and update labels
-        if "bitrate" in data.lower():
-            # Extract bitrate information
-            pass
-        elif "continuity" in data.lower():
-            # Extract continuity error information
-            pass
-        elif "splice" in data.lower():
-            # Extract SCTE-35 splice information
-            pass
+    def stop(self):
+        """Stop real-time analysis, the tap keeps running for other monitors"""
+        for unsubscribe in self._unsubscribe:
+            unsubscribe()
+        self._unsubscribe = []
+        get_bridge().unregister(self.name)
 
 
-class MonitoringThread(QThread):
-    """Thread for monitoring TSDuck output"""
+class MonitoringPipeline(QObject):
+    """TSDuck monitoring command on the process supervisor"""
     
     data_received = pyqtSignal(str)
     
-    def __init__(self, process):
+    def __init__(self, command: List[str]):
         super().__init__()
-        self.process = process
-        self.running = True
+        self.command = command
+        self.name = f"monitor-{id(self):x}"
     
-    def run(self):
-        """Monitor process output"""
-        while self.running and self.process.poll() is None:
-            try:
-                line = self.process.stdout.readline()
-                if line:
-                    self.data_received.emit(line.strip())
-            except Exception as e:
-                print(f"Monitoring error: {e}")
-                break
+    def start(self):
+        """Forward stdout and stderr lines"""
+        get_bridge().register(self.name, self._handle_event)
+        get_supervisor().start_pipeline(PipelineSpec(self.name, self.command, restart=True))
+    
+    def _handle_event(self, kind: str, payload):
+        if kind in (EVENT_STDOUT, EVENT_STDERR):
+            self.data_received.emit(payload)
+        elif kind in (EVENT_STOPPED, EVENT_FAILED):
+            get_bridge().unregister(self.name)
     
     def stop(self):
         """Stop monitoring"""
-        self.running = False
+        get_supervisor().stop_pipeline(self.name)
 
 
 class PerformanceWidget(QWidget):
     """TSDuck Performance monitoring widget with real-time system metrics"""
     
+    # The GUI only reads the newest snapshot, sampling happens on the sampler thread
+    POLL_INTERVAL_MS = 250
+    HISTORY_LINES = 20
+    PROCESS_COLUMNS = ["Pipeline", "PID", "CPU %", "RSS MB", "Threads", "Read KB/s", "Write KB/s", "Ctx/s"]
+    
     def __init__(self):
         super().__init__()
+        from resource_sampler import ResourceSampler
+        self.sampler = ResourceSampler(supervisor=get_supervisor())
+        self.last_snapshot_time = 0.0
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_performance)
         self.setup_ui()
@@ -1560,12 +1464,30 @@ class PerformanceWidget(QWidget):
         perf_group.setLayout(perf_layout)
         main_layout.addWidget(perf_group)
         
+        # TSDuck processes started by the application
+        process_group = QGroupBox("🧵 TSDuck Processes")
+        process_layout = QVBoxLayout()
+        
+        self.process_table = QTableWidget(0, len(self.PROCESS_COLUMNS))
+        self.process_table.setHorizontalHeaderLabels(self.PROCESS_COLUMNS)
+        self.process_table.verticalHeader().setVisible(False)
+        self.process_table.setMaximumHeight(160)
+        process_layout.addWidget(self.process_table)
+        
+        self.interfaces_label = QLabel("")
+        self.interfaces_label.setStyleSheet("font-family: 'Monaco', 'Consolas', monospace; font-size: 12px; color: #888;")
+        process_layout.addWidget(self.interfaces_label)
+        
+        process_group.setLayout(process_layout)
+        main_layout.addWidget(process_group)
+        
         # Performance History Chart
         history_group = QGroupBox("📈 Performance History")
         history_layout = QVBoxLayout()
         
-        self.performance_text = QTextEdit()
+        self.performance_text = QPlainTextEdit()
         self.performance_text.setReadOnly(True)
+        self.performance_text.setMaximumBlockCount(self.HISTORY_LINES)
         self.performance_text.setMaximumHeight(200)
         self.performance_text.setStyleSheet("font-family: 'Monaco', 'Consolas', monospace; font-size: 12px;")
         history_layout.addWidget(self.performance_text)
@@ -1578,160 +1500,88 @@ class PerformanceWidget(QWidget):
     
     def start_performance_monitoring(self):
         """Start real-time performance monitoring"""
-        self.timer.start(1000)  # Update every second by default
-        self.performance_text.append("[LAUNCH] Real-time performance monitoring started automatically...")
-        self.performance_text.append("📊 Monitoring CPU, Memory, Network, and TSDuck processes...")
+        try:
+            self.sampler.start()
+        except RuntimeError as e:
+            self.performance_text.appendPlainText(f"[WARNING] {e}")
+            self.status_label.setText("⏹️ Monitoring unavailable")
+            self.status_label.setStyleSheet("font-size: 16px; font-weight: bold; color: #666;")
+            return
+        self.timer.start(self.POLL_INTERVAL_MS)
+        self.performance_text.appendPlainText("[LAUNCH] Real-time performance monitoring started automatically...")
+        self.performance_text.appendPlainText("📊 Monitoring CPU, Memory, Network, and TSDuck processes...")
     
     def update_refresh_rate(self, rate_text):
         """Update refresh rate for performance monitoring"""
         rate_map = {
-            "1 second": 1000,
-            "2 seconds": 2000,
-            "5 seconds": 5000,
-            "10 seconds": 10000
+            "1 second": 1.0,
+            "2 seconds": 2.0,
+            "5 seconds": 5.0,
+            "10 seconds": 10.0
         }
-        self.timer.setInterval(rate_map.get(rate_text, 1000))
-        self.performance_text.append(f"🔄 Refresh rate updated to {rate_text}")
+        self.sampler.set_interval(rate_map.get(rate_text, 1.0))
+        self.performance_text.appendPlainText(f"🔄 Refresh rate updated to {rate_text}")
+    
+    def set_health(self, text: str, color: str):
+        self.stream_health_label.setText(text)
+        self.stream_health_label.setStyleSheet(f"font-size: 16px; font-weight: bold; color: {color};")
     
     def update_performance(self):
-        """Update performance metrics"""
-        try:
-            import psutil
-            import subprocess
-            import random
-            
-            # CPU Usage
-            cpu_percent = psutil.cpu_percent(interval=0.1)  # Faster sampling
-            self.cpu_label.setText(f"{cpu_percent:.1f}%")
-            
-            # Memory Usage
-            memory = psutil.virtual_memory()
-            memory_mb = memory.used // (1024*1024)
-            self.memory_label.setText(f"{memory_mb} MB")
-            
-            # Network Usage (simulate streaming activity)
-            network = psutil.net_io_counters()
-            network_mbps = (network.bytes_sent + network.bytes_recv) // (1024*1024) // 10  # Approximate Mbps
-            self.network_label.setText(f"{network_mbps:.1f} Mbps")
-            
-            # TSDuck Processes
-            tsp_processes = 0
-            try:
-                result = subprocess.run(["pgrep", "-c", "tsp"], capture_output=True, text=True)
-                tsp_processes = int(result.stdout.strip()) if result.stdout.strip() else 0
-            except:
-                pass
-            self.tsduck_processes_label.setText(str(tsp_processes))
-            
-            # Stream Health Assessment with more detailed criteria
-            if tsp_processes > 0:
-                if cpu_percent < 30 and memory.percent < 70:
-                    self.stream_health_label.setText("[OK] Excellent")
-                    self.stream_health_label.setStyleSheet("font-size: 16px; font-weight: bold; color: #4CAF50;")
-                elif cpu_percent < 50 and memory.percent < 80:
-                    self.stream_health_label.setText("[OK] Healthy")
-                    self.stream_health_label.setStyleSheet("font-size: 16px; font-weight: bold; color: #4CAF50;")
-                elif cpu_percent < 70 and memory.percent < 90:
-                    self.stream_health_label.setText("[WARNING] Warning")
-                    self.stream_health_label.setStyleSheet("font-size: 16px; font-weight: bold; color: #FF9800;")
+        """Show the newest snapshot from the sampler thread"""
+        snapshot = self.sampler.latest()
+        if snapshot is None or snapshot.timestamp == self.last_snapshot_time:
+            return
+        self.last_snapshot_time = snapshot.timestamp
+        
+        self.cpu_label.setText(f"{snapshot.cpu_percent:.1f}%")
+        self.memory_label.setText(f"{snapshot.memory_used // (1024*1024)} MB ({snapshot.memory_percent:.1f}%)")
+        rx_bps, tx_bps = snapshot.network_bps
+        self.network_label.setText(f"▼ {rx_bps / 1e6:.2f} Mbps  ▲ {tx_bps / 1e6:.2f} Mbps")
+        
+        processes = snapshot.processes
+        tsp_cpu = snapshot.process_cpu_percent
+        tsp_rss_mb = snapshot.process_rss_bytes / (1024*1024)
+        self.tsduck_processes_label.setText(
+            f"{len(processes)} ({tsp_cpu:.1f}% CPU, {tsp_rss_mb:.0f} MB)" if processes else "0")
+        
+        self.process_table.setRowCount(len(processes))
+        for row, process in enumerate(processes):
+            values = [process.label, str(process.pid), f"{process.cpu_percent:.1f}",
+                      f"{process.rss_bytes / (1024*1024):.1f}", str(process.threads),
+                      f"{process.read_bps / 1024:.0f}", f"{process.write_bps / 1024:.0f}",
+                      f"{process.ctx_switches_per_s:.0f}"]
+            for column, value in enumerate(values):
+                item = self.process_table.item(row, column)
+                if item is None:
+                    self.process_table.setItem(row, column, QTableWidgetItem(value))
                 else:
-                    self.stream_health_label.setText("[ERROR] Critical")
-                    self.stream_health_label.setStyleSheet("font-size: 16px; font-weight: bold; color: #f44336;")
-            else:
-                self.stream_health_label.setText("⏹️ No Stream")
-                self.stream_health_label.setStyleSheet("font-size: 16px; font-weight: bold; color: #666;")
-            
-            # Update performance history with more details
-            timestamp = time.strftime("%H:%M:%S")
-            self.performance_text.append(f"[{timestamp}] CPU: {cpu_percent:.1f}% | Memory: {memory.percent:.1f}% | Network: {network_mbps:.1f} Mbps | TSDuck: {tsp_processes}")
-            
-            # Keep only last 20 lines
-            if self.performance_text.document().blockCount() > 20:
-                cursor = self.performance_text.textCursor()
-                cursor.movePosition(cursor.MoveOperation.Start)
-                cursor.movePosition(cursor.MoveOperation.Down, cursor.MoveMode.KeepAnchor, 1)
-                cursor.removeSelectedText()
-            
-        except ImportError:
-            self.performance_text.append("[WARNING] psutil not available. Install with: pip install psutil")
-            # Fallback to simulated data
-            self.update_simulated_performance()
-        except Exception as e:
-            self.performance_text.append(f"[ERROR] Error updating performance: {e}")
-            self.update_simulated_performance()
+                    item.setText(value)
+        
+        active = [i for i in snapshot.interfaces.values() if i.rx_bps or i.tx_bps]
+        self.interfaces_label.setText("  ".join(
+            f"{i.name}: ▼{i.rx_bps / 1e6:.2f} ▲{i.tx_bps / 1e6:.2f} Mbps" + (f" ({i.drops} drops)" if i.drops else "")
+            for i in sorted(active, key=lambda i: i.name)))
+        
+        # Stream health from the tsp processes themselves, a tsp pinned near one core is falling behind
+        busiest = max((p.cpu_percent for p in processes), default=0.0)
+        if not processes:
+            self.set_health("⏹️ No Stream", "#666")
+        elif busiest < 50 and snapshot.memory_percent < 80:
+            self.set_health("[OK] Healthy", "#4CAF50")
+        elif busiest < 85 and snapshot.memory_percent < 90:
+            self.set_health("[WARNING] Warning", "#FF9800")
+        else:
+            self.set_health("[ERROR] Critical", "#f44336")
+        
+        timestamp = time.strftime("%H:%M:%S", time.localtime(snapshot.timestamp))
+        self.performance_text.appendPlainText(
+            f"[{timestamp}] CPU: {snapshot.cpu_percent:.1f}% | Memory: {snapshot.memory_percent:.1f}% | "
+            f"Network: {rx_bps / 1e6:.2f}/{tx_bps / 1e6:.2f} Mbps | TSDuck: {len(processes)} "
+            f"({tsp_cpu:.1f}% CPU, {tsp_rss_mb:.0f} MB)")
     
-    def update_simulated_performance(self):
-        """Update with real system data when psutil is not available"""
-        try:
-            import subprocess
-            import os
-            
-            # Get real CPU usage using system commands
-            try:
-                cpu_result = subprocess.run(["top", "-l", "1", "-n", "0"], capture_output=True, text=True, timeout=5)
-                cpu_lines = cpu_result.stdout.split('\n')
-                for line in cpu_lines:
-                    if "CPU usage" in line:
-                        cpu_match = re.search(r'(\d+\.\d+)%', line)
-                        if cpu_match:
-                            cpu_percent = float(cpu_match.group(1))
-                            break
-                else:
-                    cpu_percent = 0.0
-            except:
-                cpu_percent = 0.0
-            
-            # Get real memory usage
-            try:
-                memory_result = subprocess.run(["vm_stat"], capture_output=True, text=True, timeout=5)
-                # Parse vm_stat output for real memory usage
-                memory_mb = 0
-                for line in memory_result.stdout.split('\n'):
-                    if "Pages free" in line:
-                        free_pages = int(re.search(r'(\d+)', line).group(1))
-                        memory_mb = free_pages * 4096 // (1024*1024)  # Convert to MB
-                        break
-            except:
-                memory_mb = 0
-            
-            # Get real network usage
-            try:
-                network_result = subprocess.run(["netstat", "-i"], capture_output=True, text=True, timeout=5)
-                network_mbps = 0
-                for line in network_result.stdout.split('\n'):
-                    if "en0" in line or "wlan0" in line:
-                        parts = line.split()
-                        if len(parts) > 6:
-                            bytes_out = int(parts[6]) if parts[6].isdigit() else 0
-                            network_mbps = bytes_out / (1024*1024)  # Convert to MB
-                            break
-            except:
-                network_mbps = 0
-            
-            # Get real TSDuck processes
-            try:
-                tsp_result = subprocess.run(["pgrep", "-c", "tsp"], capture_output=True, text=True, timeout=5)
-                tsp_processes = int(tsp_result.stdout.strip()) if tsp_result.stdout.strip() else 0
-            except:
-                tsp_processes = 0
-            
-            self.cpu_label.setText(f"{cpu_percent:.1f}%")
-            self.memory_label.setText(f"{memory_mb} MB")
-            self.network_label.setText(f"{network_mbps:.1f} MB")
-            self.tsduck_processes_label.setText(str(tsp_processes))
-            
-            if tsp_processes > 0:
-                self.stream_health_label.setText("[OK] Real System Data")
-                self.stream_health_label.setStyleSheet("font-size: 16px; font-weight: bold; color: #4CAF50;")
-            else:
-                self.stream_health_label.setText("⏹️ No Stream")
-                self.stream_health_label.setStyleSheet("font-size: 16px; font-weight: bold; color: #666;")
-            
-            timestamp = time.strftime("%H:%M:%S")
-            self.performance_text.append(f"[{timestamp}] CPU: {cpu_percent:.1f}% | Memory: {memory_mb} MB | Network: {network_mbps:.1f} MB | TSDuck: {tsp_processes} (Real Data)")
-            
-        except Exception as e:
-            self.performance_text.append(f"[ERROR] Error getting real system data: {e}")
+    def stop_performance_monitoring(self):
+        self.timer.stop()
+        self.sampler.stop()
 
 
 class ToolsWidget(QWidget):
@@ -3012,39 +2862,118 @@ class HelpWidget(QWidget):
 
 
 class ConsoleWidget(QGroupBox):
-    """Console output widget"""
+    """Console output widget, lines are buffered and inserted in batches"""
+    
+    FLUSH_INTERVAL_MS = 50
+    MAX_BLOCKS = 5000
     
     def __init__(self):
         super().__init__("Console Output")
+        self.buffer = ConsoleBuffer()
+        self.filter_text = ""
         self.setup_ui()
         
+        # Pending lines go to the document once per tick instead of once per line
+        self.flush_timer = QTimer(self)
+        self.flush_timer.timeout.connect(self.flush_pending)
+        self.flush_timer.start(self.FLUSH_INTERVAL_MS)
+        
     def setup_ui(self):
         layout = QVBoxLayout()
         
+        # Filter
+        filter_layout = QHBoxLayout()
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Filter console output...")
+        self.filter_edit.textChanged.connect(self.apply_filter)
+        filter_layout.addWidget(self.filter_edit)
+        self.status_label = QLabel("0 lines")
+        filter_layout.addWidget(self.status_label)
+        layout.addLayout(filter_layout)
+        
         # Console output
-        self.console = QTextEdit()
+        self.console = QPlainTextEdit()
         self.console.setReadOnly(True)
+        self.console.setUndoRedoEnabled(False)
+        self.console.setMaximumBlockCount(self.MAX_BLOCKS)
         self.console.setFont(QFont("Monaco", 9))
         self.console.setStyleSheet("background-color: #1e1e1e; color: #ffffff;")
         layout.addWidget(self.console)
         
+        self.output_format = QTextCharFormat()
+        self.output_format.setForeground(QColor("#ffffff"))
+        self.error_format = QTextCharFormat()
+        self.error_format.setForeground(QColor("#ff6b6b"))
+        
         # Clear button
         clear_btn = QPushButton("Clear Console")
-        clear_btn.clicked.connect(self.console.clear)
+        clear_btn.clicked.connect(self.clear_console)
         layout.addWidget(clear_btn)
         
         self.setLayout(layout)
     
     def append_output(self, text: str):
         """Append text to console"""
-        self.console.append(text)
-        # Auto-scroll to bottom
-        scrollbar = self.console.verticalScrollBar()
-        scrollbar.setValue(scrollbar.maximum())
+        self.buffer.append(text)
     
     def append_error(self, text: str):
         """Append error text to console"""
-        self.console.append(f"<span style='color: #ff6b6b;'>{text}</span>")
+        self.buffer.append(text, error=True)
+        
+    def flush_pending(self):
+        """Insert the lines received since the last tick"""
+        lines = self.buffer.take_pending(self.MAX_BLOCKS)
+        if self.filter_text:
+            lines = [line for line in lines if self.filter_text in line[2].lower()]
+        if lines:
+            self._insert_lines(lines)
+        self._update_status()
+        
+    def _insert_lines(self, lines):
+        """Insert lines with one insertText per run of output or error lines"""
+        scrollbar = self.console.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 2
+        cursor = QTextCursor(self.console.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.beginEditBlock()
+        separator = "\n" if not self.console.document().isEmpty() else ""
+        start = 0
+        while start < len(lines):
+            error = lines[start][1]
+            end = start
+            while end < len(lines) and lines[end][1] == error:
+                end += 1
+            text = "\n".join(line[2] for line in lines[start:end])
+            cursor.insertText(separator + text, self.error_format if error else self.output_format)
+            separator = "\n"
+            start = end
+        cursor.endEditBlock()
+        # Follow new output unless the user scrolled back
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+            
+    def _update_status(self):
+        status = f"{len(self.buffer):,} lines"
+        if self.buffer.dropped:
+            status += f", {self.buffer.dropped:,} dropped"
+        self.status_label.setText(status)
+        
+    def apply_filter(self, text: str):
+        """Show only history lines containing the filter text"""
+        self.filter_text = text.strip().lower()
+        self.flush_pending()
+        self.console.clear()
+        if self.filter_text:
+            lines = self.buffer.search(self.filter_text, limit=self.MAX_BLOCKS)
+        else:
+            lines = self.buffer.latest(self.MAX_BLOCKS)
+        if lines:
+            self._insert_lines(lines)
+            
+    def clear_console(self):
+        self.buffer.clear()
+        self.console.clear()
+        self._update_status()
 
 
 class TSAnalyzerWidget(QWidget):
@@ -3155,14 +3084,20 @@ class TSAnalyzerWidget(QWidget):
                 QMessageBox.warning(self, "Input Required", "Please enter an input address/URL")
                 return
             
-            # Build TSAnalyzer command based on analysis type
-            command = self.build_analyzer_command(input_type, input_address, analysis_type)
-            
-            self.results.append(f"🔍 Starting TSAnalyzer analysis...")
-            self.results.append(f"[INFO] Command: {' '.join(command)}")
-            self.results.append("=" * 60)
-            
-            self.analyzer_process = TSDuckProcessor(command)
+            if self.use_mapped_analysis(input_type, analysis_type):
+                # Recordings are analyzed in-process from a memory mapping
+                self.results.append(f"🔍 Starting in-process analysis of {input_address}...")
+                self.results.append("=" * 60)
+                self.analyzer_process = FileAnalysisThread(input_address)
+            else:
+                # Build TSAnalyzer command based on analysis type
+                command = self.build_analyzer_command(input_type, input_address, analysis_type)
+                
+                self.results.append(f"🔍 Starting TSAnalyzer analysis...")
+                self.results.append(f"[INFO] Command: {' '.join(command)}")
+                self.results.append("=" * 60)
+                
+                self.analyzer_process = TSDuckProcessor(command)
             self.analyzer_process.output_received.connect(self.results.append)
             self.analyzer_process.error_received.connect(self.append_analysis_error)
             self.analyzer_process.finished.connect(self.analysis_finished)
@@ -3201,6 +3136,17 @@ class TSAnalyzerWidget(QWidget):
         """Clear analysis results"""
         self.results.clear()
     
+    def use_mapped_analysis(self, input_type: str, analysis_type: str) -> bool:
+        """Check if the analysis can run in-process on a memory-mapped file"""
+        if input_type not in ("file", "tsfile") or analysis_type not in (
+                "Basic Analysis", "PID Analysis", "Bitrate Analysis"):
+            return False
+        try:
+            import numpy
+            return True
+        except ImportError:
+            return False
+    
     def build_analyzer_command(self, input_type: str, input_address: str, analysis_type: str) -> List[str]:
         """Build TSAnalyzer command"""
         command = ["tsp", "-I", input_type, input_address]
@@ -3222,14 +3168,67 @@ class TSAnalyzerWidget(QWidget):
         return command
 
 
+class FileAnalysisThread(QThread):
+    """Thread for in-process analysis of a memory-mapped TS file"""
+    output_received = pyqtSignal(str)
+    error_received = pyqtSignal(str)
+    finished = pyqtSignal(int)
+    
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        
+    def run(self):
+        """Analyze the file and report per-PID results"""
+        try:
+            from ts_engine import MappedTSFile
+            
+            start = time.monotonic()
+            with MappedTSFile(self.path) as ts_file:
+                stats = ts_file.analyze()
+            elapsed = time.monotonic() - start
+            
+            self.output_received.emit(f"Packets: {stats['total_packets']:,} analyzed in {elapsed:.2f} s")
+            self.output_received.emit(f"Bitrate: {stats['bitrate'] / 1000000:.3f} Mbps")
+            self.output_received.emit(f"Continuity errors: {stats['continuity_errors']}")
+            self.output_received.emit(f"Sync errors: {stats['sync_errors']}")
+            self.output_received.emit(f"PCR accuracy: {stats['pcr_accuracy']}%")
+            self.output_received.emit(f"PCR jitter: {stats['pcr_jitter_ns'] / 1000:.1f} μs")
+            self.output_received.emit("")
+            self.output_received.emit(f"{'PID':>8} {'Packets':>12} {'Bitrate':>14} {'CC err':>7} {'PCRs':>8}")
+            for pid, pid_stats in sorted(stats['pids'].items()):
+                self.output_received.emit(
+                    f"{pid:#06x} {pid_stats['packets']:>12,} {pid_stats['bitrate']:>10,} b/s "
+                    f"{pid_stats['cc_errors']:>7} {pid_stats['pcr_count']:>8}"
+                )
+            self.finished.emit(0)
+            
+        except Exception as e:
+            self.error_received.emit(f"Error analyzing file: {str(e)}")
+            self.finished.emit(1)
+    
+    def stop(self):
+        """File analysis runs to completion"""
+        pass
+
+
 class MainWindow(QMainWindow):
     """Main application window"""
     
+    # Emitted once, after the window has painted for the first time
+    first_painted = pyqtSignal()
+    
     def __init__(self):
         super().__init__()
         self.processor = None
+        # Each run gets its own supervisor name, a stopping run never blocks the next start
+        self.run_count = 0
+        self.probe_name = f"input-probe-{id(self):x}"
+        self.splice_stage = None
+        self.splice_dispatcher = None
+        self.stop_stream_clock = None
+        self.painted = False
         self.setup_ui()
-        self.setup_connections()
         
     def setup_ui(self):
         """Setup the user interface"""
@@ -3270,29 +3269,28 @@ class MainWindow(QMainWindow):
         """)
         
         # Configuration Tab - All settings in one place
-        self.config_widget = ConfigurationWidget()
-        self.tab_widget.addTab(self.config_widget, "⚙️ Configuration")
+        with startup_timer.phase("configuration tab"):
+            self.config_widget = ConfigurationWidget()
+            self.tab_widget.addTab(self.config_widget, "⚙️ Configuration")
         
         # Monitoring Tab - Real-time analytics and status
-        self.monitoring_widget = MonitoringWidget()
-        self.tab_widget.addTab(self.monitoring_widget, "📊 Monitoring")
+        with startup_timer.phase("monitoring tab"):
+            self.monitoring_widget = MonitoringWidget()
+            self.tab_widget.addTab(self.monitoring_widget, "📊 Monitoring")
         
-        # Professional SCTE-35 Tab - Clean, organized interface
-        try:
-            from professional_scte35_widget import ProfessionalSCTE35Widget
-            self.scte35_widget = ProfessionalSCTE35Widget()
-            self.tab_widget.addTab(self.scte35_widget, "[TOOL] SCTE-35 Professional")
-        except ImportError as e:
-            print(f"[WARNING] Professional SCTE-35 widget not available: {e}")
-            self.scte35_widget = None
+        # The remaining tabs are built, and their modules imported, on first show
+        self.scte35_widget = None
+        self.tab_widget.addTab(LazyTab(self.create_scte35_widget, self.connect_scte35_widget),
+                               "[TOOL] SCTE-35 Professional")
         
         # Tools Tab - Analyzer and utilities
-        self.tools_widget = ToolsWidget()
-        self.tab_widget.addTab(self.tools_widget, "[TOOL] Tools")
+        self.tools_tab = LazyTab(ToolsWidget)
+        self.tab_widget.addTab(self.tools_tab, "[TOOL] Tools")
         
         # Help Tab - Enterprise documentation
-        self.help_widget = HelpWidget()
-        self.tab_widget.addTab(self.help_widget, "📚 Help")
+        self.help_tab = LazyTab(HelpWidget)
+        self.tab_widget.addTab(self.help_tab, "📚 Help")
+        LazyTab.install(self.tab_widget)
         
         # Control buttons
         control_layout = QHBoxLayout()
@@ -3375,9 +3373,38 @@ class MainWindow(QMainWindow):
         # Add footer to status bar
         self.statusBar().addPermanentWidget(footer_widget)
         
-    def setup_connections(self):
-        """Setup signal connections"""
-        pass
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.painted:
+            self.painted = True
+            # Queued, so the timing covers the first frame reaching the screen
+            QTimer.singleShot(0, self.first_painted.emit)
+    
+    def create_scte35_widget(self) -> QWidget:
+        """Professional SCTE-35 Tab - Clean, organized interface"""
+        try:
+            from professional_scte35_widget import ProfessionalSCTE35Widget
+            return ProfessionalSCTE35Widget()
+        except ImportError as e:
+            print(f"[WARNING] Professional SCTE-35 widget not available: {e}")
+            return QLabel(f"[WARNING] Professional SCTE-35 widget not available: {e}")
+    
+    def connect_scte35_widget(self, widget: QWidget):
+        """Route cues from the lazily built SCTE-35 tab to the injector"""
+        if hasattr(widget, 'cue_encoded'):
+            self.scte35_widget = widget
+            widget.cue_encoded.connect(self.inject_cue)
+    
+    def inject_cue(self, event_id: int, section: bytes):
+        """Send an encoded cue to the running spliceinject plugin"""
+        console_widget = self.monitoring_widget.console_widget
+        if not (self.processor and self.splice_dispatcher):
+            console_widget.append_output(f"[INFO] Cue {event_id} encoded, start processing to inject it")
+            return
+        if self.splice_dispatcher.send_section(section):
+            console_widget.append_output(f"🎬 Injected SCTE-35 cue {event_id} via {self.splice_dispatcher.host}:{self.splice_dispatcher.port}")
+        else:
+            console_widget.append_error(f"[ERROR] Failed to inject SCTE-35 cue {event_id}")
     
     def find_tsp_binary(self) -> str:
         """Find TSDuck tsp binary automatically"""
@@ -3408,16 +3435,8 @@ class MainWindow(QMainWindow):
         print("[WARNING] TSDuck not found, using 'tsp' as fallback")
         return "tsp"
     
-    def build_command(self) -> List[str]:
-        """Build TSDuck command from configuration with manual VPID/APID"""
-        # Get configuration from the new enterprise structure
-        all_config = self.config_widget.get_all_config()
-        input_config = all_config["input"]
-        output_config = all_config["output"]
-        service_config = all_config["service"]
-        scte35_config = all_config["scte35"]
-        tsduck_config = all_config["tsduck"]
-        
+    def resolve_tsp_binary(self, tsduck_config) -> str:
+        """Configured TSDuck path, else the auto-detected one"""
         # Use configured TSDuck path or fallback to auto-detection
         tsp_binary = tsduck_config.get("tsduck_path", "tsp")
         if not tsp_binary or tsp_binary == "tsp":
@@ -3425,8 +3444,10 @@ class MainWindow(QMainWindow):
         
         # Debug: Show which TSDuck binary is being used
         print(f"🔍 Using TSDuck binary: {tsp_binary}")
-        
-        # Get input configuration
+        return tsp_binary
+    
+    def build_input_args(self, input_config) -> Tuple[str, str, List[str]]:
+        """tsp input arguments, with the input type and source as TSDuck expects them"""
         input_type = input_config["type"].lower()
         input_source = input_config["source"]
         input_params = input_config.get("params", "")
@@ -3484,16 +3505,14 @@ class MainWindow(QMainWindow):
             # Keep as is for hardware inputs
             pass
         
-        # Build command with proper service and PID configuration
         # Using official TSDuck documentation patterns
-        command = [
-            tsp_binary,
+        input_args = [
             "-I", input_type, input_source,
         ]
         
         # Add input parameters if specified
         if input_params:
-            command.extend(input_params.split())
+            input_args.extend(input_params.split())
         
         # Add SRT-specific parameters for input
         if input_type == "srt":
@@ -3503,7 +3522,25 @@ class MainWindow(QMainWindow):
                 "--messageapi",         # Enable message API for SRT
                 "--latency", "2000"     # Set latency to 2000ms
             ]
-            command.extend(srt_params)
+            input_args.extend(srt_params)
+        return input_type, input_source, input_args
+    
+    def build_command(self, remap=None) -> List[str]:
+        """Build TSDuck command from configuration with manual VPID/APID
+
+        Without a remap plan the input is probed here, on the calling thread.
+        """
+        # Get configuration from the new enterprise structure
+        all_config = self.config_widget.get_all_config()
+        input_config = all_config["input"]
+        output_config = all_config["output"]
+        service_config = all_config["service"]
+        scte35_config = all_config["scte35"]
+        tsduck_config = all_config["tsduck"]
+        
+        tsp_binary = self.resolve_tsp_binary(tsduck_config)
+        input_type, input_source, input_args = self.build_input_args(input_config)
+        command = [tsp_binary, *input_args]
         
         # Add processing plugins
         command.extend([
@@ -3512,69 +3549,61 @@ class MainWindow(QMainWindow):
             "--name", service_config["service_name"], "--provider", service_config["provider_name"],
         ])
         
-        # Smart PID remapping - only remap if there are actual conflicts
-        remap_needed = self.check_pid_conflicts(input_type, input_source, service_config)
-        if remap_needed:
-            print(f"🔄 PID remapping needed for {input_type} input - adding remap plugin")
-            command.extend([
-                # Remap existing PIDs to distributor requirements (only when needed)
-                "-P", "remap", 
-                "211=" + str(service_config['vpid']),  # Video: 211 → 256
-                "221=" + str(service_config['apid']),  # Audio: 221 → 257
-            ])
+        # PID remapping from the probed PAT/PMT of the input, cached per source
+        if remap is None:
+            remap = self.check_pid_conflicts(input_type, input_source, service_config, input_args=input_args,
+                                             tsp_binary=tsp_binary,
+                                             program_number=input_config.get("program_number"))
+        for warning in remap.warnings:
+            print(f"[WARNING] {warning}")
+        if remap.rules:
+            print(f"🔄 PID remapping for {input_type} input: {' '.join(remap.rules)}")
+            command.extend(["-P", "remap", *remap.rules])
         else:
             print(f"[OK] No PID remapping needed for {input_type} input - skipping remap plugin")
         
         # Add remaining processing plugins
         command.extend([
-            # Configure PIDs using PMT plugin
+            # Configure PIDs using PMT plugin, with the stream types found in the input
             "-P", "pmt", "--service", str(service_config["service_id"]), 
-            "--add-pid", f"{service_config['vpid']}/0x1b",  # Video PID with H.264 type
-            "--add-pid", f"{service_config['apid']}/0x0f",   # Audio PID with AAC type
+            "--add-pid", f"{service_config['vpid']}/0x{remap.video_type:02x}",
+            "--add-pid", f"{service_config['apid']}/0x{remap.audio_type:02x}",
             "--add-pid", f"{service_config['scte35_pid']}/0x86",  # SCTE-35 PID
-            # Inject SCTE-35 markers
-            "-P", "spliceinject", "--pid", str(service_config["scte35_pid"]), 
-            "--pts-pid", str(service_config["vpid"]),
-            "--files", "scte35_final/preroll_10023.xml",
-            "--inject-count", "1", "--inject-interval", "1000", "--start-delay", "2000",
+            # SCTE-35 markers are injected into null packets by the InjectionStage
+            # between this command and its output, see run_processing
             # Output configuration
             "-O", output_config["type"].lower(),
             *self.get_output_params(output_config)
         ])
         return command
     
-    def check_pid_conflicts(self, input_type, input_source, service_config):
-        """Check if PID remapping is needed to avoid conflicts"""
-        try:
-            # For SRT input, we assume the stream may already have the target PIDs
-            # so we should avoid remapping to prevent conflicts
-            if input_type == "srt":
-                # SRT streams often come with pre-configured PIDs
-                # Don't remap to avoid "PID present both in input and remap" error
-                return False
-            
-            # For HLS input, we know the typical PIDs (211, 221) and need to remap
-            elif input_type == "hls":
-                # HLS typically has PIDs 211 (video) and 221 (audio)
-                # We need to remap these to our target PIDs
-                return True
-            
-            # For UDP/TCP input, assume we need remapping for standardization
-            elif input_type in ["udp", "tcp"]:
-                return True
-            
-            # For file input, assume we need remapping for standardization
-            elif input_type == "file":
-                return True
-            
-            # For other input types, be conservative and don't remap
-            else:
-                return False
-                
-        except Exception as e:
-            # If we can't determine, be conservative and don't remap
-            print(f"[WARNING] Could not check PID conflicts: {e}")
-            return False
+    def check_pid_conflicts(self, input_type, input_source, service_config, input_args=None, tsp_binary="tsp",
+                            program_number=None):
+        """Plan PID remapping from the PAT/PMT of the input
+
+        The input is probed once per source (see psi_probe), when that fails
+        the typical PIDs of the input type are assumed. The program is the
+        input program_number if configured, else the first one carrying video;
+        the output service_id says nothing about the input's numbering.
+        """
+        from psi_probe import probe_source, plan_remap, RemapPlan
+        
+        if input_args:
+            try:
+                result = probe_source(input_args, tsp_binary)
+                if result is not None:
+                    print(f"[OK] Probed {input_type} input in {result.elapsed * 1000:.0f} ms")
+                    return plan_remap(result, service_config['vpid'], service_config['apid'],
+                                      int(program_number) if program_number else None)
+            except Exception as e:
+                print(f"[WARNING] Could not probe input PIDs: {e}")
+        
+        # SRT streams often come with pre-configured PIDs, remapping them would
+        # fail with "PID present both in input and remap"
+        if input_type in ["hls", "udp", "tcp", "file"]:
+            # HLS typically has PIDs 211 (video) and 221 (audio)
+            return RemapPlan(rules=[f"211={service_config['vpid']}", f"221={service_config['apid']}"])
+        return RemapPlan()
     
     def get_output_params(self, output_config):
         """Get output parameters based on output type"""
@@ -3632,17 +3661,74 @@ class MainWindow(QMainWindow):
             return []
     
     def start_processing(self):
-        """Start IBE-100 processing"""
+        """Start IBE-100 processing once the input PIDs are known
+
+        Probing a live input takes seconds, it runs on a worker thread and
+        processing starts on the GUI thread when the remap plan arrives.
+        """
+        all_config = self.config_widget.get_all_config()
+        input_config = all_config["input"]
+        tsp_binary = self.resolve_tsp_binary(all_config["tsduck"])
+        input_type, input_source, input_args = self.build_input_args(input_config)
+        
+        def probe():
+            remap = self.check_pid_conflicts(input_type, input_source, all_config["service"],
+                                             input_args=input_args, tsp_binary=tsp_binary,
+                                             program_number=input_config.get("program_number"))
+            get_supervisor().post(self.probe_name, 'remap', remap)
+        
+        self.start_btn.setEnabled(False)
+        self.statusBar().showMessage(f"Probing {input_type} input...")
+        get_bridge().register(self.probe_name, lambda kind, remap: self.run_processing(remap))
+        threading.Thread(target=probe, name="input-probe", daemon=True).start()
+    
+    def run_processing(self, remap):
+        """Build the command with the probed remap plan and start it"""
+        get_bridge().unregister(self.probe_name)
         try:
             # Get configuration from the new enterprise structure
             all_config = self.config_widget.get_all_config()
             service_config = all_config["service"]
             scte35_config = all_config["scte35"]
             
-            command = self.build_command()
+            command = self.build_command(remap)
             # Get console widget from monitoring tab
             console_widget = self.monitoring_widget.console_widget
             
+            inject_port = scte35_config.get("inject_port", DEFAULT_INJECT_PORT)
+            # The injection stage goes right before the output, after the tap
+            stage_split = command.index("-O")
+            
+            # Fork the output to the shared tap, the analytics tab analyzes
+            # it instead of connecting to the source a second time
+            try:
+                from stream_tap import shared_tap
+                from stream_clock import track_tap
+                tap = shared_tap()
+                output_index = command.index("-O")
+                command[output_index:output_index] = tap.args(command[0])
+                # Generated cues follow the PTS of the output instead of the wall clock
+                if self.stop_stream_clock:
+                    self.stop_stream_clock()
+                _, self.stop_stream_clock = track_tap(tap, int(scte35_config.get("pts_pid", service_config["vpid"])))
+            except OSError as e:
+                console_widget.append_error(f"[ERROR] Stream tap unavailable, analytics disabled: {e}")
+            
+            # SCTE-35 packets replace null packets in a stage process between
+            # the two halves of the pipeline, so the output bitrate and the
+            # PID's continuity counter are kept; cues are repeated and timed
+            # against the PTS PID like spliceinject does
+            self.splice_stage = None
+            if scte35_config.get("spliceinject_enabled", True):
+                from splice_packetizer import InjectionStage
+                self.splice_stage = InjectionStage(
+                    service_config["scte35_pid"], null_pid=service_config["null_pid"], inject_port=inject_port,
+                    pts_pid=int(scte35_config.get("pts_pid", service_config["vpid"])),
+                    inject_count=scte35_config.get("inject_count", DEFAULT_INJECT_COUNT),
+                    inject_interval=scte35_config.get("inject_interval", DEFAULT_INJECT_INTERVAL),
+                    start_delay=scte35_config.get("start_delay", DEFAULT_START_DELAY))
+                command = self.splice_stage.stage_command(command, split=stage_split)
+            
             # Get input and output configuration for display
             input_config = all_config["input"]
             output_config = all_config["output"]
@@ -3693,6 +3779,13 @@ class MainWindow(QMainWindow):
             console_widget.append_output(f"   Ad Duration: {scte35_config['ad_duration']} seconds")
             console_widget.append_output(f"   Event ID: {scte35_config['event_id']}")
             console_widget.append_output(f"   Pre-roll: {scte35_config['preroll_duration']} seconds")
+            if self.splice_stage:
+                console_widget.append_output(f"🎬 SCTE-35 into null PID {service_config['null_pid']} slots "
+                                             f"by the injection stage process")
+                if input_config["type"].lower() == "hls":
+                    # HLS segments carry no stuffing, there is no slot to fill
+                    console_widget.append_error("[WARNING] HLS input has no null packets: SCTE-35 packets are "
+                                                "added to the stream and the output is not CBR")
             console_widget.append_output(f"[INFO] Command: {' '.join(command)}")
             
             # Test connection before starting (for network outputs)
@@ -3703,7 +3796,17 @@ class MainWindow(QMainWindow):
                 else:
                     console_widget.append_error("[ERROR] Connection test failed - stream may not work")
             
-            self.processor = TSDuckProcessor(command)
+            # One control socket for the whole run, cues never restart tsp
+            if self.splice_dispatcher is None or self.splice_dispatcher.port != inject_port:
+                if self.splice_dispatcher:
+                    self.splice_dispatcher.close()
+                self.splice_dispatcher = SpliceDispatcher(port=inject_port)
+                self.splice_dispatcher.open()
+            console_widget.append_output(f"🎬 SCTE-35 cue injection: udp://{DEFAULT_INJECT_HOST}:{inject_port}")
+            
+            # The on-air pipeline is restarted with backoff if tsp fails
+            self.run_count += 1
+            self.processor = TSDuckProcessor(command, restart=True, name=f"ibe100-main-{self.run_count}")
             self.processor.output_received.connect(console_widget.append_output)
             self.processor.error_received.connect(console_widget.append_error)
             self.processor.finished.connect(self.processing_finished)
@@ -3715,12 +3818,16 @@ class MainWindow(QMainWindow):
             self.statusBar().showMessage("Processing...")
             
         except Exception as e:
+            self.start_btn.setEnabled(True)
             QMessageBox.critical(self, "Error", f"Failed to start processing: {str(e)}")
     
     def stop_processing(self):
         """Stop IBE-100 processing"""
         if self.processor:
             self.processor.stop()
+        if self.stop_stream_clock:
+            self.stop_stream_clock()
+            self.stop_stream_clock = None
     
     def test_connection(self, output_config):
         """Test connection to output destination"""
@@ -3829,6 +3936,9 @@ class MainWindow(QMainWindow):
     
     def processing_finished(self, exit_code: int):
         """Handle processing finished"""
+        if self.sender() is not None and self.sender() is not self.processor:
+            # A previous run finished after the next one was started
+            return
         self.start_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
         
@@ -3902,7 +4012,8 @@ class MainWindow(QMainWindow):
                         "pmt_enabled": True,
                         "pmt_params": "",
                         "spliceinject_enabled": True,
-                        "spliceinject_params": ""
+                        "spliceinject_params": "",
+                        "inject_port": DEFAULT_INJECT_PORT
                     }
                 
                 self.apply_configuration(config)
@@ -3994,6 +4105,8 @@ class MainWindow(QMainWindow):
                     self.config_widget.scte35_widget.spliceinject_enabled.setChecked(scte35_config.get("spliceinject_enabled", True))
                 if hasattr(self.config_widget.scte35_widget, 'spliceinject_params'):
                     self.config_widget.scte35_widget.spliceinject_params.setText(scte35_config.get("spliceinject_params", ""))
+                if hasattr(self.config_widget.scte35_widget, 'inject_port'):
+                    self.config_widget.scte35_widget.inject_port.setValue(scte35_config.get("inject_port", DEFAULT_INJECT_PORT))
         except Exception as e:
             print(f"Error applying configuration: {e}")
             # Don't crash the application, just log the error
@@ -4006,7 +4119,9 @@ def main():
         import os
         os.system('chcp 65001 >nul 2>&1')  # Set UTF-8 encoding
     
+    startup_timer.mark("other")
     app = QApplication(sys.argv)
+    startup_timer.mark("QApplication")
     app.setApplicationName("ITAssist Broadcast Encoder - 100 (IBE-100) v1.1.0")
     
     # Force dark theme on Windows
@@ -4238,9 +4353,12 @@ def main():
             }
         """)
     
+    startup_timer.mark("theme")
+    
     # Create and show main window
-    window = MainWindow()
-    window.show()
+    with startup_timer.phase("window setup and show"):
+        window = MainWindow()
+        window.show()
     
     # Load working configuration if available
     try:
@@ -4250,10 +4368,31 @@ def main():
         window.monitoring_widget.console_widget.append_output("[OK] Working configuration loaded automatically")
     except FileNotFoundError:
         window.monitoring_widget.console_widget.append_output("[INFO] Using default configuration")
+    startup_timer.mark("configuration")
+    
+    def report_startup():
+        startup_timer.mark("first paint")
+        print(startup_timer.report())
+        window.monitoring_widget.console_widget.append_output(
+            f"[INFO] Window ready in {startup_timer.total * 1000:.0f} ms")
+    window.first_painted.connect(report_startup)
     
-    # Run application
-    sys.exit(app.exec())
+    # Run application, then stop every supervised tsp child
+    exit_code = app.exec()
+    if window.monitoring_widget.performance_widget:
+        window.monitoring_widget.performance_widget.stop_performance_monitoring()
+    get_supervisor().stop_all()
+    from stream_tap import close_shared_taps
+    close_shared_taps()
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
+    # The frozen executable is also the spawn pool worker of file analysis
+    # and the SCTE-35 injection stage (RUN_STAGE_FLAG of splice_packetizer)
+    import multiprocessing
+    multiprocessing.freeze_support()
+    if sys.argv[1:2] == ["--run-stage"]:
+        from splice_packetizer import main as run_stage
+        sys.exit(run_stage(sys.argv[2:]))
     main()
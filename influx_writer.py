@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+InfluxDB Line Protocol Writer for IBE-100
+Batched, gzip-compressed writes with an on-disk spool for outages
+
+Points from every channel are buffered and flushed in one request when the
+batch is full or the flush interval expires. Requests reuse a keep-alive
+HTTP connection. While the database cannot be reached, batches are written
+to a bounded spool directory and replayed oldest first once it is back. The
+spool is on by default, one directory per database under ~/.ibe100; batches
+the database rejects as invalid are dropped and counted, never retried.
+"""
+
+import base64
+import gzip
+import http.client
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Union
+from urllib.parse import urlencode
+
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_SPOOL_BYTES = 256 * 1024 * 1024
+# spool_dir value selecting default_spool_dir(), None disables the spool
+DEFAULT_SPOOL = "default"
+DEFAULT_SPOOL_ROOT = Path.home() / ".ibe100" / "influx_spool"
+# Spooled batches replayed per flush, so a long backlog does not starve new data
+SPOOL_REPLAY_BATCHES = 10
+# Outcomes of one write request
+POST_OK = "ok"
+POST_REJECTED = "rejected"
+POST_FAILED = "failed"
+
+
+def default_spool_dir(host: str, port: int, database: str) -> Path:
+    """Spool directory of one database, so replays never cross databases"""
+    return DEFAULT_SPOOL_ROOT / f"{host}_{port}_{database}"
+
+
+def escape_tag(value: Any) -> str:
+    """Escape a measurement, tag key or tag value"""
+    return str(value).replace('\\', '\\\\').replace(',', '\\,').replace(' ', '\\ ').replace('=', '\\=')
+
+
+def format_point(measurement: str, fields: Dict[str, Any], tags: Optional[Dict[str, Any]] = None,
+                 timestamp_ns: Optional[int] = None) -> str:
+    """One line of InfluxDB line protocol"""
+    key = escape_tag(measurement)
+    if tags:
+        key += ''.join(f",{escape_tag(k)}={escape_tag(v)}" for k, v in sorted(tags.items()) if v != '')
+    values = []
+    for name, value in fields.items():
+        if isinstance(value, bool):
+            text = 'true' if value else 'false'
+        elif isinstance(value, int):
+            text = f"{value}i"
+        elif isinstance(value, float):
+            text = repr(value)
+        else:
+            text = '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+        values.append(f"{escape_tag(name)}={text}")
+    line = f"{key} {','.join(values)}"
+    return f"{line} {timestamp_ns}" if timestamp_ns is not None else line
+
+
+@dataclass
+class WriterStats:
+    """Counters of an InfluxLineWriter"""
+    points_written: int = 0
+    requests: int = 0
+    bytes_sent: int = 0
+    failures: int = 0
+    batches_spooled: int = 0
+    batches_replayed: int = 0
+    batches_rejected: int = 0
+    points_dropped: int = 0
+
+
+class InfluxLineWriter:
+    """Buffers line protocol points and writes them to InfluxDB in batches"""
+
+    def __init__(self, host: str = "localhost", port: int = 8086, database: str = "tsduck",
+                 username: str = None, password: str = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 spool_dir: Optional[str] = DEFAULT_SPOOL, max_spool_bytes: int = DEFAULT_SPOOL_BYTES,
+                 timeout: float = 5.0, compress_level: int = 5):
+        self.host = host
+        self.port = port
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.compress_level = compress_level
+        self.max_spool_bytes = max_spool_bytes
+        if spool_dir == DEFAULT_SPOOL:
+            spool_dir = default_spool_dir(host, port, database)
+        self.spool_dir = Path(spool_dir) if spool_dir else None
+        if self.spool_dir:
+            try:
+                self.spool_dir.mkdir(parents=True, exist_ok=True)
+            except OSError as e:
+                logging.error(f"InfluxDB spool {self.spool_dir} unavailable, batches are dropped in outages: {e}")
+                self.spool_dir = None
+
+        self.path = "/write?" + urlencode({'db': database, 'precision': 'ns'})
+        self.headers = {'Content-Type': 'text/plain; charset=utf-8', 'Content-Encoding': 'gzip'}
+        if username:
+            token = base64.b64encode(f"{username}:{password or ''}".encode()).decode()
+            self.headers['Authorization'] = f"Basic {token}"
+
+        self.stats = WriterStats()
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._connection: Optional[http.client.HTTPConnection] = None
+        self._spool_seq = 0
+
+    def start(self):
+        """Start the background flush thread"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._flush_loop, name="influx-writer", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Flush what is buffered and stop"""
+        self._running = False
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=self.timeout * 2)
+            self._thread = None
+        self.flush()
+        if self._connection:
+            self._connection.close()
+            self._connection = None
+
+    def write(self, lines: Union[str, List[str]]):
+        """Queue one or more lines, never blocks on the network"""
+        if isinstance(lines, str):
+            lines = [line for line in lines.split('\n') if line]
+        with self._lock:
+            self._buffer.extend(lines)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def write_point(self, measurement: str, fields: Dict[str, Any], tags: Optional[Dict[str, Any]] = None,
+                    timestamp_ns: Optional[int] = None):
+        self.write([format_point(measurement, fields, tags, timestamp_ns or time.time_ns())])
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    def _flush_loop(self):
+        while self._running:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"InfluxDB flush error: {e}")
+
+    def flush(self) -> bool:
+        """Send buffered points, then replay the spool, returns False if the database is down"""
+        with self._send_lock:
+            ok = True
+            while True:
+                with self._lock:
+                    batch = self._buffer[:self.batch_size]
+                    del self._buffer[:self.batch_size]
+                if not batch:
+                    break
+                payload = gzip.compress(('\n'.join(batch) + '\n').encode('utf-8'), self.compress_level)
+                # After one failure the rest of this flush goes straight to the spool
+                result = self._post(payload) if ok else POST_FAILED
+                if result == POST_OK:
+                    self.stats.points_written += len(batch)
+                elif result == POST_REJECTED:
+                    self._reject(len(batch))
+                else:
+                    ok = False
+                    self._spool(payload, len(batch))
+            if ok:
+                self._replay_spool()
+            return ok
+
+    def _post(self, payload: bytes) -> str:
+        """POST one gzip batch, returns POST_OK, POST_REJECTED (invalid, never retried) or POST_FAILED"""
+        for attempt in range(2):
+            try:
+                if self._connection is None:
+                    self._connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                self._connection.request('POST', self.path, body=payload, headers=self.headers)
+                response = self._connection.getresponse()
+                body = response.read()
+                self.stats.requests += 1
+                self.stats.bytes_sent += len(payload)
+                if response.status < 300:
+                    return POST_OK
+                if 400 <= response.status < 500 and response.status != 429:
+                    # Retrying a malformed batch can never succeed
+                    logging.error(f"InfluxDB rejected batch: {response.status} {body[:200]!r}")
+                    return POST_REJECTED
+                logging.error(f"InfluxDB write failed: {response.status}")
+                self.stats.failures += 1
+                return POST_FAILED
+            except (OSError, http.client.HTTPException) as e:
+                # A keep-alive connection closed by the server is retried once on a new one
+                if self._connection:
+                    self._connection.close()
+                    self._connection = None
+                if attempt:
+                    self.stats.failures += 1
+                    logging.error(f"InfluxDB unreachable: {e}")
+        return POST_FAILED
+
+    def _reject(self, points: int):
+        self.stats.batches_rejected += 1
+        self.stats.points_dropped += points
+
+    def _spool_files(self) -> List[Path]:
+        return sorted(self.spool_dir.glob("*.lp.gz")) if self.spool_dir else []
+
+    def _spool(self, payload: bytes, points: int):
+        """Keep a failed batch on disk, dropping the oldest beyond the size limit"""
+        if not self.spool_dir:
+            self.stats.points_dropped += points
+            return
+        self._spool_seq += 1
+        name = f"{time.time_ns():020d}-{self._spool_seq:06d}-{points}.lp.gz"
+        temp = self.spool_dir / (name + '.tmp')
+        temp.write_bytes(payload)
+        temp.rename(self.spool_dir / name)
+        self.stats.batches_spooled += 1
+
+        files = self._spool_files()
+        sizes = [f.stat().st_size for f in files]
+        total = sum(sizes)
+        for path, size in zip(files, sizes):
+            if total <= self.max_spool_bytes:
+                break
+            self.stats.points_dropped += self._spooled_points(path)
+            path.unlink(missing_ok=True)
+            total -= size
+
+    @staticmethod
+    def _spooled_points(path: Path) -> int:
+        try:
+            return int(path.name.split('-')[2].split('.')[0])
+        except (IndexError, ValueError):
+            return 0
+
+    def _replay_spool(self):
+        for path in self._spool_files()[:SPOOL_REPLAY_BATCHES]:
+            result = self._post(path.read_bytes())
+            if result == POST_FAILED:
+                return
+            if result == POST_OK:
+                self.stats.points_written += self._spooled_points(path)
+                self.stats.batches_replayed += 1
+            else:
+                self._reject(self._spooled_points(path))
+            path.unlink(missing_ok=True)
+
+    def spooled_batches(self) -> int:
+        return len(self._spool_files())
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**vars(self.stats), 'pending': self.pending(), 'spooled': self.spooled_batches()}
+
+
+# Example usage
+if __name__ == "__main__":
+    writer = InfluxLineWriter(spool_dir="influx_spool", flush_interval=0.5)
+    writer.start()
+    for i in range(10):
+        writer.write_point("stream_bitrate", {"value": 15000000 + i}, {"host": "tsduck", "channel": "demo"})
+    writer.close()
+    print(writer.get_stats())
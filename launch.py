@@ -7,7 +7,8 @@ Simple launcher script with dependency checking
 import sys
 import os
 import subprocess
-import importlib.util
+
+from startup import module_available
 
 def check_python_version():
     """Check if Python version is compatible"""
@@ -46,24 +47,11 @@ def check_dependencies():
     
     missing_packages = []
     
+    # find_spec only locates each package, nothing is imported here
     for package in required_packages:
-        try:
-            if package == 'PyQt6':
-                import PyQt6
-            elif package == 'numpy':
-                import numpy
-            elif package == 'matplotlib':
-                import matplotlib
-            elif package == 'psutil':
-                import psutil
-            elif package == 'requests':
-                import requests
-            elif package == 'pyqtgraph':
-                import pyqtgraph
-            elif package == 'qdarkstyle':
-                import qdarkstyle
+        if module_available(package):
             print(f"✓ {package}")
-        except ImportError:
+        else:
             print(f"✗ {package} (missing)")
             missing_packages.append(package)
     
@@ -76,13 +64,11 @@ def check_dependencies():
 
 def check_tsduck_python_bindings():
     """Check if TSDuck Python bindings are available"""
-    try:
-        import tsduck
+    if module_available('tsduck'):
         print("✓ TSDuck Python bindings available")
         return True
-    except ImportError:
-        print("⚠ TSDuck Python bindings not available (will use subprocess mode)")
-        return False
+    print("⚠ TSDuck Python bindings not available (will use subprocess mode)")
+    return False
 
 def install_dependencies():
     """Install missing dependencies"""
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Marker Library Index for IBE-100
+Persistent SQLite index of SCTE-35 marker files with incremental sync
+
+Every marker XML file (and its JSON sidecar) is parsed once and stored in
+an SQLite database next to the markers, keyed by file name and indexed by
+event id and creation time. A sync stats the directory and only parses
+files whose XML or sidecar was added or modified since they were indexed,
+and drops the rows of deleted files. Views page rows out of the index instead of
+reading the directory.
+"""
+
+import fnmatch
+import json
+import os
+import re
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+INDEX_FILENAME = ".marker_index.sqlite3"
+DEFAULT_PATTERN = "preroll_*.xml"
+SCHEMA_VERSION = 2
+
+# <type>_<event id>[_<unix time>].xml, as written by the marker generators
+MARKER_NAME = re.compile(r'^(?P<kind>[A-Za-z_]+?)_(?P<event_id>\d+)(?:_(?P<created>\d+))?\.xml$')
+XML_EVENT_ID = re.compile(rb'splice_event_id="(\d+)"')
+TYPE_NAMES = {'preroll': 'Pre-roll'}
+
+# Sort order of every listing, newest first
+ORDER_BY = "created DESC, name DESC"
+
+
+@dataclass
+class MarkerRecord:
+    """One marker file as stored in the index"""
+    name: str
+    event_id: int
+    marker_type: str
+    preroll_seconds: Optional[float] = None
+    ad_duration_seconds: Optional[float] = None
+    pts_time: Optional[int] = None
+    created: str = ""
+    description: str = ""
+
+    @classmethod
+    def from_row(cls, row: Tuple) -> 'MarkerRecord':
+        return cls(*row[:8])
+
+
+@dataclass
+class SyncResult:
+    """Names of the files that changed in one sync"""
+    added: List[str] = field(default_factory=list)
+    updated: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.updated or self.removed)
+
+
+def parse_marker(path: Path) -> Optional[MarkerRecord]:
+    """Record of a marker file from its JSON sidecar, or its name and XML"""
+    match = MARKER_NAME.match(path.name)
+    if not match:
+        return None
+    kind = match.group('kind')
+    record = MarkerRecord(path.name, int(match.group('event_id')),
+                          TYPE_NAMES.get(kind, kind.replace('_', '-').capitalize()))
+    if match.group('created'):
+        record.created = datetime.fromtimestamp(int(match.group('created'))).isoformat()
+
+    sidecar = path.with_suffix('.json')
+    try:
+        with open(sidecar, 'r') as f:
+            data = json.load(f)
+        info = data.get('scte35_marker', data)
+        record.event_id = int(info.get('event_id', record.event_id))
+        record.marker_type = info.get('type', record.marker_type)
+        record.preroll_seconds = info.get('preroll_seconds')
+        record.ad_duration_seconds = info.get('ad_duration_seconds')
+        record.pts_time = info.get('pts_time')
+        record.created = info.get('timestamp', record.created)
+        record.description = info.get('description', '')
+    except (OSError, ValueError, AttributeError):
+        # No usable sidecar, take the event id from the XML itself
+        try:
+            event_match = XML_EVENT_ID.search(path.read_bytes())
+            if event_match:
+                record.event_id = int(event_match.group(1))
+        except OSError:
+            return None
+    if not record.created:
+        record.created = datetime.fromtimestamp(path.stat().st_mtime).isoformat()
+    return record
+
+
+class MarkerIndex:
+    """SQLite index of the markers in one directory"""
+
+    COLUMNS = "name, event_id, marker_type, preroll_seconds, ad_duration_seconds, pts_time, created, description"
+
+    def __init__(self, directory, pattern: str = DEFAULT_PATTERN, db_path: Optional[str] = None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.pattern = pattern
+        self._matches = re.compile(fnmatch.translate(pattern)).match
+        self.db_path = db_path or str(self.directory / INDEX_FILENAME)
+        self.db = sqlite3.connect(self.db_path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.db.execute("DROP TABLE IF EXISTS markers")
+        self.db.executescript(f"""
+            CREATE TABLE IF NOT EXISTS markers (
+                name TEXT PRIMARY KEY,
+                event_id INTEGER NOT NULL,
+                marker_type TEXT NOT NULL,
+                preroll_seconds REAL,
+                ad_duration_seconds REAL,
+                pts_time INTEGER,
+                created TEXT NOT NULL,
+                description TEXT,
+                xml_mtime_ns INTEGER NOT NULL,
+                xml_size INTEGER NOT NULL,
+                json_mtime_ns INTEGER NOT NULL,
+                json_size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS markers_event ON markers (event_id);
+            CREATE INDEX IF NOT EXISTS markers_created ON markers (created, name);
+            PRAGMA user_version = {SCHEMA_VERSION};
+        """)
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def _stat(self, name: str) -> Optional[Tuple[int, int, int, int]]:
+        """Modification times and sizes of the XML file and its sidecar (0 if missing)"""
+        path = self.directory / name
+        try:
+            xml_stat = path.stat()
+        except OSError:
+            return None
+        try:
+            json_stat = path.with_suffix('.json').stat()
+            json_mtime, json_size = json_stat.st_mtime_ns, json_stat.st_size
+        except OSError:
+            json_mtime = json_size = 0
+        return xml_stat.st_mtime_ns, xml_stat.st_size, json_mtime, json_size
+
+    def _store(self, record: MarkerRecord, stats: Tuple[int, int, int, int]):
+        self.db.execute(
+            f"INSERT OR REPLACE INTO markers ({self.COLUMNS}, xml_mtime_ns, xml_size, json_mtime_ns, json_size) "
+            f"VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (record.name, record.event_id, record.marker_type, record.preroll_seconds,
+             record.ad_duration_seconds, record.pts_time, record.created, record.description) + stats)
+
+    def sync(self, check_modified: bool = True) -> SyncResult:
+        """Bring the index up to date with the directory, parsing only changed files
+
+        Without check_modified only added and removed files, and known
+        files whose sidecar appeared or disappeared, are detected, which
+        needs no stat call per unchanged file.
+        """
+        result = SyncResult()
+        known = {row[0]: row[1:] for row in self.db.execute(
+            "SELECT name, xml_mtime_ns, xml_size, json_mtime_ns, json_size FROM markers")}
+        listing = os.listdir(self.directory)
+        present = [name for name in listing if self._matches(name)]
+        sidecars = {name for name in listing if name.endswith('.json')}
+        for name in present:
+            previous = known.get(name)
+            if previous is not None and not check_modified:
+                has_sidecar = os.path.splitext(name)[0] + '.json' in sidecars
+                if has_sidecar == bool(previous[2]):
+                    continue
+            stats = self._stat(name)
+            if stats is None or stats == previous:
+                continue
+            record = parse_marker(self.directory / name)
+            if record is None:
+                continue
+            self._store(record, stats)
+            (result.added if previous is None else result.updated).append(name)
+        present = set(present)
+        result.removed = [name for name in known if name not in present]
+        self.db.executemany("DELETE FROM markers WHERE name = ?", [(name,) for name in result.removed])
+        self.db.commit()
+        return result
+
+    def add(self, xml_path) -> Optional[MarkerRecord]:
+        """Index one file written by this process, without scanning the directory"""
+        name = Path(xml_path).name
+        stats = self._stat(name)
+        record = parse_marker(self.directory / name) if stats else None
+        if record is not None:
+            self._store(record, stats)
+            self.db.commit()
+        return record
+
+    def remove(self, names: List[str]):
+        self.db.executemany("DELETE FROM markers WHERE name = ?", [(name,) for name in names])
+        self.db.commit()
+
+    def count(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM markers").fetchone()[0]
+
+    def names(self) -> List[str]:
+        """Every file name in display order"""
+        return [row[0] for row in self.db.execute(f"SELECT name FROM markers ORDER BY {ORDER_BY}")]
+
+    def page(self, offset: int, limit: int) -> List[MarkerRecord]:
+        """Records of one page in display order"""
+        rows = self.db.execute(f"SELECT {self.COLUMNS} FROM markers ORDER BY {ORDER_BY} LIMIT ? OFFSET ?",
+                               (limit, offset))
+        return [MarkerRecord.from_row(row) for row in rows]
+
+    def get_many(self, names: List[str]) -> Dict[str, MarkerRecord]:
+        records = {}
+        # Stay under SQLite's host parameter limit
+        for start in range(0, len(names), 500):
+            chunk = names[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            for row in self.db.execute(f"SELECT {self.COLUMNS} FROM markers WHERE name IN ({placeholders})", chunk):
+                records[row[0]] = MarkerRecord.from_row(row)
+        return records
+
+    def find(self, event_id: int) -> List[MarkerRecord]:
+        """Records of one event, newest first"""
+        rows = self.db.execute(f"SELECT {self.COLUMNS} FROM markers WHERE event_id = ? ORDER BY {ORDER_BY}",
+                               (event_id,))
+        return [MarkerRecord.from_row(row) for row in rows]
+
+    def between(self, start: str, end: str) -> List[MarkerRecord]:
+        """Records created in [start, end), ISO timestamps"""
+        rows = self.db.execute(f"SELECT {self.COLUMNS} FROM markers WHERE created >= ? AND created < ? "
+                               f"ORDER BY {ORDER_BY}", (start, end))
+        return [MarkerRecord.from_row(row) for row in rows]
+
+
+# Example usage
+if __name__ == "__main__":
+    import sys
+    import time
+
+    index = MarkerIndex(sys.argv[1] if len(sys.argv) > 1 else "scte35_final", pattern="*.xml")
+    start = time.perf_counter()
+    result = index.sync()
+    print(f"Sync: {len(result.added)} added, {len(result.updated)} updated, {len(result.removed)} removed "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+    start = time.perf_counter()
+    index.sync(check_modified=False)
+    print(f"Unchanged sync of {index.count()} markers: {(time.perf_counter() - start) * 1000:.1f} ms")
+    for record in index.page(0, 5):
+        print(f"  {record.event_id} {record.marker_type} {record.created[:19]} {record.name}")
+    index.close()
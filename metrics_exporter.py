@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Prometheus Metrics Exporter for IBE-100
+Serves per-channel and per-PID stream metrics on /metrics
+
+Sources push their values into a MetricsRegistry as they are produced:
+TSDuckMonitor samples, SCTE-35 events, cue dispatches and supervisor
+restarts. Every series keeps its rendered name and labels, so a scrape
+only joins one line per series and never walks any history.
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Any, Tuple
+
+from process_supervisor import EVENT_STARTED, EVENT_RESTARTING, EVENT_STOPPED, EVENT_FAILED
+
+
+DEFAULT_METRICS_PORT = 8080
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# name: (type, help)
+STANDARD_METRICS = {
+    'ibe100_channel_up': ('gauge', 'Whether the channel tsp process is running'),
+    'ibe100_channel_restarts_total': ('counter', 'Restarts of the channel tsp process'),
+    'ibe100_stream_bitrate_bps': ('gauge', 'Transport stream bitrate over the last interval'),
+    'ibe100_stream_packets_per_second': ('gauge', 'Transport stream packet rate over the last interval'),
+    'ibe100_stream_errors_total': ('counter', 'Transport errors and sync losses'),
+    'ibe100_stream_cc_errors_total': ('counter', 'Continuity counter errors'),
+    'ibe100_stream_pcr_accuracy_percent': ('gauge', 'PCR intervals within the 500 ns tolerance'),
+    'ibe100_stream_pcr_jitter_ns': ('gauge', 'Maximum PCR jitter of the reference PID'),
+    'ibe100_stream_services': ('gauge', 'Services announced in the PAT'),
+    'ibe100_stream_pids': ('gauge', 'PIDs seen in the stream'),
+    'ibe100_pid_bitrate_bps': ('gauge', 'Average bitrate of a PID'),
+    'ibe100_pid_packets_total': ('counter', 'Packets of a PID'),
+    'ibe100_pid_cc_errors_total': ('counter', 'Continuity counter errors of a PID'),
+    'ibe100_pid_pcr_jitter_ns': ('gauge', 'Maximum PCR jitter of a PID'),
+    'ibe100_scte35_events_total': ('counter', 'SCTE-35 commands seen in the stream'),
+    'ibe100_scte35_cues_sent_total': ('counter', 'SCTE-35 sections sent to spliceinject'),
+    'ibe100_system_cpu_percent': ('gauge', 'Host CPU usage'),
+    'ibe100_system_memory_percent': ('gauge', 'Host memory usage'),
+}
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Family:
+    """One metric name with its series"""
+
+    def __init__(self, name: str, metric_type: str, help_text: str):
+        self.name = name
+        self.type = metric_type
+        self.header = f"# HELP {name} {help_text}\n# TYPE {name} {metric_type}\n"
+        # labels key -> [rendered name with labels, value]
+        self.series: Dict[Tuple, List] = {}
+
+    def get(self, labels: Dict[str, Any]) -> List:
+        key = tuple(sorted(labels.items()))
+        series = self.series.get(key)
+        if series is None:
+            rendered = ','.join(f'{k}="{_escape(v)}"' for k, v in key)
+            series = [f"{self.name}{{{rendered}}}" if rendered else self.name, 0]
+            self.series[key] = series
+        return series
+
+
+class MetricsRegistry:
+    """Pre-aggregated gauges and counters rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._families: Dict[str, _Family] = {}
+        self._lock = threading.Lock()
+        for name, (metric_type, help_text) in STANDARD_METRICS.items():
+            self.describe(name, metric_type, help_text)
+
+    def describe(self, name: str, metric_type: str, help_text: str):
+        """Declare a metric, 'gauge' or 'counter'"""
+        with self._lock:
+            if name not in self._families:
+                self._families[name] = _Family(name, metric_type, help_text)
+
+    def _family(self, name: str) -> _Family:
+        family = self._families.get(name)
+        if family is None:
+            raise KeyError(f"Undeclared metric: {name}")
+        return family
+
+    def set(self, name: str, value: float, **labels):
+        """Set a gauge, or a counter from an already cumulative source"""
+        with self._lock:
+            self._family(name).get(labels)[1] = value
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        with self._lock:
+            self._family(name).get(labels)[1] += amount
+
+    def value(self, name: str, **labels) -> Optional[float]:
+        with self._lock:
+            series = self._family(name).series.get(tuple(sorted(labels.items())))
+            return series[1] if series else None
+
+    def remove(self, **labels):
+        """Drop every series carrying these labels, e.g. a removed channel"""
+        match = set(labels.items())
+        with self._lock:
+            for family in self._families.values():
+                for key in [key for key in family.series if match <= set(key)]:
+                    del family.series[key]
+
+    def series_count(self) -> int:
+        with self._lock:
+            return sum(len(family.series) for family in self._families.values())
+
+    def render(self) -> str:
+        """Exposition text, one line per series"""
+        parts = []
+        with self._lock:
+            for family in self._families.values():
+                if not family.series:
+                    continue
+                parts.append(family.header)
+                parts.append(''.join(f"{rendered} {_format_value(value)}\n"
+                                     for rendered, value in family.series.values()))
+        return ''.join(parts)
+
+    # Sources
+
+    def observe_stats(self, channel: str, stats, engine_stats: Optional[Dict[str, Any]] = None):
+        """Record a StreamStats sample, with per-PID values from TSPacketEngine.get_stats()"""
+        self.set('ibe100_stream_bitrate_bps', stats.bitrate, channel=channel)
+        self.set('ibe100_stream_packets_per_second', stats.packets_per_second, channel=channel)
+        self.inc('ibe100_stream_errors_total', stats.errors, channel=channel)
+        self.inc('ibe100_stream_cc_errors_total', stats.continuity_errors, channel=channel)
+        self.set('ibe100_stream_pcr_accuracy_percent', stats.pcr_accuracy, channel=channel)
+        self.set('ibe100_stream_services', stats.services_count, channel=channel)
+        self.set('ibe100_stream_pids', stats.pids_count, channel=channel)
+        self.set('ibe100_system_cpu_percent', stats.cpu_usage)
+        self.set('ibe100_system_memory_percent', stats.memory_usage)
+        if not engine_stats:
+            return
+        self.set('ibe100_stream_pcr_jitter_ns', engine_stats.get('pcr_jitter_ns', 0.0), channel=channel)
+        for pid, pid_stats in engine_stats.get('pids', {}).items():
+            labels = {'channel': channel, 'pid': f"0x{pid:04X}"}
+            self.set('ibe100_pid_bitrate_bps', pid_stats['bitrate'], **labels)
+            self.set('ibe100_pid_packets_total', pid_stats['packets'], **labels)
+            self.set('ibe100_pid_cc_errors_total', pid_stats['cc_errors'], **labels)
+            if pid_stats['pcr_count']:
+                self.set('ibe100_pid_pcr_jitter_ns', pid_stats['pcr_max_jitter_ns'], **labels)
+
+    def bind_monitor(self, channel: str, monitor):
+        """Export every sample of a TSDuckMonitor"""
+        monitor.metrics_collector.add_callback(
+            lambda stats: self.observe_stats(channel, stats, monitor.last_engine_stats))
+
+    def bind_splice_events(self, channel: str, ring):
+        """Count the events of a SpliceEventRing, returns the unsubscribe function"""
+        return ring.subscribe(lambda event: self.inc(
+            'ibe100_scte35_events_total', channel=channel,
+            command=event.command_type or event.event_type))
+
+    def bind_supervisor(self, supervisor):
+        """Track up state and restarts of every supervised pipeline"""
+        def listener(name: str, kind: str, payload: Any):
+            if kind == EVENT_STARTED:
+                self.set('ibe100_channel_up', 1, channel=name)
+            elif kind == EVENT_RESTARTING:
+                self.set('ibe100_channel_up', 0, channel=name)
+                self.inc('ibe100_channel_restarts_total', channel=name)
+            elif kind in (EVENT_STOPPED, EVENT_FAILED):
+                self.set('ibe100_channel_up', 0, channel=name)
+        supervisor.add_listener(listener)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """GET /metrics"""
+
+    registry: MetricsRegistry = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        data = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def serve_metrics(registry: MetricsRegistry, port: int = DEFAULT_METRICS_PORT,
+                  host: str = '0.0.0.0') -> ThreadingHTTPServer:
+    """Serve /metrics in a background thread"""
+    handler = type('BoundMetricsHandler', (MetricsHandler,), {'registry': registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    return server
+
+
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> MetricsRegistry:
+    """The process-wide registry"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry()
+        return _registry
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    registry = get_registry()
+    server = serve_metrics(registry, 0, '127.0.0.1')
+    registry.set('ibe100_channel_up', 1, channel='demo')
+    registry.inc('ibe100_scte35_cues_sent_total', 3, channel='demo')
+    print(f"Serving http://127.0.0.1:{server.server_address[1]}/metrics")
+    print(registry.render())
+    time.sleep(1)
+    server.shutdown()
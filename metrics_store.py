@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Columnar Metrics Store for IBE-100
+Preallocated NumPy ring buffers with multi-resolution rollups
+
+Every field is one row of a fixed 2D array, so an append writes a single
+column and no Python objects are kept per sample. Each ring stores its
+samples twice, at i and i + capacity, which makes every window of the
+latest N samples a contiguous zero-copy view. Samples are also averaged
+into 10 s and 1 min rollups; a week of 1 min history for a channel takes
+about 3 MB. Without NumPy the same layout is kept in array module buffers,
+with memoryview windows and pure Python aggregates.
+"""
+
+import bisect
+import math
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+# (resolution in seconds, capacity): 10 s for a day, 1 min for a week
+DEFAULT_ROLLUPS = ((10, 8640), (60, 10080))
+DEFAULT_RAW_CAPACITY = 3600
+
+# array module type codes of the dtypes the store uses
+TYPECODES = {'float64': 'd', 'float32': 'f'}
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Linearly interpolated percentile of sorted values, as np.percentile computes it"""
+    position = (len(values) - 1) * q / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class TimeSeriesRing:
+    """Fixed-capacity ring of timestamped samples, one array row per field"""
+
+    def __init__(self, fields: Sequence[str], capacity: int, dtype: str = 'float64'):
+        self.fields = list(fields)
+        self.index = {name: row for row, name in enumerate(self.fields)}
+        self.capacity = capacity
+        if NUMPY_AVAILABLE:
+            self.times = np.zeros(2 * capacity, dtype=np.float64)
+            self.data = np.zeros((len(self.fields), 2 * capacity), dtype=dtype)
+        else:
+            # One buffer per row, sliced through memoryviews instead of array views
+            self.times = array('d', bytes(16 * capacity))
+            typecode = TYPECODES[dtype]
+            self.data = [array(typecode, bytes(2 * capacity * array(typecode).itemsize)) for _ in self.fields]
+        self.total = 0
+
+    def append(self, timestamp: float, values: Sequence[float]):
+        """Add one sample, values in field order"""
+        slot = self.total % self.capacity
+        self.times[slot] = self.times[slot + self.capacity] = timestamp
+        if NUMPY_AVAILABLE:
+            self.data[:, slot] = self.data[:, slot + self.capacity] = values
+        else:
+            for row, value in zip(self.data, values):
+                row[slot] = row[slot + self.capacity] = value
+        self.total += 1
+
+    def __len__(self) -> int:
+        return min(self.total, self.capacity)
+
+    def _bounds(self, count: Optional[int]) -> Tuple[int, int]:
+        size = len(self)
+        count = size if count is None else max(0, min(count, size))
+        end = (self.total - 1) % self.capacity + 1 + self.capacity if self.total else 0
+        return end - count, end
+
+    def _count_since(self, since: float) -> int:
+        start, end = self._bounds(None)
+        if not NUMPY_AVAILABLE:
+            return end - bisect.bisect_left(self.times, since, start, end)
+        return end - int(np.searchsorted(self.times[start:end], since, side='left')) - start
+
+    def timestamps(self, count: Optional[int] = None, since: Optional[float] = None) -> 'np.ndarray':
+        if since is not None:
+            count = self._count_since(since)
+        start, end = self._bounds(count)
+        if not NUMPY_AVAILABLE:
+            return memoryview(self.times)[start:end]
+        return self.times[start:end]
+
+    def window(self, field: str, count: Optional[int] = None, since: Optional[float] = None) -> 'np.ndarray':
+        """Latest values of a field, oldest first, as a view into the ring"""
+        if since is not None:
+            count = self._count_since(since)
+        start, end = self._bounds(count)
+        if not NUMPY_AVAILABLE:
+            return memoryview(self.data[self.index[field]])[start:end]
+        return self.data[self.index[field], start:end]
+
+    def summary(self, field: str, count: Optional[int] = None, since: Optional[float] = None,
+                percentiles: Sequence[float] = (50, 95, 99)) -> Dict[str, float]:
+        """min, max, mean and percentiles of a window"""
+        values = self.window(field, count, since)
+        if not len(values):
+            return {'count': 0}
+        if not NUMPY_AVAILABLE:
+            values = sorted(values)
+            result = {'count': len(values), 'min': values[0], 'max': values[-1],
+                      'mean': math.fsum(values) / len(values)}
+            for q in percentiles:
+                result[f"p{q:g}"] = percentile(values, q)
+            return result
+        result = {
+            'count': len(values),
+            'min': float(values.min()),
+            'max': float(values.max()),
+            'mean': float(values.mean()),
+        }
+        for q, value in zip(percentiles, np.percentile(values, percentiles)):
+            result[f"p{q:g}"] = float(value)
+        return result
+
+    def last(self) -> Optional[Tuple[float, 'np.ndarray']]:
+        """Timestamp and values of the newest sample"""
+        if not self.total:
+            return None
+        slot = (self.total - 1) % self.capacity
+        if not NUMPY_AVAILABLE:
+            return self.times[slot], [row[slot] for row in self.data]
+        return float(self.times[slot]), self.data[:, slot]
+
+    def nbytes(self) -> int:
+        """Size of the buffers behind the ring"""
+        if NUMPY_AVAILABLE:
+            return self.data.nbytes + self.times.nbytes
+        return sum(len(row) * row.itemsize for row in [self.times] + self.data)
+
+    def clear(self):
+        self.total = 0
+
+
+class _Rollup:
+    """Averages samples into fixed time buckets with min and max"""
+
+    def __init__(self, fields: Sequence[str], resolution: float, capacity: int):
+        self.resolution = resolution
+        self.ring = TimeSeriesRing(
+            [f"{name}{suffix}" for suffix in ('', '_min', '_max') for name in fields],
+            capacity, 'float32')
+        self.bucket: Optional[int] = None
+        self.count = 0
+        if NUMPY_AVAILABLE:
+            self.sums = np.zeros(len(fields))
+            self.mins = np.zeros(len(fields))
+            self.maxs = np.zeros(len(fields))
+        else:
+            self.sums = [0.0] * len(fields)
+            self.mins = [0.0] * len(fields)
+            self.maxs = [0.0] * len(fields)
+
+    def add(self, timestamp: float, values: 'np.ndarray'):
+        bucket = int(timestamp // self.resolution)
+        if bucket != self.bucket:
+            self.close_bucket()
+            self.bucket = bucket
+            self.sums[:] = values
+            self.mins[:] = values
+            self.maxs[:] = values
+            self.count = 1
+            return
+        if NUMPY_AVAILABLE:
+            self.sums += values
+            np.minimum(self.mins, values, out=self.mins)
+            np.maximum(self.maxs, values, out=self.maxs)
+        else:
+            self.sums = [total + value for total, value in zip(self.sums, values)]
+            self.mins = [min(low, value) for low, value in zip(self.mins, values)]
+            self.maxs = [max(high, value) for high, value in zip(self.maxs, values)]
+        self.count += 1
+
+    def close_bucket(self):
+        if self.count:
+            if NUMPY_AVAILABLE:
+                row = np.concatenate((self.sums / self.count, self.mins, self.maxs))
+            else:
+                row = [total / self.count for total in self.sums] + self.mins + self.maxs
+            self.ring.append(self.bucket * self.resolution, row)
+            self.count = 0
+
+
+class MetricsStore:
+    """Raw samples plus rollups at coarser resolutions"""
+
+    def __init__(self, fields: Sequence[str], raw_capacity: int = DEFAULT_RAW_CAPACITY,
+                 rollups: Sequence[Tuple[float, int]] = DEFAULT_ROLLUPS):
+        self.fields = list(fields)
+        self.raw = TimeSeriesRing(self.fields, raw_capacity)
+        self.rollups: Dict[float, _Rollup] = {
+            resolution: _Rollup(self.fields, resolution, capacity) for resolution, capacity in rollups
+        }
+
+    def append(self, timestamp: float, values: Sequence[float]):
+        values = np.asarray(values, dtype=np.float64) if NUMPY_AVAILABLE else [float(v) for v in values]
+        self.raw.append(timestamp, values)
+        for rollup in self.rollups.values():
+            rollup.add(timestamp, values)
+
+    def series(self, resolution: Optional[float] = None) -> TimeSeriesRing:
+        """The raw ring, or the ring of a rollup resolution; the open bucket is not included"""
+        if resolution is None:
+            return self.raw
+        return self.rollups[resolution].ring
+
+    def resolution_for(self, seconds: float) -> Optional[float]:
+        """Finest resolution whose ring still covers the last seconds"""
+        if self.raw.capacity >= seconds:
+            return None
+        for resolution, rollup in sorted(self.rollups.items()):
+            if rollup.ring.capacity * resolution >= seconds:
+                return resolution
+        return max(self.rollups) if self.rollups else None
+
+    def window(self, field: str, seconds: float, now: float, resolution: Optional[float] = None) -> 'np.ndarray':
+        """Values of a field over the last seconds"""
+        return self.series(resolution).window(field, since=now - seconds)
+
+    def memory_bytes(self) -> int:
+        rings = [self.raw] + [rollup.ring for rollup in self.rollups.values()]
+        return sum(ring.nbytes() for ring in rings)
+
+    def clear(self):
+        self.raw.clear()
+        for rollup in self.rollups.values():
+            rollup.ring.clear()
+            rollup.count = 0
+            rollup.bucket = None
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    store = MetricsStore(['bitrate', 'cc_errors'])
+    start = time.time()
+    for second in range(7 * 24 * 3600 // 10):
+        store.append(start + second * 10, (15e6 + (second % 7) * 1e5, second % 3 == 0))
+    print(f"Appended a week of 10 s samples in {time.time() - start:.2f}s")
+    print(f"Memory: {store.memory_bytes() / 1e6:.1f} MB")
+    print(f"Last hour bitrate: {store.raw.summary('bitrate', count=360)}")
+    print(f"Week of 1 min rollups: {len(store.series(60))} buckets")
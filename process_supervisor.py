@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Process Supervisor for IBE-100
+One asyncio event loop owning every tsp child process
+
+All pipes are read with non-blocking asyncio stream readers in a single
+supervisor thread instead of two reader threads plus a polling thread per
+process. Failed pipelines are restarted with exponential backoff. Results
+reach Qt through SupervisorBridge, which forwards every event with one
+queued signal. Binary stdout handlers run on a worker thread of their
+pipeline, so packet analysis never stalls the loop reading the other pipes.
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Any, Callable
+
+try:
+    from PyQt6.QtCore import QObject, Qt, pyqtSignal
+    PYQT_AVAILABLE = True
+except ImportError:
+    PYQT_AVAILABLE = False
+
+
+# Event kinds passed to listeners as (name, kind, payload)
+EVENT_STARTED = 'started'        # payload: pid
+EVENT_STDOUT = 'stdout'          # payload: line without newline
+EVENT_STDERR = 'stderr'          # payload: line without newline
+EVENT_EXITED = 'exited'          # payload: return code
+EVENT_RESTARTING = 'restarting'  # payload: delay in seconds
+EVENT_STOPPED = 'stopped'        # payload: return code, the pipeline is done
+EVENT_FAILED = 'failed'          # payload: return code, gave up restarting
+EVENT_ERROR = 'error'            # payload: message
+
+STOP_GRACE_SECONDS = 5.0
+STREAM_LIMIT = 1024 * 1024
+
+Listener = Callable[[str, str, Any], None]
+
+
+@dataclass
+class PipelineSpec:
+    """A supervised command and its restart policy"""
+    name: str
+    command: List[str]
+    restart: bool = True
+    max_restarts: Optional[int] = None
+    backoff_initial: float = 1.0
+    backoff_factor: float = 2.0
+    backoff_max: float = 30.0
+    # A run lasting this long resets the backoff delay
+    stable_after: float = 10.0
+    # 'lines', 'binary' (chunks to stdout_handler) or 'discard'
+    stdout_mode: str = 'lines'
+    stderr_mode: str = 'lines'
+    stdout_handler: Optional[Callable[[bytes], None]] = None
+    chunk_size: int = 65536
+
+
+@dataclass
+class PipelineState:
+    """Runtime state of a supervised pipeline"""
+    name: str
+    state: str = 'starting'
+    pid: Optional[int] = None
+    restarts: int = 0
+    last_exit_code: Optional[int] = None
+    started_at: float = 0.0
+    listener: Optional[Listener] = None
+    process: Any = None
+    stop_event: Any = None
+    task: Any = None
+
+
+class ProcessSupervisor:
+    """Runs and restarts child processes on one asyncio loop thread"""
+
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.pipelines: Dict[str, PipelineState] = {}
+        self._listeners: List[Listener] = []
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the supervisor thread, safe to call more than once"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run_loop, name="tsp-supervisor", daemon=True)
+            self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._install_child_watcher()
+        self._ready.set()
+        self.loop.run_forever()
+
+    def _install_child_watcher(self):
+        """Wait for children on pidfds instead of one waitpid thread each"""
+        if sys.version_info >= (3, 12) or not hasattr(asyncio, 'PidfdChildWatcher'):
+            return
+        try:
+            os.close(os.pidfd_open(os.getpid()))
+            watcher = asyncio.PidfdChildWatcher()
+            watcher.attach_loop(self.loop)
+            asyncio.set_child_watcher(watcher)
+        except (AttributeError, OSError, NotImplementedError):
+            pass
+
+    def add_listener(self, listener: Listener):
+        """Receive the events of all pipelines, called on the supervisor thread"""
+        self._listeners.append(listener)
+
+    def post(self, name: str, kind: str, payload: Any = None):
+        """Deliver an event to the pipeline listener and global listeners"""
+        state = self.pipelines.get(name)
+        listeners = ([state.listener] if state and state.listener else []) + self._listeners
+        for listener in listeners:
+            try:
+                listener(name, kind, payload)
+            except Exception as e:
+                print(f"[ERROR] Supervisor listener error: {e}")
+
+    def start_pipeline(self, spec: PipelineSpec, listener: Optional[Listener] = None):
+        """Start a pipeline, its name must not be running already"""
+        self.start()
+        if spec.name in self.pipelines and self.pipelines[spec.name].state not in ('stopped', 'failed'):
+            raise RuntimeError(f"Pipeline {spec.name} is already running")
+        state = PipelineState(name=spec.name, listener=listener)
+        self.pipelines[spec.name] = state
+
+        def create_task():
+            state.stop_event = asyncio.Event()
+            state.task = self.loop.create_task(self._supervise(spec, state))
+        self.loop.call_soon_threadsafe(create_task)
+        return state
+
+    def stop_pipeline(self, name: str, wait: bool = False, timeout: float = STOP_GRACE_SECONDS + 1):
+        """Stop a pipeline and cancel pending restarts"""
+        if not self.loop or name not in self.pipelines:
+            return
+        future = asyncio.run_coroutine_threadsafe(self._stop(name), self.loop)
+        if wait:
+            try:
+                future.result(timeout)
+            except Exception:
+                pass
+
+    def stop_all(self, wait: bool = True):
+        for name in list(self.pipelines):
+            self.stop_pipeline(name, wait=wait)
+
+    def forget(self, name: str):
+        """Drop the state of a finished pipeline"""
+        if not self.is_running(name):
+            self.pipelines.pop(name, None)
+
+    def is_running(self, name: str) -> bool:
+        state = self.pipelines.get(name)
+        return bool(state) and state.state not in ('stopped', 'failed')
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        """State, pid and restart count of every pipeline"""
+        return {
+            name: {'state': s.state, 'pid': s.pid, 'restarts': s.restarts,
+                   'last_exit_code': s.last_exit_code,
+                   'uptime': time.monotonic() - s.started_at if s.state == 'running' else 0.0}
+            for name, s in self.pipelines.items()
+        }
+
+    async def _stop(self, name: str):
+        state = self.pipelines.get(name)
+        if not state:
+            return
+        # The task may not have been created yet when stop follows start immediately
+        while state.stop_event is None:
+            await asyncio.sleep(0)
+        state.stop_event.set()
+        process = state.process
+        if process and process.returncode is None:
+            try:
+                process.terminate()
+                await asyncio.wait_for(process.wait(), STOP_GRACE_SECONDS)
+            except ProcessLookupError:
+                pass
+            except asyncio.TimeoutError:
+                process.kill()
+        if state.task:
+            await asyncio.gather(state.task, return_exceptions=True)
+
+    async def _supervise(self, spec: PipelineSpec, state: PipelineState):
+        delay = spec.backoff_initial
+        while True:
+            state.state = 'starting'
+            started = time.monotonic()
+            return_code = await self._run_once(spec, state)
+            state.last_exit_code = return_code
+            state.process = None
+            state.pid = None
+
+            if state.stop_event.is_set() or return_code == 0 or not spec.restart:
+                state.state = 'stopped' if state.stop_event.is_set() or return_code == 0 else 'failed'
+                self.post(spec.name, EVENT_STOPPED if state.state == 'stopped' else EVENT_FAILED, return_code)
+                return
+            if spec.max_restarts is not None and state.restarts >= spec.max_restarts:
+                state.state = 'failed'
+                self.post(spec.name, EVENT_FAILED, return_code)
+                return
+
+            if time.monotonic() - started >= spec.stable_after:
+                delay = spec.backoff_initial
+            state.state = 'backoff'
+            state.restarts += 1
+            self.post(spec.name, EVENT_RESTARTING, delay)
+            try:
+                await asyncio.wait_for(state.stop_event.wait(), delay)
+                state.state = 'stopped'
+                self.post(spec.name, EVENT_STOPPED, return_code)
+                return
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * spec.backoff_factor, spec.backoff_max)
+
+    async def _run_once(self, spec: PipelineSpec, state: PipelineState) -> int:
+        pipe = lambda mode: subprocess.DEVNULL if mode == 'discard' else subprocess.PIPE
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *spec.command, stdin=subprocess.DEVNULL,
+                stdout=pipe(spec.stdout_mode), stderr=pipe(spec.stderr_mode), limit=STREAM_LIMIT)
+        except OSError as e:
+            self.post(spec.name, EVENT_ERROR, f"Failed to start {spec.command[0]}: {e}")
+            return 127
+
+        state.process = process
+        state.pid = process.pid
+        if state.stop_event.is_set():
+            # Stopped while the process was being created
+            process.terminate()
+        state.state = 'running'
+        state.started_at = time.monotonic()
+        self.post(spec.name, EVENT_STARTED, process.pid)
+
+        readers = []
+        if spec.stdout_mode == 'binary':
+            readers.append(self._read_chunks(spec, process.stdout))
+        elif spec.stdout_mode == 'lines':
+            readers.append(self._read_lines(spec.name, EVENT_STDOUT, process.stdout))
+        if spec.stderr_mode == 'lines':
+            readers.append(self._read_lines(spec.name, EVENT_STDERR, process.stderr))
+
+        await asyncio.gather(*readers, return_exceptions=True)
+        return_code = await process.wait()
+        self.post(spec.name, EVENT_EXITED, return_code)
+        return return_code
+
+    async def _read_lines(self, name: str, kind: str, stream: asyncio.StreamReader):
+        while True:
+            try:
+                line = await stream.readline()
+            except ValueError:
+                # Line longer than STREAM_LIMIT, skip what is buffered
+                continue
+            if not line:
+                return
+            line = line.decode('utf-8', errors='replace').strip()
+            if line:
+                self.post(name, kind, line)
+
+    async def _read_chunks(self, spec: PipelineSpec, stream: asyncio.StreamReader):
+        # One chunk is handled on the worker while the next one is read, in order
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{spec.name}-output")
+        pending = None
+        handler_failed = False
+        try:
+            while True:
+                data = await stream.read(spec.chunk_size)
+                if pending is not None:
+                    handler_failed = not await self._handled(spec, pending)
+                    pending = None
+                if not data:
+                    return
+                if spec.stdout_handler and not handler_failed:
+                    pending = self.loop.run_in_executor(executor, spec.stdout_handler, data)
+        finally:
+            if pending is not None:
+                await self._handled(spec, pending)
+            executor.shutdown(wait=False)
+
+    async def _handled(self, spec: PipelineSpec, future) -> bool:
+        """Wait for a handler call, False once it raised"""
+        try:
+            await future
+            return True
+        except Exception as e:
+            # Keep draining the pipe so the child never blocks
+            self.post(spec.name, EVENT_ERROR, f"Output handler error: {e}")
+            return False
+
+
+_supervisor: Optional[ProcessSupervisor] = None
+_supervisor_lock = threading.Lock()
+
+
+def get_supervisor() -> ProcessSupervisor:
+    """The process-wide supervisor, started on first use"""
+    global _supervisor
+    with _supervisor_lock:
+        if _supervisor is None:
+            _supervisor = ProcessSupervisor()
+    _supervisor.start()
+    return _supervisor
+
+
+if PYQT_AVAILABLE:
+    class SupervisorBridge(QObject):
+        """Delivers supervisor events on the Qt thread through one queued signal"""
+
+        event = pyqtSignal(str, str, object)
+
+        def __init__(self, supervisor: ProcessSupervisor):
+            super().__init__()
+            self._handlers: Dict[str, Callable[[str, Any], None]] = {}
+            self.event.connect(self._dispatch, Qt.ConnectionType.QueuedConnection)
+            supervisor.add_listener(self.event.emit)
+
+        def register(self, name: str, handler: Callable[[str, Any], None]):
+            """Route events of one pipeline to handler(kind, payload)"""
+            self._handlers[name] = handler
+
+        def unregister(self, name: str):
+            self._handlers.pop(name, None)
+
+        def _dispatch(self, name: str, kind: str, payload: Any):
+            handler = self._handlers.get(name)
+            if handler:
+                handler(kind, payload)
+
+    _bridge: Optional['SupervisorBridge'] = None
+
+    def get_bridge() -> 'SupervisorBridge':
+        """The Qt bridge of the process-wide supervisor, create it on the GUI thread"""
+        global _bridge
+        if _bridge is None:
+            _bridge = SupervisorBridge(get_supervisor())
+        return _bridge
+
+
+# Example usage
+if __name__ == "__main__":
+    supervisor = get_supervisor()
+    done = threading.Event()
+
+    def listener(name, kind, payload):
+        print(f"[{name}] {kind}: {payload}")
+        if kind in (EVENT_STOPPED, EVENT_FAILED):
+            done.set()
+
+    supervisor.start_pipeline(PipelineSpec("demo", [sys.executable, "-c", "import sys; print('hello'); sys.exit(1)"],
+                                           max_restarts=2, backoff_initial=0.2), listener)
+    done.wait(10)
+    print(supervisor.get_status())
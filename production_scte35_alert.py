@@ -11,18 +11,19 @@ import os
 from datetime import datetime
 import threefive
 import threading
-import queue
+
+from splice_events import SpliceEvent, SpliceEventDecoder, SpliceEventRing, pump_events, spawn_monitor, DEFAULT_RING_CAPACITY
 
 class ProductionSCTE35Alert:
     """Production-ready SCTE-35 alert system"""
     
-    def __init__(self, config_file='distributor_config.json'):
+    def __init__(self, config_file='distributor_config.json', capacity: int = DEFAULT_RING_CAPACITY):
         self.config_file = config_file
         self.config = self.load_config()
-        self.markers_detected = []
+        self.markers_detected = SpliceEventRing(capacity)
+        self.markers_detected.subscribe(self._notify_callbacks)
         self.alert_callbacks = []
         self.monitoring_active = False
-        self.alert_queue = queue.Queue()
         self.monitor_thread = None
         
     def load_config(self):
@@ -50,15 +51,15 @@ class ProductionSCTE35Alert:
         """Add a callback function for SCTE-35 alerts"""
         self.alert_callbacks.append(callback)
     
-    def trigger_alert(self, marker_info):
+    def trigger_alert(self, event: SpliceEvent):
         """Trigger alert for detected SCTE-35 marker"""
-        self.markers_detected.append(marker_info)
-        self.alert_queue.put(marker_info)
-        
-        # Call all registered callbacks
+        self.markers_detected.append(event)
+    
+    def _notify_callbacks(self, event: SpliceEvent):
+        """Call all registered callbacks"""
         for callback in self.alert_callbacks:
             try:
-                callback(marker_info)
+                callback(event)
             except Exception as e:
                 print(f"⚠️  Alert callback error: {e}")
     
@@ -91,43 +92,29 @@ class ProductionSCTE35Alert:
         self.monitoring_active = True
         
         try:
-            process = subprocess.Popen(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
+            process = spawn_monitor(command)
             
-            start_time = time.time()
+            # Events are decoded as they arrive, this thread only watches the clock
+            self.monitor_thread = threading.Thread(
+                target=pump_events,
+                args=(process.stdout, self.markers_detected, SpliceEventDecoder(input_source)),
+                kwargs={'should_stop': lambda: not self.monitoring_active},
+                daemon=True
+            )
+            self.monitor_thread.start()
             
+            deadline = time.time() + duration if duration else None
             while self.monitoring_active:
-                if process.poll() is not None:
-                    print("⚠️  Monitoring process terminated")
-                    break
-                
-                if duration and (time.time() - start_time) > duration:
+                timeout = 0.5 if deadline is None else min(0.5, deadline - time.time())
+                if timeout <= 0:
                     print(f"⏱️  Monitoring duration ({duration}s) reached")
                     break
-                
                 try:
-                    line = process.stdout.readline()
-                    if line:
-                        line = line.strip()
-                        if line and self._is_scte35_output(line):
-                            timestamp = datetime.now().strftime("%H:%M:%S")
-                            marker_info = {
-                                'timestamp': timestamp,
-                                'source': input_source,
-                                'data': line,
-                                'type': 'SCTE-35 Marker Detected'
-                            }
-                            
-                            self.trigger_alert(marker_info)
-                            
-                except Exception as e:
-                    print(f"⚠️  Read error: {e}")
-                
-                time.sleep(0.1)
+                    process.wait(timeout=timeout)
+                    print("⚠️  Monitoring process terminated")
+                    break
+                except subprocess.TimeoutExpired:
+                    pass
             
             # Stop process
             process.terminate()
@@ -148,11 +135,6 @@ class ProductionSCTE35Alert:
         print("🛑 Stopping SCTE-35 monitoring...")
         self.monitoring_active = False
     
-    def _is_scte35_output(self, line):
-        """Check if line contains SCTE-35 output"""
-        scte35_keywords = ['splice', 'scte', 'cue', 'break', 'insert', 'time_signal']
-        return any(keyword in line.lower() for keyword in scte35_keywords)
-    
     def verify_threefive_markers(self):
         """Verify threefive-generated SCTE-35 markers"""
         
@@ -204,13 +186,12 @@ class ProductionSCTE35Alert:
     
     def get_alert_summary(self):
         """Get summary of all alerts"""
-        if not self.markers_detected:
+        if not self.markers_detected.total:
             return "No SCTE-35 alerts triggered"
         
-        summary = f"📊 SCTE-35 Alert Summary ({len(self.markers_detected)} alerts):\n"
-        for i, marker in enumerate(self.markers_detected, 1):
-            summary += f"  {i}. [{marker['timestamp']}] {marker['type']}\n"
-            summary += f"      Data: {marker['data'][:50]}...\n"
+        summary = f"📊 SCTE-35 Alert Summary ({self.markers_detected.total} alerts):\n"
+        for i, event in enumerate(self.markers_detected, self.markers_detected.dropped + 1):
+            summary += f"  {i}. [{event.timestamp}] {event.description}\n"
         
         return summary
     
@@ -218,18 +199,17 @@ class ProductionSCTE35Alert:
         """Save all alerts to a JSON file"""
         try:
             with open(filename, 'w') as f:
-                json.dump(self.markers_detected, f, indent=2)
+                json.dump([event.to_dict() for event in self.markers_detected], f, indent=2)
             print(f"💾 Alerts saved to {filename}")
         except Exception as e:
             print(f"❌ Error saving alerts: {e}")
 
-def production_alert_callback(marker_info):
+def production_alert_callback(event):
     """Production alert callback function"""
     print(f"🚨 PRODUCTION ALERT: SCTE-35 Marker Detected!")
-    print(f"   Time: {marker_info['timestamp']}")
-    print(f"   Source: {marker_info['source']}")
-    print(f"   Type: {marker_info['type']}")
-    print(f"   Data: {marker_info['data'][:100]}...")
+    print(f"   Time: {event.timestamp}")
+    print(f"   Source: {event.source}")
+    print(f"   Type: {event.description}")
     print()
     
     # Here you could add:
@@ -268,7 +248,7 @@ def main():
     print("=" * 70)
     print(f"Threefive markers verified: {'✅ Valid' if threefive_result else '❌ Failed'}")
     print(f"Stream monitoring: {'✅ Active' if monitoring_result else '❌ Failed'}")
-    print(f"Total alerts triggered: {len(alert_system.markers_detected)}")
+    print(f"Total alerts triggered: {alert_system.markers_detected.total}")
     
     # Show alert summary
     print(f"\n{alert_system.get_alert_summary()}")
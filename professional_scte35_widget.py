@@ -14,24 +14,152 @@ from typing import Dict, List, Optional, Tuple
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QGroupBox, QLabel, 
     QLineEdit, QPushButton, QComboBox, QSpinBox, QCheckBox, QTextEdit,
-    QTabWidget, QTableWidget, QTableWidgetItem, QHeaderView, QFileDialog,
+    QTabWidget, QTableView, QAbstractItemView, QHeaderView, QFileDialog,
     QMessageBox, QSplitter, QFrame, QScrollArea, QProgressBar
 )
-from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+from PyQt6.QtCore import (
+    Qt, QTimer, pyqtSignal, QAbstractTableModel, QModelIndex, QFileSystemWatcher
+)
 from PyQt6.QtGui import QFont, QPalette, QColor
 
+from marker_index import MarkerIndex, MarkerRecord, SyncResult
+from scte35_encoder import default_cue_cache, to_base64
+from stream_clock import stream_pts
+
+
+class MarkerTableModel(QAbstractTableModel):
+    """Marker library rows, read from the marker index a page at a time"""
+    
+    HEADERS = ["Event ID", "Type", "Pre-roll", "Duration", "Created"]
+    PAGE_SIZE = 256
+    CACHE_LIMIT = 4096
+    
+    def __init__(self, marker_index: MarkerIndex):
+        super().__init__()
+        self.marker_index = marker_index
+        self.names: List[str] = marker_index.names()
+        self._cache: Dict[str, MarkerRecord] = {}
+        
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.names)
+        
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+        
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+        
+    def record(self, row: int) -> Optional[MarkerRecord]:
+        """Record of a row, loading the page around it on a cache miss"""
+        if not 0 <= row < len(self.names):
+            return None
+        name = self.names[row]
+        record = self._cache.get(name)
+        if record is None:
+            if len(self._cache) >= self.CACHE_LIMIT:
+                self._cache.clear()
+            start = row - row % self.PAGE_SIZE
+            self._cache.update(self.marker_index.get_many(self.names[start:start + self.PAGE_SIZE]))
+            record = self._cache.get(name)
+        return record
+        
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            record = self.record(index.row())
+            if record is None:
+                return None
+            column = index.column()
+            if column == 0:
+                return str(record.event_id)
+            if column == 1:
+                return record.marker_type
+            if column == 2:
+                return f"{record.preroll_seconds:g}s" if record.preroll_seconds is not None else ""
+            if column == 3:
+                return f"{record.ad_duration_seconds:g}s" if record.ad_duration_seconds is not None else ""
+            return record.created[:19]
+        if role == Qt.ItemDataRole.ToolTipRole:
+            record = self.record(index.row())
+            return f"{record.name}\n{record.description}" if record else None
+        return None
+        
+    def apply(self, result: SyncResult):
+        """Apply an index change as row removals and insertions, keeping the view position"""
+        if not result.changed:
+            return
+        for name in result.updated + result.removed:
+            self._cache.pop(name, None)
+        new_names = self.marker_index.names()
+        
+        # Remove rows of deleted files, one contiguous run at a time from the bottom
+        keep = set(new_names)
+        row = len(self.names) - 1
+        while row >= 0:
+            if self.names[row] in keep:
+                row -= 1
+                continue
+            end = row
+            while row >= 0 and self.names[row] not in keep:
+                row -= 1
+            self.beginRemoveRows(QModelIndex(), row + 1, end)
+            del self.names[row + 1:end + 1]
+            self.endRemoveRows()
+        
+        # Insert new files at their sorted position, consecutive ones as one run
+        present = set(self.names)
+        row = 0
+        while row < len(new_names):
+            if new_names[row] in present:
+                row += 1
+                continue
+            start = row
+            while row < len(new_names) and new_names[row] not in present:
+                row += 1
+            self.beginInsertRows(QModelIndex(), start, row - 1)
+            self.names[start:start] = new_names[start:row]
+            self.endInsertRows()
+        
+        if self.names != new_names:
+            # An updated file moved in the sort order
+            self.beginResetModel()
+            self.names = new_names
+            self._cache.clear()
+            self.endResetModel()
+        elif result.updated:
+            positions = {name: row for row, name in enumerate(self.names)}
+            for name in result.updated:
+                row = positions.get(name)
+                if row is not None:
+                    self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+
+
 class ProfessionalSCTE35Widget(QWidget):
     """Professional SCTE-35 marker management interface"""
     
     marker_generated = pyqtSignal(str, str)  # xml_file, json_file
+    cue_encoded = pyqtSignal(int, bytes)  # event_id, splice_info_section
     
     def __init__(self):
         super().__init__()
         self.scte35_dir = Path("scte35_final")
         self.scte35_dir.mkdir(exist_ok=True)
         self.current_event_id = 10023
+        self.marker_index = MarkerIndex(self.scte35_dir)
+        self.marker_index.sync()
+        self.marker_model = MarkerTableModel(self.marker_index)
         self.setup_ui()
-        self.load_existing_markers()
+        
+        # Files written by other tools are picked up from directory change notifications
+        self.sync_timer = QTimer()
+        self.sync_timer.setSingleShot(True)
+        self.sync_timer.setInterval(300)
+        self.sync_timer.timeout.connect(lambda: self.sync_markers(check_modified=False))
+        self.marker_watcher = QFileSystemWatcher([str(self.scte35_dir)])
+        self.marker_watcher.directoryChanged.connect(lambda path: self.sync_timer.start())
         
     def setup_ui(self):
         """Setup the professional SCTE-35 interface"""
@@ -232,6 +360,11 @@ class ProfessionalSCTE35Widget(QWidget):
         self.generate_btn.clicked.connect(self.generate_quick_preroll)
         preroll_layout.addWidget(self.generate_btn, 3, 0, 1, 2)
         
+        # Cues are encoded in memory, files are only written on request
+        self.save_to_library = QCheckBox("Also save XML/JSON to marker library")
+        self.save_to_library.setChecked(False)
+        preroll_layout.addWidget(self.save_to_library, 4, 0, 1, 2)
+        
         preroll_group.setLayout(preroll_layout)
         layout.addWidget(preroll_group)
         
@@ -490,16 +623,19 @@ class ProfessionalSCTE35Widget(QWidget):
         
         library_layout = QVBoxLayout()
         
-        # Table for existing markers
-        self.marker_table = QTableWidget()
-        self.marker_table.setColumnCount(6)
-        self.marker_table.setHorizontalHeaderLabels([
-            "Event ID", "Type", "Pre-roll", "Duration", "Created", "Actions"
-        ])
+        # Table for existing markers, rows are read from the index as they scroll into view
+        self.marker_table = QTableView()
+        self.marker_table.setModel(self.marker_model)
+        self.marker_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.marker_table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.marker_table.verticalHeader().setVisible(False)
+        self.marker_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.marker_table.verticalHeader().setDefaultSectionSize(28)
+        self.marker_table.doubleClicked.connect(lambda index: self.use_selected_marker())
         
         # Style the table
         self.marker_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #2a2a2a;
                 color: white;
                 border: 1px solid #444;
@@ -513,23 +649,21 @@ class ProfessionalSCTE35Widget(QWidget):
                 padding: 8px;
                 border: 1px solid #444;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 8px;
                 border-bottom: 1px solid #333;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #4CAF50;
             }
         """)
         
-        # Set column widths
+        # Fixed column widths, sizing to contents would visit every row
         header = self.marker_table.horizontalHeader()
-        header.setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
-        header.setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
-        header.setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
-        header.setSectionResizeMode(3, QHeaderView.ResizeMode.ResizeToContents)
+        for column, width in enumerate([90, 90, 80, 80]):
+            header.setSectionResizeMode(column, QHeaderView.ResizeMode.Interactive)
+            header.resizeSection(column, width)
         header.setSectionResizeMode(4, QHeaderView.ResizeMode.Stretch)
-        header.setSectionResizeMode(5, QHeaderView.ResizeMode.ResizeToContents)
         
         library_layout.addWidget(self.marker_table)
         
@@ -540,6 +674,23 @@ class ProfessionalSCTE35Widget(QWidget):
         self.refresh_btn.clicked.connect(self.load_existing_markers)
         action_layout.addWidget(self.refresh_btn)
         
+        self.use_btn = QPushButton("Use Selected")
+        self.use_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #4CAF50;
+                color: white;
+                font-weight: bold;
+                padding: 8px 16px;
+                border-radius: 4px;
+                border: none;
+            }
+            QPushButton:hover {
+                background-color: #45a049;
+            }
+        """)
+        self.use_btn.clicked.connect(self.use_selected_marker)
+        action_layout.addWidget(self.use_btn)
+        
         self.delete_btn = QPushButton("Delete Selected")
         self.delete_btn.setStyleSheet("""
             QPushButton {
@@ -558,6 +709,9 @@ class ProfessionalSCTE35Widget(QWidget):
         action_layout.addWidget(self.delete_btn)
         
         action_layout.addStretch()
+        self.marker_count_label = QLabel()
+        action_layout.addWidget(self.marker_count_label)
+        self.update_marker_count()
         library_layout.addLayout(action_layout)
         
         library_group.setLayout(library_layout)
@@ -680,7 +834,7 @@ class ProfessionalSCTE35Widget(QWidget):
             ad_duration = self.ad_duration.value()
             event_id = self.event_id.value()
             
-            xml_file, json_file = self.generate_preroll_marker(
+            section = self.encode_preroll_marker(
                 event_id=event_id,
                 preroll_seconds=preroll_seconds,
                 ad_duration=ad_duration
@@ -690,12 +844,21 @@ class ProfessionalSCTE35Widget(QWidget):
             self.status_text.append(f"  Event ID: {event_id}")
             self.status_text.append(f"  Pre-roll: {preroll_seconds}s")
             self.status_text.append(f"  Duration: {ad_duration}s")
-            self.status_text.append(f"  Files: {xml_file}")
+            self.status_text.append(f"  Section: {len(section)} bytes, {to_base64(section)}")
+            self.cue_encoded.emit(event_id, section)
+            
+            if self.save_to_library.isChecked():
+                xml_file, json_file = self.generate_preroll_marker(
+                    event_id=event_id,
+                    preroll_seconds=preroll_seconds,
+                    ad_duration=ad_duration
+                )
+                self.status_text.append(f"  Files: {xml_file}")
+                self.add_to_library([xml_file])
+                self.marker_generated.emit(xml_file, json_file)
             self.status_text.append("")
             
             self.status_label.setText("Marker Generated")
-            self.load_existing_markers()
-            self.marker_generated.emit(xml_file, json_file)
             
         except Exception as e:
             self.status_text.append(f"[ERROR] Failed to generate marker: {e}")
@@ -729,26 +892,47 @@ class ProfessionalSCTE35Widget(QWidget):
             
             self.status_text.append("[INFO] Generating batch markers...")
             
+            save = self.save_to_library.isChecked()
+            saved_files = []
             for config in configurations:
-                xml_file, json_file = self.generate_preroll_marker(
+                section = self.encode_preroll_marker(
                     event_id=config["event_id"],
                     preroll_seconds=config["preroll"],
                     ad_duration=config["duration"]
                 )
+                self.cue_encoded.emit(config["event_id"], section)
+                if save:
+                    xml_file, _ = self.generate_preroll_marker(
+                        event_id=config["event_id"],
+                        preroll_seconds=config["preroll"],
+                        ad_duration=config["duration"]
+                    )
+                    saved_files.append(xml_file)
                 self.status_text.append(f"  Generated: Event {config['event_id']} ({config['preroll']}s pre-roll, {config['duration']}s ad)")
             
             self.status_text.append("[SUCCESS] Batch generation completed!")
-            self.load_existing_markers()
+            if saved_files:
+                self.add_to_library(saved_files)
             
         except Exception as e:
             self.status_text.append(f"[ERROR] Batch generation failed: {e}")
             
+    def encode_preroll_marker(self, event_id, preroll_seconds, ad_duration) -> bytes:
+        """Encode a pre-roll SCTE-35 marker as an in-memory splice_info_section"""
+        pts_time = stream_pts(preroll_seconds * 90000)
+        return default_cue_cache.splice_insert(
+            event_id, pts_time,
+            duration=ad_duration * 90000,
+            auto_return=self.auto_return.isChecked(),
+            unique_program_id=self.unique_program_id.value(),
+            avail_num=self.avail_num.value(),
+            avails_expected=self.avails_expected.value()
+        )
+        
     def generate_preroll_marker(self, event_id, preroll_seconds, ad_duration):
         """Generate a pre-roll SCTE-35 marker"""
-        # Calculate PTS time (90kHz clock)
-        current_time = int(time.time() * 90000)
-        preroll_pts = preroll_seconds * 90000
-        pts_time = current_time + preroll_pts
+        # PTS of the stream pre-roll seconds from now (90kHz clock)
+        pts_time = stream_pts(preroll_seconds * 90000)
         
         # Calculate ad duration in PTS
         ad_duration_pts = ad_duration * 90000
@@ -792,57 +976,42 @@ class ProfessionalSCTE35Widget(QWidget):
         return str(xml_filename), str(json_filename)
         
     def load_existing_markers(self):
-        """Load existing markers into the library table"""
-        self.marker_table.setRowCount(0)
-        
-        # Find all marker files
-        marker_files = list(self.scte35_dir.glob("preroll_*.xml"))
-        
-        for marker_file in marker_files:
-            try:
-                # Parse filename to get event ID and timestamp
-                parts = marker_file.stem.split('_')
-                if len(parts) >= 3:
-                    event_id = parts[1]
-                    timestamp = parts[2]
-                    
-                    # Read JSON file for details
-                    json_file = marker_file.with_suffix('.json')
-                    if json_file.exists():
-                        with open(json_file, 'r') as f:
-                            data = json.load(f)
-                            marker_info = data['scte35_marker']
-                            
-                            # Add to table
-                            row = self.marker_table.rowCount()
-                            self.marker_table.insertRow(row)
-                            
-                            self.marker_table.setItem(row, 0, QTableWidgetItem(str(marker_info['event_id'])))
-                            self.marker_table.setItem(row, 1, QTableWidgetItem("Pre-roll"))
-                            self.marker_table.setItem(row, 2, QTableWidgetItem(f"{marker_info['preroll_seconds']}s"))
-                            self.marker_table.setItem(row, 3, QTableWidgetItem(f"{marker_info['ad_duration_seconds']}s"))
-                            self.marker_table.setItem(row, 4, QTableWidgetItem(marker_info['timestamp'][:19]))
-                            
-                            # Action button
-                            action_btn = QPushButton("Use")
-                            action_btn.setStyleSheet("""
-                                QPushButton {
-                                    background-color: #4CAF50;
-                                    color: white;
-                                    font-weight: bold;
-                                    padding: 4px 8px;
-                                    border-radius: 3px;
-                                    border: none;
-                                }
-                                QPushButton:hover {
-                                    background-color: #45a049;
-                                }
-                            """)
-                            action_btn.clicked.connect(lambda checked, f=str(marker_file): self.use_marker(f))
-                            self.marker_table.setCellWidget(row, 5, action_btn)
-                            
-            except Exception as e:
-                print(f"Error loading marker {marker_file}: {e}")
+        """Re-check every marker file, including ones modified in place"""
+        self.sync_markers(check_modified=True)
+        
+    def sync_markers(self, check_modified: bool = False):
+        """Apply directory changes to the index and the library view"""
+        try:
+            result = self.marker_index.sync(check_modified=check_modified)
+        except Exception as e:
+            self.status_text.append(f"[ERROR] Failed to index markers: {e}")
+            return
+        self.marker_model.apply(result)
+        self.update_marker_count()
+        
+    def add_to_library(self, xml_files: List[str]):
+        """Index files this widget just wrote, without scanning the directory"""
+        result = SyncResult()
+        for xml_file in xml_files:
+            if self.marker_index.add(xml_file):
+                result.added.append(Path(xml_file).name)
+        self.marker_model.apply(result)
+        self.update_marker_count()
+        
+    def update_marker_count(self):
+        self.marker_count_label.setText(f"{self.marker_model.rowCount()} markers")
+        
+    def selected_marker(self) -> Optional[MarkerRecord]:
+        index = self.marker_table.currentIndex()
+        return self.marker_model.record(index.row()) if index.isValid() else None
+        
+    def use_selected_marker(self):
+        """Use the marker of the selected row"""
+        record = self.selected_marker()
+        if record:
+            self.use_marker(str(self.scte35_dir / record.name))
+        else:
+            self.status_text.append("[WARNING] No marker selected")
                 
     def use_marker(self, marker_file):
         """Use an existing marker"""
@@ -866,22 +1035,26 @@ class ProfessionalSCTE35Widget(QWidget):
             
     def delete_selected_marker(self):
         """Delete the selected marker"""
-        current_row = self.marker_table.currentRow()
-        if current_row >= 0:
-            event_id = self.marker_table.item(current_row, 0).text()
+        record = self.selected_marker()
+        if record:
+            event_id = record.event_id
             
             # Find and delete files
-            marker_files = list(self.scte35_dir.glob(f"preroll_{event_id}_*.xml"))
-            for marker_file in marker_files:
+            removed = []
+            for marker in self.marker_index.find(event_id):
+                marker_file = self.scte35_dir / marker.name
                 try:
-                    marker_file.unlink()
+                    marker_file.unlink(missing_ok=True)
                     json_file = marker_file.with_suffix('.json')
                     if json_file.exists():
                         json_file.unlink()
+                    removed.append(marker.name)
                 except Exception as e:
                     self.status_text.append(f"[ERROR] Failed to delete {marker_file}: {e}")
                     
+            self.marker_index.remove(removed)
+            self.marker_model.apply(SyncResult(removed=removed))
+            self.update_marker_count()
             self.status_text.append(f"[SUCCESS] Deleted marker {event_id}")
-            self.load_existing_markers()
         else:
             self.status_text.append("[WARNING] No marker selected")
@@ -10,6 +10,8 @@ import time
 import json
 from datetime import datetime
 
+from stream_clock import stream_pts
+
 class ProperTSDuckSCTE35:
     """Proper TSDuck SCTE-35 implementation based on official documentation"""
     
@@ -52,7 +54,7 @@ class ProperTSDuckSCTE35:
         """Create proper SCTE-35 XML format for TSDuck spliceinject"""
         
         # Calculate PTS time (90kHz clock)
-        pts_time = int(time.time() * 90000) % 8589934592  # Valid PTS range
+        pts_time = stream_pts()
         duration_pts = duration_seconds * 90000
         
         # Create proper TSDuck XML format
@@ -118,8 +120,7 @@ class ProperTSDuckSCTE35:
         preroll_file = f"{self.scte35_dir}/preroll_{event_id + 2}.xml"
         
         # For pre-roll, we use scheduled (not immediate) with PTS time
-        pts_time = int(time.time() * 90000) + (preroll_duration * 90)  # Add preroll delay
-        pts_time = pts_time % 8589934592  # Valid PTS range
+        pts_time = stream_pts(preroll_duration * 90)  # Add preroll delay (ms)
         duration_pts = ad_duration * 90000
         
         xml_content = f"""<?xml version="1.0" encoding="UTF-8"?>
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+PSI Probe for IBE-100
+Real PIDs and stream types of a source from its first PAT, PMT and SDT
+
+The probe reads raw packets from `tsp -I ... -O file` (or straight from a
+recording) and stops as soon as the PAT, every PMT it lists and the SDT are
+assembled, normally within a few hundred milliseconds of stream. Results
+are cached per input with a TTL, so rebuilding a pipeline for the same
+source does not probe again. plan_remap turns a result into the remap
+rules and PMT stream types of build_command instead of guessing them from
+the input type.
+"""
+
+import logging
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple, Any
+
+from ts_engine import (
+    SectionAssembler, parse_pat, parse_pmt, parse_sdt,
+    TS_PACKET_SIZE, TS_SYNC_BYTE, PAT_PID, SDT_PID, TABLE_ID_PMT, TABLE_ID_SDT_ACTUAL,
+    SCTE35_STREAM_TYPE
+)
+
+VIDEO_STREAM_TYPES = {
+    0x01: 'MPEG-1 Video', 0x02: 'MPEG-2 Video', 0x10: 'MPEG-4 Video',
+    0x1B: 'H.264', 0x24: 'HEVC', 0x33: 'VVC', 0x42: 'AVS',
+}
+AUDIO_STREAM_TYPES = {
+    0x03: 'MPEG-1 Audio', 0x04: 'MPEG-2 Audio', 0x0F: 'AAC', 0x11: 'AAC-LATM',
+    0x81: 'AC-3', 0x87: 'E-AC-3',
+}
+# Private PES (0x06) audio is recognized by its AC-3, E-AC-3, DTS or AAC descriptor
+AUDIO_DESCRIPTOR_TAGS = {0x6A, 0x7A, 0x7B, 0x7C}
+
+# Wall clock limit of one probe, and how long to wait for the SDT once PMTs are complete
+PROBE_TIMEOUT = 5.0
+SDT_GRACE = 0.5
+# Recordings are probed from their first bytes without tsp
+PROBE_FILE_BYTES = 4 * 1024 * 1024
+PROBE_CHUNK_SIZE = 64 * 1024
+DEFAULT_PROBE_TTL = 300.0
+
+
+@dataclass
+class ProbedStream:
+    """An elementary stream listed in a PMT"""
+    pid: int
+    stream_type: int
+    descriptor_tags: List[int] = field(default_factory=list)
+
+    @property
+    def kind(self) -> str:
+        if self.stream_type in VIDEO_STREAM_TYPES:
+            return 'video'
+        if self.stream_type in AUDIO_STREAM_TYPES or \
+                (self.stream_type == 0x06 and AUDIO_DESCRIPTOR_TAGS.intersection(self.descriptor_tags)):
+            return 'audio'
+        if self.stream_type == SCTE35_STREAM_TYPE:
+            return 'scte35'
+        return 'data'
+
+
+@dataclass
+class ProbedProgram:
+    """A program of the PAT with its PMT and SDT entry"""
+    program_number: int
+    pmt_pid: int
+    pcr_pid: Optional[int] = None
+    streams: List[ProbedStream] = field(default_factory=list)
+    service_name: str = ""
+    provider: str = ""
+
+    def first(self, kind: str) -> Optional[ProbedStream]:
+        return next((stream for stream in self.streams if stream.kind == kind), None)
+
+
+@dataclass
+class ProbeResult:
+    """PSI of a source"""
+    source: str
+    programs: List[ProbedProgram]
+    transport_stream_id: Optional[int] = None
+    has_sdt: bool = False
+    elapsed: float = 0.0
+    probed_at: float = field(default_factory=time.time)
+
+    @property
+    def pids(self) -> Set[int]:
+        """Every PMT, PCR and elementary stream PID in use"""
+        pids = set()
+        for program in self.programs:
+            pids.add(program.pmt_pid)
+            pids.update(stream.pid for stream in program.streams)
+            if program.pcr_pid is not None:
+                pids.add(program.pcr_pid)
+        return pids
+
+    def program(self, program_number: Optional[int] = None) -> Optional[ProbedProgram]:
+        """The program with that number, else the first one carrying video"""
+        for program in self.programs:
+            if program.program_number == program_number:
+                return program
+        return next((p for p in self.programs if p.first('video')), self.programs[0] if self.programs else None)
+
+
+class PSIProbe:
+    """Assembles PAT, PMTs and SDT from the first packets of a stream"""
+
+    def __init__(self):
+        self.assemblers: Dict[int, SectionAssembler] = {
+            PAT_PID: SectionAssembler(PAT_PID), SDT_PID: SectionAssembler(SDT_PID)
+        }
+        self.pat: Optional[Dict[str, Any]] = None
+        self.pmts: Dict[int, Dict[str, Any]] = {}
+        self.sdt_services: Dict[int, Dict[str, Any]] = {}
+        self.sdt_sections: Set[int] = set()
+        self.sdt_last_section: Optional[int] = None
+        self.packets = 0
+        self._remainder = b''
+
+    @property
+    def complete(self) -> bool:
+        """PAT and the PMT of every program it lists"""
+        return self.pat is not None and all(number in self.pmts for number in self.pat['programs'])
+
+    @property
+    def has_sdt(self) -> bool:
+        return self.sdt_last_section is not None and len(self.sdt_sections) > self.sdt_last_section
+
+    def feed(self, data) -> bool:
+        """Take a chunk of packets, not necessarily aligned; True once PSI and SDT are complete"""
+        data = self._remainder + bytes(data)
+        start = 0
+        while start < len(data) and not (data[start] == TS_SYNC_BYTE and
+                                         (start + TS_PACKET_SIZE >= len(data) or
+                                          data[start + TS_PACKET_SIZE] == TS_SYNC_BYTE)):
+            start += 1
+        end = start + (len(data) - start) // TS_PACKET_SIZE * TS_PACKET_SIZE
+        self._remainder = data[end:]
+        self.packets += (end - start) // TS_PACKET_SIZE
+        for pos in range(start, end, TS_PACKET_SIZE):
+            # PMT PIDs are added by the PAT, possibly within this chunk
+            assembler = self.assemblers.get(((data[pos + 1] & 0x1F) << 8) | data[pos + 2])
+            if assembler is not None:
+                for section in assembler.feed(data[pos:pos + TS_PACKET_SIZE]):
+                    self._section(assembler.pid, section)
+        return self.complete and self.has_sdt
+
+    def _section(self, pid: int, section: bytes):
+        try:
+            if pid == PAT_PID:
+                pat = parse_pat(section)
+                if pat['crc_valid'] and pat['current']:
+                    self.pat = pat
+                    for pmt_pid in pat['programs'].values():
+                        self.assemblers.setdefault(pmt_pid, SectionAssembler(pmt_pid))
+            elif pid == SDT_PID:
+                if section[0] != TABLE_ID_SDT_ACTUAL:
+                    return
+                sdt = parse_sdt(section)
+                if sdt['crc_valid'] and sdt['current']:
+                    self.sdt_services.update(sdt['services'])
+                    self.sdt_sections.add(sdt['section_number'])
+                    self.sdt_last_section = sdt['last_section_number']
+            elif section[0] == TABLE_ID_PMT:
+                pmt = parse_pmt(section)
+                if pmt['crc_valid'] and pmt['current']:
+                    self.pmts[pmt['program_number']] = pmt
+        except (ValueError, IndexError) as e:
+            logging.debug(f"Skipped a malformed section on PID {pid}: {e}")
+
+    def result(self, source: str = "", elapsed: float = 0.0) -> ProbeResult:
+        programs = []
+        for number, pmt_pid in sorted((self.pat or {'programs': {}})['programs'].items()):
+            pmt = self.pmts.get(number, {})
+            service = self.sdt_services.get(number, {})
+            programs.append(ProbedProgram(
+                program_number=number,
+                pmt_pid=pmt_pid,
+                pcr_pid=pmt.get('pcr_pid'),
+                streams=[ProbedStream(s['pid'], s['stream_type'], s['descriptor_tags'])
+                         for s in pmt.get('streams', [])],
+                service_name=service.get('name', ''),
+                provider=service.get('provider', ''),
+            ))
+        return ProbeResult(
+            source=source,
+            programs=programs,
+            transport_stream_id=self.pat['transport_stream_id'] if self.pat else None,
+            has_sdt=self.has_sdt,
+            elapsed=elapsed,
+        )
+
+
+def probe_command(input_args: List[str], tsp_binary: str = 'tsp', timeout: float = PROBE_TIMEOUT) -> List[str]:
+    """tsp command writing the raw packets of an input to stdout, for at most timeout"""
+    return [tsp_binary, *input_args, '-P', 'until', '--milliseconds', str(int(timeout * 1000)), '-O', 'file']
+
+
+def run_probe(input_args: List[str], tsp_binary: str = 'tsp', timeout: float = PROBE_TIMEOUT,
+              sdt_grace: float = SDT_GRACE) -> Optional[ProbeResult]:
+    """Probe an input given as tsp -I arguments, None if its PSI was not complete in time"""
+    start = time.monotonic()
+    source = " ".join(input_args[1:])
+    probe = PSIProbe()
+
+    if input_args[1:2] == ['file'] and len(input_args) == 3:
+        # A recording: read its first bytes directly
+        with open(input_args[2], 'rb') as f:
+            for _ in range(PROBE_FILE_BYTES // PROBE_CHUNK_SIZE):
+                chunk = f.read(PROBE_CHUNK_SIZE)
+                if not chunk or probe.feed(chunk):
+                    break
+    else:
+        done = threading.Event()
+        process = subprocess.Popen(probe_command(input_args, tsp_binary, timeout),
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+        def read():
+            complete_at = None
+            try:
+                while True:
+                    chunk = process.stdout.read1(PROBE_CHUNK_SIZE)
+                    if not chunk or probe.feed(chunk):
+                        break
+                    if probe.complete:
+                        complete_at = complete_at or time.monotonic()
+                        if time.monotonic() - complete_at >= sdt_grace:
+                            break
+            finally:
+                done.set()
+
+        reader = threading.Thread(target=read, name="psi-probe", daemon=True)
+        reader.start()
+        done.wait(timeout)
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        reader.join(timeout=1.0)
+        process.stdout.close()
+
+    elapsed = time.monotonic() - start
+    if not probe.complete:
+        logging.warning(f"No complete PAT/PMT from {source} after {elapsed:.2f}s ({probe.packets} packets)")
+        return None
+    return probe.result(source, elapsed)
+
+
+class ProbeCache:
+    """Probe results per input, reused for ttl seconds"""
+
+    def __init__(self, ttl: float = DEFAULT_PROBE_TTL):
+        self.ttl = ttl
+        self._entries: Dict[Tuple[str, ...], ProbeResult] = {}
+        self._lock = threading.Lock()
+        # One probe per input at a time, concurrent callers wait for it
+        self._probing: Dict[Tuple[str, ...], threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, input_args: List[str]) -> Optional[ProbeResult]:
+        with self._lock:
+            result = self._entries.get(tuple(input_args))
+            if result is not None and time.time() - result.probed_at < self.ttl:
+                return result
+            return None
+
+    def put(self, input_args: List[str], result: ProbeResult):
+        with self._lock:
+            self._entries[tuple(input_args)] = result
+
+    def invalidate(self, input_args: Optional[List[str]] = None):
+        """Forget one input, or everything"""
+        with self._lock:
+            if input_args is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(tuple(input_args), None)
+
+    def probe(self, input_args: List[str], tsp_binary: str = 'tsp',
+              timeout: float = PROBE_TIMEOUT) -> Optional[ProbeResult]:
+        """Cached result for an input, probing it on a miss"""
+        key = tuple(input_args)
+        with self._lock:
+            lock = self._probing.setdefault(key, threading.Lock())
+        with lock:
+            result = self.get(input_args)
+            if result is not None:
+                self.hits += 1
+                return result
+            self.misses += 1
+            result = run_probe(input_args, tsp_binary, timeout)
+            if result is not None:
+                self.put(input_args, result)
+            return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses, 'ttl': self.ttl}
+
+
+default_probe_cache = ProbeCache()
+
+
+def probe_source(input_args: List[str], tsp_binary: str = 'tsp',
+                 timeout: float = PROBE_TIMEOUT) -> Optional[ProbeResult]:
+    """Probe an input through the process-wide cache"""
+    return default_probe_cache.probe(input_args, tsp_binary, timeout)
+
+
+@dataclass
+class RemapPlan:
+    """Remap rules and PMT stream types for the configured video and audio PIDs"""
+    rules: List[str] = field(default_factory=list)
+    video_type: int = 0x1B
+    audio_type: int = 0x0F
+    warnings: List[str] = field(default_factory=list)
+    probed: bool = False
+
+
+def plan_remap(result: ProbeResult, vpid: int, apid: int,
+               program_number: Optional[int] = None) -> RemapPlan:
+    """Move the probed video and audio PIDs of a program to vpid and apid
+
+    A target PID used by another stream of the input is left alone, since
+    tsp refuses a remap onto a PID present in the input.
+    """
+    plan = RemapPlan(probed=True)
+    program = result.program(program_number)
+    if program is None:
+        plan.warnings.append(f"No program found in {result.source}")
+        return plan
+    video, audio = program.first('video'), program.first('audio')
+    moving = {stream.pid for stream in (video, audio) if stream is not None}
+    used = result.pids
+    for stream, target, label in ((video, vpid, 'video'), (audio, apid, 'audio')):
+        if stream is None:
+            plan.warnings.append(f"No {label} stream in program {program.program_number}")
+            continue
+        if label == 'video':
+            plan.video_type = stream.stream_type
+        else:
+            plan.audio_type = stream.stream_type
+        if stream.pid == target:
+            continue
+        if target in used and target not in moving:
+            plan.warnings.append(f"{label} PID {stream.pid} not remapped, PID {target} is already used by the input")
+            continue
+        plan.rules.append(f"{stream.pid}={target}")
+    return plan
+
+
+# Example usage
+if __name__ == "__main__":
+    import sys
+
+    args = sys.argv[1:] or ['-I', 'hls', 'https://cdn.itassist.one/BREAKING/NEWS/index.m3u8']
+    result = probe_source(args)
+    if result is None:
+        print("[ERROR] No PSI received")
+        sys.exit(1)
+    print(f"Probed {result.source} in {result.elapsed * 1000:.0f} ms, TS id {result.transport_stream_id}")
+    for program in result.programs:
+        print(f"  Program {program.program_number} '{program.service_name}' PMT {program.pmt_pid}")
+        for stream in program.streams:
+            print(f"    PID {stream.pid} type 0x{stream.stream_type:02X} {stream.kind}")
+    print(plan_remap(result, 256, 257))
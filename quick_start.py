@@ -9,6 +9,8 @@ import os
 import subprocess
 import json
 
+from startup import module_available
+
 def check_tsduck():
     """Check if TSDuck is installed"""
     try:
@@ -38,10 +40,9 @@ def check_dependencies():
     missing = []
     
     for package in required_packages:
-        try:
-            __import__(package.lower().replace('-', '_'))
+        if module_available(package):
             print(f"✅ {package}")
-        except ImportError:
+        else:
             print(f"❌ {package} (missing)")
             missing.append(package)
     
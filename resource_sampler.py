@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Resource Sampler for IBE-100
+Background per-process and per-interface resource sampling
+
+A daemon thread samples the tsp processes started through the process
+supervisor (and their forked children) once per interval: CPU, RSS,
+threads, IO and context switch rates per process, plus bit and packet
+rates per network interface computed from counter deltas. The newest
+snapshot is swapped in atomically, so readers on the GUI thread never
+wait for a sample.
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Callable, Tuple
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+DEFAULT_INTERVAL = 1.0
+# Finding forked children reads every process, only rescan every N samples
+CHILD_SCAN_EVERY = 5
+LOOPBACK_PREFIXES = ('lo',)
+
+
+@dataclass
+class ProcessSample:
+    """Resource usage of one process over the last interval"""
+    pid: int
+    label: str
+    name: str = ""
+    cpu_percent: float = 0.0
+    rss_bytes: int = 0
+    threads: int = 0
+    read_bps: float = 0.0
+    write_bps: float = 0.0
+    ctx_switches_per_s: float = 0.0
+    involuntary_per_s: float = 0.0
+
+
+@dataclass
+class InterfaceSample:
+    """Traffic of one network interface over the last interval"""
+    name: str
+    rx_bps: float = 0.0
+    tx_bps: float = 0.0
+    rx_pps: float = 0.0
+    tx_pps: float = 0.0
+    errors: int = 0
+    drops: int = 0
+
+
+@dataclass
+class ResourceSnapshot:
+    """One sampling pass"""
+    timestamp: float
+    cpu_percent: float = 0.0
+    memory_percent: float = 0.0
+    memory_used: int = 0
+    processes: List[ProcessSample] = field(default_factory=list)
+    interfaces: Dict[str, InterfaceSample] = field(default_factory=dict)
+    sample_seconds: float = 0.0
+
+    @property
+    def process_cpu_percent(self) -> float:
+        return sum(p.cpu_percent for p in self.processes)
+
+    @property
+    def process_rss_bytes(self) -> int:
+        return sum(p.rss_bytes for p in self.processes)
+
+    @property
+    def network_bps(self) -> Tuple[float, float]:
+        """Received and sent bits per second over non-loopback interfaces"""
+        external = [i for i in self.interfaces.values() if not i.name.startswith(LOOPBACK_PREFIXES)]
+        return sum(i.rx_bps for i in external), sum(i.tx_bps for i in external)
+
+
+def counter_rate(previous: Optional[int], current: int, seconds: float) -> float:
+    """Per-second rate of a cumulative counter, 0 on the first sample or a reset"""
+    if previous is None or seconds <= 0 or current < previous:
+        return 0.0
+    return (current - previous) / seconds
+
+
+def interface_rates(previous: Dict[str, Tuple], current: Dict[str, Tuple],
+                    seconds: float) -> Dict[str, InterfaceSample]:
+    """Rates from two psutil.net_io_counters(pernic=True) readings"""
+    rates = {}
+    for name, now in current.items():
+        before = previous.get(name)
+        if before is None:
+            rates[name] = InterfaceSample(name)
+            continue
+        rates[name] = InterfaceSample(
+            name,
+            rx_bps=counter_rate(before.bytes_recv, now.bytes_recv, seconds) * 8,
+            tx_bps=counter_rate(before.bytes_sent, now.bytes_sent, seconds) * 8,
+            rx_pps=counter_rate(before.packets_recv, now.packets_recv, seconds),
+            tx_pps=counter_rate(before.packets_sent, now.packets_sent, seconds),
+            errors=max(0, (now.errin + now.errout) - (before.errin + before.errout)),
+            drops=max(0, (now.dropin + now.dropout) - (before.dropin + before.dropout)),
+        )
+    return rates
+
+
+class _TrackedProcess:
+    """A psutil handle with the counters of the previous sample"""
+
+    def __init__(self, process, label: str):
+        self.process = process
+        self.label = label
+        self.io: Optional[Tuple[int, int]] = None
+        self.ctx: Optional[Tuple[int, int]] = None
+        self.sampled_at: Optional[float] = None
+
+
+class ResourceSampler:
+    """Samples supervised tsp processes and network interfaces on a background thread"""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, supervisor=None):
+        self.interval = interval
+        self.supervisor = supervisor
+        self.callbacks: List[Callable[[ResourceSnapshot], None]] = []
+        self._latest: Optional[ResourceSnapshot] = None
+        self._watched: Dict[int, str] = {}
+        self._tracked: Dict[int, _TrackedProcess] = {}
+        self._children: Dict[int, List[int]] = {}
+        self._net: Dict[str, Tuple] = {}
+        self._net_at: Optional[float] = None
+        self._samples = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, pid: int, label: str = ""):
+        """Sample a process that is not started through the supervisor"""
+        with self._lock:
+            self._watched[pid] = label or str(pid)
+
+    def unwatch(self, pid: int):
+        with self._lock:
+            self._watched.pop(pid, None)
+
+    def add_callback(self, callback: Callable[[ResourceSnapshot], None]):
+        """Called on the sampler thread with every snapshot"""
+        self.callbacks.append(callback)
+
+    def set_interval(self, interval: float):
+        self.interval = max(0.1, interval)
+
+    def latest(self) -> Optional[ResourceSnapshot]:
+        """Newest snapshot, never blocks"""
+        return self._latest
+
+    def start(self):
+        if not PSUTIL_AVAILABLE:
+            raise RuntimeError("psutil not available. Install with: pip install psutil")
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _run(self):
+        # Prime the CPU and counter baselines, the first real sample follows one interval later
+        self.sample()
+        while not self._stop.wait(self.interval):
+            try:
+                snapshot = self.sample()
+            except Exception as e:
+                print(f"[ERROR] Resource sampling error: {e}")
+                continue
+            for callback in self.callbacks:
+                try:
+                    callback(snapshot)
+                except Exception as e:
+                    print(f"[ERROR] Resource callback error: {e}")
+
+    def _root_pids(self) -> Dict[int, str]:
+        """Running pipeline processes and explicitly watched ones"""
+        with self._lock:
+            roots = dict(self._watched)
+        if self.supervisor is not None:
+            try:
+                status = self.supervisor.get_status()
+            except RuntimeError:
+                # Pipelines changed while the supervisor loop was iterating
+                status = {}
+            for name, info in status.items():
+                if info.get('pid') and info.get('state') == 'running':
+                    roots[info['pid']] = name
+        return roots
+
+    def _process_pids(self) -> Dict[int, str]:
+        roots = self._root_pids()
+        rescan = self._samples % CHILD_SCAN_EVERY == 0
+        pids = {}
+        for pid, label in roots.items():
+            pids[pid] = label
+            if rescan or pid not in self._children:
+                try:
+                    self._children[pid] = [child.pid for child in psutil.Process(pid).children(recursive=True)]
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    self._children[pid] = []
+            for child in self._children[pid]:
+                pids.setdefault(child, label)
+        for pid in [pid for pid in self._children if pid not in roots]:
+            del self._children[pid]
+        return pids
+
+    def _sample_process(self, tracked: _TrackedProcess, now: float) -> ProcessSample:
+        process = tracked.process
+        with process.oneshot():
+            sample = ProcessSample(process.pid, tracked.label, process.name(),
+                                   cpu_percent=process.cpu_percent(interval=None),
+                                   rss_bytes=process.memory_info().rss,
+                                   threads=process.num_threads())
+            try:
+                io = process.io_counters()
+                io = (io.read_bytes, io.write_bytes)
+            except (AttributeError, psutil.AccessDenied):
+                io = None
+            ctx = process.num_ctx_switches()
+            ctx = (ctx.voluntary, ctx.involuntary)
+
+        seconds = now - tracked.sampled_at if tracked.sampled_at is not None else 0.0
+        if io is not None and tracked.io is not None:
+            sample.read_bps = counter_rate(tracked.io[0], io[0], seconds)
+            sample.write_bps = counter_rate(tracked.io[1], io[1], seconds)
+        if tracked.ctx is not None:
+            sample.ctx_switches_per_s = counter_rate(sum(tracked.ctx), sum(ctx), seconds)
+            sample.involuntary_per_s = counter_rate(tracked.ctx[1], ctx[1], seconds)
+        tracked.io, tracked.ctx, tracked.sampled_at = io, ctx, now
+        return sample
+
+    def sample(self) -> ResourceSnapshot:
+        """Take one sample now and publish it"""
+        started = time.perf_counter()
+        now = time.monotonic()
+        memory = psutil.virtual_memory()
+        snapshot = ResourceSnapshot(time.time(), cpu_percent=psutil.cpu_percent(interval=None),
+                                    memory_percent=memory.percent, memory_used=memory.used)
+
+        pids = self._process_pids()
+        for pid in [pid for pid in self._tracked if pid not in pids]:
+            del self._tracked[pid]
+        for pid, label in pids.items():
+            tracked = self._tracked.get(pid)
+            if tracked is None:
+                try:
+                    tracked = self._tracked[pid] = _TrackedProcess(psutil.Process(pid), label)
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+            tracked.label = label
+            try:
+                snapshot.processes.append(self._sample_process(tracked, now))
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                del self._tracked[pid]
+            except psutil.AccessDenied:
+                pass
+
+        counters = psutil.net_io_counters(pernic=True)
+        seconds = now - self._net_at if self._net_at is not None else 0.0
+        snapshot.interfaces = interface_rates(self._net, counters, seconds)
+        self._net, self._net_at = counters, now
+
+        snapshot.sample_seconds = time.perf_counter() - started
+        self._samples += 1
+        self._latest = snapshot
+        return snapshot
+
+
+# Example usage
+if __name__ == "__main__":
+    if not PSUTIL_AVAILABLE:
+        print("psutil not available. Install with: pip install psutil")
+        raise SystemExit(1)
+
+    sampler = ResourceSampler()
+    sampler.watch(os.getpid(), "self")
+    sampler.add_callback(lambda s: print(
+        f"CPU {s.cpu_percent:.1f}% | watched CPU {s.process_cpu_percent:.1f}% "
+        f"RSS {s.process_rss_bytes / 1048576:.1f} MB | "
+        f"net {s.network_bps[0] / 1e6:.2f}/{s.network_bps[1] / 1e6:.2f} Mbps | "
+        f"sample {s.sample_seconds * 1000:.2f} ms"))
+    sampler.start()
+    try:
+        time.sleep(5)
+    finally:
+        sampler.stop()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+SCTE-35 Section Encoder for IBE-100
+In-memory splice_info_section encoding with a precompiled cue cache
+
+Cues which only differ by splice_event_id or pts_time share a byte template:
+both fields are patched in place and only the CRC32 over the bytes following
+the first patched field is recomputed, so no XML/JSON file is written and no
+threefive encode/decode round trip is needed per cue.
+"""
+
+import base64
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from ts_engine import crc32_mpeg2
+
+
+SPLICE_NULL = 0x00
+SPLICE_INSERT = 0x05
+TIME_SIGNAL = 0x06
+
+PTS_CLOCK_HZ = 90000
+PTS_MASK = (1 << 33) - 1
+DEFAULT_TIER = 0xFFF
+
+
+def _splice_time(pts_time: Optional[int]) -> bytes:
+    """Encode a splice_time() structure"""
+    if pts_time is None:
+        return b'\x7f'
+    pts_time &= PTS_MASK
+    return bytes([0xFE | (pts_time >> 32)]) + (pts_time & 0xFFFFFFFF).to_bytes(4, 'big')
+
+
+def _section(command_type: int, command: bytes, pts_adjustment: int = 0,
+             tier: int = DEFAULT_TIER, descriptors: bytes = b'') -> bytes:
+    """Wrap a splice command in a complete splice_info_section with CRC32"""
+    pts_adjustment &= PTS_MASK
+    body = (b'\x00'                                   # protocol_version
+            + bytes([pts_adjustment >> 32])          # encrypted=0, algorithm=0, pts_adjustment[32]
+            + (pts_adjustment & 0xFFFFFFFF).to_bytes(4, 'big')
+            + b'\x00'                                 # cw_index
+            + bytes([(tier >> 4) & 0xFF, ((tier & 0x0F) << 4) | (len(command) >> 8), len(command) & 0xFF])
+            + bytes([command_type]) + command
+            + len(descriptors).to_bytes(2, 'big') + descriptors)
+    length = len(body) + 4
+    header = bytes([0xFC, 0x30 | (length >> 8), length & 0xFF])
+    crc = crc32_mpeg2(header + body)
+    return header + body + crc.to_bytes(4, 'big')
+
+
+def encode_splice_insert(event_id: int, out_of_network: bool = True, immediate: bool = False,
+                         pts_time: Optional[int] = None, duration: Optional[int] = None,
+                         auto_return: bool = False, unique_program_id: int = 1,
+                         avail_num: int = 1, avails_expected: int = 1,
+                         pts_adjustment: int = 0, tier: int = DEFAULT_TIER) -> bytes:
+    """Encode a splice_insert section, pts_time and duration in 90 kHz units"""
+    flags = (0x80 if out_of_network else 0) | 0x40 | (0x20 if duration is not None else 0) \
+        | (0x10 if immediate else 0) | 0x0F
+    command = (event_id & 0xFFFFFFFF).to_bytes(4, 'big') + b'\x7f' + bytes([flags])
+    if not immediate:
+        command += _splice_time(pts_time)
+    if duration is not None:
+        duration &= PTS_MASK
+        command += bytes([(0x80 if auto_return else 0) | 0x7E | (duration >> 32)])
+        command += (duration & 0xFFFFFFFF).to_bytes(4, 'big')
+    command += (unique_program_id & 0xFFFF).to_bytes(2, 'big') + bytes([avail_num & 0xFF, avails_expected & 0xFF])
+    return _section(SPLICE_INSERT, command, pts_adjustment, tier)
+
+
+def encode_time_signal(pts_time: Optional[int], pts_adjustment: int = 0, tier: int = DEFAULT_TIER) -> bytes:
+    """Encode a time_signal section"""
+    return _section(TIME_SIGNAL, _splice_time(pts_time), pts_adjustment, tier)
+
+
+def encode_splice_null(pts_adjustment: int = 0, tier: int = DEFAULT_TIER) -> bytes:
+    """Encode a splice_null (heartbeat) section"""
+    return _section(SPLICE_NULL, b'', pts_adjustment, tier)
+
+
+def to_base64(section: bytes) -> str:
+    """Base64 form of a section, as used in sidecar files and HLS tags"""
+    return base64.b64encode(section).decode('ascii')
+
+
+class CueTemplate:
+    """Precompiled section with patchable event_id and pts_time fields"""
+
+    def __init__(self, section: bytes, event_id_offset: Optional[int], pts_offset: Optional[int]):
+        self.section = bytearray(section)
+        self.event_id_offset = event_id_offset
+        self.pts_offset = pts_offset
+        offsets = [o for o in (event_id_offset, pts_offset) if o is not None]
+        # The CRC of the bytes before the first patched field never changes
+        self.crc_start = min(offsets) if offsets else len(section) - 4
+        self.prefix_crc = crc32_mpeg2(bytes(self.section[:self.crc_start]))
+        self._lock = threading.Lock()
+
+    def render(self, event_id: Optional[int] = None, pts_time: Optional[int] = None) -> bytes:
+        """Patch the variable fields and return the finished section"""
+        with self._lock:
+            section = self.section
+            if event_id is not None and self.event_id_offset is not None:
+                section[self.event_id_offset:self.event_id_offset + 4] = (event_id & 0xFFFFFFFF).to_bytes(4, 'big')
+            if pts_time is not None and self.pts_offset is not None:
+                pts_time &= PTS_MASK
+                section[self.pts_offset] = 0xFE | (pts_time >> 32)
+                section[self.pts_offset + 1:self.pts_offset + 5] = (pts_time & 0xFFFFFFFF).to_bytes(4, 'big')
+            crc = crc32_mpeg2(section[self.crc_start:-4], self.prefix_crc)
+            section[-4:] = crc.to_bytes(4, 'big')
+            return bytes(section)
+
+
+class CueCache:
+    """Cache of cue templates keyed by everything but event_id and pts_time"""
+
+    def __init__(self, max_templates: int = 256):
+        self.max_templates = max_templates
+        self._templates: 'OrderedDict[Tuple, CueTemplate]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _template(self, key: Tuple, build) -> CueTemplate:
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self._templates.move_to_end(key)
+                self.hits += 1
+                return template
+            self.misses += 1
+            template = build()
+            self._templates[key] = template
+            if len(self._templates) > self.max_templates:
+                self._templates.popitem(last=False)
+            return template
+
+    def splice_insert(self, event_id: int, pts_time: Optional[int] = None, out_of_network: bool = True,
+                      immediate: bool = False, duration: Optional[int] = None, auto_return: bool = False,
+                      unique_program_id: int = 1, avail_num: int = 1, avails_expected: int = 1,
+                      pts_adjustment: int = 0, tier: int = DEFAULT_TIER) -> bytes:
+        """splice_insert section, built from a cached template"""
+        key = (SPLICE_INSERT, out_of_network, immediate, duration, auto_return,
+               unique_program_id, avail_num, avails_expected, pts_adjustment, tier)
+
+        def build():
+            section = encode_splice_insert(0, out_of_network, immediate, None if immediate else 0, duration,
+                                           auto_return, unique_program_id, avail_num, avails_expected,
+                                           pts_adjustment, tier)
+            # event_id follows the 14-byte header, pts_time follows event_id, cancel and flags bytes
+            return CueTemplate(section, 14, None if immediate else 20)
+
+        return self._template(key, build).render(event_id, pts_time)
+
+    def time_signal(self, pts_time: int, pts_adjustment: int = 0, tier: int = DEFAULT_TIER) -> bytes:
+        """time_signal section, built from a cached template"""
+        key = (TIME_SIGNAL, pts_adjustment, tier)
+        build = lambda: CueTemplate(encode_time_signal(0, pts_adjustment, tier), None, 14)
+        return self._template(key, build).render(None, pts_time)
+
+    def encode_marker(self, marker_type: str, event_id: int, duration_seconds: int = 0,
+                      pts_time: Optional[int] = None, out_of_network: bool = True,
+                      immediate: bool = False) -> bytes:
+        """Encode a CUE_OUT, CUE_IN, CRASH_OUT or TIME_SIGNAL marker"""
+        if pts_time is None:
+            # Imported here, stream_clock itself builds on this module
+            from stream_clock import stream_pts
+            pts_time = stream_pts()
+        marker_type = marker_type.upper().replace('-', '_')
+
+        if marker_type == "CUE_OUT":
+            duration = duration_seconds * PTS_CLOCK_HZ if duration_seconds > 0 else None
+            return self.splice_insert(event_id, pts_time, out_of_network, immediate, duration)
+        elif marker_type == "CUE_IN":
+            return self.splice_insert(event_id, pts_time, False, immediate)
+        elif marker_type == "CRASH_OUT":
+            return self.splice_insert(event_id, None, True, True)
+        elif marker_type == "TIME_SIGNAL":
+            return self.time_signal(pts_time)
+        else:
+            raise ValueError(f"Unknown marker type: {marker_type}")
+
+    def clear(self):
+        """Drop all templates"""
+        with self._lock:
+            self._templates.clear()
+
+
+# Shared by all generators so templates are compiled once per process
+default_cue_cache = CueCache()
+
+
+def encode_marker(marker_type: str, event_id: int, duration_seconds: int = 0, pts_offset: int = 0) -> bytes:
+    """Encode a marker at the stream PTS plus an offset in 90 kHz ticks, no files are written"""
+    from stream_clock import stream_pts
+    return default_cue_cache.encode_marker(marker_type, event_id, duration_seconds, stream_pts(pts_offset))
+
+
+# Example usage
+if __name__ == "__main__":
+    from ts_engine import parse_splice_info_section
+
+    section = default_cue_cache.encode_marker("CUE_OUT", 10023, duration_seconds=600)
+    print("Section:", section.hex())
+    print("Base64:", to_base64(section))
+    print("Decoded:", parse_splice_info_section(section))
+
+    count = 100000
+    start = time.perf_counter()
+    for event_id in range(count):
+        default_cue_cache.splice_insert(event_id, event_id * 3000, duration=600 * PTS_CLOCK_HZ)
+    elapsed = time.perf_counter() - start
+    print(f"{count} cues in {elapsed:.3f} s ({elapsed / count * 1e6:.1f} µs per cue)")
@@ -9,6 +9,8 @@ import time
 import json
 from datetime import datetime, timedelta
 
+from stream_clock import stream_pts
+
 class SCTE35Generator:
     """Generate SCTE-35 splice commands for distributor requirements"""
     
@@ -41,7 +43,7 @@ class SCTE35Generator:
             duration = self.config['scte35']['ad_duration']
         
         # Calculate PTS (90kHz clock)
-        pts_time = int(time.time() * 90000) + pts_offset
+        pts_time = stream_pts(pts_offset)
         
         xml_content = f"""<?xml version="1.0" encoding="UTF-8"?>
 <tsduck>
@@ -78,7 +80,7 @@ class SCTE35Generator:
             event_id = self.config['scte35']['event_id'] + 1
         
         # Calculate PTS (90kHz clock)
-        pts_time = int(time.time() * 90000) + pts_offset
+        pts_time = stream_pts(pts_offset)
         
         xml_content = f"""<?xml version="1.0" encoding="UTF-8"?>
 <tsduck>
@@ -110,7 +112,7 @@ class SCTE35Generator:
             event_id = self.config['scte35']['event_id'] + 2
         
         # Calculate PTS (90kHz clock)
-        pts_time = int(time.time() * 90000) + pts_offset
+        pts_time = stream_pts(pts_offset)
         
         xml_content = f"""<?xml version="1.0" encoding="UTF-8"?>
 <tsduck>
@@ -139,7 +141,7 @@ class SCTE35Generator:
             event_id = self.config['scte35']['event_id'] + 3
         
         # Calculate PTS (90kHz clock)
-        pts_time = int(time.time() * 90000) + pts_offset
+        pts_time = stream_pts(pts_offset)
         
         xml_content = f"""<?xml version="1.0" encoding="UTF-8"?>
 <tsduck>
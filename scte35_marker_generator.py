@@ -11,6 +11,9 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 from pathlib import Path
 
+from scte35_encoder import encode_marker
+from stream_clock import stream_pts
+
 try:
     import threefive
     THREEFIVE_AVAILABLE = True
@@ -54,7 +57,7 @@ class SCTE35MarkerGenerator:
             
             # Set timing
             if not immediate:
-                pts_time = int(time.time() * 90000) + pts_offset
+                pts_time = stream_pts(pts_offset)
                 cue.command.splice_time = threefive.SpliceTime()
                 cue.command.splice_time.pts_time = pts_time
             
@@ -118,7 +121,7 @@ class SCTE35MarkerGenerator:
             
             # Set timing
             if not immediate:
-                pts_time = int(time.time() * 90000) + pts_offset
+                pts_time = stream_pts(pts_offset)
                 cue.command.splice_time = threefive.SpliceTime()
                 cue.command.splice_time.pts_time = pts_time
             
@@ -213,7 +216,7 @@ class SCTE35MarkerGenerator:
             cue.command = threefive.TimeSignal()
             
             # Set timing
-            pts_time = int(time.time() * 90000) + pts_offset
+            pts_time = stream_pts(pts_offset)
             cue.command.splice_time = threefive.SpliceTime()
             cue.command.splice_time.pts_time = pts_time
             
@@ -316,7 +319,7 @@ class SCTE35MarkerGenerator:
     
     def _cue_to_xml(self, cue, event_id: int, duration: int, pts_offset: int, immediate: bool) -> str:
         """Convert threefive cue to TSDuck XML format"""
-        pts_time = int(time.time() * 90000) + pts_offset
+        pts_time = stream_pts(pts_offset)
         
         if immediate:
             splice_time_xml = ""
@@ -360,6 +363,9 @@ class SCTE35MarkerGenerator:
     </time_signal>
 </tsduck>"""
     
+    # In-memory splice_info_section of a marker, shared by all generators
+    encode_marker = staticmethod(encode_marker)
+    
     def get_generated_markers(self) -> List[Dict[str, Any]]:
         """Get list of all generated markers"""
         return self.markers_generated.copy()
@@ -11,18 +11,36 @@ import os
 from datetime import datetime
 import threading
 import queue
+from typing import Optional
+
+from splice_events import (
+    SpliceEvent, SpliceEventDecoder, SpliceEventRing, pump_events, spawn_monitor, follow_tap,
+    DEFAULT_RING_CAPACITY
+)
+from stream_tap import StreamTap, DEFAULT_TAP_PORT, find_shared_tap
 
 class SCTE35Monitor:
     """Monitor SCTE-35 markers in transport streams"""
     
-    def __init__(self):
+    def __init__(self, capacity: int = DEFAULT_RING_CAPACITY):
         self.monitoring = False
-        self.markers_found = []
+        self.markers_found = SpliceEventRing(capacity)
         self.alert_queue = queue.Queue()
         self.monitor_process = None
+        self._unsubscribe = []
+        
+    def start_monitoring(self, input_source, output_callback=None, tap: Optional[StreamTap] = None,
+                         scte35_pid=500):
+        """Start monitoring SCTE-35 markers in the stream
+
+        With a tap, or the shared tap of a pipeline running in this process,
+        the markers are decoded from it; only without one a splicemonitor
+        pipeline connects to the source.
+        """
+        tap = tap or find_shared_tap()
+        if tap is not None:
+            return self.start_tap_monitoring(tap, scte35_pid, output_callback)
         
-    def start_monitoring(self, input_source, output_callback=None):
-        """Start monitoring SCTE-35 markers in the stream"""
         print("🔍 Starting SCTE-35 Marker Monitoring")
         print("=" * 50)
         
@@ -31,33 +49,30 @@ class SCTE35Monitor:
             'tsp',
             '-I', 'hls', input_source,
             '-P', 'splicemonitor',
-            '--pid', '500',  # SCTE-35 PID
+            '--pid', str(scte35_pid),  # SCTE-35 PID
             '--json',  # Output in JSON format
             '-O', 'drop'  # Drop output, we only want monitoring
         ]
         
         print(f"📡 Monitoring: {input_source}")
-        print(f"🎯 SCTE-35 PID: 500")
+        print(f"🎯 SCTE-35 PID: {scte35_pid}")
         print(f"🔧 Command: {' '.join(command)}")
         print()
         
         try:
-            self.monitor_process = subprocess.Popen(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,
-                universal_newlines=True
-            )
+            self.monitor_process = spawn_monitor(command)
             
             self.monitoring = True
             print("✅ SCTE-35 monitoring started")
             
+            self._unsubscribe.append(self.markers_found.subscribe(self._handle_event))
+            if output_callback:
+                self._unsubscribe.append(self.markers_found.subscribe(output_callback))
+            
             # Start monitoring thread
             monitor_thread = threading.Thread(
                 target=self._monitor_output,
-                args=(output_callback,)
+                args=(input_source,)
             )
             monitor_thread.daemon = True
             monitor_thread.start()
@@ -68,79 +83,39 @@ class SCTE35Monitor:
             print(f"❌ Error starting monitoring: {e}")
             return False
     
-    def _monitor_output(self, output_callback):
-        """Monitor TSDuck output for SCTE-35 markers"""
-        while self.monitoring and self.monitor_process:
-            try:
-                line = self.monitor_process.stdout.readline()
-                if line:
-                    self._process_line(line.strip(), output_callback)
-                elif self.monitor_process.poll() is not None:
-                    break
-            except Exception as e:
-                print(f"⚠️  Monitoring error: {e}")
-                break
+    def start_tap_monitoring(self, tap: StreamTap, scte35_pid=500, output_callback=None):
+        """Decode SCTE-35 markers from a stream tap of the running pipeline
+
+        No second connection to the source and no tsp process: the sections
+        are decoded from the tapped packets on the tap thread.
+        """
+        print(f"🔍 Monitoring SCTE-35 PID {scte35_pid} on tap {tap.host}:{tap.port}")
+        self._unsubscribe.append(self.markers_found.subscribe(self._handle_event))
+        if output_callback:
+            self._unsubscribe.append(self.markers_found.subscribe(output_callback))
+        self._unsubscribe.append(follow_tap(tap, scte35_pid, self.markers_found))
+        self.monitoring = True
+        return True
     
-    def _process_line(self, line, output_callback):
-        """Process a line of TSDuck output"""
+    def _monitor_output(self, input_source):
+        """Decode splicemonitor JSON output into the event ring"""
         try:
-            # Try to parse as JSON
-            if line.startswith('{'):
-                data = json.loads(line)
-                if 'splice' in data or 'scte' in data.lower():
-                    self._handle_scte35_marker(data, output_callback)
-            else:
-                # Check for SCTE-35 keywords in text output
-                if any(keyword in line.lower() for keyword in ['splice', 'scte', 'cue', 'break']):
-                    self._handle_text_marker(line, output_callback)
-                    
-        except json.JSONDecodeError:
-            # Not JSON, check for SCTE-35 keywords
-            if any(keyword in line.lower() for keyword in ['splice', 'scte', 'cue', 'break']):
-                self._handle_text_marker(line, output_callback)
+            pump_events(self.monitor_process.stdout, self.markers_found,
+                        SpliceEventDecoder(input_source), should_stop=lambda: not self.monitoring)
         except Exception as e:
-            print(f"⚠️  Error processing line: {e}")
+            print(f"⚠️  Monitoring error: {e}")
     
-    def _handle_scte35_marker(self, data, output_callback):
-        """Handle detected SCTE-35 marker"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        marker_info = {
-            'timestamp': timestamp,
-            'type': 'SCTE-35 Marker',
-            'data': data
-        }
-        
-        self.markers_found.append(marker_info)
-        
-        print(f"🎯 [{timestamp}] SCTE-35 MARKER DETECTED!")
-        print(f"   Data: {json.dumps(data, indent=2)}")
-        print()
-        
-        if output_callback:
-            output_callback(marker_info)
-    
-    def _handle_text_marker(self, line, output_callback):
-        """Handle text-based SCTE-35 marker detection"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        marker_info = {
-            'timestamp': timestamp,
-            'type': 'SCTE-35 Text Marker',
-            'data': line
-        }
-        
-        self.markers_found.append(marker_info)
-        
-        print(f"🎯 [{timestamp}] SCTE-35 MARKER DETECTED!")
-        print(f"   Text: {line}")
-        print()
-        
-        if output_callback:
-            output_callback(marker_info)
+    def _handle_event(self, event: SpliceEvent):
+        """Report a detected SCTE-35 event"""
+        print(f"🎯 [{event.timestamp}] SCTE-35 MARKER DETECTED: {event.description}")
     
     def stop_monitoring(self):
         """Stop SCTE-35 monitoring"""
         print("🛑 Stopping SCTE-35 monitoring...")
         self.monitoring = False
+        for unsubscribe in self._unsubscribe:
+            unsubscribe()
+        self._unsubscribe = []
         
         if self.monitor_process:
             self.monitor_process.terminate()
@@ -153,12 +128,14 @@ class SCTE35Monitor:
     
     def get_markers_summary(self):
         """Get summary of detected markers"""
-        if not self.markers_found:
+        if not self.markers_found.total:
             return "No SCTE-35 markers detected"
         
-        summary = f"📊 SCTE-35 Markers Summary ({len(self.markers_found)} found):\n"
-        for i, marker in enumerate(self.markers_found, 1):
-            summary += f"  {i}. [{marker['timestamp']}] {marker['type']}\n"
+        summary = f"📊 SCTE-35 Markers Summary ({self.markers_found.total} found):\n"
+        if self.markers_found.dropped:
+            summary += f"  ({self.markers_found.dropped} oldest not kept)\n"
+        for i, event in enumerate(self.markers_found, self.markers_found.dropped + 1):
+            summary += f"  {i}. [{event.timestamp}] {event.description}\n"
         
         return summary
 
@@ -169,9 +146,9 @@ def test_scte35_detection():
     
     monitor = SCTE35Monitor()
     
-    def marker_callback(marker_info):
+    def marker_callback(event):
         """Callback for detected markers"""
-        print(f"🚨 ALERT: SCTE-35 marker detected at {marker_info['timestamp']}")
+        print(f"🚨 ALERT: SCTE-35 marker detected at {event.timestamp}")
     
     # Start monitoring your HLS stream
     success = monitor.start_monitoring(
@@ -228,6 +205,10 @@ def monitor_with_scte35_injection():
         print(f"   - {f}")
     print()
     
+    # Tap of the injected stream, only PSI/SI and the SCTE-35 PID are forked
+    tap = StreamTap(DEFAULT_TAP_PORT, pids=[500])
+    tap.start()
+    
     # Start injection process
     injection_command = [
         'tsp',
@@ -236,7 +217,8 @@ def monitor_with_scte35_injection():
         '--pid', '500',
         '--pts-pid', '256',
         '--files', f'{scte_dir}/*.xml',
-        '-O', 'ip', '127.0.0.1:9999'  # Local UDP for monitoring
+        *tap.args(),
+        '-O', 'ip', '127.0.0.1:9999'
     ]
     
     print("🚀 Starting SCTE-35 injection...")
@@ -256,11 +238,11 @@ def monitor_with_scte35_injection():
         # Start monitoring the injected stream
         monitor = SCTE35Monitor()
         
-        def marker_callback(marker_info):
-            print(f"🎯 INJECTED MARKER DETECTED: {marker_info['timestamp']}")
+        def marker_callback(event):
+            print(f"🎯 INJECTED MARKER DETECTED: {event.timestamp}")
         
-        # Monitor the local UDP stream
-        success = monitor.start_monitoring("udp://127.0.0.1:9999", marker_callback)
+        # Monitor the injected stream through the tap
+        success = monitor.start_tap_monitoring(tap, 500, marker_callback)
         
         if success:
             print("⏱️  Monitoring injected stream for 20 seconds...")
@@ -278,6 +260,8 @@ def monitor_with_scte35_injection():
     except Exception as e:
         print(f"❌ Error: {e}")
         return False
+    finally:
+        tap.stop()
 
 if __name__ == "__main__":
     print("🔍 SCTE-35 Marker Monitor and Alert System")
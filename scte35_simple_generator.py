@@ -11,6 +11,9 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 from pathlib import Path
 
+from scte35_encoder import encode_marker
+from stream_clock import stream_pts
+
 try:
     import threefive
     THREEFIVE_AVAILABLE = True
@@ -217,7 +220,7 @@ class SimpleSCTE35Generator:
     
     def _create_cue_out_xml(self, event_id: int, duration: int) -> str:
         """Create CUE-OUT XML for TSDuck"""
-        pts_time = int(time.time() * 90000)
+        pts_time = stream_pts()
         
         return f"""<?xml version="1.0" encoding="UTF-8"?>
 <tsduck>
@@ -243,7 +246,7 @@ class SimpleSCTE35Generator:
     
     def _create_cue_in_xml(self, event_id: int) -> str:
         """Create CUE-IN XML for TSDuck"""
-        pts_time = int(time.time() * 90000)
+        pts_time = stream_pts()
         
         return f"""<?xml version="1.0" encoding="UTF-8"?>
 <tsduck>
@@ -280,7 +283,7 @@ class SimpleSCTE35Generator:
     
     def _create_time_signal_xml(self) -> str:
         """Create TIME_SIGNAL XML for TSDuck"""
-        pts_time = int(time.time() * 90000)
+        pts_time = stream_pts()
         
         return f"""<?xml version="1.0" encoding="UTF-8"?>
 <tsduck>
@@ -328,6 +331,9 @@ class SimpleSCTE35Generator:
         except Exception as e:
             raise Exception(f"Failed to generate ad break sequence: {e}")
     
+    # In-memory splice_info_section of a marker, shared by all generators
+    encode_marker = staticmethod(encode_marker)
+    
     def get_generated_markers(self) -> List[Dict[str, Any]]:
         """Get list of all generated markers"""
         return self.markers_generated.copy()
@@ -21,6 +21,8 @@ class SCTE35Templates:
         self.templates_dir = Path("scte35_templates")
         self.templates_dir.mkdir(exist_ok=True)
         self.generated_markers = []
+        self._generator = None
+        self.event_ids = None
     
     def create_preroll_template(self, event_id: int, ad_duration: int = 30) -> Dict[str, Any]:
         """Create preroll ad break template (before main content)"""
@@ -310,8 +312,10 @@ class SCTE35Templates:
                              base_event_id: int = None) -> List[Dict[str, Any]]:
         """Generate actual markers from template"""
         try:
-            from scte35_xml_generator import SCTE35XMLGenerator
-            generator = SCTE35XMLGenerator(str(self.output_dir))
+            if self._generator is None:
+                from scte35_xml_generator import SCTE35XMLGenerator
+                self._generator = SCTE35XMLGenerator(str(self.output_dir))
+            generator = self._generator
             
             generated_markers = []
             markers = template.get("markers", [])
@@ -349,6 +353,39 @@ class SCTE35Templates:
         except Exception as e:
             raise Exception(f"Failed to generate markers from template: {e}")
     
+    def expand_schedule(self, plans, day_start: float = 0.0, first_event_id: int = None):
+        """Expand recurring break plans (BreakPlan or dicts) into one in-memory cue table
+        
+        Event ids continue across calls, so schedules expanded by the same
+        instance never share an id.
+        """
+        from break_schedule import BreakPlan, EventIdAllocator, expand_plans
+        
+        if isinstance(plans, (BreakPlan, dict)):
+            plans = [plans]
+        plans = [BreakPlan.from_dict(p) if isinstance(p, dict) else p for p in plans]
+        if self.event_ids is None:
+            self.event_ids = EventIdAllocator(first_event_id or 10000)
+        elif first_event_id:
+            self.event_ids.next_id = first_event_id
+        return expand_plans(plans, self.event_ids, day_start)
+    
+    def save_schedule(self, table, filename: str = None) -> str:
+        """Save a cue table as a single bundle in the templates directory"""
+        if not filename:
+            filename = f"schedule_{int(time.time())}.npz"
+        return table.save(str(self.templates_dir / filename))
+    
+    def load_schedule(self, filename: str):
+        """Load a saved cue table and keep its event ids reserved"""
+        from break_schedule import CueTable, EventIdAllocator
+        
+        table = CueTable.load(str(self.templates_dir / filename))
+        if self.event_ids is None:
+            self.event_ids = EventIdAllocator()
+        self.event_ids.reserve_ids(table.cues['event_id'])
+        return table
+    
     def create_standard_templates(self):
         """Create standard broadcast templates"""
         templates = []
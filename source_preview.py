@@ -9,11 +9,32 @@ import threading
 import queue
 import json
 import re
+import time
 from typing import Dict, List, Optional, Any, Callable
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from datetime import datetime
 import logging
 
+try:
+    from ts_engine import (
+        TSPacketEngine, MappedTSFile, PSISectionCache, TS_PACKET_SIZE, DEFAULT_CHUNK_PACKETS,
+        NUMPY_AVAILABLE, NULL_PID, PAT_PID, SDT_PID, TABLE_ID_PMT
+    )
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from process_supervisor import (
+    PipelineSpec, get_supervisor, EVENT_STDOUT, EVENT_ERROR, EVENT_STOPPED, EVENT_FAILED
+)
+from stream_tap import StreamTap
+from psi_probe import ProbedStream, VIDEO_STREAM_TYPES, AUDIO_STREAM_TYPES
+
+# tstables text output
+TABLE_HEADER_RE = re.compile(r'^\s*\*\s*(.+?), TID \d+ \(0x[0-9A-Fa-f]+\), PID (\d+)')
+TABLE_SUMMARY_RE = re.compile(r'Version: (\d+), sections: (\d+), total size: (\d+) bytes')
+
+SERVICE_TYPE_NAMES = {0x01: 'TV', 0x02: 'Radio', 0x16: 'SD TV', 0x19: 'HD TV', 0x1F: 'HEVC TV'}
+
 
 @dataclass
 class StreamInfo:
@@ -69,55 +90,103 @@ class TableInfo:
 class SourcePreviewProcessor:
     """Process source preview using TSDuck"""
     
-    def __init__(self):
-        self.process = None
+    def __init__(self, update_interval: float = 1.0):
         self.output_queue = queue.Queue()
         self.running = False
         self.thread = None
+        self.callback = None
+        self.update_interval = update_interval
+        # TSDuck only handles the input protocol, packets are analyzed in-process
+        self.in_process = NUMPY_AVAILABLE
+        self.pipeline_name = f"preview-{id(self):x}"
+        self.engine = None
+        self.next_update = 0.0
+        self.text_state = None
+        self._unsubscribe_tap = None
+        # Table generation last published, services and tables are only sent when it moves
+        self._tables_generation = -1
+        self._table_header = None
         
-    def start_preview(self, input_config: Dict[str, str], callback: Callable[[Dict[str, Any]], None]):
-        """Start source preview analysis"""
+    def start_preview(self, input_config: Dict[str, str], callback: Callable[[Dict[str, Any]], None],
+                      tap: Optional[StreamTap] = None):
+        """Start source preview analysis
+
+        With the tap of a running pipeline on the same source, its packets
+        are analyzed instead of opening a second connection to the source.
+        """
         if self.running:
             self.stop_preview()
             
         self.running = True
         self.callback = callback
-        self.thread = threading.Thread(target=self._preview_worker, args=(input_config,))
-        self.thread.daemon = True
-        self.thread.start()
+        self._tables_generation = -1
+        
+        if self.in_process and tap is not None:
+            self.engine = TSPacketEngine(track_tables=True)
+            self.next_update = time.monotonic() + self.update_interval
+            self._unsubscribe_tap = tap.subscribe(self._feed_packets)
+            return
+            
+        # Recordings are analyzed straight from a memory mapping, no tsp needed
+        if self.in_process and input_config.get('type', 'file').lower() == 'file':
+            self.thread = threading.Thread(target=self._preview_worker, args=(input_config,))
+            self.thread.daemon = True
+            self.thread.start()
+            return
+            
+        # Live inputs run on the shared supervisor, its event loop reads the pipes
+        command = self._build_analysis_command(input_config)
+        if self.in_process:
+            self.engine = TSPacketEngine(track_tables=True)
+            self.next_update = time.monotonic() + self.update_interval
+            spec = PipelineSpec(
+                self.pipeline_name, command, restart=False,
+                stdout_mode='binary', stderr_mode='discard', stdout_handler=self._feed_packets,
+                chunk_size=DEFAULT_CHUNK_PACKETS * TS_PACKET_SIZE
+            )
+        else:
+            self.text_state = (StreamInfo(
+                bitrate=0, packets_per_second=0, errors=0, pcr_accuracy=0.0, continuity_errors=0,
+                services_count=0, pids_count=0, video_streams=[], audio_streams=[], data_streams=[]
+            ), [], [], [])
+            spec = PipelineSpec(self.pipeline_name, command, restart=False, stderr_mode='discard')
+        get_supervisor().start_pipeline(spec, self._handle_event)
         
     def stop_preview(self):
         """Stop source preview"""
         self.running = False
-        if self.process:
-            self.process.terminate()
+        if self._unsubscribe_tap:
+            self._unsubscribe_tap()
+            self._unsubscribe_tap = None
+            self._publish_engine_stats(self.engine)
+            return
+        get_supervisor().stop_pipeline(self.pipeline_name, wait=True)
         if self.thread:
             self.thread.join(timeout=2.0)
+            self.thread = None
             
     def _preview_worker(self, input_config: Dict[str, str]):
-        """Worker thread for source preview"""
+        """Worker thread for file preview"""
         try:
-            # Build TSDuck command for analysis
-            command = self._build_analysis_command(input_config)
-            
-            # Start TSDuck process
-            self.process = subprocess.Popen(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,
-                universal_newlines=True
-            )
-            
-            # Parse output
-            self._parse_tsduck_output()
-            
+            self._analyze_mapped_file(input_config.get('source', ''))
         except Exception as e:
             logging.error(f"Error in preview worker: {e}")
             if self.callback:
                 self.callback({'error': str(e)})
                 
+    def _handle_event(self, name: str, kind: str, payload: Any):
+        """Supervisor events, called on the supervisor thread"""
+        if kind == EVENT_STDOUT:
+            self._parse_tsduck_line(payload)
+        elif kind == EVENT_ERROR:
+            logging.error(f"Error in source preview: {payload}")
+            if self.callback:
+                self.callback({'error': payload})
+        elif kind in (EVENT_STOPPED, EVENT_FAILED):
+            if self.engine is not None:
+                self._publish_engine_stats(self.engine)
+            get_supervisor().forget(name)
+                
     def _build_analysis_command(self, input_config: Dict[str, str]) -> List[str]:
         """Build TSDuck command for source analysis"""
         command = ['tsp']
@@ -160,6 +229,11 @@ class SourcePreviewProcessor:
         if params:
             command.extend(params.split())
             
+        if self.in_process:
+            # Raw packets on stdout, analyzed by TSPacketEngine
+            command.extend(['-O', 'file'])
+            return command
+            
         # Analysis plugins
         command.extend([
             '-P', 'analyze', '--all-streams',
@@ -173,50 +247,139 @@ class SourcePreviewProcessor:
         
         return command
         
-    def _parse_tsduck_output(self):
-        """Parse TSDuck output for preview data"""
+    def _feed_packets(self, data: bytes):
+        """Analyze raw packets from the TSDuck process or the tap in-process"""
+        self.engine.feed(data)
+        if time.monotonic() >= self.next_update:
+            self.next_update += self.update_interval
+            self._publish_engine_stats(self.engine)
+            
+    def _analyze_mapped_file(self, path: str):
+        """Analyze a recording in parallel ranges over a memory mapping"""
+        with MappedTSFile(path) as ts_file:
+            self._publish_stats(ts_file.analyze(), ts_file.read_tables())
+            
+    def _publish_engine_stats(self, engine: 'TSPacketEngine'):
+        """Send engine statistics to the callback"""
+        self._publish_stats(engine.get_stats(), engine.tables)
+        
+    def _publish_stats(self, stats: Dict[str, Any], tables: Optional['PSISectionCache'] = None):
+        """Send in-process analysis statistics to the callback
+
+        Services and tables are only included when a table changed since
+        the last update, so their views are not rebuilt every second.
+        """
+        pid_types = self._pid_types(tables) if tables is not None else {}
         stream_info = StreamInfo(
-            bitrate=0,
-            packets_per_second=0,
-            errors=0,
-            pcr_accuracy=0.0,
-            continuity_errors=0,
-            services_count=0,
-            pids_count=0,
+            bitrate=stats['bitrate'],
+            packets_per_second=stats['packets_per_second'],
+            errors=stats['errors'],
+            pcr_accuracy=stats['pcr_accuracy'],
+            continuity_errors=stats['continuity_errors'],
+            services_count=len(tables.pat()['programs']) if tables is not None else 0,
+            pids_count=len(stats['pids']),
             video_streams=[],
             audio_streams=[],
             data_streams=[]
         )
+        pids = [
+            PIDInfo(
+                pid=f"0x{pid:04X}",
+                pid_type=pid_types.get(pid, ('Null' if pid == NULL_PID else 'Data', None))[0],
+                bitrate=pid_stats['bitrate'],
+                packets_count=pid_stats['packets'],
+                description=f"{pid_stats['cc_errors']} CC errors",
+                stream_type=pid_types.get(pid, (None, None))[1],
+                language=None
+            )
+            for pid, pid_stats in sorted(stats['pids'].items())
+        ]
+        update = {'stream_info': stream_info, 'pids': pids}
+        if tables is not None and tables.generation != self._tables_generation:
+            self._tables_generation = tables.generation
+            update['services'] = self._services(tables)
+            update['tables'] = self._tables(tables)
         
+        if self.callback:
+            self.callback(update)
+            
+    @staticmethod
+    def _pid_types(tables: 'PSISectionCache') -> Dict[int, tuple]:
+        """(pid_type, stream_type name) of the PIDs announced in PSI/SI"""
+        pat = tables.pat()
+        types = {PAT_PID: ('PAT', None), SDT_PID: ('SDT', None)}
+        if pat['nit_pid'] is not None:
+            types[pat['nit_pid']] = ('NIT', None)
+        types.update((pmt_pid, ('PMT', None)) for pmt_pid in pat['programs'].values())
+        for pmt in tables.pmts().values():
+            for stream in pmt['streams']:
+                probed = ProbedStream(stream['pid'], stream['stream_type'], stream['descriptor_tags'])
+                name = VIDEO_STREAM_TYPES.get(probed.stream_type) or AUDIO_STREAM_TYPES.get(probed.stream_type)
+                types[probed.pid] = ({'video': 'Video', 'audio': 'Audio', 'scte35': 'SCTE-35'}.get(probed.kind, 'Data'),
+                                     name or f"0x{probed.stream_type:02X}")
+        return types
+        
+    @staticmethod
+    def _services(tables: 'PSISectionCache') -> List[ServiceInfo]:
+        """Services of the PAT with their PMT streams and SDT names"""
+        pmts = tables.pmts()
+        sdt = tables.services()
         services = []
-        pids = []
-        tables = []
+        for number, pmt_pid in sorted(tables.pat()['programs'].items()):
+            streams = [ProbedStream(s['pid'], s['stream_type'], s['descriptor_tags'])
+                       for s in pmts.get(number, {}).get('streams', [])]
+            video = next((stream.pid for stream in streams if stream.kind == 'video'), None)
+            service_type = sdt.get(number, {}).get('service_type')
+            services.append(ServiceInfo(
+                service_id=f"0x{number:04X}",
+                name=sdt.get(number, {}).get('name') or f"Program {number}",
+                service_type=SERVICE_TYPE_NAMES.get(service_type, 'TV' if video is not None else 'Radio'),
+                pids=[f"0x{stream.pid:04X}" for stream in streams],
+                pmt_pid=f"0x{pmt_pid:04X}",
+                video_pid=f"0x{video:04X}" if video is not None else None,
+                audio_pids=[f"0x{stream.pid:04X}" for stream in streams if stream.kind == 'audio'],
+                subtitle_pids=[f"0x{stream.pid:04X}" for stream in streams if 0x59 in stream.descriptor_tags]
+            ))
+        return services
         
+    @staticmethod
+    def _tables(tables: 'PSISectionCache') -> List[TableInfo]:
+        """Current version of every table"""
+        names = {number: service['name'] for number, service in tables.services().items()}
+        infos = []
+        for table in sorted(tables.tables.values(), key=lambda t: (t.pid, t.table_id, t.table_id_extension)):
+            name = table.name
+            if table.table_id == TABLE_ID_PMT:
+                name += f" - {names.get(table.table_id_extension) or f'Program {table.table_id_extension}'}"
+            infos.append(TableInfo(
+                table_name=name,
+                pid=f"0x{table.pid:04X}",
+                version=table.version if table.version is not None else 0,
+                size=table.size,
+                last_update=datetime.fromtimestamp(table.updated_at),
+                sections_count=len(table.sections)
+            ))
+        return infos
+        
+    def _parse_tsduck_line(self, line: str):
+        """Parse one line of TSDuck output for preview data"""
+        stream_info, services, pids, tables = self.text_state
         try:
-            # Read output line by line
-            for line in iter(self.process.stdout.readline, ''):
-                if not self.running:
-                    break
-                    
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                # Parse different types of output
-                self._parse_analyze_line(line, stream_info)
-                self._parse_stats_line(line, stream_info)
-                self._parse_continuity_line(line, stream_info)
-                self._parse_tables_line(line, tables)
+            # Parse different types of output
+            self._parse_analyze_line(line, stream_info)
+            self._parse_stats_line(line, stream_info)
+            self._parse_continuity_line(line, stream_info)
+            self._parse_tables_line(line, tables)
+            
+            # Send updates to callback
+            if self.callback:
+                self.callback({
+                    'stream_info': stream_info,
+                    'services': services,
+                    'pids': pids,
+                    'tables': tables
+                })
                 
-                # Send updates to callback
-                if self.callback:
-                    self.callback({
-                        'stream_info': stream_info,
-                        'services': services,
-                        'pids': pids,
-                        'tables': tables
-                    })
-                    
         except Exception as e:
             logging.error(f"Error parsing TSDuck output: {e}")
             
@@ -272,10 +435,34 @@ class SourcePreviewProcessor:
                 pass
                 
     def _parse_tables_line(self, line: str, tables: List[TableInfo]):
-        """Parse tables plugin output"""
-        # This would parse table information from TSDuck output
-        # For now, we'll simulate some table data
-        pass
+        """Parse tables plugin output
+
+        A table is announced by "* PAT, TID 0 (0x00), PID 0 (0x0000)" and
+        followed by its "Version: 0, sections: 1, total size: 16 bytes" line.
+        """
+        header = TABLE_HEADER_RE.search(line)
+        if header:
+            self._table_header = (header.group(1), int(header.group(2)))
+            return
+        summary = TABLE_SUMMARY_RE.search(line)
+        if not summary or self._table_header is None:
+            return
+        name, pid = self._table_header
+        self._table_header = None
+        table = TableInfo(
+            table_name=name,
+            pid=f"0x{pid:04X}",
+            version=int(summary.group(1)),
+            size=int(summary.group(3)),
+            last_update=datetime.now(),
+            sections_count=int(summary.group(2))
+        )
+        for index, known in enumerate(tables):
+            if (known.table_name, known.pid) == (table.table_name, table.pid):
+                tables[index] = table
+                break
+        else:
+            tables.append(table)
         
     def _parse_bitrate(self, bitrate_str: str) -> int:
         """Parse bitrate string to integer"""
@@ -290,6 +477,23 @@ class SourcePreviewProcessor:
             return int(float(bitrate_str))
 
 
+def preview_dict(update: Dict[str, Any]) -> Dict[str, Any]:
+    """A preview update as plain dicts, in the form of PreviewDataGenerator"""
+    data = dict(update)
+    if 'stream_info' in update:
+        data['stream_info'] = asdict(update['stream_info'])
+    if 'services' in update:
+        data['services'] = [asdict(service) for service in update['services']]
+    if 'pids' in update:
+        data['pids'] = [{'pid': pid.pid, 'type': pid.pid_type, 'bitrate': pid.bitrate,
+                         'packets': pid.packets_count, 'description': pid.description}
+                        for pid in update['pids']]
+    if 'tables' in update:
+        data['tables'] = [{**asdict(table), 'last_update': table.last_update.strftime('%Y-%m-%d %H:%M:%S')}
+                          for table in update['tables']]
+    return data
+
+
 class PreviewDataGenerator:
     """Generate preview data for demonstration purposes"""
     
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+SCTE-35 Event Pipeline for IBE-100
+Typed splice events decoded from `tsp -P splicemonitor --json`, threefive
+or the splice_info_sections of tapped packets
+
+SpliceEventDecoder turns JSON text, one object per line or pretty-printed
+over several lines, into SpliceEvent objects without keyword matching.
+SpliceSectionDecoder decodes the SCTE-35 PID of a stream tap in-process,
+follow_tap wires one to a tap and a ring.
+Events are kept in a fixed-size SpliceEventRing: appends are O(1), the
+oldest events are dropped once it is full and subscribers are notified of
+every new event.
+"""
+
+import json
+import subprocess
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Callable, Tuple
+
+from ts_engine import SectionAssembler, parse_splice_info_section, select_packets
+
+PTS_CLOCK_HZ = 90000
+PTS_MASK = (1 << 33) - 1
+DEFAULT_RING_CAPACITY = 1024
+# Drop a multi-line object which never terminates
+MAX_PENDING_LINES = 10000
+
+
+def _normalize(obj: Dict[str, Any]) -> Dict[str, Any]:
+    """Lowercase keys with underscores, TSDuck uses dashes and '#name'"""
+    return {key.lstrip('#').lower().replace('-', '_'): value for key, value in obj.items()}
+
+
+def _first(obj: Dict[str, Any], *keys):
+    """First value present under one of the keys"""
+    for key in keys:
+        value = obj.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+def _to_int(value) -> Optional[int]:
+    """Integer from a JSON number or a decimal/hex string"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return int(str(value), 0)
+    except ValueError:
+        return None
+
+
+def _to_ticks(obj: Dict[str, Any], name: str) -> Optional[int]:
+    """90 kHz value of a threefive field, given in seconds or as *_ticks"""
+    ticks = _to_int(obj.get(f"{name}_ticks"))
+    if ticks is not None:
+        return ticks
+    seconds = obj.get(name)
+    if isinstance(seconds, (int, float)) and not isinstance(seconds, bool):
+        return round(seconds * PTS_CLOCK_HZ)
+    return None
+
+
+@dataclass
+class SpliceEvent:
+    """A decoded SCTE-35 event"""
+    source: str = ""
+    received: float = field(default_factory=time.time)
+    event_type: str = "splice"
+    command_type: Optional[str] = None
+    event_id: Optional[int] = None
+    pts: Optional[int] = None
+    duration: Optional[int] = None
+    out_of_network: Optional[bool] = None
+    immediate: Optional[bool] = None
+    pid: Optional[int] = None
+    packet: Optional[int] = None
+    raw: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def timestamp(self) -> str:
+        return datetime.fromtimestamp(self.received).strftime("%H:%M:%S")
+
+    @property
+    def description(self) -> str:
+        """One-line summary of the event"""
+        text = self.command_type or self.event_type
+        if self.event_id is not None:
+            text += f" event {self.event_id}"
+        if self.out_of_network is not None:
+            text += " (out)" if self.out_of_network else " (in)"
+        if self.duration is not None:
+            text += f" {self.duration / PTS_CLOCK_HZ:.1f}s"
+        return text
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = dict(vars(self))
+        data['timestamp'] = self.timestamp
+        return data
+
+    @classmethod
+    def from_json(cls, obj: Dict[str, Any], source: str = "") -> 'SpliceEvent':
+        """Build an event from a splicemonitor or threefive JSON object"""
+        top = _normalize(obj)
+        command = top.get('command')
+        if isinstance(command, dict):
+            # threefive Cue: {"info_section": {...}, "command": {...}, "descriptors": [...]}
+            command = _normalize(command)
+            return cls(
+                source=source,
+                event_type="cue",
+                command_type=_first(command, 'name', 'command_type'),
+                event_id=_to_int(command.get('splice_event_id')),
+                pts=_to_ticks(command, 'pts_time'),
+                duration=_to_ticks(command, 'break_duration'),
+                out_of_network=command.get('out_of_network_indicator'),
+                immediate=command.get('splice_immediate_flag'),
+                pid=_to_int(top.get('pid')),
+                packet=_to_int(top.get('packet')),
+                raw=obj,
+            )
+
+        command_type = _first(top, 'splice_command_name', 'command_name', 'splice_command_type', 'command_type')
+        return cls(
+            source=source,
+            event_type=str(_first(top, 'event_type', 'name') or "splice"),
+            command_type=str(command_type) if command_type is not None else None,
+            event_id=_to_int(_first(top, 'event_id', 'splice_event_id')),
+            pts=_to_int(_first(top, 'pts', 'pts_time', 'splice_time')),
+            duration=_to_int(_first(top, 'duration', 'break_duration')),
+            out_of_network=_first(top, 'out_of_network', 'out_of_network_indicator'),
+            immediate=_first(top, 'immediate', 'splice_immediate'),
+            pid=_to_int(top.get('pid')),
+            packet=_to_int(_first(top, 'packet_index', 'packet')),
+            raw=obj,
+        )
+
+    @classmethod
+    def from_section(cls, info: Dict[str, Any], source: str = "", pid: Optional[int] = None) -> 'SpliceEvent':
+        """Build an event from a parse_splice_info_section result"""
+        pts = info.get('pts_time')
+        if pts is not None:
+            pts = (pts + info.get('pts_adjustment', 0)) & PTS_MASK
+        return cls(
+            source=source,
+            event_type="section",
+            command_type=info.get('command_type'),
+            event_id=info.get('splice_event_id'),
+            pts=pts,
+            duration=info.get('break_duration'),
+            out_of_network=info.get('out_of_network'),
+            immediate=info.get('immediate'),
+            pid=pid,
+            raw=info,
+        )
+
+
+class SpliceEventDecoder:
+    """Incremental decoder of JSON text into splice events"""
+
+    def __init__(self, source: str = ""):
+        self.source = source
+        self._partial = ''
+        self._pending: List[str] = []
+        self.objects = 0
+        self.errors = 0
+
+    def feed(self, data) -> List[SpliceEvent]:
+        """Decode all complete objects in a chunk of text or bytes"""
+        if isinstance(data, bytes):
+            data = data.decode('utf-8', errors='replace')
+        lines = (self._partial + data).split('\n')
+        self._partial = lines.pop()
+        events = []
+        for line in lines:
+            event = self._decode_line(line)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def flush(self) -> List[SpliceEvent]:
+        """Decode what is left at end of stream"""
+        events = self.feed('\n') if self._partial else []
+        self._pending = []
+        return events
+
+    def _decode_line(self, line: str) -> Optional[SpliceEvent]:
+        if self._pending:
+            self._pending.append(line)
+            # Pretty-printed objects close at column 0
+            if line.rstrip() != '}':
+                if len(self._pending) > MAX_PENDING_LINES:
+                    self._pending = []
+                    self.errors += 1
+                return None
+            text = '\n'.join(self._pending)
+            self._pending = []
+            return self._decode(text)
+
+        start = line.find('{')
+        if start < 0:
+            return None
+        text = line[start:]
+        if text.rstrip() == '{':
+            self._pending = [text]
+            return None
+        return self._decode(text)
+
+    def _decode(self, text: str) -> Optional[SpliceEvent]:
+        try:
+            obj = json.loads(text)
+        except json.JSONDecodeError:
+            self.errors += 1
+            return None
+        if not isinstance(obj, dict):
+            return None
+        self.objects += 1
+        return SpliceEvent.from_json(obj, self.source)
+
+
+class SpliceSectionDecoder:
+    """Incremental decoder of the SCTE-35 PID of tapped TS packets"""
+
+    def __init__(self, pid: int, source: str = ""):
+        self.pid = pid
+        self.source = source
+        self.assembler = SectionAssembler(pid)
+        self.sections = 0
+        self.parse_errors = 0
+        self.crc_errors = 0
+
+    def feed(self, data) -> List[SpliceEvent]:
+        """Decode the sections completed by a chunk of aligned packets"""
+        events = []
+        for packet in select_packets(data, (self.pid,)):
+            for section in self.assembler.feed(packet):
+                try:
+                    info = parse_splice_info_section(section)
+                except (ValueError, IndexError):
+                    self.parse_errors += 1
+                    continue
+                self.sections += 1
+                if not info['crc_valid']:
+                    self.crc_errors += 1
+                elif info['command_type'] != 'splice_null':
+                    # splice_null is the heartbeat of an idle injector
+                    events.append(SpliceEvent.from_section(info, self.source, self.pid))
+        return events
+
+
+class SpliceEventRing:
+    """Fixed-size buffer of the latest splice events with subscribers"""
+
+    def __init__(self, capacity: int = DEFAULT_RING_CAPACITY):
+        self.capacity = capacity
+        self._events: deque = deque(maxlen=capacity)
+        self._subscribers: Tuple[Callable[[SpliceEvent], None], ...] = ()
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def append(self, event: SpliceEvent):
+        """Store an event and notify subscribers"""
+        with self._lock:
+            self._events.append(event)
+            self.total += 1
+            subscribers = self._subscribers
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"⚠️  Event subscriber error: {e}")
+
+    def subscribe(self, callback: Callable[[SpliceEvent], None]) -> Callable[[], None]:
+        """Call back on every new event, returns a function to unsubscribe"""
+        with self._lock:
+            self._subscribers = self._subscribers + (callback,)
+
+        def unsubscribe():
+            with self._lock:
+                self._subscribers = tuple(s for s in self._subscribers if s is not callback)
+        return unsubscribe
+
+    def since(self, sequence: int) -> Tuple[List[SpliceEvent], int]:
+        """Events appended after a sequence number, and the next sequence number"""
+        with self._lock:
+            first = self.total - len(self._events)
+            events = list(self._events)[max(sequence - first, 0):]
+            return events, self.total
+
+    def latest(self, count: int) -> List[SpliceEvent]:
+        with self._lock:
+            return list(self._events)[-count:] if count > 0 else []
+
+    @property
+    def dropped(self) -> int:
+        """Events which fell out of the buffer"""
+        return self.total - len(self._events)
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+            self.total = 0
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._events))
+
+
+def pump_events(stream, ring: SpliceEventRing, decoder: Optional[SpliceEventDecoder] = None,
+                should_stop: Optional[Callable[[], bool]] = None) -> int:
+    """Decode a text or binary stream into the ring until EOF, returns the event count"""
+    decoder = decoder or SpliceEventDecoder()
+    count = 0
+    for line in stream:
+        for event in decoder.feed(line):
+            ring.append(event)
+            count += 1
+        if should_stop and should_stop():
+            break
+    for event in decoder.flush():
+        ring.append(event)
+        count += 1
+    return count
+
+
+def spawn_monitor(command: List[str]) -> subprocess.Popen:
+    """Start a splicemonitor pipeline for pump_events
+
+    tsp writes plugin reports through its logger on stderr, so stderr is
+    merged into the stdout pipe the events are read from.
+    """
+    return subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            text=True, bufsize=1)
+
+
+def follow_tap(tap, pid: int, ring: SpliceEventRing, source: str = "") -> Callable[[], None]:
+    """Decode the SCTE-35 PID of a StreamTap into the ring, returns the unsubscribe function"""
+    decoder = SpliceSectionDecoder(pid, source or f"tap:{tap.port}")
+
+    def on_packets(data):
+        for event in decoder.feed(data):
+            ring.append(event)
+    return tap.subscribe(on_packets)
+
+
+# Example usage
+if __name__ == "__main__":
+    import sys
+
+    ring = SpliceEventRing()
+    ring.subscribe(lambda event: print(f"🎯 [{event.timestamp}] {event.description}"))
+    pump_events(sys.stdin, ring, SpliceEventDecoder("stdin"))
+    print(f"{ring.total} events, {ring.dropped} dropped")
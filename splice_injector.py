@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+SCTE-35 Splice Injector for IBE-100
+Persistent cue dispatch into a running TSDuck spliceinject plugin
+
+The spliceinject plugin is started once with --udp and keeps listening for
+binary splice_info_sections for the lifetime of the pipeline. Cues are encoded
+in memory and sent as UDP datagrams over one long-lived socket, so firing a
+cue on air never restarts tsp or touches the SRT output.
+"""
+
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Any
+
+from scte35_encoder import CueCache, default_cue_cache, encode_splice_null, PTS_CLOCK_HZ
+
+
+DEFAULT_INJECT_HOST = "127.0.0.1"
+DEFAULT_INJECT_PORT = 4444
+# Each cue is injected this many times, this many ms apart, starting this many ms before its splice time
+DEFAULT_INJECT_COUNT = 1
+DEFAULT_INJECT_INTERVAL = 1000
+DEFAULT_START_DELAY = 2000
+# Several binary sections may share one datagram, keep it below a typical MTU
+MAX_DATAGRAM_SIZE = 1400
+
+
+def spliceinject_args(pid: int, pts_pid: int, port: int = DEFAULT_INJECT_PORT,
+                      host: str = DEFAULT_INJECT_HOST, inject_count: int = DEFAULT_INJECT_COUNT,
+                      inject_interval: int = DEFAULT_INJECT_INTERVAL,
+                      start_delay: int = DEFAULT_START_DELAY) -> List[str]:
+    """tsp -P spliceinject arguments listening for cues on a UDP socket"""
+    return [
+        "-P", "spliceinject", "--pid", str(pid), "--pts-pid", str(pts_pid),
+        "--udp", f"{host}:{port}",
+        "--inject-count", str(inject_count), "--inject-interval", str(inject_interval),
+        "--start-delay", str(start_delay),
+    ]
+
+
+@dataclass
+class DispatchStats:
+    """Counters of a splice dispatcher"""
+    cues_sent: int = 0
+    datagrams_sent: int = 0
+    bytes_sent: int = 0
+    send_errors: int = 0
+    last_send_time: float = 0.0
+    last_send_latency_us: float = 0.0
+
+
+class SpliceDispatcher:
+    """Sends encoded cues to spliceinject over one persistent UDP socket"""
+
+    def __init__(self, host: str = DEFAULT_INJECT_HOST, port: int = DEFAULT_INJECT_PORT,
+                 cue_cache: Optional[CueCache] = None):
+        self.host = host
+        self.port = port
+        self.cue_cache = cue_cache or default_cue_cache
+        self.stats = DispatchStats()
+        self._sock: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+
+    def open(self):
+        """Create the socket, spliceinject does not need to be running yet"""
+        with self._lock:
+            self._open_locked()
+
+    def _open_locked(self) -> socket.socket:
+        """The socket, created if needed; the caller holds the lock"""
+        if self._sock is None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            # A connected UDP socket skips the route lookup on every send
+            sock.connect((self.host, self.port))
+            self._sock = sock
+        return self._sock
+
+    def close(self):
+        """Close the socket"""
+        with self._lock:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def is_open(self) -> bool:
+        return self._sock is not None
+
+    def send_sections(self, sections: List[bytes]) -> bool:
+        """Send sections, packing as many as fit in each datagram
+
+        The socket is opened, used and closed under one lock, so a close
+        from another thread never lands between the open and the send.
+        """
+        datagrams = []
+        current = b''
+        for section in sections:
+            if current and len(current) + len(section) > MAX_DATAGRAM_SIZE:
+                datagrams.append(current)
+                current = b''
+            current += section
+        if current:
+            datagrams.append(current)
+
+        with self._lock:
+            start = time.perf_counter()
+            try:
+                sock = self._open_locked()
+                for datagram in datagrams:
+                    sock.send(datagram)
+            except OSError as e:
+                # Nothing listening yet (ICMP port unreachable) or socket closed
+                self.stats.send_errors += 1
+                print(f"[ERROR] Failed to send SCTE-35 cue to {self.host}:{self.port}: {e}")
+                return False
+
+            self.stats.cues_sent += len(sections)
+            self.stats.datagrams_sent += len(datagrams)
+            self.stats.bytes_sent += sum(len(datagram) for datagram in datagrams)
+            self.stats.last_send_time = time.time()
+            self.stats.last_send_latency_us = (time.perf_counter() - start) * 1e6
+            return True
+
+    def send_section(self, section: bytes) -> bool:
+        """Send one splice_info_section"""
+        return self.send_sections([section])
+
+    def cue_out(self, event_id: int, duration_seconds: int = 0, pts_time: Optional[int] = None,
+                auto_return: bool = True) -> bool:
+        """Start an ad break, immediately unless a pts_time is given"""
+        duration = duration_seconds * PTS_CLOCK_HZ if duration_seconds > 0 else None
+        return self.send_section(self.cue_cache.splice_insert(
+            event_id, pts_time, out_of_network=True, immediate=pts_time is None,
+            duration=duration, auto_return=auto_return and duration is not None))
+
+    def cue_in(self, event_id: int, pts_time: Optional[int] = None) -> bool:
+        """Return to the network, immediately unless a pts_time is given"""
+        return self.send_section(self.cue_cache.splice_insert(
+            event_id, pts_time, out_of_network=False, immediate=pts_time is None))
+
+    def time_signal(self, pts_time: int) -> bool:
+        """Send a time_signal"""
+        return self.send_section(self.cue_cache.time_signal(pts_time))
+
+    def heartbeat(self) -> bool:
+        """Send a splice_null"""
+        return self.send_section(encode_splice_null())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Dispatcher counters and target"""
+        return {'target': f"{self.host}:{self.port}", **vars(self.stats)}
+
+
+# Example usage
+if __name__ == "__main__":
+    import sys
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_INJECT_PORT
+    print("Start tsp with:", " ".join(spliceinject_args(500, 256, port)))
+    with SpliceDispatcher(port=port) as dispatcher:
+        dispatcher.cue_out(10023, duration_seconds=600)
+        print(dispatcher.get_stats())
@@ -0,0 +1,680 @@
+#!/usr/bin/env python3
+"""
+SCTE-35 Packetizer for IBE-100
+Continuity-preserving section packetization into null packet slots
+
+Sections are packed into 188-byte packets with pointer fields and 0xFF
+stuffing, and every packet of the SCTE-35 PID leaving the injector is
+stamped from one continuity counter, including packets of that PID already
+present in the input. NullSlotInjector places the packets by overwriting
+null packets, so the output keeps the exact packet count and bitrate of the
+input. InjectionStage runs it between two tsp processes and listens for
+binary sections on the same UDP port protocol as `spliceinject --udp`, so
+SpliceDispatcher and the break scheduler work with either. Like spliceinject
+it injects each cue --inject-count times, --inject-interval ms apart, the
+first time --start-delay ms before its splice time on the PTS PID.
+
+Run as a script the stage is its own process around the on-air tsp command:
+it starts both halves with pipes between them, so a supervisor restarts the
+three as one unit and the GUI event loop never touches packets.
+
+Inputs without null packets, HLS in particular since segments carry no
+stuffing, leave no slot to overwrite. Cues are then appended after max_wait,
+which raises the output bitrate and breaks CBR; the stage logs it once.
+Add stuffing upstream (e.g. tsp --add-input-stuffing) to keep CBR.
+"""
+
+import argparse
+import heapq
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Tuple
+
+from ts_engine import (
+    TS_PACKET_SIZE, TS_SYNC_BYTE, NULL_PID, NUMPY_AVAILABLE, SectionAssembler, parse_splice_info_section
+)
+from splice_injector import (
+    DEFAULT_INJECT_HOST, DEFAULT_INJECT_PORT, DEFAULT_INJECT_COUNT, DEFAULT_INJECT_INTERVAL, DEFAULT_START_DELAY
+)
+from stream_clock import StreamClock, PTS_WRAP, HALF_WRAP
+from scte35_encoder import PTS_CLOCK_HZ, PTS_MASK
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+# Payload bytes of a packet without adaptation field
+PAYLOAD_SIZE = TS_PACKET_SIZE - 4
+# Upstream tsp sends to the first port, downstream tsp reads the second
+DEFAULT_STAGE_HOST = "127.0.0.1"
+DEFAULT_STAGE_PORT = 5980
+# Packets waiting longer for a null slot are added to the stream instead
+DEFAULT_MAX_WAIT = 1.0
+MAX_QUEUED_PACKETS = 4096
+# A frozen GUI runs the stage when started with this first argument
+RUN_STAGE_FLAG = "--run-stage"
+# Pipe mode reads the upstream tsp in chunks of whole packets
+PIPE_CHUNK_SIZE = 7 * TS_PACKET_SIZE * 16
+
+
+def split_sections(data: bytes) -> List[bytes]:
+    """Sections packed back to back in one datagram, as spliceinject --udp accepts them"""
+    sections = []
+    pos = 0
+    while pos + 3 <= len(data) and data[pos] != 0xFF:
+        length = 3 + (((data[pos + 1] & 0x0F) << 8) | data[pos + 2])
+        if pos + length > len(data):
+            break
+        sections.append(bytes(data[pos:pos + length]))
+        pos += length
+    return sections
+
+
+def packetize_sections(pid: int, sections: List[bytes], cc: int = 0, pack: bool = True) -> List[bytes]:
+    """TS packets carrying sections, continuity counters counting up from cc
+
+    Packed sections follow each other inside packets and a pointer field
+    marks the first section starting in a packet. Unpacked, every section
+    starts a new packet. The last packet is filled with 0xFF stuffing.
+    """
+    if not pack:
+        packets = []
+        for section in sections:
+            packets += packetize_sections(pid, [section], cc + len(packets))
+        return packets
+
+    payload = b''.join(sections)
+    starts = deque()
+    offset = 0
+    for section in sections:
+        starts.append(offset)
+        offset += len(section)
+
+    packets = []
+    pos = 0
+    while pos < len(payload):
+        while starts and starts[0] < pos:
+            starts.popleft()
+        start = starts[0] if starts else None
+        if start is not None and start - pos < PAYLOAD_SIZE - 1:
+            # A section starts here: payload_unit_start with a pointer field
+            chunk = payload[pos:pos + PAYLOAD_SIZE - 1]
+            body = bytes([start - pos]) + chunk
+            pusi = 0x40
+        elif start == pos + PAYLOAD_SIZE - 1:
+            # It would start on the last byte, stuff it and start it in the next packet
+            chunk = body = payload[pos:start]
+            pusi = 0
+        else:
+            chunk = body = payload[pos:pos + PAYLOAD_SIZE]
+            pusi = 0
+        pos += len(chunk)
+        header = bytes([TS_SYNC_BYTE, pusi | ((pid >> 8) & 0x1F), pid & 0xFF, 0x10 | ((cc + len(packets)) & 0x0F)])
+        packets.append((header + body).ljust(TS_PACKET_SIZE, b'\xff'))
+    return packets
+
+
+class SectionPacketizer:
+    """Packetizes sections of one PID keeping its continuity counter"""
+
+    def __init__(self, pid: int, cc: int = 0, pack: bool = True):
+        self.pid = pid
+        self.cc = cc & 0x0F
+        self.pack = pack
+
+    def packetize(self, sections: List[bytes]) -> List[bytes]:
+        packets = packetize_sections(self.pid, sections, self.cc, self.pack)
+        self.cc = (self.cc + len(packets)) & 0x0F
+        return packets
+
+    def stamp(self, buffer: bytearray, offset: int):
+        """Give the packet at offset the next continuity counter if it carries a payload"""
+        if buffer[offset + 3] & 0x10:
+            buffer[offset + 3] = (buffer[offset + 3] & 0xF0) | self.cc
+            self.cc = (self.cc + 1) & 0x0F
+        else:
+            # Packets without payload repeat the last counter
+            buffer[offset + 3] = (buffer[offset + 3] & 0xF0) | ((self.cc - 1) & 0x0F)
+
+
+@dataclass
+class InjectorStats:
+    """Counters of a null slot injector"""
+    sections: int = 0
+    packets_queued: int = 0
+    packets_injected: int = 0
+    packets_added: int = 0
+    packets_dropped: int = 0
+    null_packets: int = 0
+    passthrough_packets: int = 0
+    max_wait_ms: float = 0.0
+
+
+class NullSlotInjector:
+    """Places queued section packets in the null packet slots of a stream
+
+    process() keeps the packet count: a null packet is overwritten by the
+    next queued packet. Packets of the same PID already in the input share
+    the slots with ours and sections are never interleaved, so an input
+    packet may be delayed by the few packets of a cue. Only packets which
+    found no null slot for max_wait seconds are added to the stream, so
+    cues are late but never lost when the input carries no stuffing; None
+    keeps them queued instead.
+    """
+
+    def __init__(self, pid: int, null_pid: int = NULL_PID, max_wait: Optional[float] = DEFAULT_MAX_WAIT,
+                 max_queued: int = MAX_QUEUED_PACKETS, pack: bool = True, clock=time.monotonic):
+        if pid == null_pid:
+            raise ValueError(f"SCTE-35 PID {pid} is the null PID")
+        self.pid = pid
+        self.null_pid = null_pid
+        self.max_wait = max_wait
+        self.max_queued = max_queued
+        self.clock = clock
+        self.packetizer = SectionPacketizer(pid, pack=pack)
+        self.stats = InjectorStats()
+        # (packet, queued at, last packet of its sections)
+        self._queue: deque = deque()
+        # Input packets of our PID waiting for their turn
+        self._input: deque = deque()
+        self._input_sections = SectionAssembler(pid)
+        self._input_open = False
+        self._mid_batch = False
+        self._lock = threading.Lock()
+
+    def queue_sections(self, sections: List[bytes]) -> int:
+        """Queue sections for the next null slots, returns the packets queued"""
+        # Continuity counters are stamped when the packets are placed
+        packets = packetize_sections(self.pid, sections, pack=self.packetizer.pack)
+        now = self.clock()
+        with self._lock:
+            room = self.max_queued - len(self._queue)
+            if len(packets) > room:
+                self.stats.packets_dropped += len(packets)
+                logging.warning(f"SCTE-35 queue full, dropped {len(sections)} sections")
+                return 0
+            last = len(packets) - 1
+            self._queue.extend((packet, now, n == last) for n, packet in enumerate(packets))
+            self.stats.sections += len(sections)
+            self.stats.packets_queued += len(packets)
+        return len(packets)
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def _slots(self, buffer) -> List[Tuple[int, int]]:
+        """(offset, pid) of the null packets and packets of our PID"""
+        if NUMPY_AVAILABLE and len(buffer) >= 64 * TS_PACKET_SIZE:
+            block = np.frombuffer(buffer, dtype=np.uint8).reshape(-1, TS_PACKET_SIZE)
+            pids = ((block[:, 1].astype(np.uint16) & 0x1F) << 8) | block[:, 2]
+            rows = np.flatnonzero((pids == self.null_pid) | (pids == self.pid))
+            return [(int(row) * TS_PACKET_SIZE, int(pids[row])) for row in rows]
+        slots = []
+        for offset in range(0, len(buffer), TS_PACKET_SIZE):
+            pid = ((buffer[offset + 1] & 0x1F) << 8) | buffer[offset + 2]
+            if pid == self.null_pid or pid == self.pid:
+                slots.append((offset, pid))
+        return slots
+
+    def _next_packet(self) -> Optional[bytes]:
+        """Next packet of our PID, finishing any section in progress first"""
+        if self._queue and (self._mid_batch or (not self._input and not self._input_open)):
+            packet, queued_at, last = self._queue.popleft()
+            self._mid_batch = not last
+            self._record_wait(queued_at)
+            self.stats.packets_injected += 1
+            return packet
+        if self._input:
+            packet = self._input.popleft()
+            self._input_sections.feed(packet)
+            self._input_open = self._input_sections.pending
+            return packet
+        return None
+
+    def process(self, data) -> bytearray:
+        """The chunk of aligned packets with queued packets in its null slots"""
+        buffer = bytearray(data)
+        if not buffer or len(buffer) % TS_PACKET_SIZE or buffer[0] != TS_SYNC_BYTE:
+            return buffer
+        packetizer = self.packetizer
+        with self._lock:
+            if not self._queue and not self._input and not self._mid_batch:
+                # Nothing to place, only keep the counter of input packets of our PID
+                for offset, pid in self._slots(buffer):
+                    if pid == self.pid:
+                        self._input_sections.feed(buffer[offset:offset + TS_PACKET_SIZE])
+                        self._input_open = self._input_sections.pending
+                        packetizer.stamp(buffer, offset)
+                        self.stats.passthrough_packets += 1
+                    else:
+                        self.stats.null_packets += 1
+                return buffer
+
+            for offset, pid in self._slots(buffer):
+                if pid == self.pid:
+                    # Every slot of our PID is refilled from the merged sequence
+                    self._input.append(bytes(buffer[offset:offset + TS_PACKET_SIZE]))
+                    self.stats.passthrough_packets += 1
+                else:
+                    self.stats.null_packets += 1
+                packet = self._next_packet()
+                if packet is not None:
+                    buffer[offset:offset + TS_PACKET_SIZE] = packet
+                    packetizer.stamp(buffer, offset)
+
+            queue = self._queue
+            if queue and not self._input_open and self.max_wait is not None \
+                    and self.clock() - queue[0][1] >= self.max_wait:
+                # Starved of null packets: add the waiting packets after all
+                while queue:
+                    packet, queued_at, _ = queue.popleft()
+                    offset = len(buffer)
+                    buffer += packet
+                    packetizer.stamp(buffer, offset)
+                    self.stats.packets_added += 1
+                    self._record_wait(queued_at)
+                self._mid_batch = False
+        return buffer
+
+    def _record_wait(self, queued_at: float):
+        wait_ms = (self.clock() - queued_at) * 1000
+        if wait_ms > self.stats.max_wait_ms:
+            self.stats.max_wait_ms = wait_ms
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {'pid': self.pid, 'null_pid': self.null_pid, 'pending': self.pending, **vars(self.stats)}
+        stats['max_wait_ms'] = round(stats['max_wait_ms'], 3)
+        return stats
+
+
+def splice_pts(sections: List[bytes]) -> Optional[int]:
+    """Splice time of the first section with one, adjustment applied, None for immediate cues"""
+    for section in sections:
+        try:
+            info = parse_splice_info_section(section)
+        except ValueError:
+            continue
+        if info.get('pts_time') is not None:
+            return (info['pts_time'] + info.get('pts_adjustment', 0)) & PTS_MASK
+    return None
+
+
+@dataclass(order=True)
+class ScheduledCue:
+    """Next injection of a cue"""
+    due: float
+    sequence: int
+    sections: List[bytes] = field(compare=False)
+    remaining: int = field(compare=False)
+
+
+class CueSchedule:
+    """Repeats cues and holds cues with a splice time back, as spliceinject does
+
+    A cue with a splice time is first injected start_delay before it, mapped
+    to wall time through the stream clock of the PTS PID. Immediate cues, and
+    cues arriving while the clock has no timeline, go out on the next chunk.
+    """
+
+    def __init__(self, count: int = DEFAULT_INJECT_COUNT, interval: int = DEFAULT_INJECT_INTERVAL,
+                 start_delay: int = DEFAULT_START_DELAY, clock: Optional[StreamClock] = None):
+        self.count = max(1, count)
+        self.interval = interval / 1000
+        self.start_delay = start_delay / 1000
+        self.clock = clock
+        self.unscheduled = 0
+        self.injections = 0
+        self._heap: List[ScheduledCue] = []
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def add(self, sections: List[bytes], now: Optional[float] = None) -> float:
+        """Schedule a cue, returns the wall time of its first injection"""
+        now = time.time() if now is None else now
+        due = now
+        pts = splice_pts(sections)
+        if pts is not None:
+            stream_now = self.clock.pts_at(now) if self.clock is not None else None
+            if stream_now is None:
+                self.unscheduled += 1
+            else:
+                ahead = (pts - stream_now + HALF_WRAP) % PTS_WRAP - HALF_WRAP
+                due = now + max(0.0, ahead / PTS_CLOCK_HZ - self.start_delay)
+        with self._lock:
+            self._sequence += 1
+            heapq.heappush(self._heap, ScheduledCue(due, self._sequence, sections, self.count))
+        return due
+
+    def pop_due(self, now: Optional[float] = None) -> List[List[bytes]]:
+        """Sections of every cue due now, repeats are rescheduled"""
+        if not self._heap:
+            return []
+        now = time.time() if now is None else now
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0].due <= now:
+                cue = heapq.heappop(self._heap)
+                due.append(cue.sections)
+                if cue.remaining > 1:
+                    cue.remaining -= 1
+                    cue.due = now + self.interval
+                    heapq.heappush(self._heap, cue)
+        self.injections += len(due)
+        return due
+
+    @property
+    def pending(self) -> int:
+        return len(self._heap)
+
+
+class InjectionStage:
+    """Null slot SCTE-35 injection between two tsp processes
+
+    The upstream tsp outputs to input_port, each datagram is passed through
+    the injector and sent on to output_port where the downstream tsp reads
+    it. Datagrams keep their size, so the stage adds no burst and no delay
+    beyond one loopback hop. In pipe mode (see pump and stage_command) the
+    two halves write and read stdio instead and no data port is used.
+    """
+
+    def __init__(self, pid: int, null_pid: int = NULL_PID, inject_port: int = DEFAULT_INJECT_PORT,
+                 input_port: int = DEFAULT_STAGE_PORT, output_port: Optional[int] = None,
+                 host: str = DEFAULT_STAGE_HOST, inject_host: str = DEFAULT_INJECT_HOST,
+                 max_wait: Optional[float] = DEFAULT_MAX_WAIT, pts_pid: Optional[int] = None,
+                 inject_count: int = DEFAULT_INJECT_COUNT, inject_interval: int = DEFAULT_INJECT_INTERVAL,
+                 start_delay: int = DEFAULT_START_DELAY):
+        self.injector = NullSlotInjector(pid, null_pid, max_wait)
+        self.host = host
+        self.input_port = input_port
+        self.output_port = input_port + 1 if output_port is None else output_port
+        self.inject_host = inject_host
+        self.inject_port = inject_port
+        self.pts_pid = pts_pid
+        self.clock = StreamClock(pts_pid) if pts_pid is not None else None
+        self.schedule = CueSchedule(inject_count, inject_interval, start_delay, self.clock)
+        self.running = False
+        self.datagrams = 0
+        self.starved = False
+        self._sockets: List[socket.socket] = []
+        self._threads: List[threading.Thread] = []
+
+    def upstream_args(self, pipe: bool = False) -> List[str]:
+        """Output plugin of the tsp feeding the stage"""
+        return ['-O', 'file'] if pipe else ['-O', 'ip', f"{self.host}:{self.input_port}"]
+
+    def downstream_args(self, pipe: bool = False) -> List[str]:
+        """Input plugin of the tsp reading the stage"""
+        return ['-I', 'file'] if pipe else ['-I', 'ip', f"{self.host}:{self.output_port}"]
+
+    def split_command(self, command: List[str], split: Optional[int] = None,
+                      pipe: bool = False) -> Tuple[List[str], List[str]]:
+        """Split a tsp command into (upstream, downstream) at split, by default its output plugin
+
+        Plugins from split on, such as a monitor tap, run downstream and
+        see the injected stream.
+        """
+        split = command.index('-O') if split is None else split
+        return (command[:split] + self.upstream_args(pipe),
+                [command[0]] + self.downstream_args(pipe) + command[split:])
+
+    def stage_command(self, command: List[str], split: Optional[int] = None,
+                      python: str = sys.executable) -> List[str]:
+        """One command running this stage as its own process around a tsp command"""
+        upstream, downstream = self.split_command(command, split, pipe=True)
+        options = [
+            '--pid', str(self.injector.pid), '--null-pid', str(self.injector.null_pid),
+            '--inject-host', self.inject_host, '--inject-port', str(self.inject_port),
+            '--inject-count', str(self.schedule.count),
+            '--inject-interval', str(int(self.schedule.interval * 1000)),
+            '--start-delay', str(int(self.schedule.start_delay * 1000)),
+        ]
+        if self.pts_pid is not None:
+            options += ['--pts-pid', str(self.pts_pid)]
+        if self.injector.max_wait is not None:
+            options += ['--max-wait', str(self.injector.max_wait)]
+        return [*stage_entry(python), *options, '--', *upstream, '--', *downstream]
+
+    def start(self, relay: bool = True):
+        """Bind the data and cue sockets, the bound ports are in input_port and inject_port
+
+        Without relay only the cue socket is opened, for pump.
+        """
+        if self.running:
+            return
+        cue_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        cue_sock.bind((self.inject_host, self.inject_port))
+        self.inject_port = cue_sock.getsockname()[1]
+        cue_sock.settimeout(0.2)
+        self._sockets = [cue_sock]
+        self.running = True
+        self._threads = [threading.Thread(target=self._cue_loop, args=(cue_sock,),
+                                          name="splice-stage-cues", daemon=True)]
+        if relay:
+            data_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            data_sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+            data_sock.bind((self.host, self.input_port))
+            self.input_port = data_sock.getsockname()[1]
+            data_sock.settimeout(0.2)
+            out_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            out_sock.connect((self.host, self.output_port))
+            self._sockets += [data_sock, out_sock]
+            self._threads.append(threading.Thread(target=self._relay_loop, args=(data_sock, out_sock),
+                                                  name="splice-stage", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self.running = False
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        for sock in self._sockets:
+            sock.close()
+        self._threads = []
+        self._sockets = []
+
+    def process(self, data) -> bytearray:
+        """Track the PTS PID, queue the cues due and fill the null slots of one chunk"""
+        if self.clock is not None:
+            self.clock.feed(data)
+        for sections in self.schedule.pop_due():
+            self.injector.queue_sections(sections)
+        added = self.injector.stats.packets_added
+        out = self.injector.process(data)
+        if self.injector.stats.packets_added > added and not self.starved:
+            self.starved = True
+            logging.warning(f"No null PID {self.injector.null_pid} packets for {self.injector.max_wait}s, "
+                            f"SCTE-35 packets are added to the stream and the output is no longer CBR "
+                            f"(inputs such as HLS carry no stuffing)")
+        return out
+
+    def _relay_loop(self, data_sock: socket.socket, out_sock: socket.socket):
+        buffer = bytearray(65536)
+        view = memoryview(buffer)
+        while self.running:
+            try:
+                size = data_sock.recv_into(buffer)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.datagrams += 1
+            try:
+                out_sock.send(self.process(view[:size]))
+            except OSError:
+                # Downstream tsp not listening (yet)
+                pass
+
+    def pump(self, reader, writer, chunk_size: int = PIPE_CHUNK_SIZE) -> int:
+        """Pass a byte stream through the stage until EOF, returns the bytes written"""
+        pending = b''
+        written = 0
+        read = getattr(reader, 'read1', reader.read)
+        while True:
+            data = read(chunk_size)
+            if not data:
+                break
+            data = pending + data
+            aligned = len(data) - len(data) % TS_PACKET_SIZE
+            pending = data[aligned:]
+            if aligned:
+                out = self.process(memoryview(data)[:aligned])
+                writer.write(out)
+                writer.flush()
+                written += len(out)
+        return written
+
+    def _cue_loop(self, cue_sock: socket.socket):
+        while self.running:
+            try:
+                datagram = cue_sock.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            sections = split_sections(datagram)
+            if sections:
+                due = self.schedule.add(sections)
+                try:
+                    event_id = parse_splice_info_section(sections[0]).get('splice_event_id')
+                except ValueError:
+                    event_id = None
+                logging.info(f"Cue event {event_id} received, injected in {max(0.0, due - time.time()):.1f}s "
+                             f"x{self.schedule.count}")
+            else:
+                logging.error(f"Ignored a {len(datagram)} byte cue datagram without binary sections")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'input': f"{self.host}:{self.input_port}",
+            'output': f"{self.host}:{self.output_port}",
+            'cues': f"{self.inject_host}:{self.inject_port}",
+            'running': self.running,
+            'datagrams': self.datagrams,
+            'starved': self.starved,
+            'scheduled': self.schedule.pending,
+            'injections': self.schedule.injections,
+            'unscheduled': self.schedule.unscheduled,
+            'clock_locked': self.clock.locked if self.clock is not None else False,
+            **self.injector.get_stats(),
+        }
+
+
+def stage_entry(python: str = sys.executable) -> List[str]:
+    """Command starting the stage process, before its options
+
+    In a frozen build sys.executable is the application and this file is
+    not a script, the application runs the stage given RUN_STAGE_FLAG.
+    """
+    if getattr(sys, 'frozen', False):
+        return [sys.executable, RUN_STAGE_FLAG]
+    return [python, os.path.abspath(__file__)]
+
+
+def argue(argv: Optional[List[str]] = None):
+    """Parse command line arguments: stage options -- upstream tsp command -- downstream tsp command"""
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parser = argparse.ArgumentParser(
+        description="Inject SCTE-35 into the null packets between two tsp processes",
+        usage="%(prog)s [options] -- UPSTREAM_TSP_COMMAND -- DOWNSTREAM_TSP_COMMAND")
+    parser.add_argument("--pid", type=int, required=True, help="SCTE-35 PID")
+    parser.add_argument("--null-pid", type=int, default=NULL_PID, help="PID of the slots to fill (default: 8191)")
+    parser.add_argument("--pts-pid", type=int, default=None, help="PID whose PTS splice times refer to")
+    parser.add_argument("--inject-host", default=DEFAULT_INJECT_HOST, help="Cue socket address")
+    parser.add_argument("--inject-port", type=int, default=DEFAULT_INJECT_PORT, help="Cue socket port")
+    parser.add_argument("--inject-count", type=int, default=DEFAULT_INJECT_COUNT, help="Injections of each cue")
+    parser.add_argument("--inject-interval", type=int, default=DEFAULT_INJECT_INTERVAL,
+                        help="Milliseconds between two injections of a cue")
+    parser.add_argument("--start-delay", type=int, default=DEFAULT_START_DELAY,
+                        help="Milliseconds before its splice time a cue is first injected")
+    parser.add_argument("--max-wait", type=float, default=DEFAULT_MAX_WAIT,
+                        help="Seconds a cue waits for a null packet before it is added")
+    if argv.count('--') < 2:
+        parser.error("an upstream and a downstream command, each after --, are required")
+    first = argv.index('--')
+    second = argv.index('--', first + 1)
+    args = parser.parse_args(argv[:first])
+    args.upstream, args.downstream = argv[first + 1:second], argv[second + 1:]
+    if not args.upstream or not args.downstream:
+        parser.error("empty upstream or downstream command")
+    return args
+
+
+def main(argv: Optional[List[str]] = None):
+    """Run both tsp halves with the stage between their pipes, exits when either ends"""
+    # A supervisor stops the stage with SIGTERM, the children go with it. The
+    # handler only raises while pumping, never half way through a Popen.
+    state = {'pumping': False, 'stopped': False}
+
+    def on_sigterm(signum, frame):
+        state['stopped'] = True
+        if state['pumping']:
+            raise SystemExit(143)
+    signal.signal(signal.SIGTERM, on_sigterm)
+
+    args = argue(argv)
+    logging.basicConfig(level=logging.INFO, format="* splice-stage: %(message)s")
+    stage = InjectionStage(args.pid, args.null_pid, args.inject_port, inject_host=args.inject_host,
+                           max_wait=args.max_wait, pts_pid=args.pts_pid, inject_count=args.inject_count,
+                           inject_interval=args.inject_interval, start_delay=args.start_delay)
+    try:
+        stage.start(relay=False)
+    except OSError as e:
+        print(f"[ERROR] Cue socket {args.inject_host}:{args.inject_port}: {e}", file=sys.stderr)
+        return 1
+    children: List[subprocess.Popen] = []
+    try:
+        downstream = subprocess.Popen(args.downstream, stdin=subprocess.PIPE)
+        children.append(downstream)
+        upstream = subprocess.Popen(args.upstream, stdout=subprocess.PIPE)
+        children.append(upstream)
+        state['pumping'] = True
+        if state['stopped']:
+            return 143
+        try:
+            stage.pump(upstream.stdout, downstream.stdin)
+            # Upstream ended, let downstream drain what it was given
+            downstream.stdin.close()
+            downstream.wait(timeout=10)
+        except (BrokenPipeError, ValueError, subprocess.TimeoutExpired):
+            # Downstream ended first, or did not end; it is stopped below
+            pass
+        state['pumping'] = False
+        stats = stage.get_stats()
+        logging.info(f"{stats['packets_injected']} packets injected, {stats['packets_added']} added")
+        return upstream.poll() or downstream.poll() or 0
+    except OSError as e:
+        print(f"[ERROR] Cannot start tsp: {e}", file=sys.stderr)
+        return 1
+    finally:
+        state['pumping'] = False
+        for process in children:
+            if process.poll() is None:
+                process.terminate()
+        for process in children:
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        stage.stop()
+
+
+# Example usage
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main())
+    from scte35_encoder import encode_splice_insert
+
+    injector = NullSlotInjector(pid=500)
+    injector.queue_sections([encode_splice_insert(10023, immediate=True, duration=30 * 90000)])
+    null = bytes([TS_SYNC_BYTE, 0x1F, 0xFF, 0x10]).ljust(TS_PACKET_SIZE, b'\xff')
+    video = bytes([TS_SYNC_BYTE, 0x01, 0x00, 0x10]).ljust(TS_PACKET_SIZE, b'\x00')
+    stream = injector.process((video * 6 + null) * 2)
+    print(f"{len(stream) // TS_PACKET_SIZE} packets out, {injector.get_stats()}")
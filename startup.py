@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Startup Helpers for IBE-100
+Import-free dependency checks and per-phase startup timing
+
+Dependencies are checked with importlib.util.find_spec, which locates a
+package without executing it, so checking numpy or matplotlib no longer
+costs their import time. Results are cached for the life of the process.
+StartupTimer records how long each launch phase took, from the first
+import to the first painted window.
+"""
+
+import importlib.util
+import sys
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Iterable
+
+# Import names that differ from the pip package name
+IMPORT_NAMES = {
+    'pyyaml': 'yaml',
+    'PyYAML': 'yaml',
+}
+
+
+@lru_cache(maxsize=None)
+def module_available(name: str) -> bool:
+    """True if the module can be imported, without importing it"""
+    name = IMPORT_NAMES.get(name, name)
+    if name in sys.modules:
+        return True
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        # A missing parent package of a dotted name, or a broken __spec__
+        return False
+
+
+def check_modules(names: Iterable[str]) -> Dict[str, bool]:
+    """Availability of each package"""
+    return {name: module_available(name) for name in names}
+
+
+class StartupTimer:
+    """Wall time of consecutive launch phases"""
+
+    def __init__(self, started: Optional[float] = None):
+        self.started = started if started is not None else time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+        self._last = self.started
+
+    def mark(self, name: str):
+        """End the current phase"""
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a block as its own phase, anything before it goes to 'other'"""
+        if time.perf_counter() - self._last > 0.0005:
+            self.mark('other')
+        try:
+            yield
+        finally:
+            self.mark(name)
+
+    @property
+    def total(self) -> float:
+        return self._last - self.started
+
+    def report(self) -> str:
+        """One line per phase, slowest phases stand out by their share"""
+        total = self.total or 1e-9
+        lines = [f"Startup: {self.total * 1000:.0f} ms"]
+        for name, seconds in self.phases:
+            lines.append(f"  {name:<24} {seconds * 1000:8.1f} ms  {seconds / total * 100:5.1f}%")
+        return "\n".join(lines)
+
+
+# Example usage
+if __name__ == "__main__":
+    timer = StartupTimer()
+    with timer.phase("dependency check"):
+        print(check_modules(['PyQt6', 'numpy', 'matplotlib', 'psutil', 'requests', 'pyqtgraph', 'qdarkstyle']))
+    with timer.phase("sleep"):
+        time.sleep(0.02)
+    print(timer.report())
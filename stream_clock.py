@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Stream Clock for IBE-100
+Wall clock to PTS mapping of a running stream, for cue generators
+
+StreamClock follows the PTS (or PCR) of one PID, normally the --pts-pid of
+spliceinject, unwraps the 33-bit counter and fits a line through recent
+(wall time, PTS) pairs. Packets arrive late by a varying amount, so each
+quarter second keeps only its least delayed pair. A timestamp that lands
+far off the line starts a new timeline, as after a splice or an encoder
+restart. "PTS at wall time T" is then one multiply-add on the current fit.
+
+Generators call stream_pts(), which uses the registered clock and falls
+back to the wall clock while no stream is tracked.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+from ts_engine import TS_PACKET_SIZE, select_packets
+from scte35_encoder import PTS_CLOCK_HZ, PTS_MASK
+
+PTS_WRAP = 1 << 33
+HALF_WRAP = 1 << 32
+
+DEFAULT_CLOCK = "default"
+# One fit point per bucket, the fit spans window buckets (30 s)
+BUCKET_SECONDS = 0.25
+WINDOW_BUCKETS = 120
+# The fit slope is only trusted over this span and close to 90 kHz
+MIN_FIT_SPAN = 2.0
+MAX_SLOPE_ERROR = 0.01
+# Off the fit by more than this is a discontinuity
+MAX_ERROR_SECONDS = 1.0
+STALE_SECONDS = 5.0
+
+
+def packet_timestamps(packet) -> Tuple[Optional[int], Optional[int]]:
+    """(PCR base, PTS) of one packet in 90 kHz ticks, None where absent"""
+    afc = (packet[3] >> 4) & 0x03
+    pos = 4
+    pcr = None
+    if afc & 0x02:
+        af_len = packet[4]
+        if af_len >= 7 and packet[5] & 0x10:
+            pcr = (packet[6] << 25) | (packet[7] << 17) | (packet[8] << 9) | (packet[9] << 1) | (packet[10] >> 7)
+        pos = 5 + af_len
+    pts = None
+    # PES header with PTS at the start of a payload unit
+    if packet[1] & 0x40 and afc & 0x01 and pos + 14 <= TS_PACKET_SIZE \
+            and packet[pos] == 0 and packet[pos + 1] == 0 and packet[pos + 2] == 1 and packet[pos + 7] & 0x80:
+        p = pos + 9
+        pts = (((packet[p] >> 1) & 0x07) << 30) | (packet[p + 1] << 22) | ((packet[p + 2] >> 1) << 15) \
+            | (packet[p + 3] << 7) | (packet[p + 4] >> 1)
+    return pcr, pts
+
+
+class StreamClock:
+    """Wall clock to PTS regression of one PID
+
+    Samples are added from one thread (the tap receiver); pts_at reads an
+    immutable fit tuple and may be called from any thread without locking.
+    """
+
+    def __init__(self, pid: Optional[int] = None, source: str = 'pts', bucket: float = BUCKET_SECONDS,
+                 window: int = WINDOW_BUCKETS, max_error: float = MAX_ERROR_SECONDS,
+                 stale_after: float = STALE_SECONDS):
+        if source not in ('pts', 'pcr'):
+            raise ValueError(f"Unknown clock source: {source}")
+        self.pid = pid
+        self.source = source
+        self.bucket = bucket
+        self.max_error_ticks = max_error * PTS_CLOCK_HZ
+        self.stale_after = stale_after
+        self.window: deque = deque(maxlen=window)
+        self.discontinuities = 0
+        self.wraps = 0
+        self.samples = 0
+        self.reset()
+
+    def reset(self):
+        """Forget the timeline, the next sample starts a new one"""
+        self.window.clear()
+        self._sums = [0, 0.0, 0.0, 0.0, 0.0]    # n, sx, sy, sxx, sxy
+        self._last_raw: Optional[int] = None
+        self._unwrapped = 0
+        self._bucket_start = None
+        self._origin: Tuple[float, int] = (0.0, 0)
+        # (wall origin, PTS origin, slope, intercept, last sample wall time)
+        self._fit: Optional[Tuple[float, int, float, float, float]] = None
+
+    # -- input -----------------------------------------------------------
+
+    def feed(self, data, wall: Optional[float] = None) -> int:
+        """Take the timestamps of this clock's PID from aligned TS packets"""
+        if self.pid is None:
+            return 0
+        wall = time.time() if wall is None else wall
+        found = 0
+        for packet in select_packets(data, (self.pid,)):
+            pcr, pts = packet_timestamps(packet)
+            ticks = pcr if self.source == 'pcr' else pts
+            if ticks is not None:
+                self.observe(ticks, wall)
+                found += 1
+        return found
+
+    def observe(self, ticks: int, wall: Optional[float] = None) -> bool:
+        """Add one timestamp seen at wall time, False if it started a new timeline"""
+        wall = time.time() if wall is None else wall
+        ticks &= PTS_MASK
+        self.samples += 1
+        if self._last_raw is None:
+            self._start(ticks, wall)
+            return True
+        step = (ticks - self._last_raw) % PTS_WRAP
+        if step >= HALF_WRAP:
+            step -= PTS_WRAP
+        if self._last_raw + step >= PTS_WRAP or self._last_raw + step < 0:
+            self.wraps += 1
+        unwrapped = self._unwrapped + step
+
+        wall0, pts0, slope, intercept, _ = self._fit
+        if abs(unwrapped - pts0 - (intercept + slope * (wall - wall0))) > self.max_error_ticks:
+            self.discontinuities += 1
+            self.reset()
+            self._start(ticks, wall)
+            return False
+        self._last_raw = ticks
+        self._unwrapped = unwrapped
+        self._add(wall, unwrapped)
+        return True
+
+    def _start(self, ticks: int, wall: float):
+        self._last_raw = ticks
+        self._unwrapped = ticks
+        self._origin = (wall, ticks)
+        self._add(wall, ticks)
+
+    def _add(self, wall: float, unwrapped: int):
+        x = wall - self._origin[0]
+        y = float(unwrapped - self._origin[1])
+        if self._bucket_start is not None and wall - self._bucket_start < self.bucket:
+            # Same bucket: keep the least delayed pair, the one furthest ahead of the nominal clock
+            bx, by = self.window[-1]
+            if y - PTS_CLOCK_HZ * x <= by - PTS_CLOCK_HZ * bx:
+                self._refit(wall)
+                return
+            self.window.pop()
+            self._update_sums(bx, by, -1)
+        else:
+            self._bucket_start = wall
+            if len(self.window) == self.window.maxlen:
+                self._update_sums(*self.window[0], -1)
+        self.window.append((x, y))
+        self._update_sums(x, y, 1)
+        self._refit(wall)
+
+    def _update_sums(self, x: float, y: float, sign: int):
+        sums = self._sums
+        sums[0] += sign
+        sums[1] += sign * x
+        sums[2] += sign * y
+        sums[3] += sign * x * x
+        sums[4] += sign * x * y
+
+    def _refit(self, wall: float):
+        n, sx, sy, sxx, sxy = self._sums
+        slope = float(PTS_CLOCK_HZ)
+        if n >= 2 and self.window[-1][0] - self.window[0][0] >= MIN_FIT_SPAN:
+            fitted = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+            if abs(fitted / PTS_CLOCK_HZ - 1) <= MAX_SLOPE_ERROR:
+                slope = fitted
+        self._fit = (self._origin[0], self._origin[1], slope, (sy - slope * sx) / n, wall)
+
+    # -- output ----------------------------------------------------------
+
+    @property
+    def locked(self) -> bool:
+        fit = self._fit
+        return fit is not None and time.time() - fit[4] < self.stale_after
+
+    def pts_at(self, wall: Optional[float] = None) -> Optional[int]:
+        """33-bit PTS the stream has at wall time, None without a recent timeline"""
+        fit = self._fit
+        if fit is None or time.time() - fit[4] >= self.stale_after:
+            return None
+        wall0, pts0, slope, intercept, _ = fit
+        wall = time.time() if wall is None else wall
+        return (pts0 + int(round(intercept + slope * (wall - wall0)))) & PTS_MASK
+
+    def get_stats(self) -> Dict[str, Any]:
+        fit = self._fit
+        return {
+            'pid': self.pid,
+            'source': self.source,
+            'locked': self.locked,
+            'samples': self.samples,
+            'fit_points': len(self.window),
+            'discontinuities': self.discontinuities,
+            'wraps': self.wraps,
+            'drift_ppm': round((fit[2] / PTS_CLOCK_HZ - 1) * 1e6, 1) if fit else None,
+            'pts_now': self.pts_at(),
+        }
+
+
+_clocks: Dict[str, StreamClock] = {}
+_clocks_lock = threading.Lock()
+
+
+def register_clock(clock: StreamClock, name: str = DEFAULT_CLOCK):
+    """Make a clock the source of stream_pts for name"""
+    with _clocks_lock:
+        _clocks[name] = clock
+
+
+def unregister_clock(name: str = DEFAULT_CLOCK, clock: Optional[StreamClock] = None):
+    """Remove the clock of name, only if it is still clock when one is given"""
+    with _clocks_lock:
+        if clock is None or _clocks.get(name) is clock:
+            _clocks.pop(name, None)
+
+
+def get_clock(name: str = DEFAULT_CLOCK) -> Optional[StreamClock]:
+    return _clocks.get(name)
+
+
+def track_tap(tap, pid: int, name: str = DEFAULT_CLOCK,
+              source: str = 'pts') -> Tuple[StreamClock, Callable[[], None]]:
+    """Clock of pid fed from a StreamTap and registered as name
+
+    Returns the clock and the function which unsubscribes and unregisters it.
+    """
+    clock = StreamClock(pid, source)
+    unsubscribe = tap.subscribe(clock.feed)
+    register_clock(clock, name)
+
+    def stop():
+        unsubscribe()
+        unregister_clock(name, clock)
+    return clock, stop
+
+
+def stream_pts(offset_ticks: int = 0, wall: Optional[float] = None, name: str = DEFAULT_CLOCK) -> int:
+    """PTS for a generated cue: the tracked stream PTS at wall time plus offset
+
+    Without a locked clock this is the wall clock in 90 kHz ticks, as the
+    generators used before, masked to 33 bits either way.
+    """
+    clock = _clocks.get(name)
+    pts = clock.pts_at(wall) if clock is not None else None
+    if pts is None:
+        pts = int((time.time() if wall is None else wall) * PTS_CLOCK_HZ)
+    return (pts + offset_ticks) & PTS_MASK
+
+
+# Example usage
+if __name__ == "__main__":
+    clock = StreamClock(pid=256)
+    start = time.time()
+    # A 25 fps stream starting just before the 33-bit wrap, arriving with up to 40 ms delay
+    pts = PTS_WRAP - 5 * PTS_CLOCK_HZ
+    for frame in range(25 * 20):
+        clock.observe(pts + frame * 3600, start + frame / 25 + (frame * 7 % 40) / 1000)
+    print(clock.get_stats())
+    print("PTS 1 s after the last frame:", clock.pts_at(start + 21))
+    print("stream_pts fallback:", stream_pts(), "registered:", (register_clock(clock), stream_pts())[1])
@@ -20,6 +20,19 @@ try:
 except ImportError:
     PSUTIL_AVAILABLE = False
 
+from influx_writer import InfluxLineWriter, DEFAULT_SPOOL, escape_tag
+from metrics_store import MetricsStore
+from alert_rules import AlertRuleEngine, AlertRule
+from stream_clock import StreamClock
+from stream_tap import StreamTap, tap_args, DEFAULT_TAP_HOST, DEFAULT_TAP_PORT
+from ts_engine import TSPacketEngine, TS_PACKET_SIZE, NUMPY_AVAILABLE as TS_ENGINE_AVAILABLE
+
+
+def monitor_tap_args(port: int = DEFAULT_TAP_PORT, host: str = DEFAULT_TAP_HOST,
+                     tsp_binary: str = "tsp") -> List[str]:
+    """tsp plugin arguments duplicating the whole stream to a monitor tap"""
+    return tap_args(port, host, tsp_binary=tsp_binary)
+
 
 @dataclass
 class StreamStats:
@@ -38,12 +51,22 @@ class StreamStats:
     network_out: int
 
 
+# Numeric StreamStats fields, stored as columns
+STATS_FIELDS = ('bitrate', 'packets_per_second', 'errors', 'pcr_accuracy', 'continuity_errors',
+                'services_count', 'pids_count', 'cpu_usage', 'memory_usage', 'network_in', 'network_out')
+FLOAT_FIELDS = ('pcr_accuracy', 'cpu_usage', 'memory_usage')
+
+
 class MetricsCollector:
-    """Collect system and stream metrics"""
+    """Collect system and stream metrics
+
+    History is kept in a columnar MetricsStore, one ring per field plus
+    10 s and 1 min rollups, instead of a list of StreamStats objects.
+    """
     
-    def __init__(self):
-        self.stats_history = []
-        self.max_history = 1000
+    def __init__(self, max_history: int = 3600):
+        self.max_history = max_history
+        self.store = MetricsStore(STATS_FIELDS, raw_capacity=max_history)
         self.callbacks = []
         
     def add_callback(self, callback: Callable[[StreamStats], None]):
@@ -86,11 +109,7 @@ class MetricsCollector:
         
     def update_stats(self, stats: StreamStats):
         """Update statistics and notify callbacks"""
-        self.stats_history.append(stats)
-        
-        # Keep only recent history
-        if len(self.stats_history) > self.max_history:
-            self.stats_history = self.stats_history[-self.max_history:]
+        self.store.append(stats.timestamp.timestamp(), [getattr(stats, name) for name in STATS_FIELDS])
             
         # Notify callbacks
         for callback in self.callbacks:
@@ -100,25 +119,77 @@ class MetricsCollector:
                 logging.error(f"Error in stats callback: {e}")
                 
     def get_history(self, count: int = None) -> List[StreamStats]:
-        """Get statistics history"""
-        if count is None:
-            return self.stats_history.copy()
-        return self.stats_history[-count:] if count > 0 else []
+        """Get statistics history, only the requested samples are turned into objects"""
+        if count is not None and count <= 0:
+            return []
+        ring = self.store.raw
+        times = ring.timestamps(count)
+        columns = [ring.window(name, count).tolist() for name in STATS_FIELDS]
+        history = []
+        for i, timestamp in enumerate(times.tolist()):
+            values = {name: column[i] if name in FLOAT_FIELDS else int(column[i])
+                      for name, column in zip(STATS_FIELDS, columns)}
+            history.append(StreamStats(timestamp=datetime.fromtimestamp(timestamp), **values))
+        return history
+        
+    def window(self, field: str, seconds: float, resolution: Optional[float] = None):
+        """Values of one field over the last seconds, a view into the store"""
+        if resolution is None:
+            resolution = self.store.resolution_for(seconds)
+        return self.store.window(field, seconds, time.time(), resolution)
+        
+    def summary(self, field: str, seconds: float) -> Dict[str, float]:
+        """min, max, mean and percentiles of one field over the last seconds"""
+        resolution = self.store.resolution_for(seconds)
+        return self.store.series(resolution).summary(field, since=time.time() - seconds)
 
 
 class TSDuckMonitor:
-    """Monitor TSDuck process and stream"""
+    """Monitor TSDuck process and stream
+
+    Stream metrics come from the packets themselves: the pipeline copies its
+    output to a local UDP tap (see tap_args) and the packets are counted and
+    checked in-process by TSPacketEngine. With a pts_pid the tapped packets
+    also drive a StreamClock of that PID. The monitor opens its own
+    StreamTap unless it is given one shared with other monitors.
+    """
     
-    def __init__(self):
+    def __init__(self, tap_port: int = DEFAULT_TAP_PORT, tap_host: str = DEFAULT_TAP_HOST,
+                 pts_pid: Optional[int] = None, tap: Optional[StreamTap] = None):
         self.monitoring = False
         self.monitor_thread = None
         self.metrics_collector = MetricsCollector()
         self.process = None
         self.output_queue = queue.Queue()
+        self.tap = tap or StreamTap(tap_port, tap_host)
+        self._owns_tap = tap is None
+        self._unsubscribe = None
+        # Tables are tracked for the services count of the PAT
+        self.engine = TSPacketEngine(track_tables=True) if TS_ENGINE_AVAILABLE else None
+        self.engine_lock = threading.Lock()
+        self.last_engine_stats: Dict[str, Any] = {}
+        self._last_sample = None
+        self.clock = StreamClock(pts_pid) if pts_pid is not None else None
         
-    def start_monitoring(self, process: subprocess.Popen):
-        """Start monitoring TSDuck process"""
+    @property
+    def tap_port(self) -> int:
+        return self.tap.port
+
+    @property
+    def tap_host(self) -> str:
+        return self.tap.host
+        
+    def tap_args(self, tsp_binary: str = "tsp") -> List[str]:
+        """Plugin arguments to insert before -O in the monitored tsp command"""
+        return self.tap.args(tsp_binary)
+        
+    def start_monitoring(self, process: Optional[subprocess.Popen] = None):
+        """Start monitoring TSDuck process, the tap is subscribed to first"""
         self.process = process
+        if (self.engine is not None or self.clock is not None) and self._unsubscribe is None:
+            self._unsubscribe = self.tap.subscribe(self.feed)
+            if self._owns_tap:
+                self.tap.start()
         self.monitoring = True
         self.monitor_thread = threading.Thread(target=self._monitor_loop)
         self.monitor_thread.daemon = True
@@ -129,16 +200,29 @@ class TSDuckMonitor:
         self.monitoring = False
         if self.monitor_thread:
             self.monitor_thread.join(timeout=1.0)
+        if self._unsubscribe:
+            self._unsubscribe()
+            self._unsubscribe = None
+        if self._owns_tap:
+            self.tap.stop()
             
+    def feed(self, data):
+        """Analyze a chunk of tapped packets"""
+        if self.engine is not None:
+            with self.engine_lock:
+                self.engine.feed(data)
+        if self.clock is not None:
+            self.clock.feed(data)
+        
     def _monitor_loop(self):
         """Main monitoring loop"""
-        while self.monitoring and self.process:
+        while self.monitoring and (self.process is None or self.process.poll() is None):
             try:
                 # Collect system metrics
                 stats = self.metrics_collector.collect_stats()
                 
-                # Parse TSDuck output for stream metrics
-                self._parse_tsduck_output(stats)
+                # Stream metrics from the tapped packets
+                self._collect_stream_metrics(stats)
                 
                 # Update statistics
                 self.metrics_collector.update_stats(stats)
@@ -149,38 +233,60 @@ class TSDuckMonitor:
                 logging.error(f"Error in monitoring loop: {e}")
                 time.sleep(1.0)
                 
-    def _parse_tsduck_output(self, stats: StreamStats):
-        """Parse TSDuck output for stream metrics"""
-        # This would parse actual TSDuck output
-        # For now, simulate some metrics
-        if self.process and self.process.poll() is None:
-            # Simulate stream metrics
-            stats.bitrate = 15000000  # 15 Mbps
-            stats.packets_per_second = 25000
-            stats.pcr_accuracy = 99.9
-            stats.services_count = 5
-            stats.pids_count = 20
+    def _collect_stream_metrics(self, stats: StreamStats):
+        """Fill stream metrics, rates and error counts are per interval"""
+        if self.engine is None:
+            return
+        with self.engine_lock:
+            engine_stats = self.engine.get_stats()
+        self.last_engine_stats = engine_stats
+        now = time.monotonic()
+        sample = (now, engine_stats['total_packets'], engine_stats['errors'],
+                  engine_stats['continuity_errors'])
+        if self._last_sample is not None:
+            elapsed = now - self._last_sample[0]
+            packets = sample[1] - self._last_sample[1]
+            if elapsed > 0:
+                stats.packets_per_second = int(packets / elapsed)
+                stats.bitrate = int(packets * TS_PACKET_SIZE * 8 / elapsed)
+            stats.errors = sample[2] - self._last_sample[2]
+            stats.continuity_errors = sample[3] - self._last_sample[3]
+        self._last_sample = sample
+        stats.pcr_accuracy = engine_stats['pcr_accuracy']
+        stats.pids_count = len(engine_stats['pids'])
+        stats.services_count = engine_stats['services_count']
 
 
 class InfluxDBExporter:
     """Export metrics to InfluxDB"""
     
     def __init__(self, host: str = "localhost", port: int = 8086, 
-                 database: str = "tsduck", username: str = None, password: str = None):
+                 database: str = "tsduck", username: str = None, password: str = None,
+                 channel: str = "", spool_dir: Optional[str] = DEFAULT_SPOOL,
+                 writer: Optional[InfluxLineWriter] = None):
         self.host = host
         self.port = port
         self.database = database
         self.username = username
         self.password = password
+        self.channel = channel
         self.enabled = False
+        # Channels may share one writer so their points go out in the same batches,
+        # a shared writer is closed by whoever created it
+        self.owns_writer = writer is None
+        self.writer = writer or InfluxLineWriter(host, port, database, username, password,
+                                                 spool_dir=spool_dir)
         
     def enable(self):
         """Enable InfluxDB export"""
         self.enabled = True
+        self.writer.start()
         
     def disable(self):
         """Disable InfluxDB export"""
         self.enabled = False
+        if self.owns_writer:
+            self.writer.close()
         
     def export_stats(self, stats: StreamStats):
         """Export statistics to InfluxDB"""
@@ -190,32 +296,30 @@ class InfluxDBExporter:
         try:
             # Create InfluxDB line protocol format
             timestamp_ns = int(stats.timestamp.timestamp() * 1000000000)
+            tags = f"host=tsduck,channel={escape_tag(self.channel)}" if self.channel else "host=tsduck"
             
             lines = [
-                f"stream_bitrate,host=tsduck value={stats.bitrate} {timestamp_ns}",
-                f"stream_packets_per_second,host=tsduck value={stats.packets_per_second} {timestamp_ns}",
-                f"stream_errors,host=tsduck value={stats.errors} {timestamp_ns}",
-                f"stream_pcr_accuracy,host=tsduck value={stats.pcr_accuracy} {timestamp_ns}",
-                f"stream_continuity_errors,host=tsduck value={stats.continuity_errors} {timestamp_ns}",
-                f"stream_services_count,host=tsduck value={stats.services_count} {timestamp_ns}",
-                f"stream_pids_count,host=tsduck value={stats.pids_count} {timestamp_ns}",
-                f"system_cpu_usage,host=tsduck value={stats.cpu_usage} {timestamp_ns}",
-                f"system_memory_usage,host=tsduck value={stats.memory_usage} {timestamp_ns}",
-                f"network_bytes_in,host=tsduck value={stats.network_in} {timestamp_ns}",
-                f"network_bytes_out,host=tsduck value={stats.network_out} {timestamp_ns}"
+                f"stream_bitrate,{tags} value={stats.bitrate} {timestamp_ns}",
+                f"stream_packets_per_second,{tags} value={stats.packets_per_second} {timestamp_ns}",
+                f"stream_errors,{tags} value={stats.errors} {timestamp_ns}",
+                f"stream_pcr_accuracy,{tags} value={stats.pcr_accuracy} {timestamp_ns}",
+                f"stream_continuity_errors,{tags} value={stats.continuity_errors} {timestamp_ns}",
+                f"stream_services_count,{tags} value={stats.services_count} {timestamp_ns}",
+                f"stream_pids_count,{tags} value={stats.pids_count} {timestamp_ns}",
+                f"system_cpu_usage,{tags} value={stats.cpu_usage} {timestamp_ns}",
+                f"system_memory_usage,{tags} value={stats.memory_usage} {timestamp_ns}",
+                f"network_bytes_in,{tags} value={stats.network_in} {timestamp_ns}",
+                f"network_bytes_out,{tags} value={stats.network_out} {timestamp_ns}"
             ]
             
-            # Send to InfluxDB (simplified - would use proper InfluxDB client)
-            self._send_to_influxdb('\n'.join(lines))
+            self._send_to_influxdb(lines)
             
         except Exception as e:
             logging.error(f"Error exporting to InfluxDB: {e}")
             
-    def _send_to_influxdb(self, data: str):
-        """Send data to InfluxDB"""
-        # This would use a proper InfluxDB client
-        # For now, just log the data
-        logging.info(f"InfluxDB data: {data}")
+    def _send_to_influxdb(self, lines: List[str]):
+        """Queue lines for the next batched write"""
+        self.writer.write(lines)
 
 
 class GrafanaDashboard:
@@ -342,11 +446,18 @@ class GrafanaDashboard:
 
 
 class AlertManager:
-    """Manage alerts and notifications"""
+    """Manage alerts and notifications
+
+    Conditions added with add_alert are checked on each sample as before.
+    Rules added with add_rule run on the windowed AlertRuleEngine, with
+    hold-off and hysteresis, per channel.
+    """
     
-    def __init__(self):
+    def __init__(self, batch_interval: float = 0.0):
         self.alerts = []
         self.alert_callbacks = []
+        self.rule_engine = AlertRuleEngine(batch_interval)
+        self.rule_engine.add_callback(self._deliver_rule_alerts)
         
     def add_alert(self, name: str, condition: Callable[[StreamStats], bool], 
                   message: str, severity: str = "warning"):
@@ -361,11 +472,15 @@ class AlertManager:
         }
         self.alerts.append(alert)
         
+    def add_rule(self, rule: AlertRule):
+        """Add a windowed alert rule"""
+        self.rule_engine.add_rule(rule)
+        
     def add_alert_callback(self, callback: Callable[[Dict[str, Any]], None]):
         """Add callback for alerts"""
         self.alert_callbacks.append(callback)
         
-    def check_alerts(self, stats: StreamStats):
+    def check_alerts(self, stats: StreamStats, channel: str = ""):
         """Check all alerts against current statistics"""
         for alert in self.alerts:
             try:
@@ -380,6 +495,18 @@ class AlertManager:
                         self._clear_alert(alert, stats)
             except Exception as e:
                 logging.error(f"Error checking alert {alert['name']}: {e}")
+        self.rule_engine.evaluate(stats, channel)
+        
+    def _deliver_rule_alerts(self, notifications: List[Dict[str, Any]]):
+        """Pass a batch of rule notifications to the alert callbacks"""
+        for notification in notifications:
+            alert_data = dict(notification)
+            alert_data['timestamp'] = datetime.fromtimestamp(notification['timestamp'])
+            for callback in self.alert_callbacks:
+                try:
+                    callback(alert_data)
+                except Exception as e:
+                    logging.error(f"Error in alert callback: {e}")
                 
     def _trigger_alert(self, alert: Dict[str, Any], stats: StreamStats):
         """Trigger an alert"""
@@ -465,6 +592,11 @@ if __name__ == "__main__":
         "warning"
     )
     
+    alert_manager.add_rule(AlertRule(
+        "CC Errors", "continuity_errors", ">", 5, aggregate="sum", window=10,
+        severity="critical", message="More than 5 CC errors in 10 seconds"
+    ))
+    
     alert_manager.add_alert(
         "Low PCR Accuracy",
         AlertConditions.low_pcr_accuracy(95.0),
@@ -485,6 +617,9 @@ if __name__ == "__main__":
         
     monitor.metrics_collector.add_callback(stats_callback)
     
+    # Add these arguments before -O in the tsp command, then start monitoring
+    print(f"Monitor tap: {' '.join(monitor.tap_args())}")
+    
     # Generate Grafana dashboard
     dashboard = GrafanaDashboard.generate_dashboard()
     print("Grafana dashboard generated")
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Shared Stream Tap for IBE-100
+One local copy of the on-air stream for every monitor
+
+The main pipeline forks a copy of its output to a local UDP port (see
+tap_args), optionally PID-filtered to PSI/SI plus a few PIDs such as the
+SCTE-35 and PTS PIDs. A StreamTap receives it once and hands each buffer
+to all subscribers in-process, and relays it to local UDP ports for
+external tools, so monitors no longer open their own connection to the
+source: the source is downloaded and demuxed once, and what is measured
+is exactly what is sent.
+"""
+
+import logging
+import os
+import shlex
+import socket
+import subprocess
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Any
+
+from ts_engine import TS_PACKET_SIZE
+
+# The monitored pipeline duplicates its packets to this local UDP port
+DEFAULT_TAP_HOST = "127.0.0.1"
+DEFAULT_TAP_PORT = 5990
+# Datagrams are collected into one buffer and handed out together
+TAP_BUFFER_SIZE = 7 * 188 * 256
+TAP_FLUSH_SECONDS = 0.05
+# Relayed datagrams carry 7 packets, as tsp -O ip sends them
+RELAY_DATAGRAM_SIZE = 7 * TS_PACKET_SIZE
+
+
+def tap_args(port: int = DEFAULT_TAP_PORT, host: str = DEFAULT_TAP_HOST,
+             pids: Optional[Iterable[int]] = None, tsp_binary: str = "tsp") -> List[str]:
+    """tsp plugin arguments duplicating the stream to a tap
+
+    With pids only PSI/SI and those PIDs are forked, the main output is
+    never filtered. The fork ignores its child exiting or stalling, a
+    monitoring tap must never take the channel off air.
+    """
+    # fork runs the command through the shell
+    forked = subprocess.list2cmdline([tsp_binary]) if os.name == 'nt' else shlex.quote(tsp_binary)
+    if pids is not None:
+        forked += " -P filter --psi-si" + "".join(f" --pid {pid}" for pid in sorted(set(pids)))
+    return ['-P', 'fork', '--ignore-abort', '--nowait', f"{forked} -O ip {host}:{port}"]
+
+
+class StreamTap:
+    """Receives the tapped stream once and fans it out to subscribers
+
+    Subscribers are called on the tap thread with a memoryview of whole,
+    aligned packets which is only valid during the call.
+    """
+
+    def __init__(self, port: int = DEFAULT_TAP_PORT, host: str = DEFAULT_TAP_HOST,
+                 pids: Optional[Iterable[int]] = None):
+        self.port = port
+        self.host = host
+        self.pids = sorted(set(pids)) if pids is not None else None
+        self.sock: Optional[socket.socket] = None
+        self.thread: Optional[threading.Thread] = None
+        self.running = False
+        self._subscribers: Tuple[Callable[[memoryview], None], ...] = ()
+        self._lock = threading.Lock()
+        self.datagrams = 0
+        self.bytes_received = 0
+        self.subscriber_errors = 0
+
+    def args(self, tsp_binary: str = "tsp") -> List[str]:
+        """Plugin arguments to insert before -O in the tapped tsp command"""
+        return tap_args(self.port, self.host, self.pids, tsp_binary)
+
+    def subscribe(self, callback: Callable[[memoryview], None]) -> Callable[[], None]:
+        """Receive every buffer of tapped packets, returns the unsubscribe function"""
+        with self._lock:
+            self._subscribers = self._subscribers + (callback,)
+
+        def unsubscribe():
+            with self._lock:
+                self._subscribers = tuple(s for s in self._subscribers if s is not callback)
+        return unsubscribe
+
+    def add_relay(self, port: int, host: str = DEFAULT_TAP_HOST) -> Callable[[], None]:
+        """Forward the tapped packets to a local UDP port, e.g. for a `tsp -I ip` analyzer"""
+        relay = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        relay.connect((host, port))
+
+        def forward(data: memoryview):
+            for start in range(0, len(data), RELAY_DATAGRAM_SIZE):
+                try:
+                    relay.send(data[start:start + RELAY_DATAGRAM_SIZE])
+                except OSError:
+                    # Nobody listening yet
+                    pass
+
+        unsubscribe = self.subscribe(forward)
+
+        def remove():
+            unsubscribe()
+            relay.close()
+        return remove
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def start(self):
+        """Open the tap socket and start receiving, the bound port is in self.port"""
+        if self.running:
+            return
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        self.sock.bind((self.host, self.port))
+        self.sock.settimeout(TAP_FLUSH_SECONDS)
+        self.port = self.sock.getsockname()[1]
+        self.running = True
+        self.thread = threading.Thread(target=self._receive_loop, name=f"stream-tap-{self.port}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+    def _receive_loop(self):
+        """Collect tap datagrams and publish them a buffer at a time"""
+        buffer = bytearray(TAP_BUFFER_SIZE)
+        view = memoryview(buffer)
+        filled = 0
+        last_flush = time.monotonic()
+        while self.running:
+            try:
+                received = self.sock.recv_into(view[filled:])
+                filled += received
+                self.datagrams += 1
+                self.bytes_received += received
+            except socket.timeout:
+                pass
+            except OSError:
+                break
+            now = time.monotonic()
+            if filled and (filled > TAP_BUFFER_SIZE - 2048 or now - last_flush >= TAP_FLUSH_SECONDS):
+                self._publish(view[:filled])
+                filled = 0
+                last_flush = now
+        if filled:
+            self._publish(view[:filled])
+
+    def _publish(self, data: memoryview):
+        for callback in self._subscribers:
+            try:
+                callback(data)
+            except Exception as e:
+                self.subscriber_errors += 1
+                logging.error(f"Stream tap subscriber failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'address': f"{self.host}:{self.port}",
+            'pids': self.pids,
+            'running': self.running,
+            'subscribers': self.subscriber_count,
+            'datagrams': self.datagrams,
+            'bytes_received': self.bytes_received,
+            'subscriber_errors': self.subscriber_errors,
+        }
+
+
+_shared_taps: Dict[Tuple[str, int], StreamTap] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_tap(port: int = DEFAULT_TAP_PORT, host: str = DEFAULT_TAP_HOST,
+               pids: Optional[Iterable[int]] = None) -> StreamTap:
+    """The process-wide tap on host:port, created and started on first use"""
+    with _shared_lock:
+        tap = _shared_taps.get((host, port))
+        if tap is None:
+            tap = StreamTap(port, host, pids)
+            tap.start()
+            _shared_taps[(host, port)] = tap
+        return tap
+
+
+def find_shared_tap(port: int = DEFAULT_TAP_PORT, host: str = DEFAULT_TAP_HOST) -> Optional[StreamTap]:
+    """The running process-wide tap on host:port, None when no pipeline is tapped"""
+    with _shared_lock:
+        tap = _shared_taps.get((host, port))
+        return tap if tap is not None and tap.running else None
+
+
+def free_udp_port(host: str = DEFAULT_TAP_HOST) -> int:
+    """An unused local UDP port from the ephemeral range, never one of the tap ports"""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def close_shared_taps():
+    with _shared_lock:
+        for tap in _shared_taps.values():
+            tap.stop()
+        _shared_taps.clear()
+
+
+# Example usage
+if __name__ == "__main__":
+    import sys
+
+    tap = StreamTap(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_TAP_PORT, pids=[500, 256])
+    tap.start()
+    print("Add to the pipeline:", " ".join(tap.args()))
+    packets = [0]
+    tap.subscribe(lambda data: packets.__setitem__(0, packets[0] + len(data) // TS_PACKET_SIZE))
+    try:
+        while True:
+            time.sleep(5)
+            print(f"{packets[0]} packets, {tap.get_stats()}")
+    except KeyboardInterrupt:
+        tap.stop()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for the windowed alert rule engine
+"""
+
+import unittest
+import os
+
+# Add parent directory to path for imports
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alert_rules import AlertRule, AlertRuleEngine, SlidingWindow, STATE_FIRING
+from stream_monitor import AlertManager, MetricsCollector
+
+
+class TestSlidingWindow(unittest.TestCase):
+    """Test incremental aggregates"""
+
+    def test_aggregates(self):
+        """Test sum, mean, min and max drop samples older than the window"""
+        values = [5, 1, 4, 8, 2, 7]
+        results = {}
+        for aggregate in ('sum', 'mean', 'min', 'max', 'count'):
+            window = SlidingWindow(aggregate, 3)
+            results[aggregate] = [window.push(float(t), v) for t, v in enumerate(values)]
+        self.assertEqual(results['sum'], [5, 6, 10, 13, 14, 17])
+        self.assertEqual(results['min'], [5, 1, 1, 1, 2, 2])
+        self.assertEqual(results['max'], [5, 5, 5, 8, 8, 8])
+        self.assertEqual(results['count'], [1, 2, 3, 3, 3, 3])
+        self.assertAlmostEqual(results['mean'][-1], 17 / 3)
+
+
+class TestAlertRuleEngine(unittest.TestCase):
+    """Test alert state transitions and notification batches"""
+
+    def setUp(self):
+        self.engine = AlertRuleEngine()
+        self.batches = []
+        self.engine.add_callback(self.batches.append)
+
+    def notifications(self):
+        return [(n['name'], n['channel'], n['kind']) for batch in self.batches for n in batch]
+
+    def feed(self, channel, samples):
+        for t, sample in enumerate(samples):
+            self.engine.evaluate(sample, channel, float(t))
+
+    def test_errors_in_window(self):
+        """Test 'CC errors > 5 in 10 s' fires once and clears when the burst leaves the window"""
+        self.engine.add_rule(AlertRule("cc", "continuity_errors", ">", 5, aggregate="sum", window=10))
+        self.feed("news", [{'continuity_errors': 2 if 3 <= t < 6 else 0} for t in range(20)])
+        self.assertEqual(self.notifications(), [("cc", "news", "firing"), ("cc", "news", "cleared")])
+
+    def test_hold_off_and_hysteresis(self):
+        """Test a single noisy reading neither fires nor clears the alert"""
+        self.engine.add_rule(AlertRule("low", "bitrate", "<", 1000, for_duration=3,
+                                       clear_threshold=2000, clear_after=2))
+        bitrates = [5000, 500, 5000, 500, 500, 500, 500, 1500, 500, 2500, 2500, 2500]
+        self.feed("news", [{'bitrate': b} for b in bitrates])
+        self.assertEqual(self.notifications(), [("low", "news", "firing"), ("low", "news", "cleared")])
+        self.assertEqual(self.batches[0][0]['timestamp'], 6.0)
+        self.assertEqual(self.batches[1][0]['timestamp'], 11.0)
+
+    def test_channels_and_batching(self):
+        """Test rules apply per channel and a batch drops alerts that fired and cleared"""
+        engine = AlertRuleEngine(batch_interval=10)
+        batches = []
+        engine.add_callback(batches.append)
+        engine.add_rule(AlertRule("high", "errors", ">", 0))
+        engine.add_rule(AlertRule("only-b", "errors", ">", 0, channel="b"))
+        engine.evaluate({'errors': 0}, "a", 0.0)
+        engine.evaluate({'errors': 1}, "a", 11.0)
+        self.assertEqual(len(batches), 1)
+        engine.evaluate({'errors': 1}, "b", 12.0)
+        engine.evaluate({'errors': 0}, "b", 13.0)
+        engine.evaluate({'errors': 1}, "b", 14.0)
+        engine.flush()
+        self.assertEqual(sorted((n['name'], n['channel']) for n in batches[1]),
+                         [("high", "b"), ("only-b", "b")])
+        self.assertEqual(len(engine.active_alerts()), 3)
+        self.assertTrue(all(state.state == STATE_FIRING for state in engine.active_alerts()))
+
+
+class TestAlertManagerRules(unittest.TestCase):
+    """Test rules through the AlertManager callbacks"""
+
+    def test_manager_rule(self):
+        manager = AlertManager()
+        alerts = []
+        manager.add_alert_callback(alerts.append)
+        manager.add_rule(AlertRule("errors", "errors", ">", 3, aggregate="sum", window=60, severity="critical"))
+        collector = MetricsCollector()
+        for _ in range(4):
+            stats = collector.collect_stats()
+            stats.errors = 1
+            manager.check_alerts(stats, "news")
+        self.assertEqual([(a['name'], a['severity'], a['channel']) for a in alerts],
+                         [("errors", "critical", "news")])
+
+
+if __name__ == '__main__':
+    unittest.main()
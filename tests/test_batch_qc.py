@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for multi-core batch QC
+"""
+
+import unittest
+import tempfile
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Add parent directory to path for imports
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ts_engine import NUMPY_AVAILABLE, TS_PACKET_SIZE, crc32_mpeg2, parse_splice_info_section
+from test_ts_engine import make_stream
+
+if NUMPY_AVAILABLE:
+    from batch_qc import qc_file, qc_files, has_errors
+
+
+def make_splice_insert(event_id: int, pts: int, duration: int, padding: int = 0) -> bytes:
+    """Build a splice_insert section, padded with private descriptors"""
+    command = (event_id.to_bytes(4, 'big') + b'\x7f' + b'\xef'
+               + bytes([0xFE | (pts >> 32)]) + (pts & 0xFFFFFFFF).to_bytes(4, 'big')
+               + bytes([0xFE | (duration >> 32)]) + (duration & 0xFFFFFFFF).to_bytes(4, 'big')
+               + b'\x00\x01\x00\x00')
+    descriptors = b''
+    while padding > 0:
+        size = min(padding, 200)
+        descriptors += bytes([0xF0, size + 4]) + b'TEST' + b'\x00' * size
+        padding -= size
+    body = (b'\x00' + b'\x00' * 5 + b'\x00' + bytes([0xFF, 0xF0 | (len(command) >> 8), len(command) & 0xFF])
+            + b'\x05' + command + len(descriptors).to_bytes(2, 'big') + descriptors)
+    length = len(body) + 4
+    header = bytes([0xFC, 0x30 | (length >> 8), length & 0xFF])
+    crc = crc32_mpeg2(header + body)
+    return header + body + crc.to_bytes(4, 'big')
+
+
+def packetize(section: bytes, pid: int, cc: int = 0) -> list:
+    """Split a section into transport stream packets"""
+    data = b'\x00' + section
+    packets = []
+    while data:
+        pusi = 0x40 if not packets else 0
+        chunk, data = data[:TS_PACKET_SIZE - 4], data[TS_PACKET_SIZE - 4:]
+        header = bytes([0x47, pusi | (pid >> 8), pid & 0xFF, 0x10 | (cc & 0x0F)])
+        packets.append(header + chunk + b'\xff' * (TS_PACKET_SIZE - 4 - len(chunk)))
+        cc += 1
+    return packets
+
+
+class TestSpliceSection(unittest.TestCase):
+    """Test SCTE-35 section decoding"""
+
+    def test_parse_splice_insert(self):
+        """Test decoding a splice_insert section"""
+        info = parse_splice_info_section(make_splice_insert(10023, 90000 * 100, 90000 * 30))
+        self.assertTrue(info['crc_valid'])
+        self.assertEqual(info['command_type'], 'splice_insert')
+        self.assertEqual(info['splice_event_id'], 10023)
+        self.assertTrue(info['out_of_network'])
+        self.assertEqual(info['pts_time'], 90000 * 100)
+        self.assertEqual(info['break_duration'], 90000 * 30)
+        self.assertEqual(info['unique_program_id'], 1)
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE, "NumPy not available")
+class TestBatchQC(unittest.TestCase):
+    """Test sharded QC of a file"""
+
+    def setUp(self):
+        video = make_stream(4000)
+        packets = [video[i:i + TS_PACKET_SIZE] for i in range(0, len(video), TS_PACKET_SIZE)]
+        # First cue straddles the edge between shard 0 and 1, second lies inside shard 2
+        first = packetize(make_splice_insert(1, 900000, 2700000, padding=400), 500)
+        second = packetize(make_splice_insert(2, 1800000, 2700000), 500, cc=len(first))
+        packets[2500:2500] = second
+        packets[999:999] = first
+        self.assertEqual(len(first), 3)
+
+        with tempfile.NamedTemporaryFile(suffix='.ts', delete=False) as f:
+            f.write(b''.join(packets))
+        self.path = f.name
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def test_qc_file(self):
+        """Test merged shard results"""
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            report = qc_file(self.path, executor, shards=4)
+
+        self.assertEqual(report['shards'], 4)
+        self.assertEqual(report['total_packets'], 4004)
+        self.assertEqual(report['continuity_errors'], 0)
+        self.assertEqual(report['pids']['0x01F4']['packets'], 4)
+        self.assertEqual([event['splice_event_id'] for event in report['scte35']], [1, 2])
+        self.assertEqual(report['scte35'][0]['packet'], 1001)
+        self.assertEqual((report['scte35_crc_errors'], report['scte35_parse_errors']), (0, 0))
+
+    def test_unreadable_file_does_not_stop_batch(self):
+        """Test a missing file gets an error report and the next file is still checked"""
+        missing = self.path + ".missing"
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            reports = qc_files([missing, self.path], executor, shards=2)
+        self.assertEqual([report['file'] for report in reports], [missing, self.path])
+        self.assertIn("FileNotFoundError", reports[0]['error'])
+        self.assertEqual(reports[1]['total_packets'], 4004)
+        self.assertEqual([has_errors(report) for report in reports], [True, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
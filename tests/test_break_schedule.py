@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for the ad break schedule expansion
+"""
+
+import unittest
+import tempfile
+import shutil
+import os
+
+# Add parent directory to path for imports
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from break_schedule import NUMPY_AVAILABLE
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+    from break_schedule import (BreakPlan, EventIdAllocator, CueTable, expand_plan, expand_plans,
+                                KIND_TIME_SIGNAL, KIND_CUE_OUT, KIND_CUE_IN)
+    from scte35_templates import SCTE35Templates
+    from ts_engine import parse_splice_info_section
+
+
+class TestEventIdAllocator(unittest.TestCase):
+    """Test collision-free id blocks"""
+
+    @unittest.skipUnless(NUMPY_AVAILABLE, "NumPy not available")
+    def test_allocate_around_reserved(self):
+        allocator = EventIdAllocator(100)
+        allocator.reserve_ids([103, 104, 110])
+        self.assertEqual(allocator.allocate(3), 100)
+        self.assertEqual(allocator.allocate(3), 105)
+        self.assertEqual(allocator.allocate(3), 111)
+        self.assertEqual(allocator.used, [(100, 108), (110, 114)])
+        allocator.next_id = 0xFFFFFFFE
+        self.assertEqual(allocator.allocate(5), 1)
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE, "NumPy not available")
+class TestExpansion(unittest.TestCase):
+    """Test plan expansion into cue tables"""
+
+    def test_full_day(self):
+        """Test every 12 min with a 90 s pod for 24 h on 30 channels"""
+        plan = BreakPlan(interval=720, duration=90, channels=[f"ch{n}" for n in range(30)], stagger=10)
+        table = expand_plan(plan, day_start=1000.0)
+        self.assertEqual(len(table), 30 * 120 * 3)
+        self.assertTrue(np.all(np.diff(table.cues['at']) >= 0))
+        self.assertEqual(len(np.unique(table.cues['event_id'])), len(table))
+
+        ch1 = table.channel_cues("ch1")
+        self.assertEqual(ch1['kind'][:3].tolist(), [KIND_TIME_SIGNAL, KIND_CUE_OUT, KIND_CUE_IN])
+        self.assertEqual(ch1['at'][:3].tolist(), [1005.0, 1010.0, 1100.0])
+        self.assertEqual(ch1['pts_offset'][4], (720 + 10) * 90000)
+        self.assertEqual(len(table.due_between(1000.0 + 720 - 5, 1000.0 + 720)), 1)
+
+        section = parse_splice_info_section(table.section(ch1[1], pts_base=1 << 33))
+        self.assertEqual(section['splice_event_id'], int(ch1[1]['event_id']))
+
+    def test_plans_share_allocator_and_bundle(self):
+        """Test ids stay unique across plans and a saved bundle round-trips"""
+        templates_dir = tempfile.mkdtemp()
+        try:
+            templates = SCTE35Templates(output_dir=templates_dir)
+            templates.templates_dir = templates.output_dir
+            news = templates.expand_schedule({"interval": 600, "duration": 60, "end": 3600, "channels": ["news"]})
+            both = templates.expand_schedule([BreakPlan(900, 120, end=3600, warning=0, channels=["news", "sport"])])
+            ids = np.concatenate([news.cues['event_id'], both.cues['event_id']])
+            self.assertEqual(len(np.unique(ids)), len(ids))
+
+            merged = CueTable.merge([news, both])
+            self.assertEqual(merged.channels, ["news", "sport"])
+            self.assertEqual(len(merged.channel_cues("news")), 18 + 8)
+            path = templates.save_schedule(merged, "day.npz")
+            loaded = templates.load_schedule(os.path.basename(path))
+            self.assertTrue(np.array_equal(loaded.cues, merged.cues))
+            self.assertEqual(loaded.plans[1]["channels"], ["news", "sport"])
+            self.assertEqual(loaded.to_markers()[1]["type"], "CUE-OUT")
+        finally:
+            shutil.rmtree(templates_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
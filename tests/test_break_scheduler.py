@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Tests for the ad break scheduler
+"""
+
+import unittest
+import threading
+import time
+import os
+
+# Add parent directory to path for imports
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ts_engine import parse_splice_info_section
+from break_scheduler import BreakScheduler, CUE_OUT, CUE_IN, TIME_SIGNAL
+from break_schedule import BreakPlan, expand_plan, NUMPY_AVAILABLE
+
+
+class RecordingSender:
+    """Collects the sections sent per channel"""
+
+    def __init__(self, ok=True):
+        self.ok = ok
+        self.sent = []
+        self.event = threading.Event()
+
+    def __call__(self, channel, sections):
+        self.sent.append((channel, [parse_splice_info_section(s) for s in sections]))
+        self.event.set()
+        return self.ok
+
+
+class TestBreakScheduler(unittest.TestCase):
+    """Test ordering, cancellation and firing of scheduled cues"""
+
+    def setUp(self):
+        self.now = 1000.0
+        self.sender = RecordingSender()
+        self.scheduler = BreakScheduler(self.sender, clock=lambda: self.now)
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def test_pending_order_and_cancel(self):
+        """Test cues come out in time order and cancelled or moved ones are skipped"""
+        self.scheduler.schedule("ch1", 1030, CUE_IN, 11)
+        first = self.scheduler.schedule("ch2", 1010, CUE_OUT, 20, duration=30)
+        moved = self.scheduler.schedule("ch1", 1020, CUE_OUT, 10, duration=10)
+        self.assertEqual([c.event_id for c in self.scheduler.pending()], [20, 10, 11])
+
+        self.assertTrue(self.scheduler.cancel(first.cue_id))
+        self.assertFalse(self.scheduler.cancel(first.cue_id))
+        moved = self.scheduler.reschedule(moved.cue_id, at=1040)
+        self.assertEqual([c.event_id for c in self.scheduler.pending()], [11, 10])
+        self.assertTrue(self.scheduler.cancel_event("ch1", 11))
+        self.assertEqual(len(self.scheduler), 1)
+
+        self.now = 1040.0
+        self.scheduler.fire(self.scheduler.pop_due())
+        self.assertEqual([(ch, [s['splice_event_id'] for s in sections]) for ch, sections in self.sender.sent],
+                         [("ch1", [10])])
+        self.assertEqual(self.scheduler.get_stats()['cancelled'], 2)
+
+    def test_batches_and_missed_cues(self):
+        """Test cues due together on a channel share one send and stale ones are dropped"""
+        self.scheduler.schedule_break("ch1", 1005, duration=60, event_id=100, warning=5)
+        self.scheduler.schedule("ch2", 1000, TIME_SIGNAL)
+        self.scheduler.schedule("ch2", 1000, CUE_OUT, 7)
+        stale = self.scheduler.schedule("ch3", 990, CUE_OUT, 8)
+        self.scheduler.fire(self.scheduler.pop_due())
+        self.assertEqual(stale.state, 'missed')
+        sent = dict(self.sender.sent)
+        self.assertEqual(len(self.sender.sent), 2)
+        self.assertEqual([s['command_type'] for s in sent["ch1"]], ['time_signal'])
+        self.assertEqual([s.get('splice_event_id') for s in sent["ch2"]], [None, 7])
+
+        self.now = 1005.0
+        self.scheduler.fire(self.scheduler.pop_due())
+        cue_out, = self.sender.sent[-1][1]
+        self.assertEqual(cue_out['splice_event_id'], 101)
+        self.assertTrue(cue_out['immediate'] and cue_out['out_of_network'])
+        self.assertEqual(cue_out['break_duration'], 60 * 90000)
+
+        self.now = 1065.0
+        self.scheduler.fire(self.scheduler.pop_due())
+        cue_in, = self.sender.sent[-1][1]
+        self.assertEqual(cue_in['splice_event_id'], 102)
+        self.assertFalse(cue_in['out_of_network'])
+        self.assertEqual(self.scheduler.get_stats()['missed'], 1)
+
+    def test_preroll_uses_stream_pts(self):
+        """Test cues leave pre-roll seconds early carrying the PTS of the break"""
+        scheduler = BreakScheduler(self.sender, preroll=4.0, clock=lambda: self.now,
+                                   pts_source=lambda channel, at: int(at * 90000))
+        cue = scheduler.schedule("ch1", 1010, CUE_OUT, 5, duration=30)
+        self.assertEqual(cue.fire_at, 1006.0)
+        self.now = 1006.0
+        scheduler.fire(scheduler.pop_due())
+        info = self.sender.sent[0][1][0]
+        self.assertFalse(info['immediate'])
+        self.assertEqual(info['pts_time'], 1010 * 90000)
+
+    def test_preroll_waits_without_pts(self):
+        """Test a cue falls back to an immediate splice at the break while no PTS is known"""
+        scheduler = BreakScheduler(self.sender, preroll=4.0, clock=lambda: self.now,
+                                   pts_source=lambda channel, at: None)
+        cue = scheduler.schedule("ch1", 1010, CUE_OUT, 5, duration=30)
+        self.now = 1006.0
+        scheduler.fire(scheduler.pop_due())
+        self.assertEqual((self.sender.sent, cue.fire_at, len(scheduler)), ([], 1010, 1))
+        self.now = 1010.0
+        scheduler.fire(scheduler.pop_due())
+        self.assertTrue(self.sender.sent[0][1][0]['immediate'])
+
+    def test_failed_send(self):
+        """Test a rejected send is counted and not reported as jitter"""
+        self.sender.ok = False
+        self.scheduler.schedule("ch1", 1000, TIME_SIGNAL)
+        self.scheduler.fire(self.scheduler.pop_due())
+        stats = self.scheduler.get_stats()
+        self.assertEqual((stats['fired'], stats['failed'], stats['jitter_ms']['samples']), (0, 1, 0))
+
+    @unittest.skipUnless(NUMPY_AVAILABLE, "numpy not available")
+    def test_schedule_table(self):
+        """Test an expanded plan is bulk loaded, skipping past cues and other channels"""
+        plan = BreakPlan(interval=600, duration=60, warning=0, channels=["a", "b"], end=3600)
+        table = expand_plan(plan, day_start=self.now - 300)
+        self.assertEqual(self.scheduler.schedule_table(table, channels=["a"]), 10)
+        kinds = [c.kind for c in self.scheduler.pending(3)]
+        self.assertEqual(kinds, [CUE_OUT, CUE_IN, CUE_OUT])
+        self.assertEqual(self.scheduler.pending(1)[0].at, self.now + 300)
+
+
+class TestSchedulerThread(unittest.TestCase):
+    """Test the scheduler thread wakes up for the next cue on its own"""
+
+    def test_fires_on_time(self):
+        sender = RecordingSender()
+        scheduler = BreakScheduler(sender)
+        fired = []
+        scheduler.add_listener(fired.append)
+        scheduler.start()
+        try:
+            # Scheduled while the thread sleeps on a later cue
+            scheduler.schedule("ch1", time.time() + 30, CUE_IN, 2)
+            cue = scheduler.schedule("ch1", time.time() + 0.05, CUE_OUT, 1, duration=10)
+            self.assertTrue(sender.event.wait(2))
+        finally:
+            scheduler.stop()
+        self.assertEqual(fired, [cue])
+        self.assertEqual(cue.state, 'fired')
+        self.assertLess(cue.jitter_ms, 100)
+        stats = scheduler.get_stats()
+        self.assertEqual((stats['fired'], stats['pending']), (1, 1))
+        self.assertEqual(stats['jitter_ms']['samples'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Tests for the headless channel manager
+"""
+
+import unittest
+import json
+import os
+import tempfile
+import glob
+import threading
+import time
+import socket
+import urllib.request
+
+# Add parent directory to path for imports
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from channel_manager import ChannelManager, load_channel_config, serve_control
+from tsduck_backend import TSDuckCommandBuilder
+from process_supervisor import ProcessSupervisor
+from metrics_exporter import MetricsRegistry
+from ts_engine import parse_splice_info_section
+from scte35_encoder import encode_splice_insert
+from stream_clock import get_clock, DEFAULT_CLOCK
+
+
+FAKE_TSP = f"""#!{sys.executable}
+import sys, time
+sys.stderr.write("* fake tsp " + " ".join(sys.argv[1:]) + "\\n")
+sys.stderr.flush()
+time.sleep(60)
+"""
+
+
+def wait_for(predicate, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class TestChannelManager(unittest.TestCase):
+    """Test loading and supervising channels"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.tsp = os.path.join(self.tmp.name, "tsp")
+        with open(self.tsp, "w") as f:
+            f.write(FAKE_TSP)
+        os.chmod(self.tsp, 0o755)
+        for index in range(3):
+            self.write_config(f"config_{index}.json", {
+                "name": f"Channel {index}",
+                "input": {"type": "udp", "source": f"127.0.0.1:{9000 + index}"},
+                "output": {"type": "srt", "destination": f"srt://127.0.0.1:{8000 + index}",
+                           "params": "--caller 127.0.0.1:8000"},
+                "service": {"service_name": f"Channel {index}", "vpid": 256, "scte35_pid": 500},
+                "scte35": {"spliceinject_enabled": True},
+            })
+        self.supervisor = ProcessSupervisor()
+        self.manager = ChannelManager(self.supervisor, base_inject_port=47000, tsp_binary=self.tsp,
+                                      base_tap_port=0)
+
+    def tearDown(self):
+        self.manager.stop_all()
+        self.tmp.cleanup()
+
+    def write_config(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w") as f:
+            json.dump(data, f)
+        return path
+
+    def test_load_config(self):
+        """Test destination normalization and the derived plugin chain"""
+        config = load_channel_config(os.path.join(self.tmp.name, "config_1.json"), 47001)
+        self.assertEqual(config.channel_id, "config_1")
+        self.assertEqual(config.output["source"], "srt://127.0.0.1:8001")
+        self.assertNotIn("spliceinject", config.plugins)
+        self.assertEqual(config.injection, {"pid": 500, "null_pid": 0x1FFF, "pts_pid": 256, "inject_count": 1,
+                                            "inject_interval": 1000, "start_delay": 2000})
+        self.assertIn("--add-pid 500/0x86", config.plugins["pmt"]["params"])
+
+        explicit = self.write_config("explicit.json", {
+            "input": {"type": "udp", "source": "127.0.0.1:9999"},
+            "output": {"type": "udp", "source": "127.0.0.1:9998"},
+            "plugins": {"spliceinject": {"enabled": True, "params": "--files /tmp/x.xml"}},
+        })
+        config = load_channel_config(explicit, 47009)
+        self.assertIsNone(config.inject_port)
+        self.assertEqual(config.plugins["spliceinject"]["params"], "--files /tmp/x.xml")
+
+    def test_distributor_config_argv(self):
+        """Test the exact tsp command built from the shipped distributor config"""
+        repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.manager.load([os.path.join(repo, "distributor_config.json")])
+        self.manager.start("distributor_config")
+        channel = self.manager.channels["distributor_config"]
+        self.assertEqual(channel.command, [
+            sys.executable, os.path.join(repo, "splice_packetizer.py"),
+            "--pid", "500", "--null-pid", "8191", "--inject-host", "127.0.0.1", "--inject-port", "47000",
+            "--inject-count", "1", "--inject-interval", "1000", "--start-delay", "2000", "--pts-pid", "256",
+            "--max-wait", "1.0",
+            "--", self.tsp, "-I", "hls", "https://cdn.itassist.one/BREAKING/NEWS/index.m3u8",
+            "-P", "pmt", "--service", "1", "--add-pid", "500/0x86", "-O", "file",
+            "--", self.tsp, "-I", "file", *channel.monitor.tap_args(self.tsp), "-O", "srt", "--caller", "cdn.itassist.one:8888", "--streamid", "#!::r=scte/scte,m=publish",
+            "--latency", "2000",
+        ])
+
+    def test_shipped_config_commands(self):
+        """Test every shipped config_*.json builds a tsp output with host:port, not a split URL"""
+        repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        paths = sorted(glob.glob(os.path.join(repo, "config_*.json")))
+        self.assertTrue(paths)
+        outputs = {}
+        for path in paths:
+            config = load_channel_config(path)
+            command = TSDuckCommandBuilder.build_full_command(
+                config.input, config.output, config.plugins, config.tsp_options)
+            output = command[command.index("-O"):]
+            self.assertIn(output[1], ("srt", "ip", "tcp", "file"), path)
+            self.assertFalse([arg for arg in command if arg.startswith("//")], path)
+            outputs[os.path.basename(path)] = output
+        self.assertEqual(outputs["config_6_udp_fallback.json"], ["-O", "ip", "cdn.itassist.one:8888"])
+        self.assertEqual(outputs["config_7_tcp_fallback.json"], ["-O", "tcp", "cdn.itassist.one:8888"])
+        self.assertEqual(outputs["config_8_file_output.json"], ["-O", "file", "/tmp/test_output.ts"])
+        self.assertEqual(outputs["config_1_basic.json"][:4], ["-O", "srt", "--caller", "cdn.itassist.one:8888"])
+
+    def test_quoted_service_name(self):
+        """Test names with spaces and quotes stay single arguments"""
+        path = self.write_config("quoted.json", {
+            "input": {"type": "srt", "source": "srt://:9000?latency=500"},
+            "output": {"type": "hls", "source": "/tmp/out.m3u8"},
+            "service": {"service_name": "SCTE-35 Stream", "provider_name": "O'Brien TV"},
+            "scte35": {"spliceinject_enabled": False},
+        })
+        self.manager.load([path])
+        self.manager.start("quoted")
+        channel = self.manager.channels["quoted"]
+        self.assertEqual(channel.command, [
+            self.tsp, "-I", "srt", "--listener", "9000", "--latency", "500",
+            "-P", "sdt", "--service", "1", "--name", "SCTE-35 Stream", "--provider", "O'Brien TV",
+            "-P", "pmt", "--service", "1", "--add-pid", "500/0x86",
+            *channel.monitor.tap_args(self.tsp), "-O", "hls", "/tmp/out.m3u8",
+        ])
+
+    def test_stream_clocks_registered(self):
+        """Test every channel registers the clock of its tap, the first one as default"""
+        self.manager.load([os.path.join(self.tmp.name, "config_*.json")])
+        self.manager.start_all()
+        clocks = [self.manager.channels[f"config_{index}"].monitor.clock for index in range(3)]
+        self.assertEqual([clock.pid for clock in clocks], [256] * 3)
+        self.assertIs(get_clock("config_2"), clocks[2])
+        self.assertIs(get_clock(DEFAULT_CLOCK), clocks[0])
+        self.manager.stop_all()
+        self.assertIsNone(get_clock("config_2"))
+        self.assertIsNone(get_clock(DEFAULT_CLOCK))
+
+    def test_run_many_channels(self):
+        """Test all channels start under one supervisor and can be controlled one by one"""
+        loaded = self.manager.load([os.path.join(self.tmp.name, "config_*.json")])
+        self.assertEqual(loaded, ["config_0", "config_1", "config_2"])
+        self.manager.start_all()
+        self.assertTrue(wait_for(lambda: all(s["state"] == "running" and s["pid"]
+                                             for s in self.manager.status())))
+        self.assertTrue(wait_for(lambda: self.manager.channel_log("config_2")))
+        # Both halves run under the injection stage process
+        self.assertTrue(wait_for(lambda: len(self.manager.channel_log("config_2")) >= 2))
+        self.assertEqual(sorted(line.split(" -O ")[-1].split()[0] for line in self.manager.channel_log("config_2")),
+                         ["file", "srt"])
+
+        self.manager.stop("config_1", wait=True)
+        self.assertTrue(wait_for(lambda: self.manager.channel_status("config_1")["state"] == "stopped"))
+        self.assertEqual(self.manager.channel_status("config_0")["state"], "running")
+
+        self.manager.start("config_1")
+        self.assertTrue(wait_for(lambda: self.manager.channel_status("config_1")["state"] == "running"))
+
+    def test_metrics_and_tap(self):
+        """Test a monitor tap is added before the output and channel state is exported"""
+        registry = MetricsRegistry()
+        manager = ChannelManager(self.supervisor, base_inject_port=47100, tsp_binary=self.tsp,
+                                 registry=registry, base_tap_port=0)
+        try:
+            manager.load([os.path.join(self.tmp.name, "config_0.json")])
+            manager.start("config_0")
+            command = manager.channel_status("config_0")["command"]
+            output_index = len(command) - 1 - command[::-1].index("-O")
+            self.assertEqual(command[output_index - 4:output_index - 1], ["fork", "--ignore-abort", "--nowait"])
+            self.assertTrue(command[output_index - 1].startswith(self.tsp))
+            self.assertTrue(wait_for(lambda: registry.value("ibe100_channel_up", channel="config_0") == 1))
+
+            # Cues seen on the tapped output are counted per channel
+            section = encode_splice_insert(7, pts_time=900000, duration=2700000)
+            packet = (bytes([0x47, 0x41, 0xF4, 0x10, 0]) + section).ljust(188, b'\xff')
+            manager.channels["config_0"].monitor.tap._publish(memoryview(packet))
+            self.assertEqual(registry.value("ibe100_scte35_events_total", channel="config_0",
+                                            command="splice_insert"), 1)
+            self.assertEqual(manager.channel_status("config_0")["splice_events"], 1)
+        finally:
+            manager.stop_all()
+
+    def test_invalid_channel(self):
+        """Test a bad config marks its channel as error without affecting others"""
+        self.write_config("config_bad.json", {"input": {"type": "udp"}, "output": {}})
+        self.manager.load([os.path.join(self.tmp.name, "config_bad.json")])
+        self.manager.start("config_bad")
+        status = self.manager.channel_status("config_bad")
+        self.assertEqual(status["state"], "error")
+        self.assertIn("source", status["error"])
+
+    def test_control_api(self):
+        """Test status and start/stop over HTTP"""
+        self.manager.load([os.path.join(self.tmp.name, "config_0.json")])
+        server = serve_control(self.manager, 0)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            request = urllib.request.Request(f"{base}/channels/config_0/start", method="POST")
+            with urllib.request.urlopen(request, timeout=5) as response:
+                self.assertEqual(json.load(response)["id"], "config_0")
+            self.assertTrue(wait_for(lambda: self.manager.channel_status("config_0")["state"] == "running"))
+            with urllib.request.urlopen(f"{base}/channels", timeout=5) as response:
+                channels = json.load(response)
+            self.assertEqual([c["state"] for c in channels], ["running"])
+            with self.assertRaises(urllib.error.HTTPError) as error:
+                urllib.request.urlopen(f"{base}/channels/missing", timeout=5)
+            self.assertEqual(error.exception.code, 404)
+        finally:
+            server.shutdown()
+
+    def test_scheduled_break(self):
+        """Test a break scheduled over HTTP reaches the channel's injection stage"""
+        self.manager.load([os.path.join(self.tmp.name, "config_0.json")])
+        server = serve_control(self.manager, 0)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        # The section arrives before the scheduler has counted it as fired
+        fired = threading.Event()
+        self.manager.scheduler.add_listener(lambda cue: fired.set())
+        try:
+            self.manager.start("config_0")
+            # The stage has its cue socket open once it started the tsp halves
+            self.assertTrue(wait_for(lambda: self.manager.channel_log("config_0")))
+            request = urllib.request.Request(
+                f"{base}/channels/config_0/schedule?in=0.1&duration=30&event_id=500", method="POST")
+            with urllib.request.urlopen(request, timeout=5) as response:
+                cue_out, cue_in = json.load(response)
+            self.assertEqual((cue_out["kind"], cue_in["event_id"]), ("CUE-OUT", 501))
+            self.assertTrue(wait_for(lambda: any("Cue event 500 received" in line
+                                                 for line in self.manager.channel_log("config_0"))))
+            self.assertTrue(fired.wait(5))
+
+            request = urllib.request.Request(f"{base}/schedule/{cue_in['cue_id']}/cancel", method="POST")
+            urllib.request.urlopen(request, timeout=5).close()
+            with urllib.request.urlopen(f"{base}/schedule", timeout=5) as response:
+                schedule = json.load(response)
+            self.assertEqual((schedule["stats"]["fired"], schedule["stats"]["cancelled"]), (1, 1))
+            self.assertEqual(schedule["pending"], [])
+        finally:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for the console line buffer
+"""
+
+import unittest
+import os
+
+# Add parent directory to path for imports
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from console_buffer import ConsoleBuffer, BLOCK_LINES
+
+
+class TestConsoleBuffer(unittest.TestCase):
+    """Test batching, bounds and search"""
+
+    def test_pending_batches(self):
+        """Test lines are handed over once, bursts are cut to the newest lines"""
+        buffer = ConsoleBuffer()
+        buffer.append("first\nsecond")
+        buffer.append("failed", error=True)
+        self.assertEqual(buffer.take_pending(10), [(0, False, "first"), (1, False, "second"), (2, True, "failed")])
+        self.assertEqual(buffer.take_pending(10), [])
+
+        for i in range(25):
+            buffer.append(f"line {i}")
+        batch = buffer.take_pending(5)
+        self.assertEqual([line[2] for line in batch], [f"line {i}" for i in range(20, 25)])
+        self.assertEqual(buffer.dropped, 20)
+
+    def test_bounded_history(self):
+        """Test old blocks are evicted and counted as dropped"""
+        buffer = ConsoleBuffer(capacity=2 * BLOCK_LINES)
+        total = 5 * BLOCK_LINES + 10
+        for i in range(total):
+            buffer.append(f"line {i}")
+        buffer.take_pending(total)
+        self.assertLessEqual(len(buffer), 3 * BLOCK_LINES)
+        self.assertGreaterEqual(len(buffer), 2 * BLOCK_LINES)
+        self.assertEqual(buffer.dropped, total - len(buffer))
+        self.assertEqual(buffer.latest(3), [(total - 3 + i, False, f"line {total - 3 + i}") for i in range(3)])
+
+        buffer.clear()
+        self.assertEqual((len(buffer), buffer.dropped), (0, 0))
+
+    def test_search(self):
+        """Test case-insensitive search across sealed and open blocks"""
+        buffer = ConsoleBuffer()
+        for i in range(3 * BLOCK_LINES):
+            buffer.append(f"* splicemonitor: event {i}")
+        buffer.append("* Splice_Insert EVENT 77 out", error=True)
+        matches = buffer.search("splice_insert event 77")
+        self.assertEqual(matches, [(3 * BLOCK_LINES, True, "* Splice_Insert EVENT 77 out")])
+        self.assertEqual(len(buffer.search("event 1000")), 1)
+        self.assertEqual(len(buffer.search("event 10", limit=5)), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Tests for the batched InfluxDB writer
+"""
+
+import unittest
+import gzip
+import tempfile
+import threading
+import os
+from pathlib import Path
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add parent directory to path for imports
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import influx_writer
+from influx_writer import InfluxLineWriter, format_point
+from stream_monitor import InfluxDBExporter
+
+
+class FakeInflux:
+    """Local stand-in for the InfluxDB 1.x /write endpoint"""
+
+    def __init__(self):
+        self.lines = []
+        self.requests = []
+        self.status = 204
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                fake.requests.append((self.path, dict(self.headers), self.client_address[1]))
+                if fake.status < 300:
+                    fake.lines += gzip.decompress(body).decode().splitlines()
+                self.send_response(fake.status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestInfluxLineWriter(unittest.TestCase):
+    """Test batching, compression and spooling"""
+
+    def setUp(self):
+        self.influx = FakeInflux()
+        self.spool = tempfile.TemporaryDirectory()
+        self.writer = InfluxLineWriter(port=self.influx.port, batch_size=100,
+                                       spool_dir=self.spool.name, username="u", password="p")
+
+    def tearDown(self):
+        self.writer.close()
+        self.influx.close()
+        self.spool.cleanup()
+
+    def test_format_point(self):
+        """Test escaping and field types"""
+        line = format_point("stream bitrate", {"value": 5, "ratio": 0.5, "ok": True, "name": 'a"b'},
+                            {"channel": "news 1,hd"}, 123)
+        self.assertEqual(line, 'stream\\ bitrate,channel=news\\ 1\\,hd value=5i,ratio=0.5,ok=true,name="a\\"b" 123')
+
+    def test_batches_on_one_connection(self):
+        """Test points are batched by size, gzip-compressed and sent over a kept-alive connection"""
+        for i in range(250):
+            self.writer.write_point("stream_bitrate", {"value": i}, {"channel": "news"}, i)
+        self.assertTrue(self.writer.flush())
+        self.assertEqual(len(self.influx.requests), 3)
+        self.assertEqual(len(self.influx.lines), 250)
+        path, headers, client_port = self.influx.requests[0]
+        self.assertEqual(path, "/write?db=tsduck&precision=ns")
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertTrue(headers['Authorization'].startswith('Basic '))
+        self.assertEqual(len({request[2] for request in self.influx.requests}), 1)
+
+    def test_spool_and_replay(self):
+        """Test batches are spooled while the database fails and replayed once it is back"""
+        self.influx.status = 503
+        self.writer.write(["m value=1i 1", "m value=2i 2"])
+        self.assertFalse(self.writer.flush())
+        self.writer.write(["m value=3i 3"])
+        self.assertFalse(self.writer.flush())
+        self.assertEqual(self.writer.spooled_batches(), 2)
+        self.assertEqual(self.influx.lines, [])
+
+        self.influx.status = 204
+        self.writer.write(["m value=4i 4"])
+        self.assertTrue(self.writer.flush())
+        self.assertEqual(self.writer.spooled_batches(), 0)
+        self.assertEqual(sorted(self.influx.lines), ["m value=1i 1", "m value=2i 2", "m value=3i 3", "m value=4i 4"])
+        self.assertEqual(self.writer.stats.points_written, 4)
+
+    def test_spool_limit(self):
+        """Test the oldest spooled batches are dropped beyond the size limit"""
+        self.influx.close()
+        self.writer.max_spool_bytes = 1
+        for i in range(3):
+            self.writer.write([f"m value={i}i {i}"])
+            self.writer.flush()
+        self.assertEqual(self.writer.spooled_batches(), 0)
+        self.assertEqual(self.writer.stats.points_dropped, 3)
+        self.influx = FakeInflux()
+
+    def test_rejected_batch_counted(self):
+        """Test a batch the database rejects is dropped and counted, not written or spooled"""
+        self.influx.status = 400
+        self.writer.write(["m value=1i 1", "bad line"])
+        self.assertTrue(self.writer.flush())
+        stats = self.writer.stats
+        self.assertEqual((stats.points_written, stats.points_dropped, stats.batches_rejected), (0, 2, 1))
+        self.assertEqual(self.writer.spooled_batches(), 0)
+
+    def test_default_spool(self):
+        """Test the spool is on by default, one directory per database"""
+        with mock.patch.object(influx_writer, 'DEFAULT_SPOOL_ROOT', Path(self.spool.name)):
+            writer = InfluxLineWriter(port=self.influx.port, database="ch1")
+        self.assertTrue(writer.spool_dir.is_dir())
+        self.assertEqual(writer.spool_dir, Path(self.spool.name) / f"localhost_{self.influx.port}_ch1")
+        self.assertIsNone(InfluxLineWriter(spool_dir=None).spool_dir)
+
+    def test_shared_writer_left_open(self):
+        """Test an exporter only closes the writer it created"""
+        exporter = InfluxDBExporter(writer=self.writer)
+        exporter.enable()
+        exporter.disable()
+        self.assertTrue(self.writer._running)
+
+
+if __name__ == '__main__':
+    unittest.main()
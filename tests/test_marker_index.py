@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for the marker library index
+"""
+
+import unittest
+import tempfile
+import shutil
+import json
+import os
+from pathlib import Path
+
+# Add parent directory to path for imports
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from marker_index import MarkerIndex, parse_marker
+
+
+class TestMarkerIndex(unittest.TestCase):
+    """Test incremental indexing of a marker directory"""
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.index = MarkerIndex(self.directory)
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.directory)
+
+    def write_marker(self, event_id, timestamp, preroll=2, sidecar=True):
+        xml_file = self.directory / f"preroll_{event_id}_{timestamp}.xml"
+        xml_file.write_text(f'<splice_insert splice_event_id="{event_id}" />')
+        if sidecar:
+            xml_file.with_suffix('.json').write_text(json.dumps({"scte35_marker": {
+                "type": "Pre-roll", "event_id": event_id, "preroll_seconds": preroll,
+                "ad_duration_seconds": 600, "timestamp": f"2025-10-25T12:00:{timestamp % 60:02d}"}}))
+        return xml_file
+
+    def test_incremental_sync(self):
+        """Test only added, modified and deleted files show up in a sync"""
+        first = self.write_marker(10023, 1)
+        self.write_marker(10024, 2)
+        (self.directory / "cue_out_10021.xml").write_text("<tsduck/>")
+        result = self.index.sync()
+        self.assertEqual(sorted(result.added), [first.name, "preroll_10024_2.xml"])
+        self.assertFalse(self.index.sync().changed)
+
+        self.write_marker(10025, 3)
+        first.unlink()
+        result = self.index.sync(check_modified=False)
+        self.assertEqual((result.added, result.removed), (["preroll_10025_3.xml"], [first.name]))
+
+        changed = self.write_marker(10024, 2, preroll=9)
+        os.utime(changed, ns=(1, 1))
+        self.assertFalse(self.index.sync(check_modified=False).changed)
+        self.assertEqual(self.index.sync().updated, [changed.name])
+        self.assertEqual(self.index.find(10024)[0].preroll_seconds, 9)
+
+    def test_sidecar_changes(self):
+        """Test a sidecar written or rewritten next to an unchanged XML file is picked up"""
+        xml_file = self.write_marker(10030, 1, sidecar=False)
+        self.index.sync()
+        self.assertIsNone(self.index.find(10030)[0].ad_duration_seconds)
+
+        self.write_marker(10030, 1)
+        os.utime(xml_file, ns=(1, 1))
+        self.index.sync()
+        self.assertEqual(self.index.sync(check_modified=False).updated, [])
+        xml_file.with_suffix('.json').unlink()
+        self.assertEqual(self.index.sync(check_modified=False).updated, [xml_file.name])
+        self.write_marker(10030, 1, preroll=4)
+        self.assertEqual(self.index.sync(check_modified=False).updated, [xml_file.name])
+
+        # Same modification time, only the size tells the sidecar changed
+        sidecar = xml_file.with_suffix('.json')
+        mtime = sidecar.stat().st_mtime_ns
+        self.write_marker(10030, 1, preroll=12)
+        os.utime(sidecar, ns=(mtime, mtime))
+        self.assertEqual(self.index.sync().updated, [xml_file.name])
+        self.assertEqual(self.index.find(10030)[0].preroll_seconds, 12)
+
+    def test_queries_survive_reopen(self):
+        """Test paging in newest-first order from a reopened index"""
+        for i in range(10):
+            self.write_marker(20000 + i, i)
+        self.index.sync()
+        self.index.close()
+        self.index = MarkerIndex(self.directory)
+        self.assertEqual(self.index.count(), 10)
+        self.assertEqual([r.event_id for r in self.index.page(0, 3)], [20009, 20008, 20007])
+        self.assertEqual(self.index.names()[-1], "preroll_20000_0.xml")
+        self.assertEqual(set(self.index.get_many(["preroll_20001_1.xml", "missing.xml"])), {"preroll_20001_1.xml"})
+        self.assertEqual(len(self.index.between("2025-10-25T12:00:02", "2025-10-25T12:00:05")), 3)
+
+    def test_marker_without_sidecar(self):
+        """Test the event id and type come from the XML file and its name"""
+        record = parse_marker(self.write_marker(30001, 1761386184, sidecar=False))
+        self.assertEqual((record.event_id, record.marker_type), (30001, "Pre-roll"))
+        self.assertIsNone(record.ad_duration_seconds)
+        self.assertIsNone(parse_marker(self.directory / "notes.xml"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for the Prometheus metrics exporter
+"""
+
+import unittest
+import urllib.request
+import os
+from datetime import datetime
+
+# Add parent directory to path for imports
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics_exporter import MetricsRegistry, serve_metrics, CONTENT_TYPE
+from process_supervisor import EVENT_STARTED, EVENT_RESTARTING
+from splice_events import SpliceEvent, SpliceEventRing
+from stream_monitor import StreamStats
+
+
+def make_stats(**values) -> StreamStats:
+    fields = dict(timestamp=datetime.now(), bitrate=0, packets_per_second=0, errors=0,
+                  pcr_accuracy=0.0, continuity_errors=0, services_count=0, pids_count=0,
+                  cpu_usage=0.0, memory_usage=0.0, network_in=0, network_out=0)
+    fields.update(values)
+    return StreamStats(**fields)
+
+
+class FakeSupervisor:
+    def __init__(self):
+        self.listeners = []
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def post(self, name, kind, payload=None):
+        for listener in self.listeners:
+            listener(name, kind, payload)
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """Test series aggregation and rendering"""
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_render_format(self):
+        """Test help/type headers, labels and escaping"""
+        self.registry.set('ibe100_stream_bitrate_bps', 15000000, channel='news')
+        self.registry.set('ibe100_stream_pcr_accuracy_percent', 99.5, channel='say "hi"')
+        text = self.registry.render()
+        self.assertIn('# TYPE ibe100_stream_bitrate_bps gauge\n', text)
+        self.assertIn('ibe100_stream_bitrate_bps{channel="news"} 15000000\n', text)
+        self.assertIn('ibe100_stream_pcr_accuracy_percent{channel="say \\"hi\\""} 99.5\n', text)
+        # Families without series are not rendered
+        self.assertNotIn('ibe100_pid_packets_total', text)
+
+    def test_stream_sources(self):
+        """Test samples, per-PID stats, splice events and restarts feed counters"""
+        engine_stats = {'pcr_jitter_ns': 120.0, 'pids': {0x100: {
+            'bitrate': 4000000, 'packets': 5000, 'cc_errors': 2,
+            'pcr_count': 10, 'pcr_max_jitter_ns': 120.0}}}
+        for _ in range(3):
+            self.registry.observe_stats('news', make_stats(bitrate=4000000, continuity_errors=2), engine_stats)
+        self.assertEqual(self.registry.value('ibe100_stream_cc_errors_total', channel='news'), 6)
+        self.assertEqual(self.registry.value('ibe100_pid_packets_total', channel='news', pid='0x0100'), 5000)
+
+        ring = SpliceEventRing()
+        self.registry.bind_splice_events('news', ring)
+        ring.append(SpliceEvent(command_type='splice_insert'))
+        ring.append(SpliceEvent(command_type='splice_insert'))
+        self.assertEqual(self.registry.value('ibe100_scte35_events_total',
+                                             channel='news', command='splice_insert'), 2)
+
+        supervisor = FakeSupervisor()
+        self.registry.bind_supervisor(supervisor)
+        supervisor.post('news', EVENT_STARTED, 123)
+        self.assertEqual(self.registry.value('ibe100_channel_up', channel='news'), 1)
+        supervisor.post('news', EVENT_RESTARTING, 1.0)
+        self.assertEqual(self.registry.value('ibe100_channel_restarts_total', channel='news'), 1)
+        self.assertEqual(self.registry.value('ibe100_channel_up', channel='news'), 0)
+
+        count = self.registry.series_count()
+        self.registry.remove(channel='news')
+        self.assertLess(self.registry.series_count(), count)
+        self.assertIsNone(self.registry.value('ibe100_channel_up', channel='news'))
+
+    def test_http_endpoint(self):
+        """Test /metrics is served with the Prometheus content type"""
+        self.registry.set('ibe100_channel_up', 1, channel='news')
+        server = serve_metrics(self.registry, 0, '127.0.0.1')
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                self.assertEqual(response.headers['Content-Type'], CONTENT_TYPE)
+                self.assertIn('ibe100_channel_up{channel="news"} 1', response.read().decode())
+        finally:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
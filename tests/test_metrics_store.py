@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for the columnar metrics store
+"""
+
+import unittest
+from unittest import mock
+import time
+import os
+
+# Add parent directory to path for imports
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics_store
+from metrics_store import NUMPY_AVAILABLE, TimeSeriesRing, MetricsStore
+from stream_monitor import MetricsCollector
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE, "NumPy not available")
+class TestTimeSeriesRing(unittest.TestCase):
+    """Test the ring buffer"""
+
+    def test_wraparound_windows(self):
+        """Test windows stay in order and are views after the ring wraps"""
+        ring = TimeSeriesRing(['a', 'b'], capacity=5)
+        for i in range(12):
+            ring.append(float(i), (i, -i))
+        self.assertEqual(len(ring), 5)
+        self.assertEqual(ring.window('a').tolist(), [7, 8, 9, 10, 11])
+        self.assertEqual(ring.window('b', count=2).tolist(), [-10, -11])
+        self.assertEqual(ring.window('a', since=9.5).tolist(), [10, 11])
+        self.assertTrue(np.shares_memory(ring.window('a'), ring.data))
+        self.assertEqual(ring.last()[0], 11.0)
+
+    def test_summary(self):
+        """Test vectorized aggregates"""
+        ring = TimeSeriesRing(['v'], capacity=200)
+        for i in range(101):
+            ring.append(float(i), (i,))
+        summary = ring.summary('v', count=101)
+        self.assertEqual((summary['min'], summary['max'], summary['mean']), (0, 100, 50))
+        self.assertEqual(summary['p95'], 95)
+        self.assertEqual(TimeSeriesRing(['v'], 4).summary('v'), {'count': 0})
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE, "NumPy not available")
+class TestMetricsStore(unittest.TestCase):
+    """Test rollups and the MetricsCollector front end"""
+
+    def test_rollups(self):
+        """Test samples are averaged into closed buckets with min and max"""
+        store = MetricsStore(['bitrate'], raw_capacity=10, rollups=((10, 100),))
+        for second in range(25):
+            store.append(1000.0 + second, (second,))
+        rollup = store.series(10)
+        self.assertEqual(len(rollup), 2)
+        self.assertEqual(rollup.timestamps().tolist(), [1000.0, 1010.0])
+        self.assertEqual(rollup.window('bitrate').tolist(), [4.5, 14.5])
+        self.assertEqual(rollup.window('bitrate_max').tolist(), [9, 19])
+        self.assertIsNone(store.resolution_for(10))
+        self.assertEqual(store.resolution_for(500), 10)
+
+    def test_collector_history(self):
+        """Test StreamStats round trip through the columns"""
+        collector = MetricsCollector(max_history=3)
+        now = time.time()
+        for i in range(5):
+            stats = collector.collect_stats()
+            stats.bitrate = 1000 + i
+            stats.pcr_accuracy = 99.5
+            collector.update_stats(stats)
+        history = collector.get_history()
+        self.assertEqual([s.bitrate for s in history], [1002, 1003, 1004])
+        self.assertIsInstance(history[0].bitrate, int)
+        self.assertEqual(history[-1].pcr_accuracy, 99.5)
+        self.assertEqual(len(collector.get_history(2)), 2)
+        self.assertEqual(collector.get_history(0), [])
+        self.assertEqual(collector.summary('bitrate', 2)['max'], 1004)
+        self.assertGreaterEqual(history[0].timestamp.timestamp(), now - 1)
+
+
+class TestPurePythonFallback(unittest.TestCase):
+    """Test the store answers the same queries without NumPy"""
+
+    def setUp(self):
+        patcher = mock.patch.object(metrics_store, 'NUMPY_AVAILABLE', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_ring(self):
+        ring = TimeSeriesRing(['a', 'b'], capacity=5)
+        for i in range(12):
+            ring.append(float(i), (i, -i))
+        self.assertEqual(ring.window('a').tolist(), [7, 8, 9, 10, 11])
+        self.assertEqual(ring.window('b', count=2).tolist(), [-10, -11])
+        self.assertEqual(ring.window('a', since=9.5).tolist(), [10, 11])
+        self.assertEqual(ring.last(), (11.0, [11.0, -11.0]))
+        summary = ring.summary('a', percentiles=(50, 90))
+        self.assertEqual((summary['min'], summary['max'], summary['mean']), (7, 11, 9))
+        self.assertAlmostEqual(summary['p90'], 10.6)
+
+    def test_store_and_collector(self):
+        store = MetricsStore(['bitrate'], raw_capacity=10, rollups=((10, 100),))
+        for second in range(25):
+            store.append(1000.0 + second, (second,))
+        self.assertEqual(store.series(10).window('bitrate').tolist(), [4.5, 14.5])
+        self.assertEqual(store.series(10).window('bitrate_min').tolist(), [0, 10])
+        self.assertGreater(store.memory_bytes(), 0)
+
+        collector = MetricsCollector(max_history=3)
+        for i in range(5):
+            stats = collector.collect_stats()
+            stats.bitrate = 1000 + i
+            collector.update_stats(stats)
+        self.assertEqual([s.bitrate for s in collector.get_history()], [1002, 1003, 1004])
+        self.assertEqual(collector.summary('bitrate', 2)['max'], 1004)
+        self.assertEqual(collector.window('bitrate', 2).tolist(), [1002, 1003, 1004])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for the asyncio process supervisor
+"""
+
+import unittest
+import threading
+import os
+
+# Add parent directory to path for imports
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from process_supervisor import (
+    ProcessSupervisor, PipelineSpec,
+    EVENT_STDOUT, EVENT_STDERR, EVENT_RESTARTING, EVENT_STOPPED, EVENT_FAILED
+)
+
+
+class Recorder:
+    """Collects the events of one pipeline"""
+
+    def __init__(self):
+        self.events = []
+        self.done = threading.Event()
+
+    def __call__(self, name, kind, payload):
+        self.events.append((kind, payload))
+        if kind in (EVENT_STOPPED, EVENT_FAILED):
+            self.done.set()
+
+    def kinds(self, kind):
+        return [payload for k, payload in self.events if k == kind]
+
+
+def wait_until(predicate, timeout=5.0):
+    event = threading.Event()
+    while not predicate() and timeout > 0:
+        event.wait(0.02)
+        timeout -= 0.02
+    return bool(predicate())
+
+
+def python(code: str):
+    return [sys.executable, "-c", code]
+
+
+class TestProcessSupervisor(unittest.TestCase):
+    """Test supervised child processes"""
+
+    def setUp(self):
+        self.supervisor = ProcessSupervisor()
+        self.recorder = Recorder()
+
+    def tearDown(self):
+        self.supervisor.stop_all()
+
+    def test_output_lines(self):
+        """Test stdout and stderr lines, clean exit is not restarted"""
+        code = "import sys; print('out'); print('err', file=sys.stderr)"
+        self.supervisor.start_pipeline(PipelineSpec("lines", python(code)), self.recorder)
+        self.assertTrue(self.recorder.done.wait(10))
+        self.assertEqual(self.recorder.kinds(EVENT_STDOUT), ['out'])
+        self.assertEqual(self.recorder.kinds(EVENT_STDERR), ['err'])
+        self.assertEqual(self.recorder.kinds(EVENT_STOPPED), [0])
+        self.assertEqual(self.recorder.kinds(EVENT_RESTARTING), [])
+
+    def test_restart_with_backoff(self):
+        """Test failed runs are restarted with growing delays, then given up"""
+        spec = PipelineSpec("failing", python("raise SystemExit(3)"), max_restarts=2,
+                            backoff_initial=0.05, backoff_factor=2.0)
+        self.supervisor.start_pipeline(spec, self.recorder)
+        self.assertTrue(self.recorder.done.wait(10))
+        self.assertEqual(self.recorder.kinds(EVENT_RESTARTING), [0.05, 0.1])
+        self.assertEqual(self.recorder.kinds(EVENT_FAILED), [3])
+        self.assertEqual(self.supervisor.get_status()['failing']['restarts'], 2)
+
+    def test_stop_running_pipeline(self):
+        """Test stopping terminates the child and cancels restarts"""
+        spec = PipelineSpec("sleeper", python("import time; print('up', flush=True); time.sleep(60)"))
+        self.supervisor.start_pipeline(spec, self.recorder)
+        started = threading.Event()
+        self.supervisor.add_listener(lambda name, kind, payload: kind == EVENT_STDOUT and started.set())
+        self.assertTrue(started.wait(10))
+        self.supervisor.stop_pipeline("sleeper", wait=True)
+        self.assertTrue(self.recorder.done.wait(10))
+        self.assertEqual(len(self.recorder.kinds(EVENT_STOPPED)), 1)
+        self.assertFalse(self.supervisor.is_running("sleeper"))
+
+    def test_binary_stdout(self):
+        """Test raw stdout chunks go to the handler"""
+        received = []
+        code = "import sys; sys.stdout.buffer.write(b'\\x47' * 188 * 100)"
+        spec = PipelineSpec("binary", python(code), stdout_mode='binary',
+                            stdout_handler=received.append, chunk_size=1000)
+        self.supervisor.start_pipeline(spec, self.recorder)
+        self.assertTrue(self.recorder.done.wait(10))
+        self.assertEqual(b''.join(received), b'\x47' * 18800)
+
+    def test_binary_handler_off_loop(self):
+        """Test the handler runs off the loop thread, a busy one never delays other pipelines"""
+        threads = []
+        release = threading.Event()
+
+        def busy_handler(data):
+            threads.append(threading.current_thread().name)
+            release.wait(10)
+        code = "import sys; sys.stdout.buffer.write(b'\\x47' * 188 * 10)"
+        self.supervisor.start_pipeline(PipelineSpec("busy", python(code), stdout_mode='binary',
+                                                    stdout_handler=busy_handler), Recorder())
+        try:
+            self.assertTrue(wait_until(lambda: threads))
+            self.supervisor.start_pipeline(PipelineSpec("lines", python("print('out')")), self.recorder)
+            self.assertTrue(self.recorder.done.wait(5))
+        finally:
+            release.set()
+        self.assertNotIn("tsp-supervisor", threads)
+
+
+if __name__ == '__main__':
+    unittest.main()
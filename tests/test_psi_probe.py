@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Tests for the PSI probe and PID remap planning
+"""
+
+import unittest
+import tempfile
+import time
+import os
+
+# Add parent directory to path for imports
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ts_engine import crc32_mpeg2, parse_pat, parse_pmt, parse_sdt
+from splice_packetizer import packetize_sections
+from psi_probe import PSIProbe, ProbeCache, ProbeResult, plan_remap, probe_command
+
+NULL = bytes([0x47, 0x1F, 0xFF, 0x10]).ljust(188, b'\xff')
+
+
+def long_section(table_id, extension, body, version=0):
+    """PSI section with header and CRC around body"""
+    length = 5 + len(body) + 4
+    section = bytes([table_id, 0xB0 | (length >> 8), length & 0xFF,
+                     extension >> 8, extension & 0xFF, 0xC1 | (version << 1), 0, 0]) + body
+    return section + crc32_mpeg2(section).to_bytes(4, 'big')
+
+
+def pat(programs, tsid=1):
+    body = b''.join(n.to_bytes(2, 'big') + (0xE000 | pid).to_bytes(2, 'big') for n, pid in programs.items())
+    return long_section(0x00, tsid, body)
+
+
+def pmt(program, pcr_pid, streams):
+    body = (0xE000 | pcr_pid).to_bytes(2, 'big') + b'\xf0\x00'
+    for stream_type, pid, descriptors in streams:
+        body += bytes([stream_type]) + (0xE000 | pid).to_bytes(2, 'big') + \
+            (0xF000 | len(descriptors)).to_bytes(2, 'big') + descriptors
+    return long_section(0x02, program, body)
+
+
+def sdt(services, tsid=1):
+    body = b'\x00\x01\xff'
+    for service_id, (provider, name) in services.items():
+        descriptor = bytes([0x01, len(provider)]) + provider + bytes([len(name)]) + name
+        loop = bytes([0x48, len(descriptor)]) + descriptor
+        body += service_id.to_bytes(2, 'big') + b'\xfc' + (0x8000 | len(loop)).to_bytes(2, 'big') + loop
+    return long_section(0x42, tsid, body)
+
+
+def hls_like_stream():
+    """PAT, PMT and SDT of a single program HLS source with PIDs 211/221"""
+    streams = [(0x1B, 211, b''), (0x0F, 221, b''), (0x86, 500, b'')]
+    return b''.join(packetize_sections(0, [pat({1: 4096})]) + [NULL] * 3 +
+                    packetize_sections(4096, [pmt(1, 211, streams)]) +
+                    packetize_sections(0x11, [sdt({1: (b'ITAssist', b'\x15News \xe2\x9c\x93')})]))
+
+
+class TestParsers(unittest.TestCase):
+    """Test the PAT, PMT and SDT decoders"""
+
+    def test_pat(self):
+        info = parse_pat(pat({0: 16, 1: 4096, 2: 4097}, tsid=7))
+        self.assertTrue(info['crc_valid'])
+        self.assertEqual((info['transport_stream_id'], info['nit_pid']), (7, 16))
+        self.assertEqual(info['programs'], {1: 4096, 2: 4097})
+
+    def test_pmt_and_sdt(self):
+        info = parse_pmt(pmt(3, 256, [(0x06, 257, b'\x6a\x01\x00')]))
+        self.assertEqual((info['program_number'], info['pcr_pid']), (3, 256))
+        self.assertEqual(info['streams'], [{'stream_type': 0x06, 'pid': 257, 'descriptor_tags': [0x6A]}])
+        service = parse_sdt(sdt({3: (b'Prov', b'Name')}))['services'][3]
+        self.assertEqual(service, {'name': 'Name', 'provider': 'Prov', 'service_type': 1})
+        with self.assertRaises(ValueError):
+            parse_pat(pmt(3, 256, []))
+
+
+class TestPSIProbe(unittest.TestCase):
+    """Test PSI assembled from unaligned chunks"""
+
+    def test_probe_stream(self):
+        data = b'\x00\x12' + hls_like_stream()
+        probe = PSIProbe()
+        done = False
+        for start in range(0, len(data), 100):
+            done = probe.feed(data[start:start + 100])
+        self.assertTrue(done)
+        result = probe.result("test")
+        program, = result.programs
+        self.assertEqual((program.pmt_pid, program.pcr_pid, program.service_name), (4096, 211, 'News ✓'))
+        self.assertEqual([s.kind for s in program.streams], ['video', 'audio', 'scte35'])
+        self.assertEqual(result.pids, {4096, 211, 221, 500})
+
+    def test_incomplete_without_pmt(self):
+        probe = PSIProbe()
+        self.assertFalse(probe.feed(b''.join(packetize_sections(0, [pat({1: 4096})]))))
+        self.assertFalse(probe.complete)
+
+
+class TestRemapPlan(unittest.TestCase):
+    """Test remap rules follow the probed PIDs"""
+
+    def probe(self, streams):
+        probe = PSIProbe()
+        probe.feed(b''.join(packetize_sections(0, [pat({1: 4096})]) +
+                            packetize_sections(4096, [pmt(1, streams[0][1], streams)])))
+        return probe.result("test")
+
+    def test_hls_pids_remapped(self):
+        plan = plan_remap(self.probe([(0x1B, 211, b''), (0x0F, 221, b'')]), 256, 257)
+        self.assertEqual((plan.rules, plan.warnings), (['211=256', '221=257'], []))
+
+    def test_target_pids_already_in_input(self):
+        """Test no rules when the input already uses the target PIDs"""
+        plan = plan_remap(self.probe([(0x24, 256, b''), (0x06, 257, b'\x7a\x00')]), 256, 257)
+        self.assertEqual((plan.rules, plan.video_type, plan.audio_type), ([], 0x24, 0x06))
+
+    def test_conflicting_target_skipped(self):
+        plan = plan_remap(self.probe([(0x1B, 211, b''), (0x0F, 221, b''), (0x06, 256, b'')]), 256, 257)
+        self.assertEqual(plan.rules, ['221=257'])
+        self.assertEqual(len(plan.warnings), 1)
+
+    def test_swapped_pids(self):
+        plan = plan_remap(self.probe([(0x1B, 257, b''), (0x0F, 256, b'')]), 256, 257)
+        self.assertEqual(plan.rules, ['257=256', '256=257'])
+
+
+class TestProbeCache(unittest.TestCase):
+    """Test recordings are probed once per TTL"""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.ts')
+        with os.fdopen(handle, 'wb') as f:
+            f.write(hls_like_stream())
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def test_cached_probe(self):
+        cache = ProbeCache(ttl=60)
+        args = ['-I', 'file', self.path]
+        first = cache.probe(args)
+        self.assertIs(cache.probe(args), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        cache.put(args, ProbeResult("old", [], probed_at=time.time() - 120))
+        self.assertIsNot(cache.probe(args), first)
+        self.assertEqual(cache.misses, 2)
+
+    def test_failures_not_cached(self):
+        with open(self.path, 'wb') as f:
+            f.write(NULL * 10)
+        cache = ProbeCache()
+        self.assertIsNone(cache.probe(['-I', 'file', self.path]))
+        self.assertEqual(cache.get_stats()['entries'], 0)
+
+    def test_probe_command(self):
+        self.assertEqual(probe_command(['-I', 'hls', 'url'], timeout=2),
+                         ['tsp', '-I', 'hls', 'url', '-P', 'until', '--milliseconds', '2000', '-O', 'file'])
+
+
+if __name__ == '__main__':
+    unittest.main()
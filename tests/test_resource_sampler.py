@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for the background resource sampler
+"""
+
+import unittest
+import subprocess
+import time
+import os
+from collections import namedtuple
+
+# Add parent directory to path for imports
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resource_sampler import ResourceSampler, counter_rate, interface_rates, PSUTIL_AVAILABLE
+
+NetIO = namedtuple('NetIO', 'bytes_sent bytes_recv packets_sent packets_recv errin errout dropin dropout')
+
+
+class TestRates(unittest.TestCase):
+    """Test rates from cumulative counters"""
+
+    def test_counter_rate(self):
+        self.assertEqual(counter_rate(None, 500, 1.0), 0.0)
+        self.assertEqual(counter_rate(100, 600, 2.0), 250.0)
+        # Counter reset, e.g. an interface that went down and up
+        self.assertEqual(counter_rate(600, 100, 1.0), 0.0)
+
+    def test_interface_rates(self):
+        """Test bit rates are per interval, not cumulative totals"""
+        before = {'eth0': NetIO(1000, 2000, 10, 20, 0, 0, 0, 0)}
+        after = {'eth0': NetIO(1000 + 125000, 2000 + 250000, 110, 220, 0, 1, 3, 0),
+                 'lo': NetIO(5, 5, 1, 1, 0, 0, 0, 0)}
+        rates = interface_rates(before, after, 0.5)
+        self.assertEqual(rates['eth0'].tx_bps, 2000000)
+        self.assertEqual(rates['eth0'].rx_bps, 4000000)
+        self.assertEqual(rates['eth0'].rx_pps, 400)
+        self.assertEqual((rates['eth0'].errors, rates['eth0'].drops), (1, 3))
+        self.assertEqual(rates['lo'].rx_bps, 0.0)
+
+
+class FakeSupervisor:
+    def __init__(self, status):
+        self.status = status
+
+    def get_status(self):
+        return self.status
+
+
+@unittest.skipUnless(PSUTIL_AVAILABLE, "psutil not available")
+class TestResourceSampler(unittest.TestCase):
+    """Test sampling of supervised processes"""
+
+    def setUp(self):
+        self.child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+
+    def tearDown(self):
+        self.child.kill()
+        self.child.wait()
+
+    def test_supervised_pids(self):
+        """Test running pipelines are sampled under their name and stopped ones are not"""
+        supervisor = FakeSupervisor({
+            'ibe100-main': {'state': 'running', 'pid': self.child.pid},
+            'old': {'state': 'stopped', 'pid': None},
+        })
+        sampler = ResourceSampler(supervisor=supervisor)
+        sampler.sample()
+        time.sleep(0.1)
+        snapshot = sampler.sample()
+        self.assertIs(sampler.latest(), snapshot)
+        self.assertEqual([(p.pid, p.label) for p in snapshot.processes], [(self.child.pid, 'ibe100-main')])
+        self.assertGreater(snapshot.processes[0].rss_bytes, 0)
+        self.assertGreaterEqual(snapshot.processes[0].threads, 1)
+
+        supervisor.status = {}
+        self.assertEqual(sampler.sample().processes, [])
+
+    def test_background_thread(self):
+        """Test snapshots are published from the sampler thread"""
+        sampler = ResourceSampler(interval=0.05)
+        sampler.watch(self.child.pid, "watched")
+        snapshots = []
+        sampler.add_callback(snapshots.append)
+        sampler.start()
+        try:
+            deadline = time.time() + 2
+            while len(snapshots) < 2 and time.time() < deadline:
+                time.sleep(0.02)
+        finally:
+            sampler.stop()
+        self.assertGreaterEqual(len(snapshots), 2)
+        self.assertEqual(snapshots[-1].processes[0].label, "watched")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory SCTE-35 section encoder
+"""
+
+import unittest
+import os
+from unittest import mock
+
+# Add parent directory to path for imports
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ts_engine import crc32_mpeg2, parse_splice_info_section
+from scte35_encoder import (
+    CueCache, encode_splice_insert, encode_time_signal, encode_splice_null, encode_marker
+)
+
+
+class TestSCTE35Encoder(unittest.TestCase):
+    """Test section encoding and cached templates"""
+
+    def setUp(self):
+        self.cache = CueCache()
+
+    def test_splice_insert_round_trip(self):
+        """Test an encoded splice_insert decodes to the same fields"""
+        section = encode_splice_insert(10023, pts_time=(1 << 32) + 5, duration=90000 * 30,
+                                       auto_return=True, unique_program_id=7, avail_num=2, avails_expected=3)
+        self.assertEqual(crc32_mpeg2(section), 0)
+        info = parse_splice_info_section(section)
+        self.assertTrue(info['crc_valid'])
+        self.assertEqual(info['command_type'], 'splice_insert')
+        self.assertEqual(info['splice_event_id'], 10023)
+        self.assertTrue(info['out_of_network'])
+        self.assertEqual(info['pts_time'], (1 << 32) + 5)
+        self.assertEqual(info['break_duration'], 90000 * 30)
+        self.assertTrue(info['auto_return'])
+        self.assertEqual((info['unique_program_id'], info['avail_num'], info['avails_expected']), (7, 2, 3))
+
+    def test_other_commands(self):
+        """Test time_signal and splice_null sections"""
+        info = parse_splice_info_section(encode_time_signal(123456))
+        self.assertEqual(info['command_type'], 'time_signal')
+        self.assertEqual(info['pts_time'], 123456)
+        self.assertTrue(parse_splice_info_section(encode_splice_null())['crc_valid'])
+
+    def test_cached_template_matches_encoder(self):
+        """Test patched templates equal freshly encoded sections"""
+        for event_id, pts in [(1, 0), (10023, 900000), (0xFFFFFFFF, (1 << 33) - 1)]:
+            self.assertEqual(self.cache.splice_insert(event_id, pts, duration=2700000),
+                             encode_splice_insert(event_id, pts_time=pts, duration=2700000))
+            self.assertEqual(self.cache.time_signal(pts), encode_time_signal(pts))
+        self.assertEqual(self.cache.misses, 2)
+        self.assertEqual(self.cache.hits, 4)
+
+    def test_encode_marker(self):
+        """Test marker types used by the generators"""
+        crash = parse_splice_info_section(self.cache.encode_marker("CRASH_OUT", 5))
+        self.assertTrue(crash['immediate'])
+        self.assertEqual(crash['splice_event_id'], 5)
+
+        cue_in = parse_splice_info_section(self.cache.encode_marker("CUE-IN", 6, pts_time=900))
+        self.assertFalse(cue_in['out_of_network'])
+        self.assertEqual(cue_in['pts_time'], 900)
+
+        with self.assertRaises(ValueError):
+            self.cache.encode_marker("SPLICE_SCHEDULE", 1)
+
+    def test_generators_share_encode_marker(self):
+        """Test the generators delegate to the one module-level encoder"""
+        from scte35_marker_generator import SCTE35MarkerGenerator
+        self.assertIs(SCTE35MarkerGenerator.encode_marker, encode_marker)
+        with mock.patch('stream_clock.stream_pts', return_value=1000) as stream_pts:
+            info = parse_splice_info_section(encode_marker("CUE_OUT", 9, 30, pts_offset=90000))
+        stream_pts.assert_called_once_with(90000)
+        self.assertEqual((info['pts_time'], info['break_duration']), (1000, 30 * 90000))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Tests for the SCTE-35 event pipeline
+"""
+
+import unittest
+import io
+import json
+import os
+
+# Add parent directory to path for imports
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from splice_events import (
+    SpliceEvent, SpliceEventDecoder, SpliceSectionDecoder, SpliceEventRing, pump_events, spawn_monitor, follow_tap
+)
+from stream_tap import StreamTap
+from scte35_encoder import encode_splice_insert, encode_splice_null
+
+
+SPLICEMONITOR_EVENT = {
+    "#name": "event", "event-type": "command", "pid": 500, "packet-index": 1200,
+    "splice-command-name": "splice_insert", "event-id": 10023, "out-of-network": True,
+    "pts": "0x000A4CB80", "duration": 2700000,
+}
+
+THREEFIVE_CUE = {
+    "info_section": {"table_id": "0xfc", "pts_adjustment": 0.0},
+    "command": {"command_type": 5, "name": "Splice Insert", "splice_event_id": 7,
+                "out_of_network_indicator": True, "pts_time": 10.5, "break_duration": 30.0},
+    "descriptors": [],
+}
+
+
+class TestSpliceEventDecoder(unittest.TestCase):
+    """Test incremental JSON decoding"""
+
+    def setUp(self):
+        self.decoder = SpliceEventDecoder("test")
+
+    def test_json_lines_with_log_prefix(self):
+        """Test one object per line, with tsp log prefixes and noise"""
+        text = ("* splicemonitor: " + json.dumps(SPLICEMONITOR_EVENT) + "\n"
+                "* some other log line\n" + json.dumps(SPLICEMONITOR_EVENT) + "\n")
+        events = self.decoder.feed(text)
+        self.assertEqual(len(events), 2)
+        event = events[0]
+        self.assertEqual(event.command_type, "splice_insert")
+        self.assertEqual(event.event_id, 10023)
+        self.assertEqual(event.pts, 0xA4CB80)
+        self.assertEqual(event.duration, 2700000)
+        self.assertEqual((event.pid, event.packet), (500, 1200))
+        self.assertTrue(event.out_of_network)
+
+    def test_pretty_printed_in_chunks(self):
+        """Test multi-line objects split at arbitrary points"""
+        text = json.dumps(THREEFIVE_CUE, indent=4) + "\n"
+        events = []
+        for start in range(0, len(text), 7):
+            events += self.decoder.feed(text[start:start + 7].encode())
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0].event_type, "cue")
+        self.assertEqual(events[0].event_id, 7)
+        self.assertEqual(events[0].pts, 945000)
+        self.assertEqual(events[0].duration, 2700000)
+
+    def test_malformed_is_counted(self):
+        """Test broken JSON is skipped, not fatal"""
+        self.assertEqual(self.decoder.feed('{"event-id": 1,\n'), [])
+        self.assertEqual(self.decoder.errors, 1)
+        self.assertEqual(len(self.decoder.feed(json.dumps(SPLICEMONITOR_EVENT) + "\n")), 1)
+
+
+def section_packet(pid, cc, section):
+    """One TS packet carrying a whole section"""
+    return (bytes([0x47, 0x40 | (pid >> 8), pid & 0xFF, 0x10 | cc, 0]) + section).ljust(188, b'\xff')
+
+
+class TestSpliceSectionDecoder(unittest.TestCase):
+    """Test decoding splice_info_sections from tapped packets"""
+
+    def test_sections_from_packets(self):
+        """Test splice_insert is decoded, splice_null and other PIDs are skipped"""
+        decoder = SpliceSectionDecoder(500, "tap")
+        insert = encode_splice_insert(42, pts_time=900000, duration=2700000, pts_adjustment=100)
+        data = (section_packet(500, 0, encode_splice_null()) + section_packet(256, 0, insert)
+                + section_packet(500, 1, insert))
+        events = decoder.feed(data)
+        self.assertEqual(decoder.sections, 2)
+        self.assertEqual(len(events), 1)
+        event = events[0]
+        self.assertEqual((event.event_id, event.pts, event.duration), (42, 900100, 2700000))
+        self.assertEqual((event.out_of_network, event.pid, event.command_type), (True, 500, 'splice_insert'))
+
+    def test_bad_crc_is_counted(self):
+        decoder = SpliceSectionDecoder(500)
+        section = bytearray(encode_splice_insert(1, immediate=True))
+        section[-1] ^= 0xFF
+        self.assertEqual(decoder.feed(section_packet(500, 0, bytes(section))), [])
+        self.assertEqual((decoder.crc_errors, decoder.parse_errors), (1, 0))
+
+    def test_parse_error_is_not_a_crc_error(self):
+        """Test a section too short to parse is counted apart from bad CRCs"""
+        decoder = SpliceSectionDecoder(500)
+        self.assertEqual(decoder.feed(section_packet(500, 0, bytes([0xFC, 0x30, 0x03, 0, 0, 0]))), [])
+        self.assertEqual((decoder.parse_errors, decoder.crc_errors, decoder.sections), (1, 0, 0))
+
+    def test_follow_tap(self):
+        """Test sections published by a tap land in the ring until unsubscribed"""
+        tap, ring = StreamTap(0), SpliceEventRing()
+        unsubscribe = follow_tap(tap, 500, ring)
+        tap._publish(memoryview(section_packet(500, 0, encode_splice_insert(3, immediate=True))))
+        unsubscribe()
+        tap._publish(memoryview(section_packet(500, 1, encode_splice_insert(4, immediate=True))))
+        self.assertEqual([event.event_id for event in ring], [3])
+        self.assertEqual(ring.latest(1)[0].source, "tap:0")
+
+
+class TestSpliceEventRing(unittest.TestCase):
+    """Test the bounded event buffer"""
+
+    def test_capacity_and_since(self):
+        """Test old events are dropped and consumers resume by sequence"""
+        ring = SpliceEventRing(capacity=4)
+        for event_id in range(10):
+            ring.append(SpliceEvent(event_id=event_id))
+        self.assertEqual(len(ring), 4)
+        self.assertEqual(ring.dropped, 6)
+        self.assertEqual([e.event_id for e in ring], [6, 7, 8, 9])
+
+        events, sequence = ring.since(8)
+        self.assertEqual([e.event_id for e in events], [8, 9])
+        self.assertEqual(sequence, 10)
+        events, _ = ring.since(0)
+        self.assertEqual(len(events), 4)
+
+    def test_subscribers(self):
+        """Test subscribers see each event and can unsubscribe"""
+        ring = SpliceEventRing()
+        seen = []
+        unsubscribe = ring.subscribe(seen.append)
+        ring.subscribe(lambda event: 1 / 0)
+        stream = io.StringIO((json.dumps(SPLICEMONITOR_EVENT) + "\n") * 3)
+        self.assertEqual(pump_events(stream, ring), 3)
+        unsubscribe()
+        ring.append(SpliceEvent())
+        self.assertEqual(len(seen), 3)
+
+    def test_clear_resets_sequence(self):
+        ring = SpliceEventRing(capacity=2)
+        for event_id in range(5):
+            ring.append(SpliceEvent(event_id=event_id))
+        ring.clear()
+        self.assertEqual((len(ring), ring.total, ring.dropped), (0, 0, 0))
+        ring.append(SpliceEvent(event_id=9))
+        self.assertEqual(ring.since(0), (ring.latest(1), 1))
+
+
+class TestSpawnMonitor(unittest.TestCase):
+    """Test reports written by tsp to stderr reach the ring"""
+
+    def test_stderr_reports(self):
+        report = "* splicemonitor: " + json.dumps(SPLICEMONITOR_EVENT)
+        script = ("import sys\n"
+                  f"print({report!r}, file=sys.stderr, flush=True)\n"
+                  "print('* tsp: bitrate 1,000,000 b/s', file=sys.stderr)\n"
+                  f"print({report!r}, file=sys.stderr)\n")
+        process = spawn_monitor([sys.executable, '-c', script])
+        ring = SpliceEventRing()
+        try:
+            self.assertEqual(pump_events(process.stdout, ring, SpliceEventDecoder("tsp")), 2)
+        finally:
+            process.wait(timeout=10)
+            process.stdout.close()
+        self.assertEqual([event.event_id for event in ring], [10023, 10023])
+        self.assertEqual(ring.latest(1)[0].source, "tsp")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent spliceinject dispatcher
+"""
+
+import unittest
+import threading
+import socket
+import os
+
+# Add parent directory to path for imports
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ts_engine import parse_splice_info_section
+from scte35_encoder import encode_splice_insert
+from splice_injector import SpliceDispatcher, spliceinject_args
+
+
+class TestSpliceDispatcher(unittest.TestCase):
+    """Test cue dispatch over UDP"""
+
+    def setUp(self):
+        # Stands in for the spliceinject --udp listener
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.settimeout(2)
+        self.dispatcher = SpliceDispatcher(port=self.listener.getsockname()[1])
+
+    def tearDown(self):
+        self.dispatcher.close()
+        self.listener.close()
+
+    def test_cue_out_is_received(self):
+        """Test an immediate cue-out reaches the listener"""
+        self.assertTrue(self.dispatcher.cue_out(10023, duration_seconds=30))
+        info = parse_splice_info_section(self.listener.recv(2048))
+        self.assertTrue(info['crc_valid'])
+        self.assertEqual(info['splice_event_id'], 10023)
+        self.assertTrue(info['immediate'])
+        self.assertEqual(info['break_duration'], 30 * 90000)
+
+    def test_socket_is_reused(self):
+        """Test consecutive cues share one socket and batch into datagrams"""
+        self.dispatcher.cue_in(1)
+        sock = self.dispatcher._sock
+        sections = [encode_splice_insert(event_id, pts_time=0) for event_id in range(100)]
+        self.dispatcher.send_sections(sections)
+        self.assertIs(self.dispatcher._sock, sock)
+
+        received = b''
+        while len(received) < len(b''.join(sections)) + len(encode_splice_insert(1, False, True)):
+            received += self.listener.recv(2048)
+        stats = self.dispatcher.get_stats()
+        self.assertEqual(stats['cues_sent'], 101)
+        self.assertLess(stats['datagrams_sent'], 101)
+
+    def test_close_while_sending(self):
+        """Test closing from another thread never breaks a send in flight"""
+        section = encode_splice_insert(7, immediate=True)
+        results = []
+        stop = threading.Event()
+
+        def close_repeatedly():
+            while not stop.is_set():
+                self.dispatcher.close()
+
+        # Switch threads as often as possible so the close lands mid-send
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, interval)
+        closer = threading.Thread(target=close_repeatedly)
+        closer.start()
+        try:
+            for _ in range(2000):
+                results.append(self.dispatcher.send_section(section))
+        finally:
+            stop.set()
+            closer.join()
+        self.assertTrue(all(results))
+        self.assertEqual(self.dispatcher.get_stats()['cues_sent'], 2000)
+
+    def test_spliceinject_args(self):
+        """Test the plugin listens on the dispatcher port"""
+        args = spliceinject_args(500, 256, port=4500)
+        self.assertEqual(args[:2], ["-P", "spliceinject"])
+        self.assertIn("127.0.0.1:4500", args)
+        self.assertNotIn("--files", args)
+
+
+if __name__ == '__main__':
+    unittest.main()
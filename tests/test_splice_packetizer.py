@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Tests for the SCTE-35 packetizer and null slot injection
+"""
+
+import unittest
+from unittest import mock
+import subprocess
+import tempfile
+import socket
+import time
+import io
+import os
+
+# Add parent directory to path for imports
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ts_engine import SectionAssembler, parse_splice_info_section
+from scte35_encoder import encode_splice_insert
+from splice_injector import SpliceDispatcher
+from splice_packetizer import (
+    packetize_sections, split_sections, SectionPacketizer, NullSlotInjector, InjectionStage, CueSchedule,
+    RUN_STAGE_FLAG, argue
+)
+from stream_clock import StreamClock
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NULL = bytes([0x47, 0x1F, 0xFF, 0x10]).ljust(188, b'\xff')
+
+
+def video(cc=0):
+    return bytes([0x47, 0x01, 0x00, 0x10 | cc]).ljust(188, b'\x00')
+
+
+def fake_section(length):
+    """Section of the given total length, contents are not checked"""
+    return bytes([0xFC, 0x30 | ((length - 3) >> 8), (length - 3) & 0xFF]).ljust(length, b'\x00')
+
+
+def packets_of(data, pid=500):
+    return [data[i:i + 188] for i in range(0, len(data), 188)
+            if ((data[i + 1] & 0x1F) << 8 | data[i + 2]) == pid]
+
+
+def reassemble(packets, pid=500):
+    assembler = SectionAssembler(pid)
+    sections = []
+    for packet in packets:
+        sections += assembler.feed(packet)
+    return sections
+
+
+class TestPacketize(unittest.TestCase):
+    """Test sections survive packetization"""
+
+    def test_single_section(self):
+        section = encode_splice_insert(1, immediate=True)
+        packet, = packetize_sections(500, [section], cc=15)
+        self.assertEqual(packet[:5], b'\x47\x41\xf4\x1f\x00')
+        self.assertEqual(packet[5:5 + len(section)], section)
+        self.assertEqual(set(packet[5 + len(section):]), {0xFF})
+
+    def test_packed_sections_of_every_alignment(self):
+        """Test sections starting anywhere in a packet, including its last byte"""
+        for first in range(150, 400):
+            sections = [fake_section(first), fake_section(40), fake_section(200)]
+            packets = packetize_sections(500, sections, cc=14)
+            self.assertEqual(reassemble(packets), sections, f"first section of {first} bytes")
+            self.assertEqual([p[3] & 0x0F for p in packets], [(14 + n) & 0x0F for n in range(len(packets))])
+
+    def test_unpacked_and_split(self):
+        sections = [encode_splice_insert(n, immediate=True) for n in range(3)]
+        self.assertEqual(len(packetize_sections(500, sections, pack=False)), 3)
+        self.assertEqual(split_sections(b''.join(sections) + b'\xff\xff'), sections)
+
+    def test_packetizer_keeps_counter(self):
+        packetizer = SectionPacketizer(500, cc=14)
+        packetizer.packetize([fake_section(300)])
+        self.assertEqual(packetizer.packetize([fake_section(20)])[0][3] & 0x0F, 0)
+
+
+class TestNullSlotInjector(unittest.TestCase):
+    """Test injection keeps the packet count and one continuity counter"""
+
+    def setUp(self):
+        self.now = 100.0
+        self.injector = NullSlotInjector(500, clock=lambda: self.now)
+
+    def test_replaces_null_packets(self):
+        section = fake_section(400)
+        self.assertEqual(self.injector.queue_sections([section]), 3)
+        # Input already carries PID 500 packets with their own counters
+        existing = packetize_sections(500, [fake_section(20)], cc=9)[0]
+        stream = video(0) + NULL + existing + NULL + video(1) + NULL + NULL
+        out = self.injector.process(stream)
+        self.assertEqual(len(out), len(stream))
+        ours = packets_of(out)
+        self.assertEqual([p[3] & 0x0F for p in ours], [0, 1, 2, 3])
+        # The input packet waits until the cue's section is complete
+        self.assertEqual(reassemble(ours), [section, fake_section(20)])
+        self.assertEqual(packets_of(out, 0x1FFF), [NULL])
+        self.assertEqual(packets_of(out, 0x100), [video(0), video(1)])
+        stats = self.injector.get_stats()
+        self.assertEqual((stats['packets_injected'], stats['passthrough_packets'], stats['pending']), (3, 1, 0))
+
+    def test_starved_packets_are_added(self):
+        """Test cues still go out after max_wait without null packets"""
+        self.injector.queue_sections([fake_section(30)])
+        stream = video(0) * 7
+        self.assertEqual(self.injector.process(stream), stream)
+        self.now += 1.5
+        out = self.injector.process(stream)
+        self.assertEqual(len(out), len(stream) + 188)
+        self.assertEqual(self.injector.get_stats()['packets_added'], 1)
+
+    def test_null_pid_setting(self):
+        injector = NullSlotInjector(500, null_pid=0x100)
+        injector.queue_sections([fake_section(30)])
+        out = injector.process(video(0) + NULL)
+        self.assertEqual(len(packets_of(out)), 1)
+        self.assertEqual(packets_of(out, 0x1FFF), [NULL])
+        with self.assertRaises(ValueError):
+            NullSlotInjector(500, null_pid=500)
+
+
+class TestInjectionStage(unittest.TestCase):
+    """Test cues sent like to spliceinject come out of the stage in null slots"""
+
+    def test_stage_over_udp(self):
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(("127.0.0.1", 0))
+        receiver.settimeout(5)
+        stage = InjectionStage(500, input_port=0, output_port=receiver.getsockname()[1], inject_port=0)
+        stage.start()
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            with SpliceDispatcher(port=stage.inject_port) as dispatcher:
+                dispatcher.cue_out(77, duration_seconds=30)
+            deadline = time.time() + 5
+            while time.time() < deadline and not stage.schedule.pending:
+                time.sleep(0.01)
+            datagram = video(0) * 6 + NULL
+            sender.sendto(datagram, ("127.0.0.1", stage.input_port))
+            out = receiver.recv(2048)
+        finally:
+            sender.close()
+            stage.stop()
+            receiver.close()
+        self.assertEqual(len(out), len(datagram))
+        info = parse_splice_info_section(reassemble(packets_of(out))[0])
+        self.assertEqual((info['splice_event_id'], info['break_duration']), (77, 30 * 90000))
+
+    def test_split_command(self):
+        stage = InjectionStage(500, input_port=6000)
+        upstream, downstream = stage.split_command(['tsp', '-I', 'hls', 'url', '-P', 'pmt', '-O', 'srt', 'host:1'])
+        self.assertEqual(upstream, ['tsp', '-I', 'hls', 'url', '-P', 'pmt', '-O', 'ip', '127.0.0.1:6000'])
+        self.assertEqual(downstream, ['tsp', '-I', 'ip', '127.0.0.1:6001', '-O', 'srt', 'host:1'])
+
+    def test_stage_command(self):
+        """Test plugins after the split point run downstream of the stage process"""
+        stage = InjectionStage(500, null_pid=0x1FFF, inject_port=4444, pts_pid=256, inject_count=2)
+        command = stage.stage_command(['tsp', '-I', 'hls', 'url', '-P', 'pmt', '-P', 'fork', 'x', '-O', 'srt'],
+                                      split=6)
+        self.assertEqual(command[1], os.path.join(REPO, 'splice_packetizer.py'))
+        self.assertIn('--pts-pid', command)
+        options, upstream, downstream = ' '.join(command[2:]).split(' -- ')
+        self.assertIn('--inject-count 2 --inject-interval 1000 --start-delay 2000', options)
+        self.assertEqual(upstream, 'tsp -I hls url -P pmt -O file')
+        self.assertEqual(downstream, 'tsp -I file -P fork x -O srt')
+
+    def test_frozen_stage_command(self):
+        """Test a frozen application runs the stage through its own executable"""
+        stage = InjectionStage(500)
+        with mock.patch.object(sys, 'frozen', True, create=True):
+            command = stage.stage_command(['tsp', '-I', 'hls', 'url', '-O', 'srt'])
+        self.assertEqual(command[:2], [sys.executable, RUN_STAGE_FLAG])
+        self.assertEqual(argue(command[2:]).pid, 500)
+
+    def test_pipe_mode(self):
+        """Test unaligned reads pass through with the cue in a null slot"""
+        stage = InjectionStage(500)
+        stage.schedule.add([encode_splice_insert(5, immediate=True)])
+        data = (video(0) * 6 + NULL) * 20
+        reader = io.BytesIO(data)
+        reader.read1 = lambda size: reader.read(100)
+        writer = io.BytesIO()
+        self.assertEqual(stage.pump(reader, writer), len(data))
+        out = writer.getvalue()
+        self.assertEqual(parse_splice_info_section(reassemble(packets_of(out))[0])['splice_event_id'], 5)
+        self.assertFalse(stage.starved)
+
+    def test_stage_process(self):
+        """Test the stage process injects cues between two child commands, keeping the packet count"""
+        data = (video(0) * 6 + NULL) * 50
+        upstream = ("import sys, time\n"
+                    "time.sleep(1.5)\n"
+                    "video = bytes([0x47, 0x01, 0x00, 0x10]).ljust(188, b'\\x00')\n"
+                    "null = bytes([0x47, 0x1F, 0xFF, 0x10]).ljust(188, b'\\xff')\n"
+                    "data = (video * 6 + null) * 50\n"
+                    "for i in range(0, len(data), 1316):\n"
+                    "    sys.stdout.buffer.write(data[i:i + 1316]); sys.stdout.buffer.flush(); time.sleep(0.005)\n")
+        probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+        probe.close()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "out.ts")
+            downstream = f"import sys, shutil\nshutil.copyfileobj(sys.stdin.buffer, open({path!r}, 'wb'))\n"
+            process = subprocess.Popen([sys.executable, os.path.join(REPO, 'splice_packetizer.py'), '--pid', '500',
+                                        '--inject-port', str(port), '--inject-count', '2', '--inject-interval', '100',
+                                        '--', sys.executable, '-c', upstream, '--', sys.executable, '-c', downstream],
+                                       stderr=subprocess.PIPE, text=True)
+            time.sleep(0.7)
+            with SpliceDispatcher(port=port) as dispatcher:
+                dispatcher.cue_out(88, duration_seconds=30)
+            _, errors = process.communicate(timeout=20)
+            self.assertEqual(process.returncode, 0, errors)
+            with open(path, 'rb') as f:
+                out = f.read()
+        self.assertEqual(len(out), len(data))
+        events = [parse_splice_info_section(section)['splice_event_id'] for section in reassemble(packets_of(out))]
+        self.assertEqual(events, [88, 88])
+        self.assertIn("2 packets injected, 0 added", errors)
+
+
+class TestCueSchedule(unittest.TestCase):
+    """Test cues are repeated and held back until start_delay before their splice time"""
+
+    def setUp(self):
+        self.now = time.time()
+        self.clock = StreamClock(256)
+        self.clock.observe(900000, self.now)
+
+    def test_scheduled_and_repeated(self):
+        schedule = CueSchedule(count=3, interval=500, start_delay=2000, clock=self.clock)
+        section = encode_splice_insert(1, pts_time=900000 + 10 * 90000, duration=30 * 90000)
+        self.assertAlmostEqual(schedule.add([section], self.now) - self.now, 8.0, places=3)
+        self.assertEqual(schedule.pop_due(self.now + 7.9), [])
+        self.assertEqual(schedule.pop_due(self.now + 8.0), [[section]])
+        self.assertEqual(schedule.pop_due(self.now + 8.4), [])
+        self.assertEqual(schedule.pop_due(self.now + 8.5), [[section]])
+        self.assertEqual(schedule.pop_due(self.now + 9.0), [[section]])
+        self.assertEqual((schedule.pending, schedule.injections), (0, 3))
+
+    def test_immediate_and_unlocked(self):
+        schedule = CueSchedule(clock=self.clock)
+        immediate = encode_splice_insert(2, immediate=True)
+        self.assertEqual(schedule.add([immediate], self.now), self.now)
+        # Splice time in the past of the stream: injected at once
+        late = encode_splice_insert(3, pts_time=800000)
+        self.assertEqual(schedule.add([late], self.now), self.now)
+        unlocked = CueSchedule()
+        self.assertEqual(unlocked.add([encode_splice_insert(4, pts_time=10 ** 9)], self.now), self.now)
+        self.assertEqual(unlocked.unscheduled, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Tests for the startup helpers
+"""
+
+import unittest
+import time
+import os
+
+# Add parent directory to path for imports
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from startup import module_available, check_modules, StartupTimer
+
+
+class TestModuleAvailable(unittest.TestCase):
+    """Test dependency checks without imports"""
+
+    def test_available(self):
+        self.assertTrue(module_available('json'))
+        self.assertFalse(module_available('ibe100_no_such_module'))
+        # Missing parent package of a dotted name
+        self.assertFalse(module_available('ibe100_no_such_module.sub'))
+        self.assertEqual(check_modules(['json', 'ibe100_no_such_module']),
+                         {'json': True, 'ibe100_no_such_module': False})
+
+    def test_not_imported(self):
+        """Test a found module is located but not executed"""
+        sys.modules.pop('wave', None)
+        module_available.cache_clear()
+        self.assertTrue(module_available('wave'))
+        self.assertNotIn('wave', sys.modules)
+
+
+class TestStartupTimer(unittest.TestCase):
+    """Test per-phase timing"""
+
+    def test_phases(self):
+        timer = StartupTimer()
+        time.sleep(0.01)
+        timer.mark("imports")
+        with timer.phase("window"):
+            time.sleep(0.01)
+        names = [name for name, _ in timer.phases]
+        self.assertEqual(names, ["imports", "window"])
+        self.assertAlmostEqual(sum(seconds for _, seconds in timer.phases), timer.total)
+        self.assertIn("window", timer.report())
+
+
+if __name__ == '__main__':
+    unittest.main()
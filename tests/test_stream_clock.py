@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tests for the stream clock tracker
+"""
+
+import unittest
+import time
+import os
+
+# Add parent directory to path for imports
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stream_clock import (
+    StreamClock, packet_timestamps, stream_pts, register_clock, unregister_clock, track_tap,
+    get_clock, PTS_WRAP
+)
+from stream_tap import StreamTap
+
+FRAME = 3600  # 25 fps in 90 kHz ticks
+
+
+def pes_packet(pid, pts, pcr=None):
+    """TS packet starting a PES with a PTS, optionally with a PCR"""
+    header = bytes([0x47, 0x40 | (pid >> 8), pid & 0xFF])
+    if pcr is None:
+        header += b'\x10'
+    else:
+        header += b'\x30' + bytes([7, 0x10]) + ((pcr << 15) | 0x7E00).to_bytes(6, 'big')
+    pts_bytes = bytes([0x21 | ((pts >> 29) & 0x0E), (pts >> 22) & 0xFF, ((pts >> 14) & 0xFE) | 1,
+                       (pts >> 7) & 0xFF, ((pts << 1) & 0xFE) | 1])
+    pes = b'\x00\x00\x01\xe0\x00\x00\x80\x80\x05' + pts_bytes
+    return (header + pes).ljust(188, b'\xff')
+
+
+class TestStreamClock(unittest.TestCase):
+    """Test the wall clock to PTS regression"""
+
+    def setUp(self):
+        self.start = time.time()
+
+    def play(self, clock, first_pts, frames, delay=lambda n: 0.0, start=None):
+        start = self.start if start is None else start
+        for n in range(frames):
+            clock.observe(first_pts + n * FRAME, start + n / 25 + delay(n))
+
+    def test_packet_timestamps(self):
+        pcr, pts = packet_timestamps(pes_packet(256, 0x1ABCDEF01, pcr=0x123456789))
+        self.assertEqual((pcr, pts), (0x123456789, 0x1ABCDEF01))
+        self.assertEqual(packet_timestamps(b'\x47\x01\x00\x10'.ljust(188, b'\x00')), (None, None))
+
+    def test_wraparound(self):
+        """Test the fit runs straight through the 33-bit wrap"""
+        clock = StreamClock(pid=256)
+        first = PTS_WRAP - 2 * 90000
+        self.play(clock, first, 25 * 6)
+        self.assertEqual((clock.wraps, clock.discontinuities), (1, 0))
+        expected = (first + 7 * 90000) % PTS_WRAP
+        self.assertAlmostEqual(clock.pts_at(self.start + 7), expected, delta=10)
+
+    def test_arrival_jitter_is_filtered(self):
+        """Test late packets do not pull the fit behind the stream"""
+        clock = StreamClock(pid=256)
+        self.play(clock, 1000000, 25 * 20, delay=lambda n: (n * 37 % 50) / 1000)
+        self.assertAlmostEqual(clock.pts_at(self.start + 30), 1000000 + 30 * 90000, delta=FRAME / 4)
+
+    def test_discontinuity_starts_new_timeline(self):
+        clock = StreamClock(pid=256)
+        self.play(clock, 5000000, 25 * 4)
+        self.play(clock, 90000, 25 * 4, start=self.start + 4)
+        self.assertEqual(clock.discontinuities, 1)
+        self.assertAlmostEqual(clock.pts_at(self.start + 10), 90000 + 6 * 90000, delta=10)
+
+    def test_feed_and_stale(self):
+        """Test PTS are taken from packets of the clock PID only, and old timelines expire"""
+        clock = StreamClock(pid=256, stale_after=1.0)
+        self.assertIsNone(clock.pts_at())
+        data = pes_packet(300, 5) + pes_packet(256, 900000) + b'\x47\x01\x00\x10'.ljust(188, b'\x00')
+        self.assertEqual(clock.feed(data, wall=self.start), 1)
+        self.assertEqual(clock.pts_at(self.start + 1), 990000)
+        self.assertEqual(StreamClock(pid=256, source='pcr').feed(pes_packet(256, 5, pcr=77)), 1)
+
+        clock.observe(990000, time.time() - 5)
+        self.assertFalse(clock.locked)
+        self.assertIsNone(clock.pts_at())
+
+    def test_stream_pts(self):
+        """Test generators get the tracked PTS, or the wall clock without one"""
+        wall = self.start + 2
+        self.assertEqual(stream_pts(90, wall=wall, name="test"), (int(wall * 90000) + 90) % PTS_WRAP)
+        clock = StreamClock(pid=256)
+        self.play(clock, 1234, 25)
+        register_clock(clock, "test")
+        try:
+            self.assertEqual(stream_pts(90000, wall=wall, name="test"), 1234 + 3 * 90000)
+        finally:
+            unregister_clock("test")
+
+    def test_track_tap(self):
+        """Test a tap-fed clock is registered until stopped"""
+        tap = StreamTap(0)
+        clock, stop = track_tap(tap, 256, "tap")
+        self.assertIs(get_clock("tap"), clock)
+        tap._publish(memoryview(b"".join(pes_packet(256, 1000 + i * FRAME) for i in range(3))))
+        self.assertEqual(clock.samples, 3)
+        stop()
+        self.assertIsNone(get_clock("tap"))
+
+
+if __name__ == '__main__':
+    unittest.main()
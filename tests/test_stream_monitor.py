@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests for live stream metrics from the monitor tap
+"""
+
+import unittest
+import socket
+import struct
+import time
+import os
+
+# Add parent directory to path for imports
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stream_monitor import TSDuckMonitor, StreamStats, TS_ENGINE_AVAILABLE, monitor_tap_args
+
+if TS_ENGINE_AVAILABLE:
+    from ts_engine import crc32_mpeg2
+
+
+def make_packet(pid: int, cc: int, payload: bytes = b'', start: bool = False) -> bytes:
+    """Build a payload-only transport stream packet"""
+    header = bytes([0x47, (0x40 if start else 0) | (pid >> 8) & 0x1F, pid & 0xFF, 0x10 | (cc & 0x0F)])
+    packet = header + payload
+    return packet + b'\xff' * (188 - len(packet))
+
+
+def make_pat(programs) -> bytes:
+    """PAT section announcing (program_number, pmt_pid) pairs"""
+    body = b''.join(struct.pack('>HH', number, 0xE000 | pid) for number, pid in programs)
+    section = bytes([0x00, 0xB0, 9 + len(body)]) + b'\x00\x01\xC1\x00\x00' + body
+    return section + struct.pack('>I', crc32_mpeg2(section))
+
+
+@unittest.skipUnless(TS_ENGINE_AVAILABLE, "NumPy not available")
+class TestTSDuckMonitor(unittest.TestCase):
+    """Test metrics computed from tapped packets"""
+
+    def setUp(self):
+        self.monitor = TSDuckMonitor(tap_port=0)
+        self.monitor.start_monitoring()
+        self.sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def tearDown(self):
+        self.sender.close()
+        self.monitor.stop_monitoring()
+
+    def send(self, packets):
+        for start in range(0, len(packets), 7):
+            self.sender.sendto(b''.join(packets[start:start + 7]), ("127.0.0.1", self.monitor.tap_port))
+
+    def wait_packets(self, count):
+        deadline = time.time() + 5
+        while time.time() < deadline and self.monitor.engine.total_packets < count:
+            time.sleep(0.02)
+        return self.monitor.engine.total_packets
+
+    def stats(self) -> StreamStats:
+        stats = self.monitor.metrics_collector.collect_stats()
+        self.monitor._collect_stream_metrics(stats)
+        return stats
+
+    def test_tap_args(self):
+        """Test the tap is a fork to a local UDP output"""
+        self.assertEqual(monitor_tap_args(6000), ['-P', 'fork', '--ignore-abort', '--nowait',
+                                                  'tsp -O ip 127.0.0.1:6000'])
+
+    def test_live_metrics(self):
+        """Test rates, errors, PIDs and services come from the stream"""
+        pat = make_packet(0, 0, b'\x00' + make_pat([(0, 16), (1, 0x100), (2, 0x200)]), start=True)
+        video = [make_packet(0x100, cc) for cc in range(13)]
+        # One lost packet on PID 0x100
+        video += [make_packet(0x100, cc) for cc in range(14, 20)]
+        audio = [make_packet(0x101, cc) for cc in range(2)]
+        packets = [pat] + video + audio
+        self.stats()
+        self.send(packets)
+        self.assertEqual(self.wait_packets(len(packets)), len(packets))
+
+        stats = self.stats()
+        self.assertGreater(stats.bitrate, 0)
+        self.assertGreater(stats.packets_per_second, 0)
+        self.assertEqual(stats.continuity_errors, 1)
+        self.assertEqual(stats.pids_count, 3)
+        self.assertEqual(stats.services_count, 2)
+
+        # Error counts are per interval
+        self.assertEqual(self.stats().continuity_errors, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
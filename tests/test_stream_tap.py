@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared stream tap
+"""
+
+import unittest
+import socket
+import threading
+import time
+import os
+
+# Add parent directory to path for imports
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stream_tap import (
+    StreamTap, tap_args, shared_tap, find_shared_tap, close_shared_taps, free_udp_port, DEFAULT_TAP_PORT
+)
+from scte35_monitor import SCTE35Monitor
+from stream_monitor import TSDuckMonitor, TS_ENGINE_AVAILABLE
+from ts_engine import select_packets
+
+
+def make_packet(pid: int, cc: int = 0) -> bytes:
+    """Payload-only transport stream packet"""
+    return bytes([0x47, pid >> 8, pid & 0xFF, 0x10 | cc]).ljust(188, b'\xff')
+
+
+class Collector:
+    """Subscriber keeping a copy of every buffer"""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.event = threading.Event()
+
+    def __call__(self, data):
+        self.data += data
+        self.event.set()
+
+    def wait(self, size):
+        deadline = time.time() + 5
+        while time.time() < deadline and len(self.data) < size:
+            self.event.wait(0.05)
+            self.event.clear()
+        return bytes(self.data)
+
+
+class TestTapArgs(unittest.TestCase):
+    """Test the fork plugin arguments"""
+
+    def test_full_stream(self):
+        """Test the fork never aborts the on-air pipeline"""
+        self.assertEqual(tap_args(6000), ['-P', 'fork', '--ignore-abort', '--nowait', 'tsp -O ip 127.0.0.1:6000'])
+
+    def test_pid_filter(self):
+        self.assertEqual(tap_args(6000, pids=[500, 256, 500])[-1],
+                         'tsp -P filter --psi-si --pid 256 --pid 500 -O ip 127.0.0.1:6000')
+
+    @unittest.skipIf(os.name == 'nt', "POSIX shell quoting")
+    def test_resolved_tsp_binary(self):
+        """Test the forked tsp is the binary of the main pipeline, quoted for the shell"""
+        self.assertEqual(tap_args(6000, tsp_binary="/opt/TS Duck/bin/tsp")[-1],
+                         "'/opt/TS Duck/bin/tsp' -O ip 127.0.0.1:6000")
+
+    def test_select_packets(self):
+        data = make_packet(256) + make_packet(500) + make_packet(0x1FFF) + make_packet(500, 1)
+        self.assertEqual(select_packets(data, (500,)), [make_packet(500), make_packet(500, 1)])
+        self.assertEqual(select_packets(data[1:], (500,)), [])
+
+
+class TestStreamTap(unittest.TestCase):
+    """Test one received stream is shared by subscribers and relays"""
+
+    def setUp(self):
+        self.tap = StreamTap(port=0)
+        self.tap.start()
+        self.sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.datagram = b''.join(make_packet(256, cc) for cc in range(7))
+
+    def tearDown(self):
+        self.sender.close()
+        self.tap.stop()
+
+    def send(self):
+        self.sender.sendto(self.datagram, ("127.0.0.1", self.tap.port))
+
+    def test_fan_out_and_unsubscribe(self):
+        first, second = Collector(), Collector()
+        self.tap.subscribe(first)
+        unsubscribe = self.tap.subscribe(second)
+        self.send()
+        self.assertEqual(first.wait(len(self.datagram)), self.datagram)
+        self.assertEqual(second.wait(len(self.datagram)), self.datagram)
+
+        unsubscribe()
+        self.assertEqual(self.tap.subscriber_count, 1)
+        self.send()
+        self.assertEqual(len(first.wait(2 * len(self.datagram))), 2 * len(self.datagram))
+        self.assertEqual(len(second.data), len(self.datagram))
+
+    def test_relay(self):
+        """Test tapped packets are forwarded to a local UDP port"""
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(("127.0.0.1", 0))
+        receiver.settimeout(5)
+        remove = self.tap.add_relay(receiver.getsockname()[1])
+        try:
+            self.send()
+            self.assertEqual(receiver.recv(2048), self.datagram)
+        finally:
+            remove()
+            receiver.close()
+        self.assertEqual(self.tap.subscriber_count, 0)
+
+    @unittest.skipUnless(TS_ENGINE_AVAILABLE, "NumPy not available")
+    def test_monitor_on_shared_tap(self):
+        """Test a monitor attached to a shared tap leaves it running when stopped"""
+        monitor = TSDuckMonitor(tap=self.tap)
+        monitor.start_monitoring()
+        try:
+            self.assertEqual(monitor.tap_port, self.tap.port)
+            self.send()
+            deadline = time.time() + 5
+            while time.time() < deadline and monitor.engine.total_packets < 7:
+                time.sleep(0.02)
+            self.assertEqual(monitor.engine.total_packets, 7)
+        finally:
+            monitor.stop_monitoring()
+        self.assertTrue(self.tap.running)
+        self.assertEqual(self.tap.subscriber_count, 0)
+
+
+
+class TestSharedTap(unittest.TestCase):
+    """Test monitors find the running process-wide tap"""
+
+    def tearDown(self):
+        close_shared_taps()
+
+    def test_find_shared_tap(self):
+        self.assertIsNone(find_shared_tap(0))
+        tap = shared_tap(0)
+        self.assertIs(find_shared_tap(0), tap)
+        tap.stop()
+        self.assertIsNone(find_shared_tap(0))
+
+    def test_scte35_monitor_uses_shared_tap(self):
+        """Test markers come from the tap, no splicemonitor process is started"""
+        tap = shared_tap(0)
+        monitor = SCTE35Monitor()
+        self.assertTrue(monitor.start_monitoring("udp://unused", tap=find_shared_tap(0)))
+        try:
+            self.assertIsNone(monitor.monitor_process)
+            self.assertEqual(tap.subscriber_count, 1)
+        finally:
+            monitor.stop_monitoring()
+        self.assertEqual(tap.subscriber_count, 0)
+
+    def test_free_udp_port(self):
+        port = free_udp_port()
+        self.assertFalse(DEFAULT_TAP_PORT <= port < DEFAULT_TAP_PORT + 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
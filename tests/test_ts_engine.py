@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-process transport stream engine
+"""
+
+import unittest
+import tempfile
+import os
+
+# Add parent directory to path for imports
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ts_engine import NUMPY_AVAILABLE, TS_PACKET_SIZE, PCR_CLOCK_HZ, PCR_WRAP, crc32_mpeg2
+from scte35_encoder import encode_splice_insert
+from splice_packetizer import SectionPacketizer
+
+if NUMPY_AVAILABLE:
+    from ts_engine import TSPacketEngine, MappedTSFile, analyze_file
+    from source_preview import SourcePreviewProcessor
+
+
+def make_packet(pid: int, cc: int, payload: bool = True, pcr: int = None,
+                discontinuity: bool = False) -> bytes:
+    """Build a single transport stream packet"""
+    header = bytearray([0x47, (pid >> 8) & 0x1F, pid & 0xFF, 0])
+    body = bytearray()
+    if pcr is not None or discontinuity:
+        flags = (0x80 if discontinuity else 0) | (0x10 if pcr is not None else 0)
+        af = bytearray([flags])
+        if pcr is not None:
+            base, ext = divmod(pcr, 300)
+            af += bytes([
+                (base >> 25) & 0xFF, (base >> 17) & 0xFF, (base >> 9) & 0xFF,
+                (base >> 1) & 0xFF, ((base & 1) << 7) | 0x7E | ((ext >> 8) & 1), ext & 0xFF
+            ])
+        afc = 0x30 if payload else 0x20
+        af_len = len(af) if payload else TS_PACKET_SIZE - 5
+        body += bytes([af_len]) + af
+        body += b'\xff' * (af_len - len(af))
+    else:
+        afc = 0x10
+    header[3] = afc | (cc & 0x0F)
+    packet = bytes(header) + bytes(body)
+    return packet + b'\xff' * (TS_PACKET_SIZE - len(packet))
+
+
+def make_stream(count: int, pid: int = 0x100, pcr_every: int = 10,
+                bitrate: int = 1504000, skip_cc_at: int = None) -> bytes:
+    """Build a single-PID stream with PCRs matching a constant bitrate"""
+    ticks_per_packet = TS_PACKET_SIZE * 8 * PCR_CLOCK_HZ // bitrate
+    packets = []
+    cc = 0
+    for i in range(count):
+        if i == skip_cc_at:
+            cc += 1
+        pcr = i * ticks_per_packet if i % pcr_every == 0 else None
+        packets.append(make_packet(pid, cc, pcr=pcr))
+        cc += 1
+    return b''.join(packets)
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE, "NumPy not available")
+class TestTSPacketEngine(unittest.TestCase):
+    """Test vectorized packet analysis"""
+
+    def setUp(self):
+        self.engine = TSPacketEngine()
+
+    def test_packet_and_pid_counts(self):
+        """Test packets are counted per PID"""
+        data = make_stream(50, pid=0x100) + make_stream(20, pid=0x200)
+        self.assertEqual(self.engine.feed(data), 70)
+
+        stats = self.engine.get_pid_stats()
+        self.assertEqual(stats[0x100].packets, 50)
+        self.assertEqual(stats[0x200].packets, 20)
+        self.assertEqual(self.engine.get_stats()['continuity_errors'], 0)
+
+    def test_continuity_errors(self):
+        """Test CC gaps are detected, also across feed() calls"""
+        data = make_stream(100, skip_cc_at=40)
+        self.engine.feed(data[:30 * TS_PACKET_SIZE])
+        self.engine.feed(data[30 * TS_PACKET_SIZE:])
+        self.assertEqual(self.engine.get_pid_stats()[0x100].cc_errors, 1)
+
+    def test_duplicate_and_discontinuity_are_not_errors(self):
+        """Test duplicate packets and signalled discontinuities"""
+        data = (make_packet(0x100, 0) + make_packet(0x100, 1) + make_packet(0x100, 1)
+                + make_packet(0x100, 7, discontinuity=True) + make_packet(0x100, 8))
+        self.engine.feed(data)
+        self.assertEqual(self.engine.get_stats()['continuity_errors'], 0)
+
+    def test_unaligned_chunks(self):
+        """Test packets split at arbitrary byte boundaries"""
+        data = make_stream(200)
+        for start in range(0, len(data), 1000):
+            self.engine.feed(data[start:start + 1000])
+        self.assertEqual(self.engine.total_packets, 200)
+        self.assertEqual(self.engine.get_stats()['continuity_errors'], 0)
+
+    def test_resync_after_garbage(self):
+        """Test the engine resynchronizes after lost sync"""
+        data = make_stream(10) + b'\x00' * 50 + make_stream(10, pid=0x200)
+        self.engine.feed(data)
+        self.assertEqual(self.engine.total_packets, 20)
+        self.assertEqual(self.engine.sync_errors, 1)
+
+    def test_pcr_bitrate(self):
+        """Test bitrate is derived from PCRs"""
+        self.engine.feed(make_stream(1000, bitrate=1504000))
+        stats = self.engine.get_stats()
+        self.assertAlmostEqual(stats['bitrate'], 1504000, delta=1504000 * 0.001)
+        self.assertEqual(stats['pcr_accuracy'], 100.0)
+
+        pid_stats = self.engine.get_pid_stats()[0x100]
+        self.assertEqual(pid_stats.pcr_count, 100)
+        self.assertEqual(pid_stats.pcr_discontinuities, 0)
+
+    def test_analyze_file(self):
+        """Test analyzing a file"""
+        with tempfile.NamedTemporaryFile(suffix='.ts', delete=False) as f:
+            f.write(make_stream(500))
+        try:
+            stats = analyze_file(f.name)
+            self.assertEqual(stats['total_packets'], 500)
+            self.assertIn(0x100, stats['pids'])
+        finally:
+            os.unlink(f.name)
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE, "NumPy not available")
+class TestMappedTSFile(unittest.TestCase):
+    """Test memory-mapped file analysis"""
+
+    def setUp(self):
+        # CC gap right on a range boundary when split in 4
+        self.data = b'\x00' * 5 + make_stream(4000, skip_cc_at=1000)
+        with tempfile.NamedTemporaryFile(suffix='.ts', delete=False) as f:
+            f.write(self.data)
+        self.path = f.name
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def test_packet_views(self):
+        """Test packet views start at the first sync byte"""
+        with MappedTSFile(self.path) as ts_file:
+            self.assertEqual(ts_file.offset, 5)
+            self.assertEqual(ts_file.packet_count, 4000)
+            self.assertEqual(ts_file.packets(10, 5).shape, (5, TS_PACKET_SIZE))
+            self.assertEqual(ts_file.split_ranges(4), [(0, 1000), (1000, 1000), (2000, 1000), (3000, 1000)])
+
+    def test_parallel_matches_sequential(self):
+        """Test merged range results equal a single pass"""
+        engine = TSPacketEngine()
+        engine.feed(self.data)
+        expected = engine.get_stats()
+
+        with MappedTSFile(self.path) as ts_file:
+            stats = ts_file.analyze(workers=4, chunk_packets=300)
+
+        self.assertEqual(stats['total_packets'], 4000)
+        self.assertEqual(stats['continuity_errors'], 1)
+        self.assertEqual(stats['bitrate'], expected['bitrate'])
+        self.assertEqual(stats['pids'][0x100]['pcr_count'], expected['pids'][0x100]['pcr_count'])
+
+    def test_seek_time(self):
+        """Test seeking by PCR time"""
+        with MappedTSFile(self.path) as ts_file:
+            # 1504000 b/s is 1000 packets per second, PCR every 10 packets
+            self.assertEqual(ts_file.seek_time(0), 0)
+            self.assertEqual(ts_file.seek_time(1.5), 1500)
+            self.assertEqual(ts_file.seek_time(10), ts_file.packet_count)
+
+    def test_empty_and_truncated_files(self):
+        """Test files without a whole packet analyze to zero packets"""
+        for data in (b'', make_packet(0x100, 0)[:101]):
+            with open(self.path, 'wb') as f:
+                f.write(data)
+            with MappedTSFile(self.path) as ts_file:
+                self.assertEqual(ts_file.split_ranges(4), [(0, 0)])
+                self.assertEqual(ts_file.analyze(workers=4)['total_packets'], 0)
+                self.assertEqual(len(ts_file.read_tables().tables), 0)
+
+    def write_pcrs(self, pcrs):
+        """File of one PCR packet per value"""
+        with open(self.path, 'wb') as f:
+            f.write(b''.join(make_packet(0x100, i, pcr=pcr) for i, pcr in enumerate(pcrs)))
+
+    def test_pcr_wrap(self):
+        """Test the index runs on across the 33-bit wrap"""
+        step = 27000 * 40
+        self.write_pcrs([(PCR_WRAP - 2 * step + i * step) % PCR_WRAP for i in range(5)])
+        with MappedTSFile(self.path) as ts_file:
+            _, values = ts_file.build_pcr_index()
+        self.assertEqual(list(values - values[0]), [i * step for i in range(5)])
+
+    def test_pcr_discontinuity(self):
+        """Test a backward PCR jump restarts the baseline instead of wrapping ahead"""
+        step = 27000 * 40
+        self.write_pcrs([10 * PCR_CLOCK_HZ + i * step for i in range(3)] + [i * step for i in range(3)])
+        with MappedTSFile(self.path) as ts_file:
+            _, values = ts_file.build_pcr_index()
+            self.assertEqual(list(values - values[0]), [i * step for i in range(6)])
+            self.assertEqual(ts_file.seek_time(0.1), 3)
+
+
+def long_section(table_id: int, extension: int, body: bytes, version: int = 0) -> bytes:
+    """PSI section with header and CRC around body"""
+    length = 5 + len(body) + 4
+    section = bytes([table_id, 0xB0 | (length >> 8), length & 0xFF,
+                     extension >> 8, extension & 0xFF, 0xC1 | (version << 1), 0, 0]) + body
+    return section + crc32_mpeg2(section).to_bytes(4, 'big')
+
+
+def pmt_section(program: int, streams, version: int = 0) -> bytes:
+    body = (0xE000 | streams[0][1]).to_bytes(2, 'big') + b'\xf0\x00'
+    for stream_type, pid in streams:
+        body += bytes([stream_type]) + (0xE000 | pid).to_bytes(2, 'big') + b'\xf0\x00'
+    return long_section(0x02, program, body, version)
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE, "NumPy not available")
+class TestPSISectionCache(unittest.TestCase):
+    """Test PSI/SI tables are decoded once per version"""
+
+    def setUp(self):
+        self.engine = TSPacketEngine(track_tables=True)
+        self.packetizers = {}
+        self.pat = long_section(0x00, 1, b'\x00\x01\xe1\x00\x00\x02\xe2\x00')
+        self.pmts = {0x100: pmt_section(1, [(0x1B, 0x101), (0x0F, 0x102), (0x86, 0x1F4)]),
+                     0x200: pmt_section(2, [(0x02, 0x201), (0x03, 0x202)])}
+        service = bytes([0x48, 9, 0x01, 2]) + b'P1' + bytes([4]) + b'News'
+        self.sdt = long_section(0x42, 1, b'\x00\x01\xff\x00\x01\xfc' + bytes([0x80, len(service)]) + service)
+
+    def packets(self, pid: int, section: bytes) -> bytes:
+        packetizer = self.packetizers.setdefault(pid, SectionPacketizer(pid))
+        return b''.join(packetizer.packetize([section]))
+
+    def cycle(self) -> bytes:
+        """One repetition of all tables"""
+        return (self.packets(0, self.pat) + self.packets(0x100, self.pmts[0x100]) +
+                self.packets(0x200, self.pmts[0x200]) + self.packets(0x11, self.sdt))
+
+    def test_repeated_sections_are_skipped(self):
+        """Test an MPTS is decoded once, later repetitions only counted"""
+        self.engine.feed(b''.join(self.cycle() for _ in range(10)))
+        tables = self.engine.tables
+        self.assertEqual(len(tables.tables), 4)
+        self.assertEqual(tables.generation, 4)
+        self.assertEqual(tables.repeated_sections, 36)
+        self.assertEqual(sorted(tables.pmts()), [1, 2])
+        self.assertEqual(tables.services()[1]['name'], 'News')
+        self.assertIn(0x1F4, tables.pids)
+
+    def test_new_version_and_bad_crc(self):
+        self.engine.feed(self.cycle())
+        self.pmts[0x200] = pmt_section(2, [(0x02, 0x201), (0x03, 0x202), (0x03, 0x203)], version=1)
+        self.engine.feed(self.cycle())
+        table = self.engine.tables.tables[(0x200, 0x02, 2)]
+        self.assertEqual((table.version, table.updates), (1, 2))
+        self.assertEqual(len(self.engine.tables.pmts()[2]['streams']), 3)
+
+        generation = self.engine.tables.generation
+        self.pmts[0x200] = self.pmts[0x200][:-1] + b'\x00'
+        self.engine.feed(self.cycle())
+        self.assertEqual(self.engine.tables.crc_errors, 1)
+        self.assertEqual(self.engine.tables.generation, generation)
+
+    def test_scte35_cues(self):
+        """Test SCTE-35 PIDs follow the PMT and only new cues are decoded"""
+        first, second = encode_splice_insert(1, immediate=True), encode_splice_insert(2, immediate=True)
+        self.engine.feed(self.cycle() + self.packets(0x1F4, first) + self.packets(0x1F4, first))
+        self.engine.feed(self.packets(0x1F4, second))
+        cue = self.engine.tables.tables[(0x1F4, 0xFC, 0)]
+        self.assertEqual((cue.parsed[0]['splice_event_id'], cue.updates), (2, 2))
+
+    def test_preview_tables_only_on_change(self):
+        updates = []
+        preview = SourcePreviewProcessor()
+        preview.callback = updates.append
+        self.engine.feed(self.cycle())
+        preview._publish_engine_stats(self.engine)
+        self.engine.feed(self.cycle())
+        preview._publish_engine_stats(self.engine)
+
+        self.assertEqual([sorted(update) for update in updates],
+                         [['pids', 'services', 'stream_info', 'tables'], ['pids', 'stream_info']])
+        services = {service.service_id: service for service in updates[0]['services']}
+        self.assertEqual((services['0x0001'].name, services['0x0001'].video_pid), ('News', '0x0101'))
+        self.assertEqual(services['0x0002'].audio_pids, ['0x0202'])
+        self.assertEqual([table.table_name for table in updates[0]['tables']],
+                         ['PAT', 'SDT', 'PMT - News', 'PMT - Program 2'])
+        pid_types = {info.pid: info.pid_type for info in updates[0]['pids']}
+        self.assertEqual((pid_types['0x0100'], pid_types['0x0000']), ('PMT', 'PAT'))
+
+
+if __name__ == '__main__':
+    unittest.main()
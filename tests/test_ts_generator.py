@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Tests for the synthetic transport stream generator
+"""
+
+import unittest
+import tempfile
+import socket
+import time
+import io
+import os
+
+# Add parent directory to path for imports
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ts_engine import NUMPY_AVAILABLE, SectionAssembler, parse_splice_info_section, TS_PACKET_SIZE
+from ts_generator import TSGenerator, GeneratorConfig, Fault, write_file, write_pipe, send_udp, stream_packets
+from psi_probe import run_probe, plan_remap
+
+if NUMPY_AVAILABLE:
+    from ts_engine import TSPacketEngine
+
+
+def packets_of(data, pid):
+    return [data[i:i + TS_PACKET_SIZE] for i in range(0, len(data), TS_PACKET_SIZE)
+            if ((data[i + 1] & 0x1F) << 8 | data[i + 2]) == pid]
+
+
+class TestGenerator(unittest.TestCase):
+    """Test generated streams are deterministic and carry the configured content"""
+
+    def test_deterministic(self):
+        config = GeneratorConfig(bitrate=2_000_000, cue_interval=0.5)
+        self.assertEqual(TSGenerator(config).read(5000), TSGenerator(config).read(5000))
+        self.assertNotEqual(TSGenerator(config).read(5000),
+                            TSGenerator(GeneratorConfig(bitrate=2_000_000, seed=1)).read(5000))
+
+    def test_scheduled_cues(self):
+        generator = TSGenerator(GeneratorConfig(bitrate=2_000_000, cue_interval=1.0, cue_preroll=4.0))
+        data = generator.read(generator.slot(2.5))
+        assembler = SectionAssembler(500)
+        cues = [parse_splice_info_section(section)
+                for packet in packets_of(data, 500) for section in assembler.feed(packet)]
+        self.assertEqual([cue['splice_event_id'] for cue in cues], [1, 2])
+        # Splice point preroll seconds after the cue, on the PTS timeline
+        self.assertAlmostEqual(cues[0]['pts_time'] / 90000, 1.0 + 0.5 + 4.0, places=2)
+        self.assertEqual(cues[0]['break_duration'], 30 * 90000)
+
+    def test_explicit_cue_and_bitrate_check(self):
+        generator = TSGenerator(GeneratorConfig(bitrate=2_000_000))
+        generator.schedule_cue(0.2, bytes([0xFC, 0x30, 0x11]).ljust(20, b'\x00'))
+        self.assertEqual(len(packets_of(generator.read(generator.slot(0.3)), 500)), 1)
+        with self.assertRaises(ValueError):
+            TSGenerator(GeneratorConfig(bitrate=1_000_000, video_bitrate=900_000))
+
+    def test_probe_generated_file(self):
+        """Test the PSI probe reads the generated tables"""
+        with tempfile.NamedTemporaryFile(suffix='.ts', delete=False) as f:
+            path = f.name
+        try:
+            self.assertEqual(write_file(TSGenerator(GeneratorConfig(bitrate=1_000_000)), path, 1.0), 665)
+            result = run_probe(['-I', 'file', path])
+        finally:
+            os.unlink(path)
+        program, = result.programs
+        self.assertEqual((program.service_name, program.pmt_pid, program.pcr_pid), ('IBE-100 Test', 4096, 256))
+        self.assertEqual(plan_remap(result, 256, 257).rules, [])
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE, "NumPy not available")
+class TestGeneratedStreamAnalysis(unittest.TestCase):
+    """Test the engine measures exactly what was generated, faults included"""
+
+    def analyze(self, faults=(), seconds=3.0, bitrate=5_000_000):
+        generator = TSGenerator(GeneratorConfig(bitrate=bitrate), faults)
+        engine = TSPacketEngine(track_tables=True)
+        engine.feed(generator.read(generator.slot(seconds)))
+        return generator, engine
+
+    def test_clean_stream(self):
+        generator, engine = self.analyze()
+        stats = engine.get_stats()
+        self.assertAlmostEqual(stats['bitrate'], 5_000_000, delta=5)
+        self.assertEqual((stats['continuity_errors'], stats['pcr_accuracy']), (0, 100.0))
+        self.assertLessEqual(stats['pids'][256]['pcr_max_interval_ms'], 40)
+        self.assertEqual(engine.tables.services()[1]['name'], 'IBE-100 Test')
+        self.assertEqual(stats['services_count'], 1)
+        self.assertEqual(stats['pids'][0x1FFF]['packets'], generator.stats['null_packets'])
+
+    def test_faults(self):
+        generator, engine = self.analyze([
+            Fault('cc_gap', 0.5), Fault('cc_gap', 0.7, pid=0), Fault('pcr_jump', 1.0, amount=2.0),
+            Fault('missing_psi', 1.5, duration=1.0),
+        ])
+        pids = engine.get_pid_stats()
+        self.assertEqual((pids[256].cc_errors, pids[0].cc_errors), (1, 1))
+        self.assertEqual(pids[256].pcr_discontinuities, 1)
+        # PAT every 100 ms for 3 s, none for one second
+        self.assertEqual(pids[0].packets, 20)
+        self.assertEqual(generator.stats['faults'], 4)
+
+
+class TestOutputs(unittest.TestCase):
+    """Test pipe and UDP output"""
+
+    def test_pipe(self):
+        stream = io.BytesIO()
+        self.assertEqual(write_pipe(TSGenerator(), stream, duration=0.1, realtime=False), 665)
+        self.assertEqual(len(stream.getvalue()), 665 * TS_PACKET_SIZE)
+
+    def test_udp_at_line_rate(self):
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(("127.0.0.1", 0))
+        receiver.settimeout(5)
+        try:
+            generator = TSGenerator(GeneratorConfig(bitrate=2_000_000))
+            send_udp(generator, "127.0.0.1", receiver.getsockname()[1], duration=0.2)
+            sizes = [len(receiver.recv(2048)) for _ in range(38)]
+        finally:
+            receiver.close()
+        self.assertEqual(set(sizes), {7 * TS_PACKET_SIZE})
+
+    def test_pacing(self):
+        start = time.monotonic()
+        sent = stream_packets(TSGenerator(GeneratorConfig(bitrate=2_000_000)), lambda data: None, duration=0.25)
+        self.assertEqual(sent, 332)
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+
+
+if __name__ == '__main__':
+    unittest.main()
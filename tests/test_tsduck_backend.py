@@ -43,7 +43,7 @@ class TestTSDuckCommandBuilder(unittest.TestCase):
         }
         
         command = TSDuckCommandBuilder.build_input_command(config)
-        expected = ['-I', 'udp', '239.1.1.1:1234']
+        expected = ['-I', 'ip', '239.1.1.1:1234']
         self.assertEqual(command, expected)
     
     def test_build_output_command_file(self):
@@ -9,27 +9,32 @@ import time
 import json
 import os
 from datetime import datetime
+import threading
 import threefive
 
+from splice_events import SpliceEvent, SpliceEventDecoder, SpliceEventRing, pump_events, DEFAULT_RING_CAPACITY
+
 class ThreefiveSCTE35Detector:
     """Advanced SCTE-35 detector using threefive library"""
     
-    def __init__(self):
-        self.markers_detected = []
+    def __init__(self, capacity: int = DEFAULT_RING_CAPACITY):
+        self.markers_detected = SpliceEventRing(capacity)
+        self.markers_detected.subscribe(self._notify_callbacks)
         self.alert_callbacks = []
     
     def add_alert_callback(self, callback):
         """Add a callback function for SCTE-35 alerts"""
         self.alert_callbacks.append(callback)
     
-    def trigger_alert(self, marker_info):
+    def trigger_alert(self, event: SpliceEvent):
         """Trigger alert for detected SCTE-35 marker"""
-        self.markers_detected.append(marker_info)
-        
-        # Call all registered callbacks
+        self.markers_detected.append(event)
+    
+    def _notify_callbacks(self, event: SpliceEvent):
+        """Call all registered callbacks"""
         for callback in self.alert_callbacks:
             try:
-                callback(marker_info)
+                callback(event)
             except Exception as e:
                 print(f"⚠️  Alert callback error: {e}")
     
@@ -49,42 +54,28 @@ class ThreefiveSCTE35Detector:
         print("🚀 Starting detection...")
         print()
         
-        markers_found = []
+        first_sequence = self.markers_detected.total
         
         try:
+            # threefive prints each cue as a JSON object
             process = subprocess.Popen(
                 command,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
                 text=True
             )
             
-            start_time = time.time()
+            reader = threading.Thread(
+                target=pump_events,
+                args=(process.stdout, self.markers_detected, SpliceEventDecoder(input_source)),
+                daemon=True
+            )
+            reader.start()
             
-            while time.time() - start_time < duration:
-                if process.poll() is not None:
-                    break
-                    
-                try:
-                    line = process.stdout.readline()
-                    if line:
-                        line = line.strip()
-                        if line and self._is_scte35_output(line):
-                            timestamp = datetime.now().strftime("%H:%M:%S")
-                            marker_info = {
-                                'timestamp': timestamp,
-                                'source': input_source,
-                                'data': line,
-                                'type': 'SCTE-35 Marker (Threefive)'
-                            }
-                            
-                            markers_found.append(marker_info)
-                            self.trigger_alert(marker_info)
-                            
-                except Exception as e:
-                    print(f"⚠️  Read error: {e}")
-                
-                time.sleep(0.1)
+            try:
+                process.wait(timeout=duration)
+            except subprocess.TimeoutExpired:
+                pass
             
             # Stop process
             process.terminate()
@@ -101,20 +92,16 @@ class ThreefiveSCTE35Detector:
         print("📊 Detection Results:")
         print("=" * 50)
         
+        markers_found, _ = self.markers_detected.since(first_sequence)
         if markers_found:
             print(f"✅ Found {len(markers_found)} SCTE-35 markers!")
-            for i, marker in enumerate(markers_found, 1):
-                print(f"   {i}. [{marker['timestamp']}] {marker['type']}")
+            for i, event in enumerate(markers_found, 1):
+                print(f"   {i}. [{event.timestamp}] {event.description}")
             return True
         else:
             print("❌ No SCTE-35 markers detected")
             return False
     
-    def _is_scte35_output(self, line):
-        """Check if line contains SCTE-35 output from threefive"""
-        scte35_keywords = ['splice', 'scte', 'cue', 'break', 'insert', 'time_signal', 'splice_insert']
-        return any(keyword in line.lower() for keyword in scte35_keywords)
-    
     def test_threefive_detection(self):
         """Test threefive detection on your HLS stream"""
         
@@ -177,13 +164,12 @@ class ThreefiveSCTE35Detector:
         
         return True
 
-def alert_callback(marker_info):
+def alert_callback(event):
     """Example alert callback function"""
     print(f"🚨 ALERT: SCTE-35 Marker Detected!")
-    print(f"   Time: {marker_info['timestamp']}")
-    print(f"   Source: {marker_info['source']}")
-    print(f"   Type: {marker_info['type']}")
-    print(f"   Data: {marker_info['data'][:100]}...")
+    print(f"   Time: {event.timestamp}")
+    print(f"   Source: {event.source}")
+    print(f"   Type: {event.description}")
     print()
 
 def main():
@@ -209,7 +195,7 @@ def main():
     print("=" * 70)
     print(f"Original stream SCTE-35 markers: {'✅ Found' if original_result else '❌ None'}")
     print(f"Threefive-generated markers: {'✅ Valid' if generated_result else '❌ Failed'}")
-    print(f"Total markers detected: {len(detector.markers_detected)}")
+    print(f"Total markers detected: {detector.markers_detected.total}")
     
     if generated_result:
         print("\n🎉 SUCCESS: Threefive SCTE-35 system is working!")
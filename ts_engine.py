@@ -0,0 +1,1133 @@
+#!/usr/bin/env python3
+"""
+Transport Stream Engine
+In-process MPEG-TS packet analysis for TSDuck GUI
+
+Packets are processed in large blocks (7 x 188 x N bytes) using NumPy views,
+so sync bytes, PIDs, continuity counters, adaptation fields and PCRs are
+extracted for a whole block at once instead of scraping text lines printed
+by a child `tsp -P analyze` process.
+"""
+
+import os
+import mmap
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, List, Optional, Any, BinaryIO, Tuple
+from dataclasses import dataclass, field
+import logging
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+TS_PACKET_SIZE = 188
+TS_SYNC_BYTE = 0x47
+NULL_PID = 0x1FFF
+PID_COUNT = 0x2000
+
+# Read granularity: 7 packets fit one UDP datagram, read 1024 of those at once
+DEFAULT_CHUNK_PACKETS = 7 * 1024
+
+PCR_CLOCK_HZ = 27000000
+PCR_WRAP = (1 << 33) * 300
+# ISO/IEC 13818-1: PCR accuracy tolerance is +/-500 ns
+PCR_ACCURACY_TOLERANCE_NS = 500
+# Above this gap two consecutive PCRs are treated as a discontinuity
+PCR_DISCONTINUITY_TICKS = PCR_CLOCK_HZ // 10
+# Files are split over worker processes in ranges of at least this many packets
+MIN_PACKETS_PER_WORKER = 50000
+
+
+@dataclass
+class PIDStats:
+    """Per-PID statistics data structure"""
+    pid: int
+    packets: int = 0
+    bitrate: int = 0
+    cc_errors: int = 0
+    scrambled_packets: int = 0
+    tei_packets: int = 0
+    pcr_count: int = 0
+    pcr_discontinuities: int = 0
+    pcr_max_interval_ms: float = 0.0
+    pcr_max_jitter_ns: float = 0.0
+
+
+@dataclass
+class _PCRState:
+    """Running PCR state for one PID"""
+    first_pcr: int = -1
+    first_packet: int = -1
+    first_discontinuity: bool = False
+    last_pcr: int = -1
+    last_packet: int = -1
+    count: int = 0
+    intervals: int = 0
+    accurate_intervals: int = 0
+    discontinuities: int = 0
+    sum_ticks: int = 0
+    sum_packets: int = 0
+    max_interval_ticks: int = 0
+    max_jitter_ticks: float = 0.0
+
+
+def _require_numpy():
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("NumPy is required for in-process transport stream analysis")
+
+
+def _build_crc32_table() -> List[int]:
+    table = []
+    for i in range(256):
+        crc = i << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else (crc << 1)
+        table.append(crc & 0xFFFFFFFF)
+    return table
+
+
+_CRC32_TABLE = _build_crc32_table()
+
+
+def crc32_mpeg2(data: bytes, crc: int = 0xFFFFFFFF) -> int:
+    """CRC32 as used by MPEG-2 PSI/SI sections"""
+    table = _CRC32_TABLE
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ table[(crc >> 24) ^ byte]
+    return crc
+
+
+class SectionAssembler:
+    """Reassemble PSI/SI sections from the packets of one PID"""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.buffer = bytearray()
+        self.last_cc = -1
+        self.synchronized = False
+
+    @property
+    def pending(self) -> bool:
+        """True when a section started but is not complete yet"""
+        return self.synchronized and len(self.buffer) > 0
+
+    def feed(self, packet) -> List[bytes]:
+        """Feed one 188-byte packet, return the sections completed by it"""
+        packet = bytes(packet)
+        afc = (packet[3] >> 4) & 0x03
+        if not afc & 0x01:
+            return []
+        cc = packet[3] & 0x0F
+        if self.last_cc >= 0 and cc == self.last_cc:
+            return []  # duplicate packet
+        if self.last_cc >= 0 and cc != (self.last_cc + 1) & 0x0F:
+            # Lost packets: drop the section in progress
+            self.buffer.clear()
+            self.synchronized = False
+        self.last_cc = cc
+
+        start = 4 + (1 + packet[4] if afc & 0x02 else 0)
+        if start >= TS_PACKET_SIZE:
+            return []
+        payload = packet[start:]
+        sections = []
+
+        if packet[1] & 0x40:
+            pointer = payload[0]
+            if self.synchronized:
+                self.buffer += payload[1:1 + pointer]
+                sections.extend(self._extract())
+            self.buffer = bytearray(payload[1 + pointer:])
+            self.synchronized = True
+        elif self.synchronized:
+            self.buffer += payload
+        sections.extend(self._extract())
+        return sections
+
+    def _extract(self) -> List[bytes]:
+        """Pop all complete sections from the buffer"""
+        sections = []
+        while len(self.buffer) >= 3 and self.buffer[0] != 0xFF:
+            length = 3 + (((self.buffer[1] & 0x0F) << 8) | self.buffer[2])
+            if len(self.buffer) < length:
+                break
+            sections.append(bytes(self.buffer[:length]))
+            del self.buffer[:length]
+        if self.buffer[:1] == b'\xff':
+            # Stuffing up to the end of the packet
+            self.buffer.clear()
+        return sections
+
+
+def select_packets(data, pids) -> List[bytes]:
+    """Packets of the given PIDs from a chunk of aligned packets"""
+    if not len(data) or len(data) % TS_PACKET_SIZE or data[0] != TS_SYNC_BYTE:
+        return []
+    if NUMPY_AVAILABLE:
+        block = np.frombuffer(data, dtype=np.uint8).reshape(-1, TS_PACKET_SIZE)
+        pid = ((block[:, 1].astype(np.uint16) & 0x1F) << 8) | block[:, 2]
+        return [block[row].tobytes() for row in np.flatnonzero(np.isin(pid, list(pids)))]
+    data = bytes(data)
+    return [data[i:i + TS_PACKET_SIZE] for i in range(0, len(data), TS_PACKET_SIZE)
+            if ((data[i + 1] & 0x1F) << 8 | data[i + 2]) in pids]
+
+
+PAT_PID = 0x0000
+NIT_PID = 0x0010
+SDT_PID = 0x0011
+TABLE_ID_PAT = 0x00
+TABLE_ID_PMT = 0x02
+TABLE_ID_NIT_ACTUAL = 0x40
+TABLE_ID_NIT_OTHER = 0x41
+TABLE_ID_SDT_ACTUAL = 0x42
+TABLE_ID_SDT_OTHER = 0x46
+TABLE_ID_SCTE35 = 0xFC
+NETWORK_NAME_DESCRIPTOR = 0x40
+SERVICE_DESCRIPTOR = 0x48
+SCTE35_STREAM_TYPE = 0x86
+
+TABLE_NAMES = {
+    TABLE_ID_PAT: 'PAT',
+    TABLE_ID_PMT: 'PMT',
+    TABLE_ID_NIT_ACTUAL: 'NIT',
+    TABLE_ID_NIT_OTHER: 'NIT Other',
+    TABLE_ID_SDT_ACTUAL: 'SDT',
+    TABLE_ID_SDT_OTHER: 'SDT Other',
+    TABLE_ID_SCTE35: 'SCTE-35',
+}
+
+
+def _psi_header(section: bytes) -> Dict[str, Any]:
+    """Fields of the long section header shared by PSI/SI tables"""
+    if len(section) < 12 or not section[1] & 0x80:
+        raise ValueError("Not a long-form PSI/SI section")
+    return {
+        'table_id': section[0],
+        'table_id_extension': int.from_bytes(section[3:5], 'big'),
+        'version': (section[5] >> 1) & 0x1F,
+        'current': bool(section[5] & 0x01),
+        'section_number': section[6],
+        'last_section_number': section[7],
+        'crc_valid': crc32_mpeg2(section) == 0,
+    }
+
+
+def _descriptors(data: bytes) -> List[Tuple[int, bytes]]:
+    """(tag, payload) of a descriptor loop"""
+    descriptors = []
+    pos = 0
+    while pos + 2 <= len(data):
+        length = data[pos + 1]
+        descriptors.append((data[pos], bytes(data[pos + 2:pos + 2 + length])))
+        pos += 2 + length
+    return descriptors
+
+
+def _dvb_text(data: bytes) -> str:
+    """DVB string, UTF-8 when its character table selector says so, else Latin-1"""
+    encoding = 'latin-1'
+    if data[:1] and data[0] < 0x20:
+        if data[0] == 0x15:
+            encoding = 'utf-8'
+        data = data[3:] if data[0] == 0x10 else data[1:]
+    return bytes(data).decode(encoding, errors='replace')
+
+
+def parse_pat(section: bytes) -> Dict[str, Any]:
+    """Decode a PAT section: program_number -> PMT PID, program 0 is the NIT PID"""
+    info = _psi_header(section)
+    if info['table_id'] != TABLE_ID_PAT:
+        raise ValueError("Not a PAT section")
+    info['transport_stream_id'] = info['table_id_extension']
+    programs = {}
+    body = section[8:-4]
+    for pos in range(0, len(body) - 3, 4):
+        programs[int.from_bytes(body[pos:pos + 2], 'big')] = int.from_bytes(body[pos + 2:pos + 4], 'big') & 0x1FFF
+    info['nit_pid'] = programs.pop(0, None)
+    info['programs'] = programs
+    return info
+
+
+def parse_pmt(section: bytes) -> Dict[str, Any]:
+    """Decode a PMT section with its elementary streams and their descriptor tags"""
+    info = _psi_header(section)
+    if info['table_id'] != TABLE_ID_PMT:
+        raise ValueError("Not a PMT section")
+    info['program_number'] = info['table_id_extension']
+    info['pcr_pid'] = int.from_bytes(section[8:10], 'big') & 0x1FFF
+    pos = 12 + (int.from_bytes(section[10:12], 'big') & 0x0FFF)
+    end = len(section) - 4
+    streams = []
+    while pos + 5 <= end:
+        es_info_length = int.from_bytes(section[pos + 3:pos + 5], 'big') & 0x0FFF
+        streams.append({
+            'stream_type': section[pos],
+            'pid': int.from_bytes(section[pos + 1:pos + 3], 'big') & 0x1FFF,
+            'descriptor_tags': [tag for tag, _ in _descriptors(section[pos + 5:pos + 5 + es_info_length])],
+        })
+        pos += 5 + es_info_length
+    info['streams'] = streams
+    return info
+
+
+def parse_nit(section: bytes) -> Dict[str, Any]:
+    """Decode a NIT section: network name and the transport streams it lists"""
+    info = _psi_header(section)
+    if info['table_id'] not in (TABLE_ID_NIT_ACTUAL, TABLE_ID_NIT_OTHER):
+        raise ValueError("Not a NIT section")
+    info['network_id'] = info['table_id_extension']
+    info['network_name'] = ''
+    end = 10 + (int.from_bytes(section[8:10], 'big') & 0x0FFF)
+    for tag, data in _descriptors(section[10:end]):
+        if tag == NETWORK_NAME_DESCRIPTOR:
+            info['network_name'] = _dvb_text(data)
+    pos = end + 2
+    streams = []
+    while pos + 6 <= len(section) - 4:
+        streams.append({
+            'transport_stream_id': int.from_bytes(section[pos:pos + 2], 'big'),
+            'original_network_id': int.from_bytes(section[pos + 2:pos + 4], 'big'),
+        })
+        pos += 6 + (int.from_bytes(section[pos + 4:pos + 6], 'big') & 0x0FFF)
+    info['transport_streams'] = streams
+    return info
+
+
+def parse_sdt(section: bytes) -> Dict[str, Any]:
+    """Decode an SDT section: service_id -> name, provider and service_type"""
+    info = _psi_header(section)
+    info['transport_stream_id'] = info['table_id_extension']
+    info['original_network_id'] = int.from_bytes(section[8:10], 'big')
+    services = {}
+    pos = 11
+    end = len(section) - 4
+    while pos + 5 <= end:
+        service_id = int.from_bytes(section[pos:pos + 2], 'big')
+        loop_length = int.from_bytes(section[pos + 3:pos + 5], 'big') & 0x0FFF
+        service = {'name': '', 'provider': '', 'service_type': None}
+        for tag, data in _descriptors(section[pos + 5:pos + 5 + loop_length]):
+            if tag == SERVICE_DESCRIPTOR and len(data) >= 3:
+                provider_end = 2 + data[1]
+                service['service_type'] = data[0]
+                service['provider'] = _dvb_text(data[2:provider_end])
+                service['name'] = _dvb_text(data[provider_end + 1:provider_end + 1 + data[provider_end]])
+        services[service_id] = service
+        pos += 5 + loop_length
+    info['services'] = services
+    return info
+
+
+SPLICE_COMMAND_NAMES = {
+    0x00: 'splice_null',
+    0x04: 'splice_schedule',
+    0x05: 'splice_insert',
+    0x06: 'time_signal',
+    0x07: 'bandwidth_reservation',
+    0xFF: 'private_command',
+}
+
+
+def _parse_splice_time(data: bytes, pos: int) -> Tuple[Optional[int], int]:
+    """Parse a splice_time() structure, returns (pts or None, new position)"""
+    if data[pos] & 0x80:
+        pts = ((data[pos] & 0x01) << 32) | int.from_bytes(data[pos + 1:pos + 5], 'big')
+        return pts, pos + 5
+    return None, pos + 1
+
+
+def parse_splice_info_section(section: bytes) -> Dict[str, Any]:
+    """Decode the main fields of an SCTE-35 splice_info_section"""
+    if len(section) < 18 or section[0] != 0xFC:
+        raise ValueError("Not a splice_info_section")
+
+    command_type = section[13]
+    info = {
+        'table_id': section[0],
+        'section_length': len(section),
+        'crc_valid': crc32_mpeg2(section) == 0,
+        'protocol_version': section[3],
+        'encrypted': bool(section[4] & 0x80),
+        'pts_adjustment': ((section[4] & 0x01) << 32) | int.from_bytes(section[5:9], 'big'),
+        'tier': (int.from_bytes(section[10:12], 'big') >> 4) & 0x0FFF,
+        'command_type': SPLICE_COMMAND_NAMES.get(command_type, f"0x{command_type:02X}"),
+    }
+    if info['encrypted']:
+        return info
+
+    pos = 14
+    if command_type == 0x05:
+        info['splice_event_id'] = int.from_bytes(section[pos:pos + 4], 'big')
+        info['cancel'] = bool(section[pos + 4] & 0x80)
+        pos += 5
+        if not info['cancel']:
+            flags = section[pos]
+            info['out_of_network'] = bool(flags & 0x80)
+            program_splice = bool(flags & 0x40)
+            duration_flag = bool(flags & 0x20)
+            info['immediate'] = bool(flags & 0x10)
+            pos += 1
+            if program_splice and not info['immediate']:
+                info['pts_time'], pos = _parse_splice_time(section, pos)
+            elif not program_splice:
+                # Component splice mode, component times are not reported
+                components = section[pos]
+                pos += 1
+                for _ in range(components):
+                    pos += 1
+                    if not info['immediate']:
+                        _, pos = _parse_splice_time(section, pos)
+            if duration_flag:
+                info['auto_return'] = bool(section[pos] & 0x80)
+                info['break_duration'] = ((section[pos] & 0x01) << 32) | int.from_bytes(section[pos + 1:pos + 5], 'big')
+                pos += 5
+            info['unique_program_id'] = int.from_bytes(section[pos:pos + 2], 'big')
+            info['avail_num'] = section[pos + 2]
+            info['avails_expected'] = section[pos + 3]
+    elif command_type == 0x06:
+        info['pts_time'], pos = _parse_splice_time(section, pos)
+    return info
+
+
+@dataclass
+class PSITable:
+    """Current version of one table, its sections by section_number"""
+    pid: int
+    table_id: int
+    table_id_extension: int
+    version: Optional[int]
+    last_section_number: int = 0
+    sections: Dict[int, bytes] = field(default_factory=dict)
+    parsed: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+    updated_at: float = 0.0
+    updates: int = 0
+
+    @property
+    def name(self) -> str:
+        return TABLE_NAMES.get(self.table_id, f"TID 0x{self.table_id:02X}")
+
+    @property
+    def complete(self) -> bool:
+        return len(self.sections) > self.last_section_number
+
+    @property
+    def size(self) -> int:
+        return sum(len(section) for section in self.sections.values())
+
+
+class PSISectionCache:
+    """PAT, PMT, NIT, SDT and SCTE-35 tables of a stream, decoded once per version
+
+    PSI repeats several times a second per service. A repeated section is
+    recognized by its header and CRC field and skipped without computing
+    its CRC or parsing it again; only new versions, new sections and new
+    SCTE-35 cues are checked and decoded. PMT and SCTE-35 PIDs follow the
+    PAT and PMTs, so every service of an MPTS is covered.
+    """
+
+    def __init__(self, scte35_pids: Tuple[int, ...] = ()):
+        self.assemblers: Dict[int, SectionAssembler] = {}
+        self.tables: Dict[Tuple[int, int, int], PSITable] = {}
+        self.pids = set()
+        self.scte35_pids = set(scte35_pids)
+        # Header and CRC field of the last accepted section per (pid, table_id, extension, number)
+        self._fingerprints: Dict[Tuple[int, int, int, int], bytes] = {}
+        # Increments on every table change, consumers refresh their views when it moved
+        self.generation = 0
+        self.sections = 0
+        self.repeated_sections = 0
+        self.crc_errors = 0
+        self.parse_errors = 0
+        self._track_pids()
+
+    def process_block(self, block, pid=None) -> int:
+        """Feed an aligned (N, 188) packet array, returns the number of table changes"""
+        if pid is None:
+            pid = ((block[:, 1].astype(np.int32) & 0x1F) << 8) | block[:, 2]
+        changed = 0
+        done = set()
+        # A PAT or PMT in this block may add PIDs whose packets follow it in the same block
+        while self.pids - done:
+            todo = self.pids - done
+            done |= todo
+            for row in np.flatnonzero(np.isin(pid, list(todo))):
+                changed += self.feed_packet(int(pid[row]), block[row].tobytes())
+        return changed
+
+    def feed_packet(self, pid: int, packet) -> int:
+        """Feed one packet, returns the number of table changes"""
+        assembler = self.assemblers.get(pid)
+        if assembler is None:
+            return 0
+        return sum(self._section(pid, section) for section in assembler.feed(packet))
+
+    def _section(self, pid: int, section: bytes) -> int:
+        self.sections += 1
+        table_id = section[0]
+        if table_id not in TABLE_NAMES:
+            return 0
+        if table_id == TABLE_ID_SCTE35:
+            key = (pid, table_id, 0, 0)
+        elif len(section) < 12 or not section[1] & 0x80:
+            self.parse_errors += 1
+            return 0
+        elif not section[5] & 0x01:
+            # Next version, not applicable yet
+            return 0
+        else:
+            key = (pid, table_id, int.from_bytes(section[3:5], 'big'), section[6])
+
+        fingerprint = section[:8] + section[-4:]
+        if self._fingerprints.get(key) == fingerprint:
+            self.repeated_sections += 1
+            return 0
+        if crc32_mpeg2(section) != 0:
+            self.crc_errors += 1
+            return 0
+        try:
+            parsed = self._parse(table_id, section)
+        except (ValueError, IndexError) as e:
+            self.parse_errors += 1
+            logging.debug(f"Malformed {TABLE_NAMES[table_id]} section on PID {pid}: {e}")
+            return 0
+
+        self._store(key, section, parsed)
+        self._fingerprints[key] = fingerprint
+        self.generation += 1
+        if table_id in (TABLE_ID_PAT, TABLE_ID_PMT):
+            self._track_pids()
+        return 1
+
+    @staticmethod
+    def _parse(table_id: int, section: bytes) -> Dict[str, Any]:
+        if table_id == TABLE_ID_PAT:
+            return parse_pat(section)
+        if table_id == TABLE_ID_PMT:
+            return parse_pmt(section)
+        if table_id in (TABLE_ID_NIT_ACTUAL, TABLE_ID_NIT_OTHER):
+            return parse_nit(section)
+        if table_id in (TABLE_ID_SDT_ACTUAL, TABLE_ID_SDT_OTHER):
+            return parse_sdt(section)
+        return parse_splice_info_section(section)
+
+    def _store(self, key: Tuple[int, int, int, int], section: bytes, parsed: Dict[str, Any]):
+        pid, table_id, extension, number = key
+        version = parsed.get('version')
+        table = self.tables.get(key[:3])
+        if table is None or table.version != version:
+            if table is not None:
+                # New version: sections of the previous one no longer apply
+                for old in table.sections:
+                    self._fingerprints.pop(key[:3] + (old,), None)
+            updates = table.updates if table is not None else 0
+            table = self.tables[key[:3]] = PSITable(pid, table_id, extension, version, updates=updates)
+        table.sections[number] = section
+        table.parsed[number] = parsed
+        table.last_section_number = parsed.get('last_section_number', 0)
+        table.updated_at = time.time()
+        table.updates += 1
+
+    def _track_pids(self):
+        """Follow the PMT, NIT and SCTE-35 PIDs announced by the PAT and PMTs"""
+        pids = {PAT_PID, NIT_PID, SDT_PID} | self.scte35_pids
+        pat = self.pat()
+        pids.update(pat['programs'].values())
+        if pat['nit_pid'] is not None:
+            pids.add(pat['nit_pid'])
+        for pmt in self.pmts().values():
+            pids.update(stream['pid'] for stream in pmt['streams'] if stream['stream_type'] == SCTE35_STREAM_TYPE)
+
+        for pid in pids - self.assemblers.keys():
+            self.assemblers[pid] = SectionAssembler(pid)
+        for pid in self.assemblers.keys() - pids:
+            del self.assemblers[pid]
+        for key in [key for key in self.tables if key[0] not in pids]:
+            for number in self.tables.pop(key).sections:
+                self._fingerprints.pop(key + (number,), None)
+            self.generation += 1
+        self.pids = pids
+
+    def _tables(self, *table_ids: int) -> List[PSITable]:
+        return [table for table in self.tables.values() if table.table_id in table_ids]
+
+    def pat(self) -> Dict[str, Any]:
+        """PAT programs of all sections, program_number -> PMT PID"""
+        programs, nit_pid = {}, None
+        for table in self._tables(TABLE_ID_PAT):
+            for parsed in table.parsed.values():
+                programs.update(parsed['programs'])
+                nit_pid = parsed['nit_pid'] if parsed['nit_pid'] is not None else nit_pid
+        return {'programs': programs, 'nit_pid': nit_pid}
+
+    def pmts(self) -> Dict[int, Dict[str, Any]]:
+        """Current PMT per program_number, from the PMT PIDs of the PAT"""
+        pmt_pids = set(self.pat()['programs'].values()) if self._tables(TABLE_ID_PAT) else None
+        return {table.table_id_extension: table.parsed[0] for table in self._tables(TABLE_ID_PMT)
+                if 0 in table.parsed and (pmt_pids is None or table.pid in pmt_pids)}
+
+    def services(self) -> Dict[int, Dict[str, Any]]:
+        """SDT actual services, service_id -> name, provider and service_type"""
+        services = {}
+        for table in self._tables(TABLE_ID_SDT_ACTUAL):
+            for parsed in table.parsed.values():
+                services.update(parsed['services'])
+        return services
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'tables': len(self.tables),
+            'pids': sorted(self.pids),
+            'generation': self.generation,
+            'sections': self.sections,
+            'repeated_sections': self.repeated_sections,
+            'crc_errors': self.crc_errors,
+            'parse_errors': self.parse_errors,
+        }
+
+
+class TSPacketEngine:
+    """Vectorized MPEG-TS packet analyzer producing per-PID statistics"""
+
+    def __init__(self, chunk_packets: int = DEFAULT_CHUNK_PACKETS, track_tables: bool = False):
+        _require_numpy()
+        self.chunk_packets = chunk_packets
+        self.track_tables = track_tables
+        self.reset()
+
+    def reset(self):
+        """Reset all counters"""
+        self.total_packets = 0
+        self.sync_errors = 0
+        self.start_time = None
+        self.last_time = None
+        self._pending = b''
+        self._packets = np.zeros(PID_COUNT, dtype=np.int64)
+        self._cc_errors = np.zeros(PID_COUNT, dtype=np.int64)
+        self._scrambled = np.zeros(PID_COUNT, dtype=np.int64)
+        self._tei = np.zeros(PID_COUNT, dtype=np.int64)
+        self._last_cc = np.full(PID_COUNT, -1, dtype=np.int16)
+        self._first_cc = np.full(PID_COUNT, -1, dtype=np.int16)
+        self._first_disc = np.zeros(PID_COUNT, dtype=bool)
+        self._pcr: Dict[int, _PCRState] = {}
+        # PSI/SI tables, only when asked for since most users only need counters
+        self.tables = PSISectionCache() if self.track_tables else None
+
+    def feed(self, data) -> int:
+        """Feed raw bytes (any length, any alignment); returns packets processed"""
+        now = time.monotonic()
+        if self.start_time is None:
+            self.start_time = now
+        self.last_time = now
+
+        if self._pending:
+            data = self._pending + bytes(data)
+            self._pending = b''
+
+        buf = np.frombuffer(data, dtype=np.uint8)
+        processed = 0
+        offset = 0
+        size = len(buf)
+
+        while size - offset >= TS_PACKET_SIZE:
+            if buf[offset] != TS_SYNC_BYTE:
+                resync = self._find_sync(buf, offset)
+                if resync < 0:
+                    # Keep the tail, the sync byte may be in the next chunk
+                    offset = max(offset, size - 2 * TS_PACKET_SIZE + 1)
+                    break
+                self.sync_errors += 1
+                offset = resync
+                continue
+
+            count = (size - offset) // TS_PACKET_SIZE
+            block = buf[offset:offset + count * TS_PACKET_SIZE].reshape(count, TS_PACKET_SIZE)
+
+            # Stop at the first lost sync byte, the rest is realigned on the next pass
+            lost = np.flatnonzero(block[:, 0] != TS_SYNC_BYTE)
+            if len(lost):
+                count = int(lost[0])
+                block = block[:count]
+
+            self.process_block(block)
+            processed += count
+            offset += count * TS_PACKET_SIZE
+
+        if offset < size:
+            self._pending = bytes(data[offset:])
+
+        return processed
+
+    def _find_sync(self, buf, start: int) -> int:
+        """Find the next offset where two consecutive sync bytes line up"""
+        candidates = np.flatnonzero(buf[start:] == TS_SYNC_BYTE) + start
+        for pos in candidates:
+            nxt = pos + TS_PACKET_SIZE
+            if nxt >= len(buf):
+                return -1
+            if buf[nxt] == TS_SYNC_BYTE:
+                return int(pos)
+        return -1
+
+    def process_block(self, block) -> None:
+        """Analyze an aligned (N, 188) uint8 array of packets"""
+        count = len(block)
+        if count == 0:
+            return
+
+        b1 = block[:, 1]
+        b3 = block[:, 3]
+        pid = ((b1.astype(np.int32) & 0x1F) << 8) | block[:, 2]
+        tei = (b1 & 0x80) != 0
+        scrambled = (b3 & 0xC0) != 0
+        has_af = (b3 & 0x20) != 0
+        has_payload = (b3 & 0x10) != 0
+        cc = (b3 & 0x0F).astype(np.int16)
+
+        af_len = np.where(has_af, block[:, 4], 0)
+        af_flags = np.where(af_len > 0, block[:, 5], 0)
+        discontinuity = (af_flags & 0x80) != 0
+
+        self._packets += np.bincount(pid, minlength=PID_COUNT)
+        if tei.any():
+            self._tei += np.bincount(pid[tei], minlength=PID_COUNT)
+        if scrambled.any():
+            self._scrambled += np.bincount(pid[scrambled], minlength=PID_COUNT)
+
+        self._check_continuity(pid, cc, has_payload & ~tei, discontinuity)
+
+        pcr_mask = (af_flags & 0x10) != 0
+        pcr_mask &= af_len >= 7
+        if pcr_mask.any():
+            self._collect_pcr(block, pid, pcr_mask, discontinuity)
+
+        if self.tables is not None:
+            self.tables.process_block(block, pid)
+
+        self.total_packets += count
+
+    def _check_continuity(self, pid, cc, counted, discontinuity):
+        """Count CC errors for all packets carrying payload"""
+        counted = counted & (pid != NULL_PID)
+        if not counted.any():
+            return
+
+        pids = pid[counted]
+        ccs = cc[counted]
+        disc = discontinuity[counted]
+
+        order = np.argsort(pids, kind='stable')
+        pids = pids[order]
+        ccs = ccs[order]
+        disc = disc[order]
+
+        # Previous CC for every packet: within the PID group, or the carried state
+        prev = np.empty_like(ccs)
+        prev[1:] = ccs[:-1]
+        group_start = np.ones(len(pids), dtype=bool)
+        group_start[1:] = pids[1:] != pids[:-1]
+        prev[group_start] = self._last_cc[pids[group_start]]
+
+        delta = (ccs - prev) & 0x0F
+        # Delta 0 is a legal duplicate packet, anything else but 1 is an error
+        errors = (prev >= 0) & (delta != 1) & (delta != 0) & ~disc
+        if errors.any():
+            self._cc_errors += np.bincount(pids[errors], minlength=PID_COUNT)
+
+        group_end = np.ones(len(pids), dtype=bool)
+        group_end[:-1] = group_start[1:]
+        self._last_cc[pids[group_end]] = ccs[group_end]
+
+        # First CC of each PID, needed to check continuity when merging ranges
+        first = group_start & (self._first_cc[pids] < 0)
+        self._first_cc[pids[first]] = ccs[first]
+        self._first_disc[pids[first]] = disc[first]
+
+    def _collect_pcr(self, block, pid, pcr_mask, discontinuity):
+        """Extract PCR values and update per-PID PCR statistics"""
+        rows = np.flatnonzero(pcr_mask)
+        fields = block[rows, 6:12].astype(np.int64)
+        base = ((fields[:, 0] << 25) | (fields[:, 1] << 17) | (fields[:, 2] << 9)
+                | (fields[:, 3] << 1) | (fields[:, 4] >> 7))
+        ext = ((fields[:, 4] & 0x01) << 8) | fields[:, 5]
+        pcrs = base * 300 + ext
+        positions = rows.astype(np.int64) + self.total_packets
+        pcr_pids = pid[rows]
+        pcr_disc = discontinuity[rows]
+
+        for p in np.unique(pcr_pids):
+            sel = pcr_pids == p
+            self._update_pcr_state(int(p), pcrs[sel], positions[sel], pcr_disc[sel])
+
+    def _update_pcr_state(self, pid: int, pcrs, positions, disc):
+        """Update running PCR statistics of one PID from a vector of samples"""
+        state = self._pcr.setdefault(pid, _PCRState())
+        state.count += len(pcrs)
+        if state.first_pcr < 0:
+            state.first_pcr = int(pcrs[0])
+            state.first_packet = int(positions[0])
+            state.first_discontinuity = bool(disc[0])
+
+        if state.last_pcr >= 0:
+            prev_pcr = np.concatenate(([state.last_pcr], pcrs[:-1]))
+            prev_pos = np.concatenate(([state.last_packet], positions[:-1]))
+            cur_pcr, cur_pos = pcrs, positions
+        else:
+            # First PCR of this PID only opens the first interval
+            prev_pcr, prev_pos = pcrs[:-1], positions[:-1]
+            cur_pcr, cur_pos, disc = pcrs[1:], positions[1:], disc[1:]
+
+        state.last_pcr = int(pcrs[-1])
+        state.last_packet = int(positions[-1])
+        if len(cur_pcr) == 0:
+            return
+
+        ticks = (cur_pcr - prev_pcr) % PCR_WRAP
+        packets = cur_pos - prev_pos
+        valid = (ticks > 0) & (ticks <= PCR_DISCONTINUITY_TICKS) & (packets > 0) & ~disc
+        state.discontinuities += int(np.count_nonzero(~valid & ~disc))
+
+        if not valid.any():
+            return
+        ticks = ticks[valid]
+        packets = packets[valid]
+
+        state.sum_ticks += int(ticks.sum())
+        state.sum_packets += int(packets.sum())
+        state.max_interval_ticks = max(state.max_interval_ticks, int(ticks.max()))
+        state.intervals += len(ticks)
+
+        # Jitter: PCR delta against the delta expected at the average TS rate
+        ticks_per_packet = state.sum_ticks / state.sum_packets
+        jitter = np.abs(ticks - packets * ticks_per_packet)
+        state.max_jitter_ticks = max(state.max_jitter_ticks, float(jitter.max()))
+        tolerance = PCR_ACCURACY_TOLERANCE_NS * PCR_CLOCK_HZ / 1e9
+        state.accurate_intervals += int(np.count_nonzero(jitter <= tolerance))
+
+    def merge(self, other: 'TSPacketEngine') -> None:
+        """Append the results of an engine which analyzed the data following ours"""
+        base = self.total_packets
+
+        # Continuity between our last packet and the first packet of the other range
+        both = (self._last_cc >= 0) & (other._first_cc >= 0)
+        delta = (other._first_cc - self._last_cc) & 0x0F
+        self._cc_errors += both & (delta != 1) & (delta != 0) & ~other._first_disc
+
+        self._packets += other._packets
+        self._cc_errors += other._cc_errors
+        self._scrambled += other._scrambled
+        self._tei += other._tei
+        unset = self._first_cc < 0
+        self._first_cc[unset] = other._first_cc[unset]
+        self._first_disc[unset] = other._first_disc[unset]
+        self._last_cc = np.where(other._last_cc >= 0, other._last_cc, self._last_cc)
+
+        for pid, theirs in other._pcr.items():
+            ours = self._pcr.get(pid)
+            if ours is None:
+                ours = self._pcr[pid] = _PCRState(**vars(theirs))
+                ours.first_packet += base
+                ours.last_packet += base
+                continue
+            if ours.last_pcr >= 0 and theirs.first_pcr >= 0:
+                # Measure the interval spanning the range boundary
+                self._update_pcr_state(
+                    pid, np.array([theirs.first_pcr], dtype=np.int64),
+                    np.array([theirs.first_packet + base], dtype=np.int64),
+                    np.array([theirs.first_discontinuity]))
+                ours.count -= 1
+            ours.count += theirs.count
+            ours.intervals += theirs.intervals
+            ours.accurate_intervals += theirs.accurate_intervals
+            ours.discontinuities += theirs.discontinuities
+            ours.sum_ticks += theirs.sum_ticks
+            ours.sum_packets += theirs.sum_packets
+            ours.max_interval_ticks = max(ours.max_interval_ticks, theirs.max_interval_ticks)
+            ours.max_jitter_ticks = max(ours.max_jitter_ticks, theirs.max_jitter_ticks)
+            ours.last_pcr = theirs.last_pcr
+            ours.last_packet = theirs.last_packet + base
+
+        self.total_packets += other.total_packets
+        self.sync_errors += other.sync_errors
+        if other.start_time is not None:
+            self.start_time = other.start_time if self.start_time is None else min(self.start_time, other.start_time)
+            self.last_time = other.last_time if self.last_time is None else max(self.last_time, other.last_time)
+
+    def read_stream(self, stream: BinaryIO, max_packets: Optional[int] = None) -> int:
+        """Read and analyze a binary stream until EOF"""
+        chunk_size = self.chunk_packets * TS_PACKET_SIZE
+        processed = 0
+        while max_packets is None or processed < max_packets:
+            data = stream.read(chunk_size)
+            if not data:
+                break
+            processed += self.feed(data)
+        return processed
+
+    def ts_bitrate(self) -> int:
+        """Transport stream bitrate, PCR based when possible, wall clock otherwise"""
+        reference = self._reference_pcr()
+        if reference is not None and reference.sum_ticks > 0:
+            return int(reference.sum_packets * TS_PACKET_SIZE * 8 * PCR_CLOCK_HZ / reference.sum_ticks)
+        if self.start_time is not None and self.last_time > self.start_time:
+            return int(self.total_packets * TS_PACKET_SIZE * 8 / (self.last_time - self.start_time))
+        return 0
+
+    def _reference_pcr(self) -> Optional[_PCRState]:
+        """PCR PID with the most measured intervals"""
+        if not self._pcr:
+            return None
+        return max(self._pcr.values(), key=lambda state: state.intervals)
+
+    def get_pid_stats(self) -> Dict[int, PIDStats]:
+        """Get statistics for every PID seen so far"""
+        bitrate = self.ts_bitrate()
+        stats = {}
+        for pid in np.flatnonzero(self._packets):
+            pid = int(pid)
+            packets = int(self._packets[pid])
+            pid_stats = PIDStats(
+                pid=pid,
+                packets=packets,
+                bitrate=int(bitrate * packets / self.total_packets) if self.total_packets else 0,
+                cc_errors=int(self._cc_errors[pid]),
+                scrambled_packets=int(self._scrambled[pid]),
+                tei_packets=int(self._tei[pid])
+            )
+            pcr = self._pcr.get(pid)
+            if pcr:
+                pid_stats.pcr_count = pcr.count
+                pid_stats.pcr_discontinuities = pcr.discontinuities
+                pid_stats.pcr_max_interval_ms = pcr.max_interval_ticks * 1000.0 / PCR_CLOCK_HZ
+                pid_stats.pcr_max_jitter_ns = pcr.max_jitter_ticks * 1e9 / PCR_CLOCK_HZ
+            stats[pid] = pid_stats
+        return stats
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get stream statistics in the same layout as StreamAnalyzer.stats"""
+        bitrate = self.ts_bitrate()
+        intervals = sum(state.intervals for state in self._pcr.values())
+        accurate = sum(state.accurate_intervals for state in self._pcr.values())
+        reference = self._reference_pcr()
+
+        return {
+            'bitrate': bitrate,
+            'packets_per_second': bitrate // (TS_PACKET_SIZE * 8),
+            'total_packets': self.total_packets,
+            'errors': int(self._tei.sum()) + self.sync_errors,
+            'sync_errors': self.sync_errors,
+            'pcr_accuracy': round(100.0 * accurate / intervals, 2) if intervals else 0.0,
+            'pcr_jitter_ns': reference.max_jitter_ticks * 1e9 / PCR_CLOCK_HZ if reference else 0.0,
+            'continuity_errors': int(self._cc_errors.sum()),
+            # Programs announced in the PAT, only known when tables are tracked
+            'services_count': len(self.tables.pat()['programs']) if self.tables is not None else 0,
+            'pids': {pid: vars(stats) for pid, stats in self.get_pid_stats().items()}
+        }
+
+
+class MappedTSFile:
+    """Zero-copy memory-mapped view of a transport stream file"""
+
+    def __init__(self, path: str):
+        _require_numpy()
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.buffer = memoryview(self._mmap) if self._mmap else memoryview(b'')
+        self.offset = self._find_first_sync()
+        self.packet_count = (len(self.buffer) - self.offset) // TS_PACKET_SIZE
+        self._pcr_index = None
+
+    def close(self):
+        """Release the mapping"""
+        self._pcr_index = None
+        self.buffer.release()
+        if self._mmap:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _find_first_sync(self) -> int:
+        """Offset of the first packet, checked against the next two sync bytes"""
+        head = np.frombuffer(self.buffer[:TS_PACKET_SIZE * 3], dtype=np.uint8)
+        for pos in np.flatnonzero(head[:TS_PACKET_SIZE] == TS_SYNC_BYTE):
+            if all(pos + n * TS_PACKET_SIZE >= len(head) or head[pos + n * TS_PACKET_SIZE] == TS_SYNC_BYTE
+                   for n in (1, 2)):
+                return int(pos)
+        return 0
+
+    def packets(self, start: int = 0, count: Optional[int] = None):
+        """(N, 188) array view of packets, no data is copied"""
+        start = max(0, min(start, self.packet_count))
+        if count is None or start + count > self.packet_count:
+            count = self.packet_count - start
+        view = np.frombuffer(self.buffer, dtype=np.uint8, count=count * TS_PACKET_SIZE,
+                             offset=self.offset + start * TS_PACKET_SIZE)
+        return view.reshape(count, TS_PACKET_SIZE)
+
+    def split_ranges(self, parts: int) -> List[Tuple[int, int]]:
+        """Split the file in (start_packet, packet_count) ranges on packet boundaries"""
+        if not self.packet_count:
+            # Empty or shorter than one packet
+            return [(0, 0)]
+        parts = max(1, min(parts, self.packet_count))
+        step = -(-self.packet_count // parts)
+        return [(start, min(step, self.packet_count - start))
+                for start in range(0, self.packet_count, step)]
+
+    def analyze_range(self, start: int = 0, count: Optional[int] = None,
+                      chunk_packets: int = DEFAULT_CHUNK_PACKETS) -> TSPacketEngine:
+        """Analyze a range of packets directly from the mapping"""
+        engine = TSPacketEngine(chunk_packets)
+        view = self.packets(start, count)
+        for pos in range(0, len(view), chunk_packets):
+            block = view[pos:pos + chunk_packets]
+            lost = np.flatnonzero(block[:, 0] != TS_SYNC_BYTE)
+            if len(lost):
+                # Lost alignment, the byte-oriented path resynchronizes the rest of the range
+                engine.process_block(block[:lost[0]])
+                offset = self.offset + (start + pos + int(lost[0])) * TS_PACKET_SIZE
+                end = self.offset + (start + len(view)) * TS_PACKET_SIZE
+                for chunk in range(offset, end, chunk_packets * TS_PACKET_SIZE):
+                    engine.feed(self.buffer[chunk:min(end, chunk + chunk_packets * TS_PACKET_SIZE)])
+                break
+            engine.process_block(block)
+        return engine
+
+    def analyze(self, workers: int = None, chunk_packets: int = DEFAULT_CHUNK_PACKETS) -> Dict[str, Any]:
+        """Analyze the whole file, splitting it in ranges analyzed in parallel
+
+        The ranges go to worker processes, the per-PID and section work of
+        the engine holds the GIL so threads would run one at a time.
+        """
+        workers = workers or min(os.cpu_count() or 1, max(1, self.packet_count // MIN_PACKETS_PER_WORKER))
+        ranges = self.split_ranges(workers)
+        if len(ranges) == 1:
+            return self.analyze_range(*ranges[0], chunk_packets=chunk_packets).get_stats()
+
+        # Spawned, not forked: callers such as the GUI run threads
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=len(ranges), mp_context=context) as executor:
+            starts, counts = zip(*ranges)
+            engines = list(executor.map(_analyze_file_range, repeat(self.path), starts, counts,
+                                        repeat(chunk_packets)))
+
+        result = engines[0]
+        for engine in engines[1:]:
+            result.merge(engine)
+        return result.get_stats()
+
+    def read_tables(self, chunk_packets: int = DEFAULT_CHUNK_PACKETS) -> PSISectionCache:
+        """PSI/SI tables of the whole file, repeated sections are skipped cheaply"""
+        tables = PSISectionCache()
+        for start in range(0, self.packet_count, chunk_packets):
+            block = self.packets(start, chunk_packets)
+            lost = np.flatnonzero(block[:, 0] != TS_SYNC_BYTE)
+            # Sections are only read from aligned packets
+            tables.process_block(block[:lost[0]] if len(lost) else block)
+        return tables
+
+    def build_pcr_index(self, pid: Optional[int] = None,
+                        chunk_packets: int = DEFAULT_CHUNK_PACKETS) -> Tuple[Any, Any]:
+        """Index (packet number, unwrapped PCR) of all PCRs of one PID"""
+        positions, values = [], []
+        for start in range(0, self.packet_count, chunk_packets):
+            block = self.packets(start, chunk_packets)
+            has_pcr = ((block[:, 3] & 0x20) != 0) & (block[:, 4] >= 7) & ((block[:, 5] & 0x10) != 0)
+            rows = np.flatnonzero(has_pcr)
+            if not len(rows):
+                continue
+            pids = ((block[rows, 1].astype(np.int32) & 0x1F) << 8) | block[rows, 2]
+            if pid is None:
+                pid = int(pids[0])
+            rows = rows[pids == pid]
+            fields = block[rows, 6:12].astype(np.int64)
+            base = ((fields[:, 0] << 25) | (fields[:, 1] << 17) | (fields[:, 2] << 9)
+                    | (fields[:, 3] << 1) | (fields[:, 4] >> 7))
+            positions.append(rows + start)
+            values.append(base * 300 + (((fields[:, 4] & 0x01) << 8) | fields[:, 5]))
+
+        if not positions:
+            self._pcr_index = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+            return self._pcr_index
+
+        positions = np.concatenate(positions)
+        self._pcr_index = (positions, unwrap_pcr(positions, np.concatenate(values)))
+        return self._pcr_index
+
+    def seek_pcr(self, pcr: int) -> int:
+        """Packet number of the first PCR at or after an (unwrapped) PCR value"""
+        if self._pcr_index is None:
+            self.build_pcr_index()
+        positions, values = self._pcr_index
+        index = int(np.searchsorted(values, pcr))
+        if index >= len(positions):
+            return self.packet_count
+        return int(positions[index])
+
+    def seek_time(self, seconds: float) -> int:
+        """Packet number at an offset in seconds from the first PCR"""
+        if self._pcr_index is None:
+            self.build_pcr_index()
+        values = self._pcr_index[1]
+        if not len(values):
+            return 0
+        return self.seek_pcr(int(values[0] + seconds * PCR_CLOCK_HZ))
+
+
+def _analyze_file_range(path: str, start: int, count: int, chunk_packets: int) -> TSPacketEngine:
+    """Worker process entry point, each worker maps the file itself"""
+    with MappedTSFile(path) as ts_file:
+        return ts_file.analyze_range(start, count, chunk_packets)
+
+
+def unwrap_pcr(positions, values):
+    """Monotonic PCR timeline of one PID across wraps and discontinuities
+
+    Only a step from near the top of the 33-bit base to near zero is a
+    wrap. Any other backward step, or a forward jump beyond
+    PCR_DISCONTINUITY_TICKS, is a discontinuity: the timeline advances by
+    the mean rate over the packets in between and continues from the new
+    PCR value as its baseline.
+    """
+    if len(values) < 2:
+        return values.copy()
+    deltas = np.diff(values)
+    wrapped = (deltas < 0) & (deltas + PCR_WRAP <= PCR_DISCONTINUITY_TICKS)
+    deltas[wrapped] += PCR_WRAP
+    broken = (deltas <= 0) | (deltas > PCR_DISCONTINUITY_TICKS)
+    if broken.any():
+        gaps = np.diff(positions)
+        valid = ~broken
+        rate = deltas[valid].sum() / max(int(gaps[valid].sum()), 1) if valid.any() else 0.0
+        deltas[broken] = np.round(gaps[broken] * rate).astype(np.int64)
+    return np.concatenate(([values[0]], values[0] + np.cumsum(deltas)))
+
+
+def analyze_file(path: str, chunk_packets: int = DEFAULT_CHUNK_PACKETS,
+                 workers: int = None) -> Dict[str, Any]:
+    """Analyze a transport stream file and return its statistics"""
+    with MappedTSFile(path) as ts_file:
+        return ts_file.analyze(workers, chunk_packets)
+
+
+# Example usage
+if __name__ == "__main__":
+    import sys
+    import json
+
+    if len(sys.argv) < 2:
+        print("Usage: ts_engine.py <file.ts>")
+        sys.exit(1)
+
+    print(json.dumps(analyze_file(sys.argv[1]), indent=2, default=str))
@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+Synthetic Transport Stream Generator
+Deterministic test streams for load and regression testing
+
+Produces a single program stream at a constant bitrate: PAT, PMT and SDT,
+PCR-bearing video and audio PES stubs, null stuffing and scheduled SCTE-35
+cues, with faults (CC gaps, PCR jumps, missing PSI) injected on request.
+Packet timing derives from the packet index only, so the same config always
+yields the same bytes. Output goes to files, UDP or pipes, paced at line
+rate when needed, to exercise parsing, monitoring and injection offline at
+1-200 Mbps.
+"""
+
+import sys
+import time
+import random
+import socket
+import argparse
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple, Any
+
+from ts_engine import (
+    crc32_mpeg2, TS_PACKET_SIZE, NULL_PID, PCR_CLOCK_HZ, PCR_WRAP,
+    PAT_PID, SDT_PID, TABLE_ID_PAT, TABLE_ID_PMT, TABLE_ID_SDT_ACTUAL,
+    SERVICE_DESCRIPTOR, SCTE35_STREAM_TYPE
+)
+from scte35_encoder import encode_splice_insert, PTS_MASK
+from splice_packetizer import SectionPacketizer, PAYLOAD_SIZE
+
+PTS_CLOCK_HZ = 90000
+PACKET_BITS = TS_PACKET_SIZE * 8
+NULL_PACKET = bytes([0x47, NULL_PID >> 8, NULL_PID & 0xFF, 0x10]) + b'\xff' * PAYLOAD_SIZE
+# PES header with a PTS: start code, stream_id, length, flags, header length, PTS
+PES_HEADER_SIZE = 14
+PCR_FIELD_SIZE = 8
+REGISTRATION_DESCRIPTOR = 0x05
+UDP_DATAGRAM_PACKETS = 7
+
+FAULT_KINDS = ('cc_gap', 'pcr_jump', 'missing_psi')
+
+
+@dataclass
+class GeneratorConfig:
+    """Stream layout, rates and SCTE-35 schedule of a generated stream"""
+    bitrate: int = 10_000_000
+    # Video gets 80% of what audio leaves when not set
+    video_bitrate: Optional[int] = None
+    audio_bitrate: int = 192_000
+    frame_rate: float = 25.0
+    audio_sample_rate: int = 48000
+    transport_stream_id: int = 1
+    original_network_id: int = 1
+    service_id: int = 1
+    service_name: str = "IBE-100 Test"
+    provider_name: str = "ITAssist"
+    pmt_pid: int = 4096
+    video_pid: int = 256
+    audio_pid: int = 257
+    scte35_pid: int = 500
+    video_stream_type: int = 0x1B
+    audio_stream_type: int = 0x0F
+    psi_interval: float = 0.1
+    sdt_interval: float = 0.5
+    pcr_interval: float = 0.02
+    # PTS of a frame is ahead of the PCR at its first packet by this much
+    pts_delay: float = 0.5
+    # A splice_insert every cue_interval seconds when set, preroll seconds before its splice point
+    cue_interval: float = 0.0
+    cue_preroll: float = 4.0
+    break_duration: float = 30.0
+    seed: int = 0
+
+
+@dataclass
+class Fault:
+    """A fault at a stream time in seconds
+
+    cc_gap skips one continuity counter on pid (the video PID by default),
+    pcr_jump moves all following PCRs by amount seconds without signalling
+    a discontinuity, missing_psi stops PAT, PMT and SDT for duration seconds.
+    """
+    kind: str
+    at: float
+    duration: float = 0.0
+    pid: Optional[int] = None
+    amount: float = 1.0
+
+    def __post_init__(self):
+        if self.kind not in FAULT_KINDS:
+            raise ValueError(f"Unknown fault {self.kind}, expected one of {', '.join(FAULT_KINDS)}")
+
+
+def _long_section(table_id: int, extension: int, body: bytes, version: int = 0) -> bytes:
+    """PSI section with header and CRC around body"""
+    length = 5 + len(body) + 4
+    section = bytes([table_id, 0xB0 | (length >> 8), length & 0xFF, extension >> 8, extension & 0xFF,
+                     0xC1 | ((version & 0x1F) << 1), 0, 0]) + body
+    return section + crc32_mpeg2(section).to_bytes(4, 'big')
+
+
+def _pcr_field(pcr: int) -> bytes:
+    base, extension = divmod(pcr % PCR_WRAP, 300)
+    return bytes([(base >> 25) & 0xFF, (base >> 17) & 0xFF, (base >> 9) & 0xFF, (base >> 1) & 0xFF,
+                  ((base & 1) << 7) | 0x7E | (extension >> 8), extension & 0xFF])
+
+
+def _pes_header(stream_id: int, pts: int, length: int = 0) -> bytes:
+    pts &= PTS_MASK
+    return bytes([0, 0, 1, stream_id, length >> 8, length & 0xFF, 0x80, 0x80, 5,
+                  0x21 | ((pts >> 29) & 0x0E), (pts >> 22) & 0xFF, ((pts >> 14) & 0xFE) | 1,
+                  (pts >> 7) & 0xFF, ((pts << 1) & 0xFE) | 1])
+
+
+def _packet(pid: int, cc: int, payload: bytes = b'', pusi: bool = False, pcr: Optional[int] = None) -> bytes:
+    """One packet, an adaptation field carries the PCR and fills what the payload leaves"""
+    header = bytes([0x47, (0x40 if pusi else 0) | (pid >> 8), pid & 0xFF])
+    room = PAYLOAD_SIZE - len(payload)
+    if room == 0 and pcr is None:
+        return header + bytes([0x10 | cc]) + payload
+    if room == 1:
+        adaptation = b'\x00'
+    else:
+        fields = b'\x10' + _pcr_field(pcr) if pcr is not None else b'\x00'
+        adaptation = bytes([room - 1]) + fields + b'\xff' * (room - 1 - len(fields))
+    return header + bytes([(0x30 if payload else 0x20) | cc]) + adaptation + payload
+
+
+class TSGenerator:
+    """Generates a deterministic single program transport stream packet by packet
+
+    Every packet slot is assigned by priority: pending PSI/SCTE-35 packets,
+    a due PCR, audio and video packets owed at their rate, else a null
+    packet. Video frames and audio frames take a fixed number of packets so
+    PTS and PCR never drift apart.
+    """
+
+    def __init__(self, config: Optional[GeneratorConfig] = None, faults: Iterable[Fault] = ()):
+        self.config = config = config or GeneratorConfig()
+        video_bitrate = config.video_bitrate
+        if video_bitrate is None:
+            video_bitrate = (config.bitrate - config.audio_bitrate) * 4 // 5
+        self.frame_packets = max(1, round(video_bitrate / (config.frame_rate * PACKET_BITS)))
+        audio_frame = 1024 / config.audio_sample_rate
+        self.audio_frame_packets = max(1, round(config.audio_bitrate * audio_frame / PACKET_BITS))
+        # Packets owed at slot n are n * num // den, as exact integers
+        self._video_rate = (round(self.frame_packets * config.frame_rate * 1000) * PACKET_BITS, config.bitrate * 1000)
+        self._audio_rate = (self.audio_frame_packets * config.audio_sample_rate * PACKET_BITS, 1024 * config.bitrate)
+        payload_share = (self.frame_packets * config.frame_rate + self.audio_frame_packets / audio_frame) * PACKET_BITS
+        if payload_share >= config.bitrate * 0.98:
+            raise ValueError(f"Video and audio need {payload_share:.0f} b/s, more than the {config.bitrate} b/s TS")
+
+        self.packet_index = 0
+        self.pcr_offset = 0
+        self._counters: Dict[int, int] = {config.video_pid: 0, config.audio_pid: 0}
+        self._skip_cc: set = set()
+        self._packetizers = {pid: SectionPacketizer(pid) for pid in (PAT_PID, config.pmt_pid, SDT_PID, config.scte35_pid)}
+        self._control: Deque[bytes] = deque()
+        self._video_sent = 0
+        self._audio_sent = 0
+        self._psi_suppressed_until = -1
+        self._faults = sorted(faults, key=lambda fault: fault.at)
+        self._cues: List[Tuple[int, bytes]] = []
+        self._event_id = 0
+
+        filler = random.Random(config.seed).randbytes(PAYLOAD_SIZE * 16)
+        self._filler = filler
+        self._video_packets = [_packet(config.video_pid, cc, filler[cc * PAYLOAD_SIZE:(cc + 1) * PAYLOAD_SIZE])
+                               for cc in range(16)]
+        self._audio_packets = [_packet(config.audio_pid, cc, filler[(15 - cc) * PAYLOAD_SIZE:(16 - cc) * PAYLOAD_SIZE])
+                               for cc in range(16)]
+        self._tables = self._build_tables()
+
+        self._next_psi = 0
+        self._next_sdt = 0
+        self._next_pcr = 0
+        self._next_cue = self.slot(config.cue_interval) if config.cue_interval > 0 else None
+        self._next_event = 0
+
+        self.stats: Dict[str, int] = {
+            'packets': 0, 'null_packets': 0, 'pcr_count': 0, 'video_frames': 0, 'audio_frames': 0,
+            'psi_cycles': 0, 'cues': 0, 'faults': 0,
+        }
+
+    def slot(self, seconds: float) -> int:
+        """First packet slot at or after a stream time"""
+        return -(-round(seconds * self.config.bitrate * 1000) // (PACKET_BITS * 1000))
+
+    def pcr_at(self, index: int) -> int:
+        """27 MHz time of a packet slot, without faults"""
+        return index * PACKET_BITS * PCR_CLOCK_HZ // self.config.bitrate
+
+    @property
+    def time(self) -> float:
+        """Stream time of the next packet in seconds"""
+        return self.packet_index * PACKET_BITS / self.config.bitrate
+
+    def schedule_cue(self, at: float, section: bytes):
+        """Send a section on the SCTE-35 PID at a stream time"""
+        self._cues.append((self.slot(at), section))
+        self._cues.sort(key=lambda cue: cue[0])
+        self._next_event = min(self._next_event, self._cues[0][0])
+
+    def _build_tables(self) -> Tuple[bytes, bytes, bytes]:
+        config = self.config
+        pat = _long_section(TABLE_ID_PAT, config.transport_stream_id,
+                            config.service_id.to_bytes(2, 'big') + (0xE000 | config.pmt_pid).to_bytes(2, 'big'))
+        # CUEI registration announces SCTE-35 in the program
+        program_info = bytes([REGISTRATION_DESCRIPTOR, 4]) + b'CUEI'
+        body = (0xE000 | config.video_pid).to_bytes(2, 'big') + (0xF000 | len(program_info)).to_bytes(2, 'big') + program_info
+        for stream_type, pid in ((config.video_stream_type, config.video_pid),
+                                 (config.audio_stream_type, config.audio_pid),
+                                 (SCTE35_STREAM_TYPE, config.scte35_pid)):
+            body += bytes([stream_type]) + (0xE000 | pid).to_bytes(2, 'big') + b'\xf0\x00'
+        pmt = _long_section(TABLE_ID_PMT, config.service_id, body)
+        provider, name = config.provider_name.encode('latin-1'), config.service_name.encode('latin-1')
+        service = bytes([0x01, len(provider)]) + provider + bytes([len(name)]) + name
+        descriptors = bytes([SERVICE_DESCRIPTOR, len(service)]) + service
+        sdt = _long_section(TABLE_ID_SDT_ACTUAL, config.transport_stream_id,
+                            config.original_network_id.to_bytes(2, 'big') + b'\xff' +
+                            config.service_id.to_bytes(2, 'big') + b'\xfc' +
+                            (0x8000 | len(descriptors)).to_bytes(2, 'big') + descriptors)
+        return pat, pmt, sdt
+
+    def read(self, count: int) -> bytes:
+        """The next count packets"""
+        next_packet = self._next_packet
+        return b''.join([next_packet() for _ in range(count)])
+
+    def _next_packet(self) -> bytes:
+        n = self.packet_index
+        self.packet_index = n + 1
+        self.stats['packets'] += 1
+        if n >= self._next_event:
+            self._events(n)
+        if self._control:
+            return self._control.popleft()
+        video_owed = self._video_sent < n * self._video_rate[0] // self._video_rate[1]
+        if n >= self._next_pcr:
+            self._next_pcr = n + max(1, self.slot(self.config.pcr_interval))
+            self.stats['pcr_count'] += 1
+            pcr = self.pcr_at(n) + self.pcr_offset
+            if video_owed:
+                return self._video_packet(pcr)
+            return _packet(self.config.video_pid, (self._counters[self.config.video_pid] - 1) & 0x0F, pcr=pcr)
+        if self._audio_sent < n * self._audio_rate[0] // self._audio_rate[1]:
+            return self._audio_packet()
+        if video_owed:
+            return self._video_packet()
+        self.stats['null_packets'] += 1
+        return NULL_PACKET
+
+    def _cc(self, pid: int) -> int:
+        cc = self._counters[pid]
+        if pid in self._skip_cc:
+            self._skip_cc.discard(pid)
+            cc = (cc + 1) & 0x0F
+        self._counters[pid] = (cc + 1) & 0x0F
+        return cc
+
+    def _video_packet(self, pcr: Optional[int] = None) -> bytes:
+        config = self.config
+        frame, position = divmod(self._video_sent, self.frame_packets)
+        self._video_sent += 1
+        cc = self._cc(config.video_pid)
+        if position and pcr is None:
+            return self._video_packets[cc]
+        header = b''
+        if not position:
+            self.stats['video_frames'] += 1
+            pts = round((frame / config.frame_rate + config.pts_delay) * PTS_CLOCK_HZ)
+            header = _pes_header(0xE0, pts)
+        room = PAYLOAD_SIZE - len(header) - (PCR_FIELD_SIZE if pcr is not None else 0)
+        return _packet(config.video_pid, cc, header + self._filler[:room], pusi=not position, pcr=pcr)
+
+    def _audio_packet(self) -> bytes:
+        config = self.config
+        frame, position = divmod(self._audio_sent, self.audio_frame_packets)
+        self._audio_sent += 1
+        cc = self._cc(config.audio_pid)
+        if position:
+            return self._audio_packets[cc]
+        self.stats['audio_frames'] += 1
+        pts = round((frame * 1024 / config.audio_sample_rate + config.pts_delay) * PTS_CLOCK_HZ)
+        header = _pes_header(0xC0, pts, self.audio_frame_packets * PAYLOAD_SIZE - 6)
+        return _packet(config.audio_pid, cc, header + self._filler[:PAYLOAD_SIZE - PES_HEADER_SIZE], pusi=True)
+
+    def _events(self, n: int):
+        """Queue due PSI and cues and apply due faults, then find the next event slot"""
+        config = self.config
+        pat, pmt, sdt = self._tables
+        while self._faults and self.slot(self._faults[0].at) <= n:
+            self._apply(self._faults.pop(0), n)
+        psi = n >= self._psi_suppressed_until
+        if n >= self._next_psi:
+            self._next_psi = n + max(1, self.slot(config.psi_interval))
+            if psi:
+                self.stats['psi_cycles'] += 1
+                self._control.extend(self._packetizers[PAT_PID].packetize([pat]))
+                self._control.extend(self._packetizers[config.pmt_pid].packetize([pmt]))
+        if n >= self._next_sdt:
+            self._next_sdt = n + max(1, self.slot(config.sdt_interval))
+            if psi:
+                self._control.extend(self._packetizers[SDT_PID].packetize([sdt]))
+        if self._next_cue is not None and n >= self._next_cue:
+            self._next_cue += max(1, self.slot(config.cue_interval))
+            self._event_id += 1
+            splice_time = self.pcr_at(n) // 300 + round((config.pts_delay + config.cue_preroll) * PTS_CLOCK_HZ)
+            self._cues.append((n, encode_splice_insert(
+                self._event_id, pts_time=splice_time,
+                duration=round(config.break_duration * PTS_CLOCK_HZ), auto_return=True)))
+        while self._cues and self._cues[0][0] <= n:
+            self.stats['cues'] += 1
+            self._control.extend(self._packetizers[config.scte35_pid].packetize([self._cues.pop(0)[1]]))
+
+        upcoming = [self._next_psi, self._next_sdt]
+        if self._next_cue is not None:
+            upcoming.append(self._next_cue)
+        if self._cues:
+            upcoming.append(self._cues[0][0])
+        if self._faults:
+            upcoming.append(self.slot(self._faults[0].at))
+        if self._psi_suppressed_until > n:
+            upcoming.append(self._psi_suppressed_until)
+        self._next_event = min(upcoming)
+
+    def _apply(self, fault: Fault, n: int):
+        self.stats['faults'] += 1
+        if fault.kind == 'cc_gap':
+            pid = fault.pid if fault.pid is not None else self.config.video_pid
+            if pid in self._packetizers:
+                self._packetizers[pid].cc = (self._packetizers[pid].cc + 1) & 0x0F
+            else:
+                self._skip_cc.add(pid)
+        elif fault.kind == 'pcr_jump':
+            self.pcr_offset += round(fault.amount * PCR_CLOCK_HZ)
+        else:
+            self._psi_suppressed_until = max(self._psi_suppressed_until, self.slot(fault.at + fault.duration))
+
+
+def stream_packets(generator: TSGenerator, emit: Callable[[bytes], Any], duration: Optional[float] = None,
+                   realtime: bool = True, burst_packets: int = UDP_DATAGRAM_PACKETS * 16) -> int:
+    """Hand bursts of packets to emit, paced at the TS bitrate when realtime
+
+    Runs for duration seconds of stream, forever when None; returns the
+    number of packets emitted.
+    """
+    bitrate = generator.config.bitrate
+    remaining = None if duration is None else round(duration * bitrate / PACKET_BITS)
+    sent = 0
+    start = time.monotonic()
+    while remaining is None or sent < remaining:
+        count = burst_packets if remaining is None else min(burst_packets, remaining - sent)
+        emit(generator.read(count))
+        sent += count
+        if realtime:
+            delay = start + sent * PACKET_BITS / bitrate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+    return sent
+
+
+def write_file(generator: TSGenerator, path: str, duration: float) -> int:
+    """Write duration seconds of stream to a file as fast as possible"""
+    with open(path, 'wb') as f:
+        return stream_packets(generator, f.write, duration, realtime=False, burst_packets=7 * 1024)
+
+
+def write_pipe(generator: TSGenerator, stream=None, duration: Optional[float] = None,
+               realtime: bool = True) -> int:
+    """Write the stream to a binary pipe, e.g. stdout read by `tsp -I file`"""
+    stream = stream or sys.stdout.buffer
+    try:
+        return stream_packets(generator, stream.write, duration, realtime)
+    except BrokenPipeError:
+        return 0
+    finally:
+        try:
+            stream.flush()
+        except BrokenPipeError:
+            pass
+
+
+def send_udp(generator: TSGenerator, host: str, port: int, duration: Optional[float] = None,
+             realtime: bool = True) -> int:
+    """Send the stream as 7-packet UDP datagrams, like tsp -O ip"""
+    datagram = UDP_DATAGRAM_PACKETS * TS_PACKET_SIZE
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4 * 1024 * 1024)
+    sock.connect((host, port))
+
+    def emit(data: bytes):
+        view = memoryview(data)
+        for start in range(0, len(view), datagram):
+            try:
+                sock.send(view[start:start + datagram])
+            except ConnectionRefusedError:
+                # Nobody listening on a local port yet
+                pass
+
+    try:
+        return stream_packets(generator, emit, duration, realtime)
+    finally:
+        sock.close()
+
+
+def _parse_bitrate(value: str) -> int:
+    """Bitrate in b/s, with an optional k or M suffix"""
+    value = value.strip().lower()
+    for suffix, scale in (('m', 1_000_000), ('k', 1_000)):
+        if value.endswith(suffix):
+            return int(float(value[:-1]) * scale)
+    return int(value)
+
+
+def _parse_fault(value: str) -> Fault:
+    """kind@seconds[:argument], e.g. cc_gap@5, pcr_jump@10:1.5, missing_psi@20:3"""
+    kind, _, when = value.partition('@')
+    at, _, argument = when.partition(':')
+    fault = Fault(kind, float(at))
+    if argument:
+        if kind == 'missing_psi':
+            fault.duration = float(argument)
+        elif kind == 'pcr_jump':
+            fault.amount = float(argument)
+        else:
+            fault.pid = int(argument, 0)
+    return fault
+
+
+def argue():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Generate a synthetic transport stream")
+    parser.add_argument("-b", "--bitrate", type=_parse_bitrate, default=10_000_000,
+                        help="TS bitrate in b/s, k and M suffixes allowed (default: 10M)")
+    parser.add_argument("-d", "--duration", type=float, default=None,
+                        help="Seconds of stream (default: forever, 60 for files)")
+    parser.add_argument("-o", "--output", default="-",
+                        help="file:PATH, udp:HOST:PORT or - for stdout (default: -)")
+    parser.add_argument("--fast", action="store_true", help="Do not pace UDP and pipe output at line rate")
+    parser.add_argument("--cue-interval", type=float, default=0.0, help="Seconds between splice_insert cues")
+    parser.add_argument("--fault", type=_parse_fault, action="append", default=[],
+                        help="kind@seconds[:argument], kinds: " + ", ".join(FAULT_KINDS))
+    parser.add_argument("--seed", type=int, default=0, help="Payload filler seed")
+    return parser.parse_args()
+
+
+def main():
+    """Run the generator"""
+    args = argue()
+    try:
+        generator = TSGenerator(GeneratorConfig(bitrate=args.bitrate, cue_interval=args.cue_interval,
+                                                seed=args.seed), args.fault)
+    except ValueError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 2
+
+    start = time.monotonic()
+    kind, _, target = args.output.partition(':')
+    if kind == 'file':
+        packets = write_file(generator, target, args.duration or 60.0)
+    elif kind == 'udp':
+        host, _, port = target.rpartition(':')
+        packets = send_udp(generator, host or "127.0.0.1", int(port), args.duration, realtime=not args.fast)
+    else:
+        packets = write_pipe(generator, duration=args.duration, realtime=not args.fast)
+    elapsed = time.monotonic() - start
+    print(f"{packets} packets in {elapsed:.2f}s "
+          f"({packets * PACKET_BITS / max(elapsed, 1e-9) / 1e6:.1f} Mb/s), {generator.stats}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,6 +11,7 @@ import subprocess
 import threading
 import time
 import queue
+import shlex
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Callable
 import logging
@@ -23,6 +24,45 @@ except ImportError:
     TSDUCK_AVAILABLE = False
     print("Warning: TSDuck Python bindings not available. Using subprocess fallback.")
 
+try:
+    from ts_engine import TSPacketEngine, NUMPY_AVAILABLE as TS_ENGINE_AVAILABLE
+except ImportError:
+    TS_ENGINE_AVAILABLE = False
+
+
+def split_params(params) -> List[str]:
+    """Plugin parameters from a config: shell-quoted text or an argument list"""
+    if not params:
+        return []
+    if isinstance(params, (list, tuple)):
+        return [str(param) for param in params]
+    return shlex.split(params)
+
+
+def strip_scheme(source: str) -> str:
+    """host:port of udp://host:port, tcp://host:port or a bare host:port"""
+    return source.split('://', 1)[-1].partition('?')[0]
+
+
+def srt_args(source: str, params: List[str]) -> List[str]:
+    """srt plugin options for srt://host:port?streamid=...&latency=... or host:port
+
+    An empty host (srt://:9000) listens, anything else calls. Options already
+    given in params win over the ones taken from the URL.
+    """
+    address, _, query = source.split('://', 1)[-1].partition('?')
+    args = []
+    if '--caller' not in params and '--listener' not in params and address:
+        if address.startswith(':'):
+            args.extend(['--listener', address[1:]])
+        else:
+            args.extend(['--caller', address])
+    for item in query.split('&') if query else []:
+        key, _, value = item.partition('=')
+        if key in ('streamid', 'latency', 'passphrase') and value and f'--{key}' not in params:
+            args.extend([f'--{key}', value])
+    return args
+
 
 class TSDuckCommandBuilder:
     """Build TSDuck commands from configuration"""
@@ -32,34 +72,28 @@ class TSDuckCommandBuilder:
         """Build input command from configuration"""
         input_type = config.get('type', 'file').lower()
         source = config.get('source', '')
-        params = config.get('params', '')
+        params = split_params(config.get('params', ''))
         
         if not source:
             raise ValueError("Input source is required")
             
-        cmd = ['-I', input_type, source]
+        # srt takes its address as options, the others as the plugin parameter
+        cmd = ['-I', input_type] if input_type == 'srt' else ['-I', input_type, source]
         
         # Add specific parameters based on input type
         if input_type == 'file':
             if not os.path.exists(source):
                 raise FileNotFoundError(f"Input file not found: {source}")
         elif input_type == 'udp':
-            # Parse UDP parameters
-            if ':' in source:
-                host, port = source.split(':', 1)
-                cmd.extend(['--local-address', host, '--local-port', port])
+            # UDP is tsp's ip plugin, [address:]port
+            cmd = ['-I', 'ip', strip_scheme(source)]
         elif input_type == 'tcp':
-            if ':' in source:
-                host, port = source.split(':', 1)
-                cmd.extend(['--server', host, '--port', port])
-        elif input_type == 'http':
-            cmd.extend(['--url', source])
-        elif input_type == 'hls':
-            cmd.extend(['--url', source])
+            cmd = ['-I', 'tcp', strip_scheme(source)]
+        elif input_type in ('http', 'hls'):
+            # The URL is the plugin parameter
+            pass
         elif input_type == 'srt':
-            if ':' in source:
-                host, port = source.split(':', 1)
-                cmd.extend(['--local-address', host, '--local-port', port])
+            cmd.extend(srt_args(source, params))
         elif input_type == 'rist':
             cmd.extend(['--url', source])
         elif input_type in ['dvb-t', 'dvb-s', 'dvb-c']:
@@ -84,8 +118,7 @@ class TSDuckCommandBuilder:
             cmd.extend(['--device', source])
             
         # Add additional parameters
-        if params:
-            cmd.extend(params.split())
+        cmd.extend(params)
             
         return cmd
     
@@ -94,12 +127,12 @@ class TSDuckCommandBuilder:
         """Build output command from configuration"""
         output_type = config.get('type', 'file').lower()
         destination = config.get('source', '')
-        params = config.get('params', '')
+        params = split_params(config.get('params', ''))
         
         if not destination:
             raise ValueError("Output destination is required")
             
-        cmd = ['-O', output_type, destination]
+        cmd = ['-O', output_type] if output_type == 'srt' else ['-O', output_type, destination]
         
         # Add specific parameters based on output type
         if output_type == 'file':
@@ -108,21 +141,15 @@ class TSDuckCommandBuilder:
             if output_dir and not os.path.exists(output_dir):
                 os.makedirs(output_dir, exist_ok=True)
         elif output_type == 'udp':
-            if ':' in destination:
-                host, port = destination.split(':', 1)
-                cmd.extend(['--remote-address', host, '--remote-port', port])
+            # UDP is tsp's ip plugin, address:port
+            cmd = ['-O', 'ip', strip_scheme(destination)]
         elif output_type == 'tcp':
-            if ':' in destination:
-                host, port = destination.split(':', 1)
-                cmd.extend(['--server', host, '--port', port])
-        elif output_type == 'http':
-            cmd.extend(['--url', destination])
-        elif output_type == 'hls':
-            cmd.extend(['--url', destination])
+            cmd = ['-O', 'tcp', strip_scheme(destination)]
+        elif output_type in ('http', 'hls'):
+            # The playlist or URL is the plugin parameter
+            pass
         elif output_type == 'srt':
-            if ':' in destination:
-                host, port = destination.split(':', 1)
-                cmd.extend(['--remote-address', host, '--remote-port', port])
+            cmd.extend(srt_args(destination, params))
         elif output_type == 'rist':
             cmd.extend(['--url', destination])
         elif output_type == 'asi':
@@ -135,8 +162,7 @@ class TSDuckCommandBuilder:
             cmd.extend(['--device', destination])
             
         # Add additional parameters
-        if params:
-            cmd.extend(params.split())
+        cmd.extend(params)
             
         return cmd
     
@@ -148,9 +174,7 @@ class TSDuckCommandBuilder:
         for plugin_name, config in plugins.items():
             if config.get('enabled', False):
                 commands.extend(['-P', plugin_name])
-                params = config.get('params', '')
-                if params:
-                    commands.extend(params.split())
+                commands.extend(split_params(config.get('params', '')))
                     
         return commands
     
@@ -293,6 +317,25 @@ class StreamAnalyzer:
             'pids': {},
             'tables': {}
         }
+        self.engine = TSPacketEngine() if TS_ENGINE_AVAILABLE else None
+        
+    def analyze_packets(self, data: bytes) -> Dict[str, Any]:
+        """Analyze raw transport stream bytes in-process"""
+        if self.engine is None:
+            raise RuntimeError("In-process analysis requires NumPy")
+        self.engine.feed(data)
+        self.stats.update(self.engine.get_stats())
+        return self.stats.copy()
+    
+    def analyze_file(self, path: str) -> Dict[str, Any]:
+        """Analyze a transport stream file in-process"""
+        if self.engine is None:
+            raise RuntimeError("In-process analysis requires NumPy")
+        self.engine.reset()
+        with open(path, 'rb') as f:
+            self.engine.read_stream(f)
+        self.stats.update(self.engine.get_stats())
+        return self.stats.copy()
         
     def parse_analyze_output(self, output: str) -> Dict[str, Any]:
         """Parse output from analyze plugin"""
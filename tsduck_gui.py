@@ -41,6 +41,8 @@ except ImportError:
     GUI_OPTIMIZATIONS_AVAILABLE = False
     print("Warning: GUI optimizations not available")
 
+from stream_monitor import TSDuckMonitor, DEFAULT_TAP_PORT
+
 # Try to import TSDuck Python bindings
 try:
     import tsduck
@@ -109,27 +111,39 @@ class TSDuckProcessor(QThread):
 
 
 class StreamMonitor(QThread):
-    """Thread for monitoring stream statistics"""
+    """Thread for monitoring stream statistics from the pipeline's tap"""
     stats_updated = pyqtSignal(dict)
     
-    def __init__(self):
+    def __init__(self, tap_port: int = DEFAULT_TAP_PORT):
         super().__init__()
         self._running = False
+        self.monitor = TSDuckMonitor(tap_port=tap_port)
+        
+    def tap_args(self, tsp_binary: str = "tsp") -> List[str]:
+        """Plugin arguments copying the processed stream to this monitor"""
+        return self.monitor.tap_args(tsp_binary)
         
     def run(self):
         """Monitor stream statistics"""
         self._running = True
+        self.monitor.metrics_collector.add_callback(self._emit_stats)
+        try:
+            self.monitor.start_monitoring()
+        except OSError as e:
+            print(f"[ERROR] Cannot open monitor tap on port {self.monitor.tap_port}: {e}")
+            return
         while self._running:
-            # Simulate stream monitoring
-            stats = {
-                'bitrate': 15000000,  # 15 Mbps
-                'packets_per_second': 25000,
-                'errors': 0,
-                'pcr_accuracy': 99.9,
-                'continuity_errors': 0
-            }
-            self.stats_updated.emit(stats)
-            time.sleep(1)
+            self.msleep(200)
+        self.monitor.stop_monitoring()
+        
+    def _emit_stats(self, stats):
+        self.stats_updated.emit({
+            'bitrate': stats.bitrate,
+            'packets_per_second': stats.packets_per_second,
+            'errors': stats.errors,
+            'pcr_accuracy': stats.pcr_accuracy,
+            'continuity_errors': stats.continuity_errors
+        })
     
     def stop(self):
         """Stop monitoring"""
@@ -378,6 +392,7 @@ class PluginWidget(QGroupBox):
 
 class SourcePreviewWidget(QGroupBox):
     """Widget for source preview functionality"""
+    preview_received = pyqtSignal(dict)
     
     def __init__(self, parent=None):
         super().__init__("Source Preview", parent)
@@ -479,9 +494,11 @@ class SourcePreviewWidget(QGroupBox):
         
         self.setLayout(layout)
         
-        # Preview processor
+        # Preview processor, it analyzes the tap of the running pipeline if any
         self.preview_processor = None
         self.input_config = None
+        self.tap = None
+        self.preview_received.connect(self.preview_callback)
         
     def start_preview(self):
         """Start source preview"""
@@ -495,15 +512,12 @@ class SourcePreviewWidget(QGroupBox):
         
         # Import and use the real preview processor
         try:
-            from source_preview import SourcePreviewProcessor, PreviewDataGenerator
-            
-            # For now, use sample data. In real implementation, use:
-            # self.preview_processor = SourcePreviewProcessor()
-            # self.preview_processor.start_preview(self.input_config, self.preview_callback)
+            from source_preview import SourcePreviewProcessor, preview_dict
             
-            # Use sample data for demonstration
-            sample_data = PreviewDataGenerator.generate_sample_data()
-            self.preview_callback(sample_data)
+            # Results arrive on the analysis thread, the signal queues them to the GUI
+            self.preview_processor = SourcePreviewProcessor()
+            self.preview_processor.start_preview(
+                self.input_config, lambda update: self.preview_received.emit(preview_dict(update)), tap=self.tap)
             
         except ImportError:
             # Fallback to simulated data
@@ -512,7 +526,8 @@ class SourcePreviewWidget(QGroupBox):
     def stop_preview(self):
         """Stop source preview"""
         if self.preview_processor:
-            self.preview_processor.stop()
+            self.preview_processor.stop_preview()
+            self.preview_processor = None
         self.preview_btn.setEnabled(True)
         self.stop_preview_btn.setEnabled(False)
         
@@ -614,6 +629,10 @@ Stream Properties:
         """Set input configuration for preview"""
         self.input_config = input_config
         
+    def set_tap(self, tap):
+        """Tap of the pipeline processing the previewed input, None once it stops"""
+        self.tap = tap
+        
     def refresh_preview(self):
         """Refresh preview data"""
         if self.preview_btn.isEnabled():
@@ -1168,16 +1187,21 @@ class MainWindow(QMainWindow):
             )
             return
             
+        # Start monitor, fed by a copy of the stream taken just before the output
+        self.monitor = StreamMonitor()
+        self.monitor.stats_updated.connect(self.update_statistics)
+        if '-O' in command:
+            output_index = len(command) - 1 - command[::-1].index('-O')
+            command[output_index:output_index] = self.monitor.tap_args(command[0])
+            # Previews of the input analyze the same tap instead of reconnecting
+            self.source_preview.set_tap(self.monitor.monitor.tap)
+        
         # Start processor
         self.processor = TSDuckProcessor(command)
         self.processor.output_received.connect(self.output_text.append)
         self.processor.error_received.connect(self.output_text.append)
         self.processor.finished.connect(self.processing_finished)
         
-        # Start monitor
-        self.monitor = StreamMonitor()
-        self.monitor.stats_updated.connect(self.update_statistics)
-        
         # Update UI
         self.start_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
@@ -1197,6 +1221,9 @@ class MainWindow(QMainWindow):
             
     def processing_finished(self, exit_code: int):
         """Handle processing finished"""
+        self.source_preview.set_tap(None)
+        if self.monitor:
+            self.monitor.stop()
         self.start_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
         